@@ -0,0 +1,462 @@
+"""
+=================================================================================
+ANTRIAN PEKERJAAN (JOB QUEUE) DOKUMEN TAT - SQLite lokal
+=================================================================================
+Pekerjaan berat (render massal, ekspor, terbit ulang) dikirim dari UI ke
+antrian dan dijalankan oleh proses worker terpisah:
+
+    python antrian.py worker --jumlah 2
+
+- Worker di-fork dari induk yang sudah hangat (pool_hangat.py): pustaka
+  dokumen, template kop & aturan rekomendasi sudah dimuat sebelum fork, dan
+  tiap worker didaur ulang setelah --maks-tugas pekerjaan.
+
+- Prioritas: angka kecil dijalankan lebih dulu (PRIORITAS_MENDESAK untuk
+  tenggat sidang), lalu tenggat terdekat, lalu urutan masuk.
+- Adil antar pengguna: di prioritas yang sama, pemilik dengan pekerjaan
+  berjalan paling sedikit didahulukan.
+- Retry dengan backoff eksponensial; pekerjaan milik worker yang mati
+  dikembalikan ke antrian setelah heartbeat kedaluwarsa.
+- Admission control: pengiriman ditolak (AntrianPenuh) bila antrian total
+  atau antrian milik satu pengguna sudah terlalu dalam.
+=================================================================================
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import zipfile
+from contextlib import contextmanager
+
+import enkripsi
+from arsip import DATA_DIR, Arsip
+from gudang import GudangBlob, ref_surat
+from pool_hangat import MAKS_TUGAS, Pengawas, panaskan
+
+ANTRIAN_PATH = os.path.join(DATA_DIR, "antrian.sqlite3")
+KELUARAN_DIR = os.path.join(DATA_DIR, "keluaran")
+
+PRIORITAS_MENDESAK = 0
+PRIORITAS_TINGGI = 10
+PRIORITAS_NORMAL = 50
+PRIORITAS_RENDAH = 90
+
+BATAS_ANTRIAN = int(os.environ.get("TAT_ANTRIAN_MAKS", "1000"))
+BATAS_ANTRIAN_PER_PEMILIK = int(os.environ.get("TAT_ANTRIAN_MAKS_PEMILIK", "50"))
+HEARTBEAT_TIMEOUT = 300  # detik
+INTERVAL_DETAK = HEARTBEAT_TIMEOUT / 5
+
+SKEMA_ANTRIAN = """
+CREATE TABLE IF NOT EXISTS pekerjaan (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    jenis TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    pemilik TEXT NOT NULL DEFAULT '',
+    prioritas INTEGER NOT NULL DEFAULT 50,
+    tenggat REAL,
+    status TEXT NOT NULL DEFAULT 'antri',
+    percobaan INTEGER NOT NULL DEFAULT 0,
+    maks_percobaan INTEGER NOT NULL DEFAULT 3,
+    jalan_setelah REAL NOT NULL DEFAULT 0,
+    worker TEXT,
+    heartbeat REAL,
+    kemajuan TEXT,
+    hasil TEXT,
+    error TEXT,
+    dibuat REAL NOT NULL,
+    selesai REAL
+);
+CREATE INDEX IF NOT EXISTS idx_pekerjaan_antri
+    ON pekerjaan(status, prioritas, tenggat, id);
+CREATE INDEX IF NOT EXISTS idx_pekerjaan_pemilik ON pekerjaan(pemilik, status);
+"""
+
+
+class AntrianPenuh(Exception):
+    """Antrian terlalu dalam; pengiriman pekerjaan baru ditolak sementara"""
+
+
+# =============================================================================
+# REGISTRY HANDLER
+# =============================================================================
+HANDLER = {}
+
+
+def handler(jenis):
+    """Dekorator pendaftaran fungsi pelaksana untuk satu jenis pekerjaan"""
+    def _daftar(fn):
+        HANDLER[jenis] = fn
+        return fn
+    return _daftar
+
+
+# =============================================================================
+# ANTRIAN
+# =============================================================================
+class Antrian:
+    def __init__(self, path=None):
+        self.path = path or ANTRIAN_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SKEMA_ANTRIAN)
+        # Koneksi dapat dipakai bersama beberapa sesi (thread) Streamlit
+        self._lock = threading.RLock()
+
+    def close(self):
+        self._conn.close()
+
+    @contextmanager
+    def _transaksi(self):
+        """Lock antar-thread + BEGIN IMMEDIATE (kunci tulis antar-proses) sampai COMMIT/ROLLBACK"""
+        with self._lock:
+            c = self._conn
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                yield c
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+            c.execute("COMMIT")
+
+    def kirim(self, jenis, payload, pemilik='', prioritas=PRIORITAS_NORMAL,
+              tenggat=None, maks_percobaan=3):
+        """Masukkan pekerjaan ke antrian, kembalikan id. Raise AntrianPenuh bila penuh."""
+        if jenis not in HANDLER:
+            raise ValueError(f"Jenis pekerjaan tidak dikenal: {jenis}")
+        with self._transaksi() as c:
+            total, milik = c.execute(
+                "SELECT COUNT(*), COALESCE(SUM(pemilik = ?), 0) FROM pekerjaan "
+                "WHERE status IN ('antri', 'berjalan')", (pemilik,)
+            ).fetchone()
+            # Pekerjaan mendesak tetap diterima walau antrian dalam
+            if prioritas > PRIORITAS_MENDESAK:
+                if total >= BATAS_ANTRIAN:
+                    raise AntrianPenuh(f"Antrian penuh ({total} pekerjaan), coba lagi nanti")
+                if milik >= BATAS_ANTRIAN_PER_PEMILIK:
+                    raise AntrianPenuh(f"Anda masih memiliki {milik} pekerjaan dalam antrian")
+            cur = c.execute(
+                "INSERT INTO pekerjaan (jenis, payload, pemilik, prioritas, tenggat, "
+                "maks_percobaan, dibuat) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (jenis, json.dumps(payload, ensure_ascii=False), pemilik, prioritas,
+                 tenggat, maks_percobaan, time.time())
+            )
+            return cur.lastrowid
+
+    def ambil(self, worker):
+        """Klaim satu pekerjaan siap jalan secara atomik (None jika kosong)"""
+        now = time.time()
+        with self._transaksi() as c:
+            row = c.execute(
+                "SELECT p.id FROM pekerjaan p WHERE p.status = 'antri' AND p.jalan_setelah <= ? "
+                "ORDER BY p.prioritas, "
+                "(SELECT COUNT(*) FROM pekerjaan b WHERE b.pemilik = p.pemilik AND b.status = 'berjalan'), "
+                "COALESCE(p.tenggat, 1e18), p.id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            c.execute(
+                "UPDATE pekerjaan SET status = 'berjalan', worker = ?, heartbeat = ?, "
+                "percobaan = percobaan + 1 WHERE id = ?",
+                (worker, now, row['id'])
+            )
+            job = c.execute("SELECT * FROM pekerjaan WHERE id = ?", (row['id'],)).fetchone()
+        job = dict(job)
+        job['payload'] = json.loads(job['payload'])
+        return job
+
+    def detak(self, job_id, worker):
+        """Heartbeat pekerjaan berjalan; False bila pekerjaan sudah bukan milik worker ini"""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE pekerjaan SET heartbeat = ? WHERE id = ? AND status = 'berjalan' AND worker = ?",
+                (time.time(), job_id, worker)
+            )
+        return cur.rowcount == 1
+
+    def laporkan_kemajuan(self, job_id, kemajuan):
+        """Perbarui kemajuan + heartbeat pekerjaan berjalan"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pekerjaan SET kemajuan = ?, heartbeat = ? WHERE id = ? AND status = 'berjalan'",
+                (kemajuan, time.time(), job_id)
+            )
+
+    def selesai(self, job_id, hasil, worker):
+        """Tandai selesai; False (hasil dibuang) bila pekerjaan sudah diklaim ulang worker lain"""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE pekerjaan SET status = 'selesai', hasil = ?, error = NULL, selesai = ? "
+                "WHERE id = ? AND status = 'berjalan' AND worker = ?",
+                (json.dumps(hasil, ensure_ascii=False), time.time(), job_id, worker)
+            )
+        return cur.rowcount == 1
+
+    def gagal(self, job_id, error, worker):
+        """Catat kegagalan; jadwalkan ulang dengan backoff bila masih ada sisa percobaan"""
+        with self._transaksi() as c:
+            job = c.execute(
+                "SELECT percobaan, maks_percobaan FROM pekerjaan "
+                "WHERE id = ? AND status = 'berjalan' AND worker = ?",
+                (job_id, worker)
+            ).fetchone()
+            if job is None:
+                return False
+            if job['percobaan'] < job['maks_percobaan']:
+                c.execute(
+                    "UPDATE pekerjaan SET status = 'antri', error = ?, worker = NULL, "
+                    "jalan_setelah = ? WHERE id = ?",
+                    (error, time.time() + 2 ** job['percobaan'], job_id)
+                )
+            else:
+                c.execute(
+                    "UPDATE pekerjaan SET status = 'gagal', error = ?, selesai = ? WHERE id = ?",
+                    (error, time.time(), job_id)
+                )
+        return True
+
+    def pulihkan_macet(self, timeout=HEARTBEAT_TIMEOUT):
+        """
+        Pekerjaan yang worker-nya berhenti mengirim heartbeat: dijadwalkan ulang
+        dengan backoff seperti gagal(), atau gagal permanen bila percobaannya
+        habis (pekerjaan yang mematikan worker-nya tidak diklaim ulang terus).
+        """
+        now = time.time()
+        with self._transaksi() as c:
+            habis = c.execute(
+                "UPDATE pekerjaan SET status = 'gagal', worker = NULL, selesai = ?, "
+                "error = 'worker berhenti tanpa heartbeat (percobaan habis)' "
+                "WHERE status = 'berjalan' AND heartbeat < ? AND percobaan >= maks_percobaan",
+                (now, now - timeout)
+            ).rowcount
+            ulang = c.execute(
+                "UPDATE pekerjaan SET status = 'antri', worker = NULL, "
+                "error = 'worker berhenti tanpa heartbeat', jalan_setelah = ? + (1 << percobaan) "
+                "WHERE status = 'berjalan' AND heartbeat < ?",
+                (now, now - timeout)
+            ).rowcount
+        return habis + ulang
+
+    def status(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM pekerjaan WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['hasil'] = json.loads(job['hasil']) if job['hasil'] else None
+        return job
+
+    def daftar(self, pemilik=None, limit=20):
+        """Pekerjaan terbaru (opsional: milik satu pengguna)"""
+        with self._lock:
+            if pemilik is None:
+                rows = self._conn.execute(
+                    "SELECT id, jenis, prioritas, status, percobaan, kemajuan, error, dibuat, selesai, hasil "
+                    "FROM pekerjaan ORDER BY id DESC LIMIT ?", (limit,)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT id, jenis, prioritas, status, percobaan, kemajuan, error, dibuat, selesai, hasil "
+                    "FROM pekerjaan WHERE pemilik = ? ORDER BY id DESC LIMIT ?", (pemilik, limit)
+                ).fetchall()
+        hasil = []
+        for row in rows:
+            job = dict(row)
+            job['hasil'] = json.loads(job['hasil']) if job['hasil'] else None
+            hasil.append(job)
+        return hasil
+
+    def kedalaman(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM pekerjaan WHERE status IN ('antri', 'berjalan')"
+            ).fetchone()[0]
+
+
+# =============================================================================
+# HANDLER PEKERJAAN
+# =============================================================================
+@handler("render_surat")
+def render_surat(job, antrian):
+    """
+    Render surat Word + PDF bertanda tangan untuk daftar kasus arsip, hasil berupa
+    ZIP; payload bundel=True menambah satu PDF gabungan untuk dicetak.
+    """
+    from app import generate_pdf_bundle, generate_word_document
+    from audit import LogAudit
+    import tanda_tangan
+
+    kasus_ids = job['payload']['kasus_ids']
+    bundel = [] if job['payload'].get('bundel') else None
+    arsip = Arsip()
+    gudang = GudangBlob()
+    kunci = tanda_tangan.muat_kunci()
+    audit = LogAudit(kunci=kunci)
+    os.makedirs(KELUARAN_DIR, exist_ok=True)
+    path_zip = os.path.join(KELUARAN_DIR, f"pekerjaan_{job['id']}.zip")
+
+    # ZIP ditulis langsung ke stream terenkripsi: bundel tidak pernah utuh sebagai plaintext
+    try:
+        with enkripsi.buka_tulis(path_zip) as keluaran, \
+                zipfile.ZipFile(keluaran, "w", zipfile.ZIP_STORED) as zf:
+            for idx, kasus_id in enumerate(kasus_ids, 1):
+                hasil = arsip.ambil_kasus(kasus_id)
+                if hasil is None:
+                    continue
+                nama_file = f"Surat_TAT_{kasus_id}_{hasil['data']['nama'].replace(' ', '_')}"
+                # Surat yang sudah pernah di-render/ditandatangani diambil dari gudang blob
+                ref_word, ref_pdf = ref_surat(kasus_id, 'docx'), ref_surat(kasus_id, 'pdf')
+                sha_word = gudang.cari(ref_word) or gudang.simpan(
+                    generate_word_document(hasil['data'], hasil['medical'],
+                                           hasil['legal'], hasil['recommendation']), ref_word)
+                sha_pdf = gudang.cari(ref_pdf)
+                if sha_pdf is None or arsip.cari_surat(sha_pdf) is None:
+                    surat_ttd = tanda_tangan.tandatangani_surat(hasil, kunci)
+                    arsip.simpan_surat(surat_ttd)
+                    audit.catat('tanda_tangan_surat', pengguna=job['pemilik'], tunggu=False,
+                                kasus_id=kasus_id, nomor_surat=surat_ttd['nomor_surat'],
+                                sha256=surat_ttd['sha256'], id_kunci=surat_ttd['id_kunci'],
+                                pekerjaan=job['id'])
+                    sha_pdf = gudang.simpan(surat_ttd['pdf'], ref_pdf)
+                for sha, ekstensi in ((sha_word, ".docx"), (sha_pdf, ".pdf")):
+                    with gudang.buka(sha) as isi:
+                        zf.writestr(nama_file + ekstensi, isi)
+                if bundel is not None:
+                    bundel.append(hasil)
+                if idx % 10 == 0 or idx == len(kasus_ids):
+                    antrian.laporkan_kemajuan(job['id'], f"{idx}/{len(kasus_ids)}")
+            if bundel:
+                # Salinan cetak tanpa tanda tangan; surat resmi tetap PDF per kasus
+                zf.writestr(f"Bundel_Cetak_{job['id']}.pdf", generate_pdf_bundle(bundel).getvalue())
+        audit.flush()  # pekerjaan baru dinyatakan selesai setelah jejak auditnya tersimpan
+    finally:
+        audit.close()
+        gudang.close()
+        arsip.close()
+
+    return {'file': path_zip, 'jumlah': len(kasus_ids)}
+
+
+@handler("terbit_ulang")
+def terbit_ulang(job, antrian):
+    """Terbit ulang surat kasus terdampak ganti penandatangan/kop, hasil berupa laporan CSV"""
+    import terbit_ulang as modul_terbit
+
+    p = job['payload']
+    r = modul_terbit.terbitkan_ulang(
+        p['kasus_ids'], p.get('penandatangan'), p.get('kop_berubah', False),
+        proses=p.get('proses'), pengguna=job['pemilik'],
+        laporan=lambda n, total: antrian.laporkan_kemajuan(job['id'], f"{n}/{total}"),
+    )
+    teks = io.StringIO()
+    penulis = csv.DictWriter(teks, fieldnames=['kasus_id', 'nomor_surat', 'cara', 'sha256'])
+    penulis.writeheader()
+    penulis.writerows(r['rincian'])
+    os.makedirs(KELUARAN_DIR, exist_ok=True)
+    path = os.path.join(KELUARAN_DIR, f"pekerjaan_{job['id']}_terbit_ulang.csv")
+    with enkripsi.buka_tulis(path) as f:
+        f.write(teks.getvalue().encode("utf-8"))
+    return {'file': path, 'jumlah': r['jumlah'], 'tambal': r['tambal'], 'render': r['render']}
+
+
+@handler("rekap")
+def rekap(job, antrian):
+    """Rekap bulanan/tahunan XLSX/CSV dari arsip (streaming, lihat rekap.py)"""
+    import rekap as modul_rekap
+
+    tahun, bulan = job['payload']['tahun'], job['payload'].get('bulan')
+    format_rekap = job['payload'].get('format', 'xlsx')
+    nama = f"pekerjaan_{job['id']}_{modul_rekap.nama_rekap(tahun, bulan, format_rekap)}"
+    path, jumlah = modul_rekap.buat_rekap(
+        tahun, bulan, format_rekap, path=os.path.join(KELUARAN_DIR, nama),
+        laporan=lambda n: antrian.laporkan_kemajuan(job['id'], f"{n} kasus"),
+    )
+    return {'file': path, 'jumlah': jumlah}
+
+
+# =============================================================================
+# WORKER
+# =============================================================================
+def _detak(antrian, job_id, worker, berhenti):
+    while not berhenti.wait(INTERVAL_DETAK):
+        if not antrian.detak(job_id, worker):
+            return
+
+
+def jalankan_worker(nama_worker, path=None, jeda=1.0, berhenti_jika_kosong=False,
+                    maks_pekerjaan=None):
+    """
+    Loop worker: klaim pekerjaan, jalankan handler, catat hasil/galat.
+    Berhenti setelah maks_pekerjaan pekerjaan (None = tanpa batas) agar
+    pengawas dapat mendaur ulang proses.
+    """
+    antrian = Antrian(path)
+    jumlah = 0
+    try:
+        while maks_pekerjaan is None or jumlah < maks_pekerjaan:
+            antrian.pulihkan_macet()
+            job = antrian.ambil(nama_worker)
+            if job is None:
+                if berhenti_jika_kosong:
+                    return
+                time.sleep(jeda)
+                continue
+            # Heartbeat dari thread terpisah selama handler berjalan, agar pekerjaan
+            # panjang tanpa laporan kemajuan tidak dianggap macet dan dijalankan dua kali
+            berhenti = threading.Event()
+            detak = threading.Thread(target=_detak, args=(antrian, job['id'], nama_worker, berhenti),
+                                     daemon=True)
+            detak.start()
+            try:
+                hasil = HANDLER[job['jenis']](job, antrian)
+            except Exception:
+                antrian.gagal(job['id'], traceback.format_exc(limit=5), nama_worker)
+            else:
+                antrian.selesai(job['id'], hasil, nama_worker)
+            finally:
+                berhenti.set()
+                detak.join()
+            jumlah += 1
+    finally:
+        antrian.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker antrian dokumen TAT")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    p_worker = sub.add_parser("worker", help="jalankan proses worker")
+    p_worker.add_argument("--jumlah", type=int, default=2, help="jumlah proses worker")
+    p_worker.add_argument("--maks-tugas", type=int, default=MAKS_TUGAS,
+                          help="daur ulang worker setelah N pekerjaan (0 = tanpa batas)")
+    p_worker.add_argument("--dingin", action="store_true",
+                          help="lewati pemanasan (worker mengimpor pustaka sendiri)")
+    sub.add_parser("status", help="tampilkan pekerjaan terbaru")
+    args = parser.parse_args()
+
+    if args.perintah == "worker":
+        if not args.dingin:
+            print(f"Pemanasan worker: {panaskan() * 1000:.0f} ms")
+        pengawas = Pengawas(jalankan_worker, args.jumlah, f"{socket.gethostname()}:{os.getpid()}",
+                            maks_pekerjaan=args.maks_tugas or None)
+        pengawas.jalankan()
+    else:
+        antrian = Antrian()
+        for job in antrian.daftar(limit=50):
+            print(f"#{job['id']:<6} {job['jenis']:<16} p={job['prioritas']:<3} "
+                  f"{job['status']:<9} {job['kemajuan'] or '':<10} {job['error'] or ''}"[:160])
+
+
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,14 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from io import BytesIO
+import functools
+import hmac
+import itertools
 import json
+import os
+import uuid
+import zipfile
+from xml.sax.saxutils import escape
 
 # ReportLab untuk PDF
 from reportlab.lib.pagesizes import letter, A4
@@ -23,12 +30,31 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, cm
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
+from reportlab import rl_config
 
 # python-docx untuk Word
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 
+# Arsip & tanda tangan elektronik
+from arsip import Arsip
+from asam import NAMA_DIMENSI, PENEMPATAN, RAWAT_INAP, TIDAK_DINILAI, nilai_asam, penempatan_asam
+from audit import AuditGagal, LogAudit
+import enkripsi
+from gudang import GudangBlob, ref_surat
+import tanda_tangan
+from antrian import (Antrian, AntrianPenuh, PRIORITAS_MENDESAK, PRIORITAS_TINGGI,
+                     PRIORITAS_NORMAL, PRIORITAS_RENDAH)
+from profiler import ProfilRerun
+from rekap import NAMA_BULAN
+from saran import IndeksSaran
+from sinkron import MODE_LAPANGAN
+from ruang_kerja import RuangKerja, STATUS_DIUNDUH
+from tenant import REGISTRI, get_tenant
+from terbit_ulang import FIELD_TTD, pilih_kasus
+from validasi import FORMAT_TANGGAL_SURAT, SATUAN_BARANG_BUKTI, USIA_MAKS, USIA_MIN, validasi_kasus
+
 # =============================================================================
 # KONFIGURASI
 # =============================================================================
@@ -130,6 +156,23 @@ SEMA_LIMITS = {
     # beberapa kategori tambahan bisa ditambahkan di sini
 }
 
+# Token mode admin (akses via ?admin=<token>); kosong = mode admin nonaktif
+ADMIN_TOKEN = os.environ.get("TAT_ADMIN_TOKEN", "")
+
+# Prioritas antrian dokumen (angka kecil = didahulukan)
+PRIORITAS_ANTRIAN = {
+    "Normal": PRIORITAS_NORMAL,
+    "Tinggi": PRIORITAS_TINGGI,
+    "Mendesak (tenggat sidang)": PRIORITAS_MENDESAK,
+}
+
+# Tombol unduh hasil pekerjaan antrian per ekstensi file: (label, mime)
+UNDUHAN_PEKERJAAN = {
+    ".zip": ("🗂️ Download ZIP Surat", "application/zip"),
+    ".xlsx": ("📊 Download Rekap (XLSX)", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    ".csv": ("📊 Download Rekap (CSV)", "text/csv"),
+}
+
 # Zat yang diakui oleh Juknis / daftar G tapi TIDAK termasuk ambang numerik SEMA:
 NON_SEMA_LIST = [
     "Carisoprodol",
@@ -138,6 +181,22 @@ NON_SEMA_LIST = [
     # tambahkan jika ada obat daftar-G lain
 ]
 
+@functools.lru_cache(maxsize=None)
+def regulasi_tenant(tenant):
+    """Regulasi efektif tenant (override SEMA digabung sekali per tenant per proses)"""
+    if tenant.sema_limits is None and tenant.non_sema_list is None:
+        return {}
+    sema_limits = dict(SEMA_LIMITS)
+    for jenis, info in (tenant.sema_limits or {}).items():
+        if info is None:
+            sema_limits.pop(jenis, None)
+        else:
+            sema_limits[jenis] = info
+    return {
+        'sema_limits': sema_limits,
+        'non_sema_list': list(tenant.non_sema_list) if tenant.non_sema_list is not None else None,
+    }
+
 # =============================================================================
 # FUNGSI GENERATE NOMOR SURAT
 # =============================================================================
@@ -182,7 +241,7 @@ def analyze_medical_data(data):
     
     diagnosis = DIAGNOSIS_ICD10.get(diagnosis_code, "Gangguan Mental dan Perilaku akibat Penggunaan Zat")
     
-    return {
+    hasil = {
         'dsm5_count': dsm5_count,
         'severity': severity,
         'severity_level': severity_level,
@@ -191,16 +250,27 @@ def analyze_medical_data(data):
         'pola_penggunaan': data.get('pola_penggunaan', 'Situasional'),
         'durasi_bulan': data.get('durasi_bulan', 0)
     }
+    
+    # Level layanan ASAM (hanya kasus yang diisi jawaban ASAM-nya)
+    asam = nilai_asam(data)
+    if asam:
+        hasil['asam'] = asam
+    return hasil
 
 # =============================================================================
 # FUNGSI EVALUASI SEMA
 # =============================================================================
-def evaluate_barang_bukti_sema(barang_bukti_detail):
+def evaluate_barang_bukti_sema(barang_bukti_detail, sema_limits=None, non_sema_list=None):
     """
     Evaluasi tiap barang bukti terhadap ambang SEMA.
     barang_bukti_detail: dict keyed by jenis (string) -> {"jumlah": float, "satuan": str}
+    sema_limits/non_sema_list: versi regulasi lain (default: SEMA_LIMITS/NON_SEMA_LIST)
     Mengembalikan dict ringkasan.
     """
+    if sema_limits is None:
+        sema_limits = SEMA_LIMITS
+    if non_sema_list is None:
+        non_sema_list = NON_SEMA_LIST
     sema_exceeded = []
     sema_within = []
     unit_issues = []
@@ -224,11 +294,11 @@ def evaluate_barang_bukti_sema(barang_bukti_detail):
         key = jenis
 
         # Non SEMA -> daftar obat daftar G dll
-        if key in NON_SEMA_LIST:
+        if key in non_sema_list:
             non_sema_items.append(f"{key}: jumlah={jumlah} {satuan} (NON-SEMA - dinilai kualitatif sesuai Juknis)")
             continue
 
-        sema_info = SEMA_LIMITS.get(key)
+        sema_info = sema_limits.get(key)
         if not sema_info:
             unit_issues.append(f"{key}: tidak terdapat di SEMA (perlu penilaian ahli/juknis)")
             continue
@@ -263,8 +333,14 @@ def evaluate_barang_bukti_sema(barang_bukti_detail):
 # =============================================================================
 # FUNGSI ANALISIS HUKUM
 # =============================================================================
-def analyze_legal_data(data):
-    """Analisis data hukum berdasarkan KEP/99 + evaluasi SEMA bila diaktifkan"""
+def analyze_legal_data(data, regulasi=None):
+    """
+    Analisis data hukum berdasarkan KEP/99 + evaluasi SEMA bila diaktifkan.
+    regulasi: opsional dict {'sema_limits', 'non_sema_list'} untuk versi regulasi lain
+    (default: regulasi tenant data['tenant'])
+    """
+    if regulasi is None:
+        regulasi = regulasi_tenant(get_tenant(data.get('tenant')))
     
     # Cek keterlibatan jaringan awal berdasarkan tujuan & metode pembelian
     tujuan_kepemilikan = data.get('tujuan_kepemilikan', '')
@@ -286,7 +362,11 @@ def analyze_legal_data(data):
 
     sema_result = {}
     if enable_sema_evaluation and barang_bukti_detail:
-        sema_result = evaluate_barang_bukti_sema(barang_bukti_detail)
+        sema_result = evaluate_barang_bukti_sema(
+            barang_bukti_detail,
+            regulasi.get('sema_limits'),
+            regulasi.get('non_sema_list')
+        )
         # Jika ada yang melebihi ambang SEMA, pastikan keterlibatan_jaringan menjadi Didapatkan
         if sema_result.get('sema_exceeded'):
             keterlibatan_jaringan = "Didapatkan (Berdasarkan jumlah BB melebihi SEMA)"
@@ -310,55 +390,191 @@ def analyze_legal_data(data):
 # =============================================================================
 # FUNGSI REKOMENDASI
 # =============================================================================
-def generate_recommendation(medical_analysis, legal_analysis, demografi):
-    """Generate rekomendasi berdasarkan analisis medis dan hukum"""
-    
-    severity = medical_analysis['severity_level']
-    keterlibatan = legal_analysis['keterlibatan_jaringan']
-    dsm5 = medical_analysis['dsm5_count']
-    
-    # Rule-based recommendation (tetap mempertahankan logika awal)
-    if keterlibatan == "Tidak didapatkan" and dsm5 >= 2:
-        if severity == "Berat" or dsm5 >= 6:
-            rekomendasi = "Rehabilitasi Rawat Inap"
-            durasi = "6 (enam) bulan"
-            tempat = "RS/Balai Besar Rehabilitasi/Lembaga Rehabilitasi/Institusi Penerima Wajib Lapor Badan Narkotika Nasional"
-        else:
-            rekomendasi = "Rehabilitasi Rawat Jalan"
-            durasi = "3 (tiga) bulan"
-            tempat = "Institusi Penerima Wajib Lapor Badan Narkotika Nasional"
-            
-        tindak_lanjut = "dilanjutkan sesuai ketentuan Perundang-Undangan"
-        wajib_lapor = f"melaksanakan WAJIB LAPOR kepada Penyidik {demografi.get('instansi_penyidik', 'Polda/Polres')} sampai selesai proses rehabilitasi"
-        
-    elif keterlibatan.startswith("Didapatkan") and dsm5 >= 2:
-        rekomendasi = "Proses Hukum dengan Rehabilitasi"
-        durasi = "sesuai putusan hakim"
-        tempat = "Lembaga Pemasyarakatan dengan fasilitas rehabilitasi"
-        tindak_lanjut = "dilanjutkan proses hukum dengan mempertimbangkan aspek rehabilitasi"
-        wajib_lapor = "menjalani rehabilitasi dalam masa penahanan/pidana"
-        
+# Keluaran tiap aturan. {instansi_penyidik} diisi dari data demografi saat lookup.
+ATURAN_REKOMENDASI = {
+    "R1-RAWAT-INAP": {
+        'rekomendasi': "Rehabilitasi Rawat Inap",
+        'durasi': "6 (enam) bulan",
+        'tempat': "RS/Balai Besar Rehabilitasi/Lembaga Rehabilitasi/Institusi Penerima Wajib Lapor Badan Narkotika Nasional",
+        'tindak_lanjut': "dilanjutkan sesuai ketentuan Perundang-Undangan",
+        'wajib_lapor': "melaksanakan WAJIB LAPOR kepada Penyidik {instansi_penyidik} sampai selesai proses rehabilitasi",
+    },
+    "R2-RAWAT-JALAN": {
+        'rekomendasi': "Rehabilitasi Rawat Jalan",
+        'durasi': "3 (tiga) bulan",
+        'tempat': "Institusi Penerima Wajib Lapor Badan Narkotika Nasional",
+        'tindak_lanjut': "dilanjutkan sesuai ketentuan Perundang-Undangan",
+        'wajib_lapor': "melaksanakan WAJIB LAPOR kepada Penyidik {instansi_penyidik} sampai selesai proses rehabilitasi",
+    },
+    "R3-HUKUM-REHAB": {
+        'rekomendasi': "Proses Hukum dengan Rehabilitasi",
+        'durasi': "sesuai putusan hakim",
+        'tempat': "Lembaga Pemasyarakatan dengan fasilitas rehabilitasi",
+        'tindak_lanjut': "dilanjutkan proses hukum dengan mempertimbangkan aspek rehabilitasi",
+        'wajib_lapor': "menjalani rehabilitasi dalam masa penahanan/pidana",
+    },
+    "R4-PROSES-HUKUM": {
+        'rekomendasi': "Proses Hukum",
+        'durasi': "-",
+        'tempat': "-",
+        'tindak_lanjut': "dilanjutkan sesuai ketentuan Perundang-Undangan",
+        'wajib_lapor': "-",
+    },
+}
+
+# Domain input terdiskretisasi: (keterlibatan, dsm5, keparahan, penempatan ASAM)
+DOMAIN_KETERLIBATAN = ("TIDAK", "DIDAPATKAN", "LAIN")
+DOMAIN_DSM5 = ("0-1", "2-5", "6+")
+DOMAIN_KEPARAHAN = ("Berat", "Bukan Berat")
+DOMAIN_ASAM = PENEMPATAN  # Tidak Dinilai / Rawat Jalan / Rawat Inap
+
+# Predikat aturan di atas domain terdiskretisasi. Aturan spesifik tidak boleh
+# saling tumpang tindih; aturan default hanya berlaku bila tidak ada yang cocok.
+# Penempatan ASAM Rawat Inap menaikkan gangguan ringan/sedang ke rawat inap;
+# kasus tanpa penilaian ASAM diputus seperti sebelumnya (DSM-5 saja).
+PREDIKAT_REKOMENDASI = [
+    ("R1-RAWAT-INAP", lambda k, d, s, a: k == "TIDAK" and d != "0-1"
+                                         and (s == "Berat" or d == "6+" or a == RAWAT_INAP)),
+    ("R2-RAWAT-JALAN", lambda k, d, s, a: k == "TIDAK" and d == "2-5" and s != "Berat"
+                                          and a != RAWAT_INAP),
+    ("R3-HUKUM-REHAB", lambda k, d, s, a: k == "DIDAPATKAN" and d != "0-1"),
+]
+ATURAN_DEFAULT = "R4-PROSES-HUKUM"
+
+def diskretisasi_rekomendasi(severity_level, keterlibatan_jaringan, dsm5_count, penempatan=TIDAK_DINILAI):
+    """Petakan input mentah ke kunci tabel keputusan (penempatan: hasil ASAM, lihat asam.py)"""
+    if keterlibatan_jaringan == "Tidak didapatkan":
+        k = "TIDAK"
+    elif keterlibatan_jaringan.startswith("Didapatkan"):
+        k = "DIDAPATKAN"
+    else:
+        k = "LAIN"
+    
+    if dsm5_count >= 6:
+        d = "6+"
+    elif dsm5_count >= 2:
+        d = "2-5"
     else:
-        rekomendasi = "Proses Hukum"
-        durasi = "-"
-        tempat = "-"
-        tindak_lanjut = "dilanjutkan sesuai ketentuan Perundang-Undangan"
-        wajib_lapor = "-"
+        d = "0-1"
+    
+    return (k, d, "Berat" if severity_level == "Berat" else "Bukan Berat", penempatan)
+
+def compile_tabel_rekomendasi(predikat=None, default=ATURAN_DEFAULT, aturan=None):
+    """
+    Kompilasi aturan menjadi tabel keputusan lengkap {kunci: rule_id}.
+    Raise ValueError bila ada kombinasi yang tidak tercakup, aturan spesifik
+    yang tumpang tindih (konflik), atau rule_id tanpa definisi keluaran.
+    """
+    predikat = PREDIKAT_REKOMENDASI if predikat is None else predikat
+    aturan = ATURAN_REKOMENDASI if aturan is None else aturan
+    
+    tabel = {}
+    konflik = []
+    for kunci in itertools.product(DOMAIN_KETERLIBATAN, DOMAIN_DSM5, DOMAIN_KEPARAHAN, DOMAIN_ASAM):
+        cocok = [rule_id for rule_id, fn in predikat if fn(*kunci)]
+        if len(cocok) > 1:
+            konflik.append((kunci, cocok))
+        rule_id = cocok[0] if cocok else default
+        if rule_id is None:
+            raise ValueError(f"Tabel rekomendasi tidak lengkap: {kunci} tidak tercakup aturan")
+        tabel[kunci] = rule_id
+    
+    if konflik:
+        raise ValueError(f"Konflik aturan rekomendasi: {konflik}")
+    tidak_terdefinisi = set(tabel.values()) - set(aturan)
+    if tidak_terdefinisi:
+        raise ValueError(f"Aturan tanpa keluaran: {sorted(tidak_terdefinisi)}")
+    return tabel
+
+# Dikompilasi & diverifikasi sekali saat modul dimuat
+TABEL_REKOMENDASI = compile_tabel_rekomendasi()
+
+def generate_recommendation(medical_analysis, legal_analysis, demografi, tabel=None, aturan=None):
+    """
+    Generate rekomendasi via lookup tabel keputusan (menyertakan rule_id yang berlaku).
+    tabel/aturan: versi tabel keputusan lain (default: TABEL_REKOMENDASI/ATURAN_REKOMENDASI)
+    """
+    if tabel is None:
+        tabel = TABEL_REKOMENDASI
+    if aturan is None:
+        aturan = ATURAN_REKOMENDASI
+    
+    kunci = diskretisasi_rekomendasi(
+        medical_analysis['severity_level'],
+        legal_analysis['keterlibatan_jaringan'],
+        medical_analysis['dsm5_count'],
+        penempatan_asam(medical_analysis.get('asam'))
+    )
+    rule_id = tabel[kunci]
+    keluaran = aturan[rule_id]
     
     return {
-        'rekomendasi': rekomendasi,
-        'durasi': durasi,
-        'tempat': tempat,
-        'tindak_lanjut': tindak_lanjut,
-        'wajib_lapor': wajib_lapor
+        'rekomendasi': keluaran['rekomendasi'],
+        'durasi': keluaran['durasi'],
+        'tempat': keluaran['tempat'],
+        'tindak_lanjut': keluaran['tindak_lanjut'],
+        'wajib_lapor': keluaran['wajib_lapor'].format(
+            instansi_penyidik=demografi.get('instansi_penyidik', 'Polda/Polres')
+        ),
+        'rule_id': rule_id
     }
 
+# =============================================================================
+# RENDER DETERMINISTIK
+# =============================================================================
+# Input sama -> bytes surat identik (hash stabil untuk dedup gudang blob, cache
+# dan diff): jam metadata .docx = tanggal surat, PDF memakai mode invariant
+# ReportLab (tanggal & ID tetap), entri ZIP .docx terurut dengan timestamp tetap.
+RENDER_DETERMINISTIK = os.environ.get("TAT_RENDER_DETERMINISTIK", "1") != "0"
+WAKTU_METADATA_DEFAULT = datetime(2000, 1, 1)
+
+def waktu_surat(data):
+    """Jam metadata surat: tanggal_surat (bukan jam render); default tetap bila tidak terbaca"""
+    try:
+        return datetime.strptime(str(data.get('tanggal_surat', '')).strip(), FORMAT_TANGGAL_SURAT)
+    except ValueError:
+        return WAKTU_METADATA_DEFAULT
+
+def nama_berkas_surat(data, ekstensi):
+    """Nama file unduhan surat, stabil untuk surat yang sama"""
+    return f"Surat_TAT_{data['nama'].replace(' ', '_')}_{waktu_surat(data):%Y%m%d}.{ekstensi}"
+
+def _simpan_docx(doc, waktu):
+    """
+    Simpan Document ke BytesIO. Mode deterministik: core properties memakai
+    `waktu`, lalu ZIP ditulis ulang dengan timestamp tetap dan entri terurut
+    ([Content_Types].xml tetap pertama).
+    """
+    buffer = BytesIO()
+    if not RENDER_DETERMINISTIK:
+        doc.save(buffer)
+        buffer.seek(0)
+        return buffer
+    
+    cp = doc.core_properties
+    cp.created = cp.modified = waktu
+    cp.revision = 1
+    mentah = BytesIO()
+    doc.save(mentah)
+    with zipfile.ZipFile(mentah) as src, zipfile.ZipFile(buffer, "w") as dst:
+        for nama in sorted(src.namelist(), key=lambda n: (n != "[Content_Types].xml", n)):
+            info = zipfile.ZipInfo(nama, date_time=waktu.timetuple()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.create_system = 3
+            info.external_attr = 0o644 << 16
+            dst.writestr(info, src.read(nama))
+    buffer.seek(0)
+    return buffer
+
 # =============================================================================
 # FUNGSI GENERATE WORD DOCUMENT
 # =============================================================================
-def generate_word_document(data, medical_analysis, legal_analysis, recommendation):
-    """Generate dokumen Word format surat TAT"""
-    
+@functools.lru_cache(maxsize=None)
+def _word_kop_template(tenant):
+    """
+    Template .docx per tenant (margin + kop surat + garis pemisah), dibangun
+    sekali per proses; tiap surat hanya memuat bytes ini lalu menambah isi.
+    """
     doc = Document()
     
     # Setup margin
@@ -373,22 +589,34 @@ def generate_word_document(data, medical_analysis, legal_analysis, recommendatio
     header_text = doc.add_paragraph()
     header_text.alignment = WD_ALIGN_PARAGRAPH.CENTER
     
-    run = header_text.add_run("BADAN NARKOTIKA NASIONAL\nPROVINSI KALIMANTAN UTARA\n")
+    run = header_text.add_run(f"BADAN NARKOTIKA NASIONAL\n{tenant.wilayah.upper()}\n")
     run.bold = True
     run.font.size = Pt(14)
     
-    run2 = header_text.add_run("(NATIONAL NARCOTICS BOARD PROVINCE OF NORTH KALIMANTAN)\n")
+    run2 = header_text.add_run(f"{tenant.kop_inggris}\n")
     run2.font.size = Pt(11)
     
-    run3 = header_text.add_run("Jl. Teuku Umar No. 31, Kota Tarakan, Provinsi Kalimantan Utara\n")
+    run3 = header_text.add_run(f"{tenant.alamat}\n")
     run3.font.size = Pt(10)
     
-    run4 = header_text.add_run("Telepon: (+62) 81256023695 | Web: kaltara.bnn.go.id")
+    run4 = header_text.add_run(tenant.kontak)
     run4.font.size = Pt(9)
     
     # Garis pemisah
     doc.add_paragraph("_" * 80)
     
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+PENANDA_TTD = "Ditandatangani Secara Elektronik Oleh:"
+
+def generate_word_document(data, medical_analysis, legal_analysis, recommendation, tenant=None):
+    """Generate dokumen Word format surat TAT (tenant default: data['tenant'])"""
+    
+    tenant = tenant or get_tenant(data.get('tenant'))
+    doc = Document(BytesIO(_word_kop_template(tenant)))
+    
     # Nomor surat
     p = doc.add_paragraph()
     p.add_run(f"Nomor\t\t: {data['nomor_surat']}\n")
@@ -398,7 +626,7 @@ def generate_word_document(data, medical_analysis, legal_analysis, recommendatio
     
     p_right = doc.add_paragraph()
     p_right.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    p_right.add_run(f"Tarakan, {data['tanggal_surat']}")
+    p_right.add_run(f"{tenant.tempat_surat}, {data['tanggal_surat']}")
     
     doc.add_paragraph()
     
@@ -425,7 +653,7 @@ def generate_word_document(data, medical_analysis, legal_analysis, recommendatio
     doc.add_paragraph()
     
     # Isi
-    doc.add_paragraph("2. Sehubungan dengan rujukan tersebut di atas, bersama ini disampaikan bahwa Tim Asesmen Terpadu Tingkat Provinsi Kalimantan Utara telah melakukan Asesmen Terpadu pada:")
+    doc.add_paragraph(f"2. Sehubungan dengan rujukan tersebut di atas, bersama ini disampaikan bahwa {tenant.tim} telah melakukan Asesmen Terpadu pada:")
     
     # Data tersangka
     table_data = [
@@ -448,7 +676,7 @@ def generate_word_document(data, medical_analysis, legal_analysis, recommendatio
     
     # Kesimpulan
     doc.add_paragraph("3. Berdasarkan hasil Asesmen Terpadu terhadap tersangka/terdakwa a.n. ").add_run(data['nama']).bold = True
-    doc.add_paragraph("Tim Asesmen Terpadu Tingkat Provinsi Kalimantan Utara menyimpulkan:").add_run().bold = True
+    doc.add_paragraph(f"{tenant.tim} menyimpulkan:").add_run().bold = True
     
     # Poin a - Kesimpulan Medis
     jenis_narkotika_text = ", ".join(data.get('jenis_narkotika_positif', []))
@@ -463,7 +691,7 @@ def generate_word_document(data, medical_analysis, legal_analysis, recommendatio
     doc.add_paragraph()
     
     # Rekomendasi
-    doc.add_paragraph("4. Tim Asesmen Terpadu Tingkat Provinsi Kalimantan Utara memberikan rekomendasi terhadap ").add_run(f"tersangka/terdakwa a.n. {data['nama']}").bold = True
+    doc.add_paragraph(f"4. {tenant.tim} memberikan rekomendasi terhadap ").add_run(f"tersangka/terdakwa a.n. {data['nama']}").bold = True
     doc.add_paragraph(" sebagai berikut:")
     
     p_rec_a = doc.add_paragraph()
@@ -486,75 +714,174 @@ def generate_word_document(data, medical_analysis, legal_analysis, recommendatio
     # TTD
     p_ttd = doc.add_paragraph()
     p_ttd.alignment = WD_ALIGN_PARAGRAPH.LEFT
-    p_ttd.add_run("Ditandatangani Secara Elektronik Oleh:\n\n")
+    p_ttd.add_run(f"{PENANDA_TTD}\n\n")
     p_ttd.add_run(f"{data['jabatan_penandatangan']}\n\n\n\n")
     p_ttd.add_run(f"{data['nama_penandatangan']}\n")
     p_ttd.add_run(f"NIP. {data['nip_penandatangan']}")
     
     # Tembusan
     doc.add_paragraph("\n\nTembusan:")
-    tembusan_list = [
-        "Kepala BNN Provinsi Kalimantan Utara;",
-        "Sekretaris BNN Provinsi Kalimantan Utara;",
-        "Kepala Seksi Rehabilitasi BNN Provinsi Kalimantan Utara;",
-        f"{data['instansi_pemohon']}."
-    ]
+    tembusan_list = [*tenant.tembusan, f"{data['instansi_pemohon']}."]
     
     for idx, item in enumerate(tembusan_list, start=1):
         doc.add_paragraph(f"{idx}. {item}", style='List Number')
     
     # Save to BytesIO
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    return buffer
+    return _simpan_docx(doc, waktu_surat(data))
+
+def _teks_ttd(data, field):
+    """Elemen <w:t> isian blok TTD persis seperti ditulis python-docx"""
+    nilai = data.get(field)
+    teks = f"NIP. {nilai}" if field == 'nip_penandatangan' else nilai
+    # Kosong, spasi di tepi (xml:space) atau karakter kontrol (\n -> <w:br/>) tidak bisa ditambal
+    if not nilai or nilai.strip() != nilai or not nilai.isprintable():
+        return None
+    return f"<w:t>{escape(teks)}</w:t>"
+
+def tambal_ttd_docx(isi_docx, data_lama, data_baru):
+    """
+    Ganti hanya blok penandatangan (jabatan/nama/NIP) pada .docx hasil
+    generate_word_document(data_lama) sehingga isinya sama dengan render penuh
+    data_baru, tanpa menyusun ulang dokumen. Entri ZIP lain disalin apa adanya.
+    Mengembalikan bytes, atau None bila surat tidak bisa ditambal dengan aman
+    (blok TTD/nilai lama tidak ditemukan tepat sekali) -> render penuh.
+    """
+    ganti = []
+    for field in FIELD_TTD:
+        if data_lama.get(field) == data_baru.get(field):
+            continue
+        lama, baru = _teks_ttd(data_lama, field), _teks_ttd(data_baru, field)
+        if lama is None or baru is None:
+            return None
+        ganti.append((lama, baru))
+    
+    with zipfile.ZipFile(BytesIO(isi_docx)) as src:
+        xml = src.read("word/document.xml").decode("utf-8")
+        # Surat lama harus milik data_lama (mis. bukan surat sebelum nomor diganti)
+        if xml.count(PENANDA_TTD) != 1 or escape(f": {data_lama['nomor_surat']}") + "</w:t>" not in xml:
+            return None
+        i = xml.index(PENANDA_TTD)
+        awal = max(xml.rfind("<w:p>", 0, i), xml.rfind("<w:p ", 0, i))
+        akhir = xml.find("</w:p>", i)
+        if awal < 0 or akhir < 0:
+            return None
+        blok = xml[awal:akhir]
+        for lama, baru in ganti:
+            if blok.count(lama) != 1:
+                return None
+            blok = blok.replace(lama, baru)
+        xml = xml[:awal] + blok + xml[akhir:]
+        
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w") as dst:
+            for info in src.infolist():
+                salinan = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                salinan.compress_type = info.compress_type
+                salinan.create_system = info.create_system
+                salinan.external_attr = info.external_attr
+                isi = xml.encode("utf-8") if info.filename == "word/document.xml" else src.read(info.filename)
+                dst.writestr(salinan, isi)
+    return buffer.getvalue()
 
 # =============================================================================
 # FUNGSI GENERATE PDF
 # =============================================================================
-def generate_pdf_document(data, medical_analysis, legal_analysis, recommendation):
-    """Generate dokumen PDF format surat TAT"""
-    
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4,
-                           topMargin=1*cm, bottomMargin=1*cm,
-                           leftMargin=1.5*cm, rightMargin=1.5*cm)
-    
-    elements = []
+# Content stream Flate biner: ASCII85 (default ReportLab) menambah ~25% ukuran
+# stream tanpa manfaat untuk file yang disimpan/dikirim sebagai biner.
+rl_config.useA85 = 0
+
+# Font surat: Helvetica base-14 (tidak di-embed, tersedia di semua viewer PDF).
+# Subset TTF (mis. Vera) menambah ~35 KiB per surat karena tabel hinting ikut
+# ter-embed, lebih besar dari isi surat itu sendiri.
+
+@functools.lru_cache(maxsize=None)
+def _pdf_styles(font_normal='Helvetica', font_bold='Helvetica-Bold'):
+    """Style paragraf surat TAT (dibangun sekali per font, dipakai bersama semua tenant)"""
     styles = getSampleStyleSheet()
     
-    # Custom styles
-    style_center = ParagraphStyle(
-        'CustomCenter',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=12,
-        spaceAfter=6
-    )
-    
-    style_header = ParagraphStyle(
-        'CustomHeader',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=14,
-        fontName='Helvetica-Bold',
-        spaceAfter=6
-    )
+    return {
+        'font': font_normal,
+        'center': ParagraphStyle(
+            'CustomCenter',
+            parent=styles['Normal'],
+            alignment=TA_CENTER,
+            fontName=font_normal,
+            fontSize=12,
+            spaceAfter=6
+        ),
+        'header': ParagraphStyle(
+            'CustomHeader',
+            parent=styles['Normal'],
+            alignment=TA_CENTER,
+            fontSize=14,
+            fontName=font_bold,
+            spaceAfter=6
+        ),
+        'body': ParagraphStyle(
+            'CustomBody',
+            parent=styles['Normal'],
+            alignment=TA_JUSTIFY,
+            fontName=font_normal,
+            fontSize=11,
+            leading=14,
+            spaceAfter=8
+        ),
+        'tanggal': ParagraphStyle('TanggalRight', parent=styles['Normal'], alignment=2,
+                                  fontName=font_normal, fontSize=11),
+    }
+
+@functools.lru_cache(maxsize=None)
+def _pdf_kop(tenant):
+    """Markup kop, tempat surat, tembusan & teks footer per tenant (disusun sekali per proses)"""
+    return {
+        'kop': (
+            f"<b>BADAN NARKOTIKA NASIONAL<br/>{escape(tenant.wilayah.upper())}</b>",
+            escape(tenant.kop_inggris),
+            escape(tenant.alamat),
+            escape(tenant.kontak),
+        ),
+        'tempat_surat': escape(tenant.tempat_surat),
+        'tembusan': tuple(escape(t) for t in tenant.tembusan),
+        'footer': f"keaslian surat dapat diverifikasi pada Sistem TAT {tenant.nama_instansi}",
+        'author': tenant.nama_instansi,
+        'creator': f"Sistem TAT {tenant.nama_instansi}",
+    }
+
+def _pdf_doc_template(buffer, mode_arsip=False, kode_verifikasi=None, tenant=None):
+    """
+    SimpleDocTemplate A4; mode arsip: content stream terkompresi + metadata lengkap
+    (judul, pembuat, instansi).
+    Mode deterministik: invariant ReportLab (tanggal pembuatan & ID dokumen tetap).
+    """
+    kwargs = {'invariant': 1} if RENDER_DETERMINISTIK else {}
+    if mode_arsip:
+        kop = _pdf_kop(tenant or get_tenant())
+        kwargs.update(
+            pageCompression=1,
+            title="Hasil Asesmen Terpadu",
+            author=kop['author'],
+            creator=kop['creator'],
+        )
+    return SimpleDocTemplate(buffer, pagesize=A4,
+                             topMargin=1*cm, bottomMargin=1*cm,
+                             leftMargin=1.5*cm, rightMargin=1.5*cm,
+                             subject=f"Kode Verifikasi: {kode_verifikasi}" if kode_verifikasi else None,
+                             **kwargs)
+
+def _pdf_elements(data, medical_analysis, legal_analysis, recommendation, gaya, tenant=None):
+    """Susun flowable isi satu surat TAT"""
     
-    style_body = ParagraphStyle(
-        'CustomBody',
-        parent=styles['Normal'],
-        alignment=TA_JUSTIFY,
-        fontSize=11,
-        leading=14,
-        spaceAfter=8
-    )
+    kop = _pdf_kop(tenant or get_tenant(data.get('tenant')))
+    elements = []
+    style_center = gaya['center']
+    style_header = gaya['header']
+    style_body = gaya['body']
+    tanggal_style = gaya['tanggal']
     
     # Header
-    elements.append(Paragraph("<b>BADAN NARKOTIKA NASIONAL<br/>PROVINSI KALIMANTAN UTARA</b>", style_header))
-    elements.append(Paragraph("(NATIONAL NARCOTICS BOARD PROVINCE OF NORTH KALIMANTAN)", style_center))
-    elements.append(Paragraph("Jl. Teuku Umar No. 31, Kota Tarakan, Provinsi Kalimantan Utara", style_center))
-    elements.append(Paragraph("Telepon: (+62) 81256023695 | Web: kaltara.bnn.go.id", style_center))
+    elements.append(Paragraph(kop['kop'][0], style_header))
+    for baris_kop in kop['kop'][1:]:
+        elements.append(Paragraph(baris_kop, style_center))
     elements.append(Spacer(1, 0.3*cm))
     elements.append(Paragraph("_" * 100, style_center))
     elements.append(Spacer(1, 0.5*cm))
@@ -569,8 +896,7 @@ def generate_pdf_document(data, medical_analysis, legal_analysis, recommendation
     elements.append(Paragraph(nomor_text, style_body))
     elements.append(Spacer(1, 0.3*cm))
     
-    tanggal_style = ParagraphStyle('TanggalRight', parent=styles['Normal'], alignment=2, fontSize=11)
-    elements.append(Paragraph(f"Tarakan, {data['tanggal_surat']}", tanggal_style))
+    elements.append(Paragraph(f"{kop['tempat_surat']}, {data['tanggal_surat']}", tanggal_style))
     elements.append(Spacer(1, 0.5*cm))
     
     # Kepada
@@ -606,7 +932,7 @@ def generate_pdf_document(data, medical_analysis, legal_analysis, recommendation
     
     t = Table(data_table, colWidths=[4*cm, 12*cm])
     t.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTNAME', (0, 0), (-1, -1), gaya['font']),
         ('FONTSIZE', (0, 0), (-1, -1), 11),
         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
         ('LEFTPADDING', (0, 0), (-1, -1), 5),
@@ -684,27 +1010,201 @@ def generate_pdf_document(data, medical_analysis, legal_analysis, recommendation
     
     # Tembusan
     elements.append(Paragraph("<b>Tembusan:</b>", style_body))
-    tembusan = [
-        "Kepala BNN Provinsi Kalimantan Utara;",
-        "Sekretaris BNN Provinsi Kalimantan Utara;",
-        "Kepala Seksi Rehabilitasi BNN Provinsi Kalimantan Utara;",
-        f"{data['instansi_pemohon']}."
-    ]
+    tembusan = [*kop['tembusan'], f"{data['instansi_pemohon']}."]
     
     for idx, titem in enumerate(tembusan, 1):
         elements.append(Paragraph(f"{idx}. {titem}", style_body))
     
+    return elements
+
+def generate_pdf_document(data, medical_analysis, legal_analysis, recommendation,
+                          kode_verifikasi=None, mode_arsip=False, tenant=None):
+    """
+    Generate dokumen PDF format surat TAT.
+    kode_verifikasi: dicetak di footer tiap halaman (surat bertanda tangan elektronik).
+    mode_arsip: output untuk arsip jangka panjang/email (stream terkompresi,
+    metadata dokumen lengkap); dipakai untuk surat bertanda tangan.
+    tenant: kop & tembusan (default: data['tenant'])
+    """
+    
+    tenant = tenant or get_tenant(data.get('tenant'))
+    buffer = BytesIO()
+    doc = _pdf_doc_template(buffer, mode_arsip, kode_verifikasi, tenant)
+    gaya = _pdf_styles()
+    elements = _pdf_elements(data, medical_analysis, legal_analysis, recommendation, gaya, tenant)
+    teks_footer = _pdf_kop(tenant)['footer']
+    
     # Build PDF
+    if kode_verifikasi:
+        def _footer_verifikasi(canvas, _doc):
+            canvas.saveState()
+            canvas.setFont(gaya['font'], 8)
+            canvas.drawCentredString(
+                A4[0] / 2, 0.5*cm,
+                f"Kode Verifikasi: {kode_verifikasi} - {teks_footer}"
+            )
+            canvas.restoreState()
+        doc.build(elements, onFirstPage=_footer_verifikasi, onLaterPages=_footer_verifikasi)
+    else:
+        doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+def generate_pdf_bundle(daftar_hasil, mode_arsip=True):
+    """
+    Gabungkan banyak surat TAT dalam satu PDF (bundel cetak pekerjaan antrian).
+    Objek font dan resource lain ditulis sekali untuk seluruh bundel (bukan sekali
+    per surat). Kop tiap surat mengikuti tenant surat tersebut.
+    daftar_hasil: iterable dict {'data', 'medical', 'legal', 'recommendation'}
+    """
+    
+    buffer = BytesIO()
+    doc = _pdf_doc_template(buffer, mode_arsip)
+    gaya = _pdf_styles()
+    
+    elements = []
+    for hasil in daftar_hasil:
+        if elements:
+            elements.append(PageBreak())
+        elements.extend(_pdf_elements(hasil['data'], hasil['medical'], hasil['legal'],
+                                      hasil['recommendation'], gaya))
+    
     doc.build(elements)
     buffer.seek(0)
     return buffer
 
+# =============================================================================
+# ARSIP & TANDA TANGAN ELEKTRONIK
+# =============================================================================
+@st.cache_resource
+def get_arsip():
+    """Satu koneksi arsip per proses, dipakai bersama oleh semua sesi"""
+    return Arsip()
+
+@st.cache_resource
+def get_gudang():
+    """Gudang blob surat yang sudah di-render (dedup SHA-256, dipakai bersama semua sesi)"""
+    return GudangBlob()
+
+@st.cache_resource
+def get_kunci_tte():
+    return tanda_tangan.muat_kunci()
+
+@st.cache_resource
+def get_antrian():
+    """Antrian pekerjaan dokumen (dijalankan oleh `python antrian.py worker`)"""
+    return Antrian()
+
+@st.cache_resource
+def get_audit():
+    """Log audit berantai hash; satu thread penulis (group commit) per proses"""
+    return LogAudit()
+
+def get_id_sesi():
+    return st.session_state.setdefault('id_sesi', uuid.uuid4().hex)
+
+def catat_unduh(kasus_id, format_surat, sha256=None):
+    """Callback tombol unduh: tandai kasus di ruang kerja + catat di log audit"""
+    get_ruang_kerja().tandai(kasus_id, STATUS_DIUNDUH)
+    get_audit().catat('unduh_surat', pengguna=get_id_sesi(), tunggu=False,
+                      kasus_id=kasus_id, format=format_surat, sha256=sha256)
+
+def get_ruang_kerja():
+    """Ruang kerja kasus milik sesi ini (beberapa kasus, memori dibatasi)"""
+    if 'ruang_kerja' not in st.session_state:
+        # Berkas spill yang hilang dimuat ulang dari arsip
+        st.session_state['ruang_kerja'] = RuangKerja(pemuat=lambda kasus_id: get_arsip().ambil_kasus(kasus_id))
+    return st.session_state['ruang_kerja']
+
+@st.cache_resource
+def get_indeks_saran(kode_tenant):
+    """
+    Indeks saran isian dari riwayat arsip tenant (satu per proses). Dibangun di
+    thread latar: selama arsip dipindai form tetap tampil, saran menyusul.
+    """
+    indeks = IndeksSaran(tenant=kode_tenant)
+    indeks.perbarui_latar(get_arsip())
+    return indeks
+
+def _pakai_saran(indeks, field):
+    """Callback pilihan saran: salin ke isian; nama penandatangan ikut mengisi jabatan & NIP"""
+    nilai = st.session_state.get(f"saran_{field}")
+    st.session_state[f"saran_{field}"] = None
+    if not nilai:
+        return
+    st.session_state[f"isian_{field}"] = nilai
+    if field == 'nama_penandatangan':
+        for f, v in indeks.penandatangan(nilai).items():
+            st.session_state[f"isian_{f}"] = v
+
+def input_saran(label, field, indeks, value="", **kwargs):
+    """
+    text_input dengan saran dari riwayat arsip (awalan kata / salah ketik).
+    Saran dihitung dari indeks di memori, tanpa query database per rerun.
+    """
+    kunci = f"isian_{field}"
+    st.session_state.setdefault(kunci, value)
+    teks = st.text_input(label, key=kunci, **kwargs)
+    saran = indeks.saran(field, teks, limit=4)
+    if saran and teks not in saran:
+        st.pills("Saran", saran, key=f"saran_{field}", label_visibility="collapsed",
+                 on_change=_pakai_saran, args=(indeks, field))
+    return teks
+
+def label_kasus(ringkasan):
+    lokasi = "" if ringkasan['di_memori'] else " 💾"
+    return (f"#{ringkasan['kasus_id']} {ringkasan['nama']} — "
+            f"{ringkasan['rekomendasi']} [{ringkasan['status']}]{lokasi}")
+
+LABEL_KIRIMAN = {'antri': "menunggu dikirim", 'terkirim': "terkirim", 'gagal': "gagal dikirim",
+                 'batal': "dibatalkan"}
+
+def kiriman_surat(hasil, surat_ttd, nama_file):
+    """Kiriman outbox untuk surat bertanda tangan (kosong bila email pemohon tidak diisi)"""
+    email = hasil['data'].get('email_penerima')
+    if not email:
+        return []
+    return [{
+        'kasus_id': hasil['kasus_id'],
+        'sha256': surat_ttd['sha256'],
+        'penerima': email,
+        'nama_penerima': hasil['data'].get('penerima_surat'),
+        'subjek': f"Hasil Asesmen Terpadu - Nomor {surat_ttd['nomor_surat']}",
+        'nama_lampiran': nama_file,
+        'lampiran': surat_ttd['pdf'],
+    }]
+
+def is_admin():
+    """Mode admin aktif bila query param ?admin= cocok dengan TAT_ADMIN_TOKEN"""
+    token = st.query_params.get("admin", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+def parse_daftar_id(teks):
+    """Parse '1-5, 8, 10' menjadi [1, 2, 3, 4, 5, 8, 10]"""
+    hasil = []
+    for bagian in teks.replace(";", ",").split(","):
+        bagian = bagian.strip()
+        if not bagian:
+            continue
+        if "-" in bagian:
+            awal, akhir = (int(x) for x in bagian.split("-", 1))
+            hasil.extend(range(awal, akhir + 1))
+        else:
+            hasil.append(int(bagian))
+    return list(dict.fromkeys(hasil))
+
 # =============================================================================
 # MAIN APPLICATION
 # =============================================================================
 def main():
-    st.markdown('<h1 class="main-header">⚖️ SISTEM ASESMEN TERPADU (TAT)<br/>BNN PROVINSI KALIMANTAN UTARA</h1>', 
+    # Tenant (BNN Provinsi) dipilih lewat ?tenant=<kode>
+    kode_tenant = st.query_params.get("tenant")
+    tenant = get_tenant(kode_tenant)
+    
+    st.markdown(f'<h1 class="main-header">⚖️ SISTEM ASESMEN TERPADU (TAT)<br/>BNN {tenant.wilayah.upper()}</h1>', 
                 unsafe_allow_html=True)
+    if kode_tenant and kode_tenant not in REGISTRI:
+        st.warning(f"⚠️ Tenant '{kode_tenant}' tidak terdaftar, memakai {tenant.nama_instansi}.")
     
     st.markdown("""
     <div class="info-box">
@@ -718,17 +1218,119 @@ def main():
     # Sidebar
     with st.sidebar:
         st.header("📌 Informasi Sistem")
-        st.info("""
-        **BNN Provinsi Kalimantan Utara**
+        st.info(f"""
+        **{tenant.nama_instansi}**
         
-        Jl. Teuku Umar No. 31
-        Kota Tarakan
-        Provinsi Kalimantan Utara
+        {tenant.alamat}
         
-        📞 (+62) 81256023695 
-        📧 kaltara.bnn.go.id
+        📞 {tenant.kontak}
         """)
         
+        if MODE_LAPANGAN:
+            konflik = get_arsip().status_sinkron('konflik')
+            st.caption(f"📡 Mode lapangan: {get_arsip().jumlah_belum_sinkron()} kasus menunggu sinkron"
+                       + (f", ⚠️ {len(konflik)} konflik nomor surat" if konflik else ""))
+        
+        st.markdown("---")
+        with st.expander("🗂️ Ruang Kerja Kasus", expanded=True):
+            ruang_kerja = get_ruang_kerja()
+            daftar_kasus = {r['kasus_id']: r for r in ruang_kerja.daftar()}
+            if daftar_kasus:
+                pilihan = [None] + list(daftar_kasus)
+                kasus_dipilih = st.selectbox(
+                    "Kasus aktif", pilihan,
+                    index=pilihan.index(ruang_kerja.aktif) if ruang_kerja.aktif in daftar_kasus else 0,
+                    format_func=lambda k: "➕ Kasus baru" if k is None else label_kasus(daftar_kasus[k]),
+                    help="💾 = disimpan sementara di disk, dimuat ulang tanpa menghitung ulang analisis"
+                )
+                if kasus_dipilih != ruang_kerja.aktif:
+                    ruang_kerja.pilih(kasus_dipilih)
+                
+                col_rk1, col_rk2 = st.columns(2)
+                with col_rk1:
+                    if st.button("➕ Kasus baru", use_container_width=True):
+                        ruang_kerja.pilih(None)
+                        st.rerun()
+                with col_rk2:
+                    if st.button("🗑️ Tutup kasus", use_container_width=True,
+                                 disabled=ruang_kerja.aktif is None,
+                                 help="Keluarkan dari ruang kerja (arsip tetap tersimpan)"):
+                        ruang_kerja.hapus(ruang_kerja.aktif)
+                        st.rerun()
+                st.caption(f"{len(daftar_kasus)} kasus di sesi ini")
+            else:
+                st.caption("Belum ada kasus. Kasus yang diproses di Tab III akan muncul di sini.")
+        
+        with st.expander("🔏 Verifikasi Surat"):
+            file_verifikasi = st.file_uploader("Unggah surat PDF", type=["pdf"], key="file_verifikasi")
+            if file_verifikasi is not None:
+                hasil_verifikasi = tanda_tangan.verifikasi_surat(
+                    file_verifikasi.getvalue(), get_arsip(), get_kunci_tte()
+                )
+                if hasil_verifikasi['valid']:
+                    st.success(f"✅ {hasil_verifikasi['alasan']}")
+                    st.caption(f"Nomor: {hasil_verifikasi['surat']['nomor_surat']}  \n"
+                               f"Ditandatangani: {hasil_verifikasi['surat']['ditandatangani']}")
+                else:
+                    st.error(f"❌ {hasil_verifikasi['alasan']}")
+            st.download_button("🔑 Kunci Publik Verifikasi", tanda_tangan.pem_kunci_publik(get_kunci_tte()),
+                               file_name="kunci_tte.pub.pem", mime="application/x-pem-file",
+                               help="Untuk instansi penerima: verifikasi file .sig surat tanpa akses arsip")
+        
+        if is_admin():
+            with st.expander("🛠️ Profiling (Admin)"):
+                profil_deterministik = st.checkbox("Deterministik (cProfile)",
+                                                   help="Hitungan panggilan eksak, overhead lebih besar dari sampling")
+                if st.button("⏺️ Profil rerun berikutnya"):
+                    st.session_state['profil_berikutnya'] = {'deterministik': profil_deterministik}
+                    st.caption("Interaksi berikutnya akan diprofil.")
+                
+                ringkasan_profil = st.session_state.get('profil_terakhir')
+                if ringkasan_profil:
+                    st.caption(f"Rerun terakhir: {ringkasan_profil['durasi_ms']} ms, "
+                               f"{ringkasan_profil['sampel']} sampel")
+                    st.dataframe(pd.DataFrame(ringkasan_profil['top_n']), hide_index=True)
+                    with open(ringkasan_profil['file_collapsed'], "rb") as f:
+                        st.download_button("🔥 Collapsed stack (flamegraph)", f.read(),
+                                           file_name=os.path.basename(ringkasan_profil['file_collapsed']))
+                    if ringkasan_profil['file_prof']:
+                        with open(ringkasan_profil['file_prof'], "rb") as f:
+                            st.download_button("📈 cProfile (.prof)", f.read(),
+                                               file_name=os.path.basename(ringkasan_profil['file_prof']))
+            
+            with st.expander("🔁 Terbit Ulang Surat (Admin)"):
+                st.caption(f"Surat {tenant.nama_instansi} yang belum terkirim diterbitkan ulang "
+                           "dengan penandatangan/kop terbaru (hasil: laporan CSV di antrian).")
+                nip_lama = st.text_input("NIP penandatangan lama (kosong = semua)")
+                ttd_baru = {
+                    'jabatan_penandatangan': st.text_input("Jabatan baru"),
+                    'nama_penandatangan': st.text_input("Nama baru"),
+                    'nip_penandatangan': st.text_input("NIP baru"),
+                }
+                ttd_baru = {f: v.strip() for f, v in ttd_baru.items() if v.strip()}
+                kop_berubah = st.checkbox("Kop surat berubah (render penuh)")
+                sejak_terbit = st.date_input("Dibuat sejak", value=None, key="terbit_sejak")
+                termasuk_terkirim = st.checkbox("Termasuk surat yang sudah terkirim")
+                
+                kasus_terdampak = pilih_kasus(
+                    get_arsip(), tenant.kode, ttd_baru, nip_lama.strip() or None,
+                    sejak=f"{sejak_terbit:%Y-%m-%d}" if sejak_terbit else None,
+                    termasuk_terkirim=termasuk_terkirim
+                ) if ttd_baru or kop_berubah else []
+                st.caption(f"{len(kasus_terdampak)} kasus terdampak")
+                if st.button("📦 Terbitkan Ulang", disabled=not kasus_terdampak):
+                    try:
+                        job_id = get_antrian().kirim(
+                            "terbit_ulang",
+                            {'kasus_ids': kasus_terdampak, 'penandatangan': ttd_baru,
+                             'kop_berubah': kop_berubah},
+                            pemilik=get_id_sesi(),
+                            prioritas=PRIORITAS_RENDAH
+                        )
+                        st.success(f"✅ Pekerjaan #{job_id} ({len(kasus_terdampak)} kasus) masuk antrian")
+                    except AntrianPenuh as e:
+                        st.warning(f"⏳ {e}")
+        
         st.markdown("---")
         st.caption("Versi 2.0 - Desember 2025")
     
@@ -755,9 +1357,13 @@ def main():
             nama = st.text_input("Nama Lengkap *", placeholder="Contoh: AHMAD YANI")
             nik = st.text_input("NIK *", placeholder="6471XXXXXXXXXXXX", max_chars=16)
             tempat_lahir = st.text_input("Tempat Lahir *", placeholder="Tarakan")
-            tanggal_lahir = st.date_input("Tanggal Lahir *", 
-                                         min_value=datetime(1950, 1, 1),
-                                         max_value=datetime.now())
+            # Tanpa nilai awal (default hari ini selalu gagal validasi usia);
+            # rentang pilihan mengikuti batas usia validasi.py
+            hari_ini = datetime.now()
+            tanggal_lahir = st.date_input("Tanggal Lahir *", value=None,
+                                         min_value=datetime(hari_ini.year - USIA_MAKS, 1, 1),
+                                         max_value=datetime(hari_ini.year - USIA_MIN, hari_ini.month,
+                                                            min(hari_ini.day, 28)))
             jenis_kelamin = st.selectbox("Jenis Kelamin *", ["Laki-laki", "Perempuan"])
             kewarganegaraan = st.text_input("Kewarganegaraan *", value="Indonesia")
         
@@ -901,7 +1507,7 @@ def main():
                                         key=f"bb_{jenis}")
             with col_bb2:
                 satuan = st.selectbox(f"Satuan {jenis}", 
-                                     ["gram", "butir", "paket", "lembar", "lainnya"],
+                                     SATUAN_BARANG_BUKTI,
                                      key=f"satuan_{jenis}")
             
             # Simpan unit 'paket' atau 'lainnya' juga — evaluator akan minta verifikasi jika unit tidak sesuai
@@ -1294,18 +1900,25 @@ def main():
                 value=datetime.now()
             )
         
+        indeks_saran = get_indeks_saran(tenant.kode)
+        
         with col_surat2:
-            penerima_surat = st.text_input(
-                "Penerima Surat (Kepada Yth.) *",
+            penerima_surat = input_saran(
+                "Penerima Surat (Kepada Yth.) *", 'penerima_surat', indeks_saran,
                 value="Direktur Reserse Narkoba Polda Kalimantan Utara",
                 help="Contoh: Direktur Reserse Narkoba Polda Kaltara / Kapolres Tarakan"
             )
             
-            instansi_pemohon = st.text_input(
-                "Instansi Pemohon *",
+            instansi_pemohon = input_saran(
+                "Instansi Pemohon *", 'instansi_pemohon', indeks_saran,
                 value="Direktorat Reserse Narkoba Polda Kalimantan Utara"
             )
             
+            email_penerima = st.text_input(
+                "Email Instansi Pemohon",
+                placeholder="opsional — surat PDF dikirim otomatis setelah ditandatangani"
+            )
+            
             nomor_surat_pemohon = st.text_input(
                 "Nomor Surat Pemohon *",
                 placeholder="B/XXX/... "
@@ -1320,20 +1933,21 @@ def main():
         col_ttd1, col_ttd2, col_ttd3 = st.columns(3)
         
         with col_ttd1:
-            jabatan_ttd = st.text_input(
-                "Jabatan Penandatangan *",
-                value="Kepala Seksi Rehabilitasi BNN Provinsi Kalimantan Utara"
+            jabatan_ttd = input_saran(
+                "Jabatan Penandatangan *", 'jabatan_penandatangan', indeks_saran,
+                value=tenant.penandatangan[0]['jabatan'] if tenant.penandatangan else ""
             )
         
         with col_ttd2:
-            nama_ttd = st.text_input(
-                "Nama Penandatangan *",
-                placeholder="Nama Lengkap"
+            nama_ttd = input_saran(
+                "Nama Penandatangan *", 'nama_penandatangan', indeks_saran,
+                placeholder="Nama Lengkap",
+                help="Memilih nama dari saran ikut mengisi jabatan & NIP terakhir"
             )
         
         with col_ttd3:
-            nip_ttd = st.text_input(
-                "NIP*",
+            nip_ttd = input_saran(
+                "NIP*", 'nip_penandatangan', indeks_saran,
                 placeholder="19XXXXXX XXXXXX X XXX"
             )
 
@@ -1342,31 +1956,80 @@ def main():
     # Tombol Generate
     if st.button("🔍 PROSES ASESMEN & GENERATE SURAT", use_container_width=True):
         
-        # Validasi input wajib
-        errors = []
-        
-        if not nama:
-            errors.append("Nama lengkap harus diisi")
-        if not nik or len(nik) != 16:
-            errors.append("NIK harus 16 digit")
-        if not alamat:
-            errors.append("Alamat harus diisi")
-        if not kronologi:
-            errors.append("Kronologi kejadian harus diisi")
-        if not jenis_narkotika_digunakan:
-            errors.append("Jenis narkotika yang digunakan harus dipilih")
-        if hasil_urine == "Positif" and not jenis_positif:
-            errors.append("Jenis narkotika yang positif harus dipilih")
-        if not fakta_hukum:
-            errors.append("Fakta-fakta hukum harus diisi")
-        if not kesimpulan_hukum:
-            errors.append("Kesimpulan hukum harus diisi")
-        if not kesimpulan_medis:
-            errors.append("Kesimpulan medis harus diisi")
-        if not nomor_surat_pemohon:
-            errors.append("Nomor surat pemohon harus diisi")
-        if not nama_ttd or not nip_ttd:
-            errors.append("Data penandatangan harus lengkap")
+        # Kompilasi data
+        data_lengkap = {
+            # Identitas
+            'nama': nama,
+            'nik': nik,
+            'tempat_lahir': tempat_lahir,
+            'tanggal_lahir': tanggal_lahir.strftime("%d-%m-%Y") if tanggal_lahir else "",
+            'jenis_kelamin': jenis_kelamin,
+            'kewarganegaraan': kewarganegaraan,
+            'alamat': alamat,
+            'no_hp': no_hp,
+            'no_rekening': no_rekening,
+            'status_kawin': status_kawin,
+            'pendidikan': pendidikan,
+            'pekerjaan': pekerjaan,
+            'penghasilan': penghasilan,
+            
+            # Hukum
+            'kronologi': kronologi,
+            'jenis_narkotika_digunakan': jenis_narkotika_digunakan,
+            'hasil_urine': hasil_urine,
+            'jenis_narkotika_positif': jenis_positif,
+            'riwayat_pidana_narkotika': riwayat_narkotika > 0,
+            'riwayat_penahanan': jumlah_penahanan,
+            'barang_bukti_jenis': barang_bukti_jenis,
+            'barang_bukti_detail': barang_bukti_detail,
+            'tujuan_kepemilikan': tujuan_kepemilikan,
+            'metode_pembelian': metode_pembelian,
+            'fakta_hukum': fakta_hukum,
+            'kesimpulan_hukum': kesimpulan_hukum,
+            # flag evaluasi SEMA
+            'enable_sema_evaluation': enable_sema,
+            
+            # Medis
+            'dsm5_count': dsm5_count,
+            'jenis_narkotika_utama': jenis_utama_medis,
+            'diagnosis_code': diagnosis_code,
+            'pola_penggunaan': pola_penggunaan,
+            'durasi_bulan': durasi_penggunaan,
+            'kesimpulan_medis': kesimpulan_medis,
+            
+            # ASAM 6 dimensi (lihat asam.py)
+            'tingkat_withdrawal': tingkat_withdrawal if ada_withdrawal else "",
+            'frekuensi_intoksikasi': frekuensi_intoksikasi if ada_intoksikasi else 0,
+            'jenis_penyakit': jenis_penyakit if ada_penyakit else [],
+            'tingkat_gangguan_jiwa': tingkat_gangguan_jiwa if ada_gangguan_jiwa else "",
+            'motivasi_rehabilitasi': motivasi_rehabilitasi,
+            'insight_masalah': insight_masalah,
+            'riwayat_rehabilitasi': riwayat_rehabilitasi,
+            'hasil_rehabilitasi': hasil_rehabilitasi if riwayat_rehabilitasi > 0 else "",
+            'trigger_utama': trigger_utama,
+            'dukungan_keluarga': dukungan_keluarga,
+            'kondisi_rumah': kondisi_rumah,
+            'status_pekerjaan': status_pekerjaan,
+            'kemampuan_ekonomi': kemampuan_ekonomi,
+            
+            # Surat
+            'nomor_surat': nomor_surat,
+            'tanggal_surat': tanggal_surat.strftime("%d %B %Y"),
+            'tanggal_pelaksanaan': tanggal_pelaksanaan.strftime("%d %B %Y"),
+            'penerima_surat': penerima_surat,
+            'instansi_pemohon': instansi_pemohon,
+            'email_penerima': email_penerima.strip(),
+            'nomor_surat_pemohon': nomor_surat_pemohon,
+            'tanggal_surat_pemohon': tanggal_surat_pemohon.strftime("%d %B %Y"),
+            'jabatan_penandatangan': jabatan_ttd,
+            'nama_penandatangan': nama_ttd,
+            'nip_penandatangan': nip_ttd,
+            'tenant': tenant.kode,
+            'instansi_penyidik': instansi_pemohon
+        }
+        
+        # Validasi input (skema yang sama dipakai impor massal)
+        errors = validasi_kasus(data_lengkap)
         
         if errors:
             st.error("⚠️ **Lengkapi data berikut:**")
@@ -1375,84 +2038,46 @@ def main():
         else:
             with st.spinner("🔄 Memproses asesmen dan membuat surat..."):
                 
-                # Kompilasi data
-                data_lengkap = {
-                    # Identitas
-                    'nama': nama,
-                    'nik': nik,
-                    'tempat_lahir': tempat_lahir,
-                    'tanggal_lahir': tanggal_lahir.strftime("%d-%m-%Y"),
-                    'jenis_kelamin': jenis_kelamin,
-                    'kewarganegaraan': kewarganegaraan,
-                    'alamat': alamat,
-                    'no_hp': no_hp,
-                    'no_rekening': no_rekening,
-                    'status_kawin': status_kawin,
-                    'pendidikan': pendidikan,
-                    'pekerjaan': pekerjaan,
-                    'penghasilan': penghasilan,
-                    
-                    # Hukum
-                    'kronologi': kronologi,
-                    'jenis_narkotika_digunakan': jenis_narkotika_digunakan,
-                    'hasil_urine': hasil_urine,
-                    'jenis_narkotika_positif': jenis_positif,
-                    'riwayat_pidana_narkotika': riwayat_narkotika > 0,
-                    'riwayat_penahanan': jumlah_penahanan,
-                    'barang_bukti_jenis': barang_bukti_jenis,
-                    'barang_bukti_detail': barang_bukti_detail,
-                    'tujuan_kepemilikan': tujuan_kepemilikan,
-                    'metode_pembelian': metode_pembelian,
-                    'fakta_hukum': fakta_hukum,
-                    'kesimpulan_hukum': kesimpulan_hukum,
-                    # flag evaluasi SEMA
-                    'enable_sema_evaluation': enable_sema,
-                    
-                    # Medis
-                    'dsm5_count': dsm5_count,
-                    'jenis_narkotika_utama': jenis_utama_medis,
-                    'diagnosis_code': diagnosis_code,
-                    'pola_penggunaan': pola_penggunaan,
-                    'durasi_bulan': durasi_penggunaan,
-                    'kesimpulan_medis': kesimpulan_medis,
-                    
-                    # Surat
-                    'nomor_surat': nomor_surat,
-                    'tanggal_surat': tanggal_surat.strftime("%d %B %Y"),
-                    'tanggal_pelaksanaan': tanggal_pelaksanaan.strftime("%d %B %Y"),
-                    'penerima_surat': penerima_surat,
-                    'instansi_pemohon': instansi_pemohon,
-                    'nomor_surat_pemohon': nomor_surat_pemohon,
-                    'tanggal_surat_pemohon': tanggal_surat_pemohon.strftime("%d %B %Y"),
-                    'jabatan_penandatangan': jabatan_ttd,
-                    'nama_penandatangan': nama_ttd,
-                    'nip_penandatangan': nip_ttd,
-                    'instansi_penyidik': instansi_pemohon
-                }
-                
                 # Analisis
                 medical_analysis = analyze_medical_data(data_lengkap)
                 legal_analysis = analyze_legal_data(data_lengkap)
                 recommendation = generate_recommendation(medical_analysis, legal_analysis, data_lengkap)
                 
-                # Simpan ke session state
-                st.session_state['hasil_asesmen'] = {
+                # Simpan ke arsip & ruang kerja sesi (jadi kasus aktif)
+                hasil_baru = {
                     'data': data_lengkap,
                     'medical': medical_analysis,
                     'legal': legal_analysis,
                     'recommendation': recommendation,
                     'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 }
+                hasil_baru['kasus_id'] = get_arsip().simpan_kasus(hasil_baru)
+                # Inkremental: hanya kasus baru sejak watermark (termasuk dari sesi lain)
+                get_indeks_saran(tenant.kode).perbarui_latar(get_arsip())
+                try:
+                    get_audit().catat(
+                        'asesmen', pengguna=get_id_sesi(),
+                        kasus_id=hasil_baru['kasus_id'],
+                        nomor_surat=nomor_surat,
+                        tenant=tenant.kode,
+                        penandatangan=nip_ttd,
+                        rekomendasi=recommendation['rekomendasi'],
+                        rule_id=recommendation.get('rule_id'),
+                    )
+                except AuditGagal as e:
+                    st.error(f"❌ Asesmen tersimpan di arsip tetapi log audit gagal ditulis: {e}")
+                    st.stop()
+                get_ruang_kerja().tambah(hasil_baru)
                 
                 st.success("✅ **Asesmen berhasil diproses!**")
                 st.balloons()
     
-    # Tampilkan hasil jika sudah ada
-    if 'hasil_asesmen' in st.session_state:
-        hasil = st.session_state['hasil_asesmen']
+    # Tampilkan hasil kasus aktif di ruang kerja
+    hasil = get_ruang_kerja().hasil_aktif()
+    if hasil is not None:
         
         st.markdown("---")
-        st.subheader("B. RINGKASAN HASIL ASESMEN")
+        st.subheader(f"B. RINGKASAN HASIL ASESMEN — #{hasil['kasus_id']} {hasil['data']['nama']}")
         
         col_hasil1, col_hasil2, col_hasil3 = st.columns(3)
         
@@ -1471,6 +2096,13 @@ def main():
                 hasil['medical']['diagnosis_code'],
                 hasil['medical']['pola_penggunaan']
             ), unsafe_allow_html=True)
+            
+            asam = hasil['medical'].get('asam')
+            if asam:
+                st.caption(
+                    f"ASAM level {asam['level']} — {asam['layanan']} (skor {asam['skor']:.2f}); "
+                    + ", ".join(f"D{d} {skor}" for d, skor in zip(NAMA_DIMENSI, asam['dimensi']))
+                )
         
         with col_hasil2:
             st.markdown("""
@@ -1494,12 +2126,14 @@ def main():
             <strong>📋 REKOMENDASI</strong><br/>
             <strong style="font-size: 1.2em;">{}</strong><br/>
             • Durasi: {}<br/>
-            • Tempat: {}
+            • Tempat: {}<br/>
+            • Aturan: {}
             </div>
             """.format(
                 hasil['recommendation']['rekomendasi'],
                 hasil['recommendation']['durasi'],
-                hasil['recommendation']['tempat'][:50] + "..." if len(hasil['recommendation']['tempat']) > 50 else hasil['recommendation']['tempat']
+                hasil['recommendation']['tempat'][:50] + "..." if len(hasil['recommendation']['tempat']) > 50 else hasil['recommendation']['tempat'],
+                hasil['recommendation'].get('rule_id', '-')
             ), unsafe_allow_html=True)
         
         st.markdown("---")
@@ -1511,43 +2145,82 @@ def main():
         
         with col_dl1:
             try:
-                word_buffer = generate_word_document(
-                    hasil['data'],
-                    hasil['medical'],
-                    hasil['legal'],
-                    hasil['recommendation']
-                )
+                # Render sekali per kasus arsip; selanjutnya dibaca dari gudang blob
+                if 'sha256_word' not in hasil:
+                    ref_word = ref_surat(hasil['kasus_id'], 'docx')
+                    hasil['sha256_word'] = get_gudang().cari(ref_word) or get_gudang().simpan(
+                        generate_word_document(
+                            hasil['data'],
+                            hasil['medical'],
+                            hasil['legal'],
+                            hasil['recommendation']
+                        ),
+                        ref_word
+                    )
+                word_buffer = get_gudang().baca(hasil['sha256_word'])
                 
-                filename_word = f"Surat_TAT_{hasil['data']['nama'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.docx"
+                filename_word = nama_berkas_surat(hasil['data'], "docx")
                 
                 st.download_button(
                     label="📘 Download Surat (Word)",
                     data=word_buffer,
                     file_name=filename_word,
                     mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                    use_container_width=True
+                    use_container_width=True,
+                    on_click=catat_unduh,
+                    args=(hasil['kasus_id'], 'docx')
                 )
             except Exception as e:
                 st.error(f"Error generating Word: {str(e)}")
         
         with col_dl2:
             try:
-                pdf_buffer = generate_pdf_document(
-                    hasil['data'],
-                    hasil['medical'],
-                    hasil['legal'],
-                    hasil['recommendation']
-                )
+                filename_pdf = nama_berkas_surat(hasil['data'], "pdf")
                 
-                filename_pdf = f"Surat_TAT_{hasil['data']['nama'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.pdf"
+                # Render + tandatangani sekali per kasus arsip; surat bertanda yang sudah
+                # terdaftar dibaca ulang dari gudang blob
+                if 'sha256_pdf' not in hasil:
+                    ref_pdf = ref_surat(hasil['kasus_id'], 'pdf')
+                    surat = get_arsip().cari_surat(get_gudang().cari(ref_pdf) or "")
+                    if surat is None:
+                        surat = tanda_tangan.tandatangani_surat(hasil, get_kunci_tte())
+                        # Kiriman email masuk outbox di transaksi yang sama; dikirim oleh pengiriman.py
+                        get_arsip().simpan_surat(surat, kiriman_surat(hasil, surat, filename_pdf))
+                        # Ref gudang langsung setelah commit: rerun berikutnya tidak menandatangani
+                        # ulang dan mengantrikan email kedua, apa pun hasil penulisan audit
+                        get_gudang().simpan(surat['pdf'], ref_pdf)
+                        try:
+                            get_audit().catat('tanda_tangan_surat', pengguna=get_id_sesi(),
+                                              kasus_id=hasil['kasus_id'],
+                                              nomor_surat=surat['nomor_surat'],
+                                              sha256=surat['sha256'],
+                                              id_kunci=surat['id_kunci'])
+                        except AuditGagal as e:
+                            st.warning(f"⚠️ Surat tersimpan di arsip tetapi log audit gagal ditulis: {e}")
+                    hasil['sha256_pdf'] = surat['sha256']
+                    hasil['kode_verifikasi'] = surat['kode_verifikasi']
+                    hasil['tanda_tangan'] = surat['tanda_tangan']
+                pdf_buffer = get_gudang().baca(hasil['sha256_pdf'])
                 
                 st.download_button(
                     label="📕 Download Surat (PDF)",
                     data=pdf_buffer,
                     file_name=filename_pdf,
                     mime="application/pdf",
+                    use_container_width=True,
+                    on_click=catat_unduh,
+                    args=(hasil['kasus_id'], 'pdf', hasil.get('sha256_pdf'))
+                )
+                st.caption(f"🔏 Kode Verifikasi: {tanda_tangan.format_kode(hasil['kode_verifikasi'])}")
+                st.download_button(
+                    label="✍️ Tanda Tangan (.sig)",
+                    data=bytes.fromhex(hasil['tanda_tangan']),
+                    file_name=f"{filename_pdf}.sig",
+                    mime="application/octet-stream",
                     use_container_width=True
                 )
+                for k in get_arsip().status_kiriman(hasil['kasus_id'], limit=3):
+                    st.caption(f"📧 {k['penerima']}: {LABEL_KIRIMAN.get(k['status'], k['status'])}")
             except Exception as e:
                 st.error(f"Error generating PDF: {str(e)}")
         
@@ -1619,6 +2292,114 @@ def main():
             NIP. {hasil['data']['nip_penandatangan']}
             """)
     
+    # =============================================================================
+    # PROSES MASSAL VIA ANTRIAN DOKUMEN
+    # =============================================================================
+    with tab3:
+        st.markdown("---")
+        st.subheader("D. PROSES MASSAL (ANTRIAN DOKUMEN)")
+        st.caption("Render surat untuk banyak kasus arsip dijalankan oleh worker terpisah, "
+                   "sehingga tidak memblokir sesi asesor lain.")
+        
+        id_sesi = get_id_sesi()
+        
+        col_q1, col_q2, col_q3 = st.columns([2, 1, 1])
+        
+        with col_q1:
+            kasus_ids_text = st.text_input("ID Kasus Arsip", placeholder="Contoh: 1-50, 75, 80")
+        
+        with col_q2:
+            prioritas_label = st.selectbox("Prioritas", list(PRIORITAS_ANTRIAN.keys()))
+        
+        with col_q3:
+            tenggat_sidang = st.date_input("Tenggat Sidang (opsional)", value=None)
+        
+        bundel_cetak = st.checkbox("Sertakan bundel PDF untuk cetak (satu file semua surat)")
+        
+        if st.button("📦 Kirim ke Antrian"):
+            try:
+                kasus_ids = parse_daftar_id(kasus_ids_text)
+            except ValueError:
+                kasus_ids = []
+            if not kasus_ids:
+                st.error("Masukkan ID kasus yang valid, contoh: 1-50, 75")
+            else:
+                try:
+                    job_id = get_antrian().kirim(
+                        "render_surat",
+                        {'kasus_ids': kasus_ids, 'bundel': bundel_cetak},
+                        pemilik=id_sesi,
+                        prioritas=PRIORITAS_ANTRIAN[prioritas_label],
+                        tenggat=datetime.combine(tenggat_sidang, datetime.min.time()).timestamp()
+                        if tenggat_sidang else None
+                    )
+                    st.success(f"✅ Pekerjaan #{job_id} ({len(kasus_ids)} kasus) masuk antrian")
+                except AntrianPenuh as e:
+                    st.warning(f"⏳ {e}")
+        
+        st.markdown("**Rekap Bulanan (BNN Pusat)**")
+        col_r1, col_r2, col_r3, col_r4 = st.columns([1, 1, 1, 1])
+        
+        with col_r1:
+            tahun_rekap = st.number_input("Tahun", min_value=2020, max_value=2100,
+                                          value=datetime.now().year, step=1)
+        
+        with col_r2:
+            bulan_rekap = st.selectbox("Bulan", [None] + list(range(1, 13)),
+                                       format_func=lambda b: "Setahun penuh" if b is None else NAMA_BULAN[b - 1])
+        
+        with col_r3:
+            format_rekap = st.selectbox("Format", ["xlsx", "csv"],
+                                        format_func=lambda f: {"xlsx": "Excel (XLSX)", "csv": "CSV"}[f])
+        
+        with col_r4:
+            st.write("")
+            kirim_rekap = st.button("📊 Buat Rekap")
+        
+        if kirim_rekap:
+            try:
+                job_id = get_antrian().kirim(
+                    "rekap",
+                    {'tahun': int(tahun_rekap), 'bulan': bulan_rekap, 'format': format_rekap},
+                    pemilik=id_sesi,
+                    prioritas=PRIORITAS_RENDAH
+                )
+                st.success(f"✅ Pekerjaan rekap #{job_id} masuk antrian")
+            except AntrianPenuh as e:
+                st.warning(f"⏳ {e}")
+        
+        daftar_pekerjaan = get_antrian().daftar(pemilik=id_sesi)
+        if daftar_pekerjaan:
+            st.button("🔄 Perbarui Status")
+            st.dataframe(
+                pd.DataFrame([{
+                    'ID': job['id'],
+                    'Jenis': job['jenis'],
+                    'Status': job['status'],
+                    'Kemajuan': job['kemajuan'] or "-",
+                    'Percobaan': job['percobaan'],
+                    'Dibuat': datetime.fromtimestamp(job['dibuat']).strftime("%Y-%m-%d %H:%M"),
+                } for job in daftar_pekerjaan]),
+                hide_index=True,
+                use_container_width=True
+            )
+            
+            pekerjaan_selesai = {job['id']: job for job in daftar_pekerjaan
+                                 if job['status'] == 'selesai' and job['hasil']}
+            if pekerjaan_selesai:
+                job_dipilih = st.selectbox("Unduh hasil pekerjaan", list(pekerjaan_selesai.keys()),
+                                           format_func=lambda i: f"#{i} ({pekerjaan_selesai[i]['hasil']['jumlah']} kasus)")
+                path_hasil = pekerjaan_selesai[job_dipilih]['hasil']['file']
+                label_unduh, mime_unduh = UNDUHAN_PEKERJAAN[os.path.splitext(path_hasil)[1]]
+                if os.path.exists(path_hasil):
+                    with enkripsi.buka_baca(path_hasil) as f:
+                        st.download_button(
+                            label=label_unduh,
+                            data=f.read(),
+                            file_name=os.path.basename(path_hasil),
+                            mime=mime_unduh
+                        )
+    
     # =============================================================================
     # TAB 4: PANDUAN
     # =============================================================================
@@ -1762,12 +2543,27 @@ def main():
         
         st.markdown("---")
         
-        st.info("""
+        st.info(f"""
         **📞 Kontak:**  
-        BNN Provinsi Kalimantan Utara  
-        Jl. Teuku Umar No. 31, Kota Tarakan, Provinsi Kalimantan Utara  
+        {tenant.nama_instansi}  
+        {tenant.alamat}  
         """)
     
 # End main()
+
+def jalankan_main():
+    """Jalankan main(); bila admin meminta, rerun ini dibungkus profiler"""
+    opsi_profil = st.session_state.pop('profil_berikutnya', None)
+    if opsi_profil is None:
+        main()
+        return
+    
+    profil = ProfilRerun(**opsi_profil)
+    try:
+        with profil:
+            main()
+    finally:
+        st.session_state['profil_terakhir'] = profil.ringkasan
+
 if __name__ == "__main__":
-    main()
+    jalankan_main()
@@ -0,0 +1,786 @@
+"""
+=================================================================================
+ARSIP KASUS & SURAT TAT (SQLite lokal)
+=================================================================================
+Menyimpan hasil asesmen (data_lengkap + analisis + rekomendasi) dan register
+surat yang sudah ditandatangani secara elektronik (hash SHA-256 + tanda tangan).
+=================================================================================
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from tenant import TENANT_DEFAULT
+
+DATA_DIR = os.environ.get(
+    "TAT_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+)
+ARSIP_PATH = os.path.join(DATA_DIR, "arsip.sqlite3")
+
+SKEMA_ARSIP = """
+CREATE TABLE IF NOT EXISTS kasus (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nomor_surat TEXT NOT NULL,
+    nama TEXT,
+    dibuat TEXT NOT NULL,
+    data TEXT NOT NULL,
+    medical TEXT NOT NULL,
+    legal TEXT NOT NULL,
+    recommendation TEXT NOT NULL,
+    sandi BLOB,  -- ciphertext [data, medical, legal, recommendation]; kolom teks kosong bila terisi
+    -- Kunci indeks terbit ulang (terbit_ulang.py); tetap polos karena tercetak di kop/TTD surat
+    tenant TEXT,
+    nip_penandatangan TEXT,
+    -- Urutan perubahan global saat isi kasus ditulis ulang (terbit ulang, ganti nomor
+    -- surat); NULL = belum pernah berubah. Dipakai ekspor_analitik untuk ekspor ulang.
+    diubah INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_kasus_nomor_surat ON kasus(nomor_surat);
+CREATE INDEX IF NOT EXISTS idx_kasus_dibuat ON kasus(dibuat);
+
+-- Register surat bertanda tangan: kunci utama = SHA-256 file final,
+-- sehingga verifikasi file unggahan cukup satu lookup indeks.
+CREATE TABLE IF NOT EXISTS surat (
+    sha256 TEXT PRIMARY KEY,
+    kasus_id INTEGER,
+    nomor_surat TEXT NOT NULL,
+    format TEXT NOT NULL,
+    kode_verifikasi TEXT NOT NULL,
+    tanda_tangan TEXT NOT NULL,
+    id_kunci TEXT NOT NULL,
+    ditandatangani TEXT NOT NULL,
+    digantikan TEXT                  -- sha256 surat pengganti kasus yang sama (terbit ulang, ganti nomor)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_surat_kasus ON surat(kasus_id);
+
+-- Checkpoint impor surat lama (.docx): satu baris per file yang sudah diproses,
+-- ditulis dalam transaksi yang sama dengan kasusnya agar impor bisa dilanjutkan.
+CREATE TABLE IF NOT EXISTS impor_surat (
+    path TEXT PRIMARY KEY,
+    ukuran INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    sha256 TEXT,
+    kasus_id INTEGER,
+    status TEXT NOT NULL,
+    pesan TEXT,
+    diimpor TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_impor_sha256 ON impor_surat(sha256);
+
+-- Outbox pengiriman surat ke instansi pemohon: ditulis dalam transaksi yang sama
+-- dengan register surat, dikirim asinkron oleh `python pengiriman.py worker`.
+CREATE TABLE IF NOT EXISTS kiriman (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kasus_id INTEGER,
+    sha256 TEXT,
+    penerima TEXT NOT NULL,          -- alamat email
+    nama_penerima TEXT,
+    subjek TEXT NOT NULL,
+    nama_lampiran TEXT NOT NULL,
+    lampiran BLOB NOT NULL,          -- ciphertext bila enkripsi aktif
+    status TEXT NOT NULL DEFAULT 'antri',
+    percobaan INTEGER NOT NULL DEFAULT 0,
+    jalan_setelah REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    dibuat TEXT NOT NULL,
+    terkirim TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_kiriman_antri ON kiriman(status, jalan_setelah);
+CREATE INDEX IF NOT EXISTS idx_kiriman_kasus ON kiriman(kasus_id);
+
+-- Mode lapangan (sinkron.py), sisi laptop: status sinkron tiap kasus lokal ke
+-- server provinsi. Kasus tanpa baris di sini masih menunggu dikirim.
+CREATE TABLE IF NOT EXISTS sinkron_keluar (
+    kasus_id INTEGER PRIMARY KEY,
+    status TEXT NOT NULL,            -- 'terkirim' / 'konflik'
+    kasus_id_pusat INTEGER,
+    pesan TEXT,
+    waktu TEXT NOT NULL
+);
+
+-- Sisi server: kasus yang diterima dari perangkat lapangan. Kunci (perangkat,
+-- id lokal) membuat batch yang dikirim ulang tidak menggandakan kasus.
+CREATE TABLE IF NOT EXISTS sinkron_masuk (
+    perangkat TEXT NOT NULL,
+    kasus_id_lokal INTEGER NOT NULL,
+    kasus_id INTEGER NOT NULL,
+    sidik TEXT NOT NULL,
+    diterima TEXT NOT NULL,
+    PRIMARY KEY (perangkat, kasus_id_lokal)
+) WITHOUT ROWID;
+"""
+
+
+KOLOM_KASUS = ('nomor_surat', 'nama', 'dibuat', 'data', 'medical', 'legal', 'recommendation',
+               'sandi', 'tenant', 'nip_penandatangan')
+_UPDATE_KASUS = (f"UPDATE kasus SET {', '.join(f'{k} = ?' for k in KOLOM_KASUS)}, "
+                 "diubah = (SELECT COALESCE(MAX(diubah), 0) + 1 FROM kasus) WHERE id = ?")
+
+
+def _dump(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def sidik_kasus(hasil):
+    """SHA-256 isi asesmen kanonis (data, medical, legal, recommendation)"""
+    return hashlib.sha256(json.dumps(
+        [hasil['data'], hasil['medical'], hasil['legal'], hasil['recommendation']],
+        ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")).hexdigest()
+
+
+class Arsip:
+    """Akses arsip SQLite; aman dipakai bersama oleh beberapa sesi Streamlit."""
+
+    def __init__(self, path=None, cincin=None):
+        import enkripsi  # impor lambat: enkripsi memakai DATA_DIR dari modul ini
+
+        self._enkripsi = enkripsi
+        self._cincin_tetap = cincin
+        self.path = path or ARSIP_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SKEMA_ARSIP)
+        kolom = {row['name'] for row in self._conn.execute("PRAGMA table_info(kasus)")}
+        if 'sandi' not in kolom:
+            # Arsip lama: tambah kolom ciphertext; record lama tetap terbaca sampai dirotasi
+            self._conn.execute("ALTER TABLE kasus ADD COLUMN sandi BLOB")
+        for nama in ('tenant', 'nip_penandatangan'):
+            if nama not in kolom:
+                # Record lama: NULL sampai diisi isi_indeks_penandatangan()
+                self._conn.execute(f"ALTER TABLE kasus ADD COLUMN {nama} TEXT")
+        if 'diubah' not in kolom:
+            self._conn.execute("ALTER TABLE kasus ADD COLUMN diubah INTEGER")
+        if 'digantikan' not in {row['name'] for row in self._conn.execute("PRAGMA table_info(surat)")}:
+            # Register lama: surat yang sudah ada versi lebih baru untuk kasus yang sama ditandai
+            self._conn.execute("ALTER TABLE surat ADD COLUMN digantikan TEXT")
+            self._conn.execute(
+                "UPDATE surat SET digantikan = (SELECT b.sha256 FROM surat b WHERE b.kasus_id = surat.kasus_id "
+                "AND b.format = surat.format AND b.ditandatangani > surat.ditandatangani "
+                "ORDER BY b.ditandatangani DESC LIMIT 1) WHERE kasus_id IS NOT NULL"
+            )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_kasus_penandatangan "
+            "ON kasus(tenant, nip_penandatangan, dibuat)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_kasus_diubah ON kasus(diubah)")
+        self._conn.commit()
+
+    def _cincin(self):
+        return self._cincin_tetap or self._enkripsi.muat_cincin()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # -------------------------------------------------------------------------
+    # KASUS
+    # -------------------------------------------------------------------------
+    def _nilai_kasus(self, hasil):
+        """Nilai kolom KOLOM_KASUS (urutan sama)"""
+        data = hasil['data']
+        dibuat = hasil.get('timestamp') or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        indeks = (data.get('tenant') or TENANT_DEFAULT, data.get('nip_penandatangan') or '')
+        if self._enkripsi.ENKRIPSI_AKTIF:
+            # Satu DEK per record untuk seluruh isi; kolom teks dikosongkan (nama = data pribadi)
+            sandi = self._enkripsi.enkripsi_bytes(
+                _dump([data, hasil['medical'], hasil['legal'], hasil['recommendation']]).encode("utf-8"),
+                self._cincin()
+            )
+            return (data.get('nomor_surat', ''), '', dibuat, '', '', '', '', sandi, *indeks)
+        return (
+            data.get('nomor_surat', ''),
+            data.get('nama', ''),
+            dibuat,
+            _dump(data),
+            _dump(hasil['medical']),
+            _dump(hasil['legal']),
+            _dump(hasil['recommendation']),
+            None,
+            *indeks,
+        )
+
+    def _insert_kasus(self, hasil):
+        cur = self._conn.execute(
+            f"INSERT INTO kasus ({', '.join(KOLOM_KASUS)}) VALUES ({', '.join('?' * len(KOLOM_KASUS))})",
+            self._nilai_kasus(hasil)
+        )
+        return cur.lastrowid
+
+    def simpan_kasus(self, hasil):
+        """Simpan satu hasil asesmen, kembalikan id kasus"""
+        with self._lock, self._conn:
+            return self._insert_kasus(hasil)
+
+    def _row_to_hasil(self, row):
+        if row['sandi'] is not None:
+            data, medical, legal, recommendation = json.loads(
+                self._enkripsi.dekripsi_bytes(row['sandi'], self._cincin())
+            )
+        else:
+            data = json.loads(row['data'])
+            medical = json.loads(row['medical'])
+            legal = json.loads(row['legal'])
+            recommendation = json.loads(row['recommendation'])
+        return {
+            'kasus_id': row['id'],
+            'data': data,
+            'medical': medical,
+            'legal': legal,
+            'recommendation': recommendation,
+            'timestamp': row['dibuat'],
+        }
+
+    def ambil_kasus(self, kasus_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM kasus WHERE id = ?", (kasus_id,)).fetchone()
+        return self._row_to_hasil(row) if row else None
+
+    def iter_kasus(self, batch=500, sejak_id=0, sampai_id=None):
+        """
+        Iterasi kasus dengan id > sejak_id (dan <= sampai_id bila diisi) per batch
+        (keyset pagination, tidak memuat semua ke memori)
+        """
+        last_id = sejak_id
+        batas = sampai_id if sampai_id is not None else -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT * FROM kasus WHERE id > ? AND (? < 0 OR id <= ?) ORDER BY id LIMIT ?",
+                    (last_id, batas, batas, batch)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._row_to_hasil(row)
+            last_id = rows[-1]['id']
+
+    def iter_kasus_periode(self, awal, akhir, batch=500):
+        """
+        Iterasi kasus dengan awal <= dibuat < akhir (teks 'YYYY-MM-DD ...') urut
+        waktu, per batch (keyset (dibuat, id) di atas idx_kasus_dibuat)
+        """
+        last = (awal, 0)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT * FROM kasus WHERE (dibuat, id) > (?, ?) AND dibuat < ? "
+                    "ORDER BY dibuat, id LIMIT ?",
+                    (last[0], last[1], akhir, batch)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._row_to_hasil(row)
+            last = (rows[-1]['dibuat'], rows[-1]['id'])
+
+    def iter_kasus_diubah(self, sejak_versi, sampai_versi, sampai_id=None, batch=500):
+        """
+        Iterasi kasus yang ditulis ulang dengan sejak_versi < diubah <= sampai_versi
+        (opsional: hanya id <= sampai_id), urut diubah; lihat versi_ubah()
+        """
+        last = sejak_versi
+        batas = sampai_id if sampai_id is not None else -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT * FROM kasus WHERE diubah > ? AND diubah <= ? AND (? < 0 OR id <= ?) "
+                    "ORDER BY diubah LIMIT ?",
+                    (last, sampai_versi, batas, batas, batch)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._row_to_hasil(row)
+            last = rows[-1]['diubah']
+
+    def versi_ubah(self):
+        """Nomor urut perubahan isi kasus terakhir (0 bila belum ada yang ditulis ulang)"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(diubah), 0) FROM kasus").fetchone()[0]
+
+    def iter_blob_kasus(self, sejak_id, sampai_id, batch=500):
+        """
+        (id, diubah, blob) kasus id (sejak_id, sampai_id] untuk rotasi kunci: blob =
+        ciphertext, atau JSON plaintext [data, medical, legal, recommendation] untuk
+        record lama; diubah = versi isi saat dibaca (lihat tulis_blob_kasus)
+        """
+        last_id = sejak_id
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, diubah, data, medical, legal, recommendation, sandi FROM kasus "
+                    "WHERE id > ? AND id <= ? ORDER BY id LIMIT ?",
+                    (last_id, sampai_id, batch)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                if row['sandi'] is not None:
+                    yield row['id'], row['diubah'], row['sandi']
+                else:
+                    yield row['id'], row['diubah'], (f"[{row['data']},{row['medical']},"
+                                                     f"{row['legal']},{row['recommendation']}]")
+            last_id = rows[-1]['id']
+
+    def tulis_blob_kasus(self, baris):
+        """
+        Simpan ciphertext hasil rotasi [(id, diubah, blob)] dalam satu transaksi.
+        Compare-and-set pada diubah: kasus yang ditulis ulang sejak dibaca (app,
+        terbit ulang, ganti nomor) dilewati - isinya sudah dienkripsi dengan kunci
+        aktif dan tidak boleh dikembalikan ke isi lama. Kembalikan jumlah yang ditulis.
+        """
+        with self._lock, self._conn:
+            cur = self._conn.executemany(
+                "UPDATE kasus SET sandi = ?, nama = '', data = '', medical = '', legal = '', "
+                "recommendation = '' WHERE id = ? AND diubah IS ?",
+                [(blob, kasus_id, diubah) for kasus_id, diubah, blob in baris]
+            )
+        return cur.rowcount
+
+    def rentang_id(self, tabel="kasus"):
+        """(id_min, id_maks) tabel kasus/kiriman, atau (0, 0) bila kosong"""
+        if tabel not in ("kasus", "kiriman"):
+            raise ValueError(f"Tabel tidak dikenal: {tabel}")
+        with self._lock:
+            row = self._conn.execute(f"SELECT MIN(id), MAX(id) FROM {tabel}").fetchone()
+        return (row[0] or 0, row[1] or 0)
+
+    def iter_lampiran_kiriman(self, sejak_id, sampai_id, batch=100):
+        """
+        (id, sha256, lampiran) kiriman id (sejak_id, sampai_id] untuk rotasi kunci:
+        lampiran = ciphertext, atau PDF polos bila ditulis saat enkripsi nonaktif
+        """
+        last_id = sejak_id
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, sha256, lampiran FROM kiriman WHERE id > ? AND id <= ? ORDER BY id LIMIT ?",
+                    (last_id, sampai_id, batch)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row['id'], row['sha256'], row['lampiran']
+            last_id = rows[-1]['id']
+
+    def tulis_lampiran_kiriman(self, baris):
+        """
+        Simpan lampiran hasil rotasi [(id, sha256, blob)] dalam satu transaksi;
+        compare-and-set pada sha256 (lampiran yang diganti selama rotasi dilewati).
+        Kembalikan jumlah yang ditulis.
+        """
+        with self._lock, self._conn:
+            cur = self._conn.executemany(
+                "UPDATE kiriman SET lampiran = ? WHERE id = ? AND sha256 IS ?",
+                [(blob, kiriman_id, sha) for kiriman_id, sha, blob in baris]
+            )
+        return cur.rowcount
+
+    # -------------------------------------------------------------------------
+    # SURAT BERTANDA TANGAN
+    # -------------------------------------------------------------------------
+    def simpan_surat(self, daftar_surat, kiriman=()):
+        """
+        Daftarkan satu atau banyak surat bertanda tangan dalam satu transaksi.
+        kiriman: list dict {penerima, nama_penerima, subjek, nama_lampiran, lampiran
+        (bytes), kasus_id, sha256} yang masuk outbox di transaksi yang sama.
+        """
+        if isinstance(daftar_surat, dict):
+            daftar_surat = [daftar_surat]
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        kiriman = [self._baris_kiriman(k, now) for k in kiriman]
+        with self._lock, self._conn:
+            self._insert_surat(daftar_surat, now)
+            if kiriman:
+                self._conn.executemany(
+                    "INSERT INTO kiriman (kasus_id, sha256, penerima, nama_penerima, subjek, "
+                    "nama_lampiran, lampiran, dibuat) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    kiriman
+                )
+
+    def _insert_surat(self, daftar_surat, now):
+        """Daftarkan surat; surat lain untuk kasus & format yang sama ditandai digantikan"""
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO surat (sha256, kasus_id, nomor_surat, format, kode_verifikasi, "
+            "tanda_tangan, id_kunci, ditandatangani) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (s['sha256'], s.get('kasus_id'), s['nomor_surat'], s.get('format', 'pdf'),
+                 s['kode_verifikasi'], s['tanda_tangan'], s['id_kunci'],
+                 s.get('ditandatangani') or now)
+                for s in daftar_surat
+            ]
+        )
+        terbaru = [(s['sha256'], s['kasus_id'], s.get('format', 'pdf'))
+                   for s in daftar_surat if s.get('kasus_id') is not None]
+        self._conn.executemany("UPDATE surat SET digantikan = NULL WHERE sha256 = ?",
+                               [(sha,) for sha, _, _ in terbaru])
+        self._conn.executemany(
+            "UPDATE surat SET digantikan = ? WHERE kasus_id = ? AND format = ? AND sha256 != ?",
+            [(sha, kasus_id, fmt, sha) for sha, kasus_id, fmt in terbaru]
+        )
+
+    def cari_surat(self, sha256):
+        """Lookup surat berdasarkan SHA-256 file (indeks kunci utama)"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM surat WHERE sha256 = ?", (sha256,)).fetchone()
+        return dict(row) if row else None
+
+    # -------------------------------------------------------------------------
+    # OUTBOX PENGIRIMAN SURAT
+    # -------------------------------------------------------------------------
+    def _lampiran(self, isi):
+        if self._enkripsi.ENKRIPSI_AKTIF:
+            return self._enkripsi.enkripsi_bytes(isi, self._cincin())
+        return isi
+
+    def _baris_kiriman(self, k, now):
+        return (k.get('kasus_id'), k.get('sha256'), k['penerima'], k.get('nama_penerima'),
+                k['subjek'], k['nama_lampiran'], self._lampiran(k['lampiran']), now)
+
+    def ambil_kiriman(self, sewa=300, maks_lampiran=10, maks_bytes=15 * 1024 * 1024):
+        """
+        Klaim batch kiriman jatuh tempo untuk SATU penerima (penerima dengan kiriman
+        tertua lebih dulu). Klaim = sewa: jalan_setelah digeser `sewa` detik, sehingga
+        batch milik worker yang mati dikirim ulang setelah sewa habis.
+        """
+        now = time.time()
+        with self._lock:
+            c = self._conn
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                pertama = c.execute(
+                    "SELECT penerima FROM kiriman WHERE status = 'antri' AND jalan_setelah <= ? "
+                    "ORDER BY id LIMIT 1", (now,)
+                ).fetchone()
+                if pertama is None:
+                    c.execute("COMMIT")
+                    return []
+                rows = c.execute(
+                    "SELECT * FROM kiriman WHERE status = 'antri' AND jalan_setelah <= ? "
+                    "AND penerima = ? ORDER BY id LIMIT ?",
+                    (now, pertama['penerima'], maks_lampiran)
+                ).fetchall()
+                batch, total = [], 0
+                for row in rows:
+                    if batch and total + len(row['lampiran']) > maks_bytes:
+                        break
+                    batch.append(row)
+                    total += len(row['lampiran'])
+                c.executemany(
+                    "UPDATE kiriman SET percobaan = percobaan + 1, jalan_setelah = ? WHERE id = ?",
+                    [(now + sewa, row['id']) for row in batch]
+                )
+                c.execute("COMMIT")
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+        hasil = []
+        for row in batch:
+            k = dict(row)
+            k['percobaan'] += 1
+            if self._enkripsi.terenkripsi(k['lampiran']):
+                k['lampiran'] = self._enkripsi.dekripsi_bytes(k['lampiran'], self._cincin())
+            hasil.append(k)
+        return hasil
+
+    def kiriman_terkirim(self, ids):
+        """Tandai terkirim; lampiran dihapus dari outbox (surat tetap di register)"""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE kiriman SET status = 'terkirim', terkirim = ?, error = NULL, "
+                "lampiran = x'' WHERE id = ?",
+                [(now, i) for i in ids]
+            )
+
+    def kiriman_gagal(self, ids, error, jalan_setelah=None):
+        """Jadwalkan ulang pada `jalan_setelah` (epoch), atau gagal permanen bila None"""
+        with self._lock, self._conn:
+            if jalan_setelah is None:
+                self._conn.executemany(
+                    "UPDATE kiriman SET status = 'gagal', error = ? WHERE id = ?",
+                    [(error, i) for i in ids]
+                )
+            else:
+                self._conn.executemany(
+                    "UPDATE kiriman SET error = ?, jalan_setelah = ? WHERE id = ?",
+                    [(error, jalan_setelah, i) for i in ids]
+                )
+
+    def status_kiriman(self, kasus_id=None, limit=50):
+        """Ringkasan kiriman (tanpa lampiran), terbaru dulu"""
+        kolom = "id, kasus_id, penerima, subjek, status, percobaan, jalan_setelah, error, dibuat, terkirim"
+        with self._lock:
+            if kasus_id is None:
+                rows = self._conn.execute(
+                    f"SELECT {kolom} FROM kiriman ORDER BY id DESC LIMIT ?", (limit,)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    f"SELECT {kolom} FROM kiriman WHERE kasus_id = ? ORDER BY id DESC LIMIT ?",
+                    (kasus_id, limit)
+                ).fetchall()
+        return [dict(row) for row in rows]
+
+    # -------------------------------------------------------------------------
+    # CHECKPOINT IMPOR SURAT LAMA
+    # -------------------------------------------------------------------------
+    def file_terimpor(self):
+        """{path: (ukuran, mtime)} file yang sudah tercatat di checkpoint impor"""
+        with self._lock:
+            rows = self._conn.execute("SELECT path, ukuran, mtime FROM impor_surat").fetchall()
+        return {row['path']: (row['ukuran'], row['mtime']) for row in rows}
+
+    def simpan_impor(self, daftar):
+        """
+        Catat satu batch hasil impor dalam satu transaksi. Tiap item: dict path,
+        ukuran, mtime, sha256, status, pesan, hasil (dict hasil asesmen atau None).
+        Item 'ok' yang SHA-256-nya sudah pernah diimpor dicatat sebagai 'duplikat'.
+        Kembalikan Counter status.
+        """
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        jumlah = Counter()
+        with self._lock, self._conn:
+            for item in daftar:
+                status, kasus_id = item['status'], None
+                if status == 'ok':
+                    sudah = self._conn.execute(
+                        "SELECT path, kasus_id FROM impor_surat WHERE sha256 = ? AND status = 'ok'",
+                        (item['sha256'],)
+                    ).fetchone()
+                    if sudah and sudah['path'] == item['path']:
+                        kasus_id = sudah['kasus_id']  # file disentuh ulang, isi sama
+                    elif sudah:
+                        status, kasus_id = 'duplikat', sudah['kasus_id']
+                    else:
+                        kasus_id = self._insert_kasus(item['hasil'])
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO impor_surat (path, ukuran, mtime, sha256, kasus_id, status, pesan, diimpor) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (item['path'], item['ukuran'], item['mtime'], item.get('sha256'), kasus_id,
+                     status, item.get('pesan'), now)
+                )
+                jumlah[status] += 1
+        return jumlah
+
+    # -------------------------------------------------------------------------
+    # SINKRON MODE LAPANGAN (lihat sinkron.py)
+    # -------------------------------------------------------------------------
+    def ambil_belum_sinkron(self, sejak_id=0, limit=200):
+        """Kasus lokal id > sejak_id yang belum tercatat di sinkron_keluar, urut id"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT k.* FROM kasus k LEFT JOIN sinkron_keluar s ON s.kasus_id = k.id "
+                "WHERE k.id > ? AND s.kasus_id IS NULL ORDER BY k.id LIMIT ?",
+                (sejak_id, limit)
+            ).fetchall()
+        return [self._row_to_hasil(row) for row in rows]
+
+    def jumlah_belum_sinkron(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM kasus k LEFT JOIN sinkron_keluar s ON s.kasus_id = k.id "
+                "WHERE s.kasus_id IS NULL"
+            ).fetchone()[0]
+
+    def catat_sinkron(self, daftar):
+        """Catat balasan server [{kasus_id, status, kasus_id_pusat, pesan}] dalam satu transaksi"""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sinkron_keluar (kasus_id, status, kasus_id_pusat, pesan, waktu) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(h['kasus_id'], 'konflik' if h['status'] == 'konflik' else 'terkirim',
+                  h.get('kasus_id_pusat'), h.get('pesan'), now) for h in daftar]
+            )
+
+    def status_sinkron(self, status=None, limit=50):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.*, k.nomor_surat FROM sinkron_keluar s JOIN kasus k ON k.id = s.kasus_id "
+                "WHERE ? IS NULL OR s.status = ? ORDER BY s.kasus_id DESC LIMIT ?",
+                (status, status, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def ganti_nomor_surat(self, kasus_id, nomor_surat, surat=None):
+        """
+        Ganti nomor surat kasus lokal (penyelesaian konflik) dan antrikan ulang
+        sinkronnya. Kiriman yang masih antri membawa PDF bernomor lama: bila
+        `surat` (surat bertanda tangan dengan nomor baru) diberikan, surat itu
+        didaftarkan dan menggantikan lampiran + nomor di subjek kiriman; tanpa
+        `surat` kiriman dibatalkan (status 'batal'). Semua dalam satu transaksi.
+        Mengembalikan jumlah kiriman yang diganti/dibatalkan.
+        """
+        hasil = self.ambil_kasus(kasus_id)
+        if hasil is None:
+            raise KeyError(kasus_id)
+        nomor_lama = hasil['data'].get('nomor_surat') or ''
+        hasil['data']['nomor_surat'] = nomor_surat
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        lampiran = self._lampiran(surat['pdf']) if surat is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(_UPDATE_KASUS, (*self._nilai_kasus(hasil), kasus_id))
+            self._conn.execute("DELETE FROM sinkron_keluar WHERE kasus_id = ?", (kasus_id,))
+            if surat is not None:
+                self._insert_surat([surat], now)
+                kiriman = self._conn.execute(
+                    "UPDATE kiriman SET sha256 = ?, lampiran = ?, subjek = REPLACE(subjek, ?, ?) "
+                    "WHERE kasus_id = ? AND status = 'antri'",
+                    (surat['sha256'], lampiran, nomor_lama or nomor_surat, nomor_surat, kasus_id)
+                )
+            else:
+                kiriman = self._conn.execute(
+                    "UPDATE kiriman SET status = 'batal', error = ? WHERE kasus_id = ? AND status = 'antri'",
+                    (f"nomor surat diganti menjadi {nomor_surat}", kasus_id)
+                )
+            return kiriman.rowcount
+
+    def terima_sinkron(self, perangkat, daftar):
+        """
+        Sisi server: simpan satu batch kasus dari perangkat lapangan dalam satu
+        transaksi. Tiap item: dict kasus_id (id lokal) + hasil. Balasan per item:
+        'diterima' (kasus baru), 'duplikat' (isi sama sudah ada: batch dikirim
+        ulang, atau kasus yang sama masuk lewat jalur lain), 'diperbarui' (kasus
+        lokal yang sudah pernah diterima dikirim dengan isi baru - terbit ulang,
+        ganti nomor - dan kasus pusatnya ditulis ulang), atau 'konflik'
+        (nomor_surat sudah dipakai kasus lain; tidak disimpan).
+        """
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        balasan = []
+        with self._lock, self._conn:
+            for item in daftar:
+                hasil = item['hasil']
+                sidik = sidik_kasus(hasil)
+                nomor = hasil['data'].get('nomor_surat', '')
+                h = {'kasus_id': item['kasus_id'], 'status': 'diterima', 'kasus_id_pusat': None, 'pesan': None}
+                sudah = self._conn.execute(
+                    "SELECT kasus_id, sidik FROM sinkron_masuk WHERE perangkat = ? AND kasus_id_lokal = ?",
+                    (perangkat, item['kasus_id'])
+                ).fetchone()
+                pemakai = self._conn.execute(
+                    "SELECT * FROM kasus WHERE nomor_surat = ?", (nomor,)
+                ).fetchall() if nomor else []
+                if sudah is not None:
+                    # Perangkat hanya mengirim ulang kasus yang isinya berubah di laptop:
+                    # isi berbeda = versi lebih baru dari kasus pusat yang sama
+                    h['kasus_id_pusat'] = sudah['kasus_id']
+                    lain = next((row['id'] for row in pemakai if row['id'] != sudah['kasus_id']), None)
+                    if sudah['sidik'] == sidik:
+                        h['status'] = 'duplikat'
+                    elif lain is not None:
+                        h['status'] = 'konflik'
+                        h['pesan'] = f"Nomor surat {nomor} sudah dipakai kasus #{lain} pusat"
+                    else:
+                        h['status'] = 'diperbarui'
+                        self._conn.execute(_UPDATE_KASUS, (*self._nilai_kasus(hasil), sudah['kasus_id']))
+                        self._conn.execute(
+                            "UPDATE sinkron_masuk SET sidik = ?, diterima = ? "
+                            "WHERE perangkat = ? AND kasus_id_lokal = ?",
+                            (sidik, now, perangkat, item['kasus_id'])
+                        )
+                    balasan.append(h)
+                    continue
+                sama = next((row for row in pemakai if sidik_kasus(self._row_to_hasil(row)) == sidik), None)
+                if sama is not None:
+                    h['status'], h['kasus_id_pusat'] = 'duplikat', sama['id']
+                elif pemakai:
+                    h['status'], h['kasus_id_pusat'] = 'konflik', pemakai[0]['id']
+                    h['pesan'] = f"Nomor surat {nomor} sudah dipakai kasus #{pemakai[0]['id']} pusat"
+                else:
+                    h['kasus_id_pusat'] = self._insert_kasus(hasil)
+                if h['status'] != 'konflik':
+                    self._conn.execute(
+                        "INSERT INTO sinkron_masuk (perangkat, kasus_id_lokal, kasus_id, sidik, diterima) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (perangkat, item['kasus_id'], h['kasus_id_pusat'], sidik, now)
+                    )
+                balasan.append(h)
+        return balasan
+
+    # -------------------------------------------------------------------------
+    # TERBIT ULANG (lihat terbit_ulang.py)
+    # -------------------------------------------------------------------------
+    def isi_indeks_penandatangan(self, batch=500):
+        """Isi kolom tenant/nip_penandatangan record lama (NULL); kembalikan jumlah kasus"""
+        jumlah = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT * FROM kasus WHERE tenant IS NULL LIMIT ?", (batch,)
+                ).fetchall()
+            if not rows:
+                return jumlah
+            nilai = []
+            for row in rows:
+                data = self._row_to_hasil(row)['data']
+                nilai.append((data.get('tenant') or TENANT_DEFAULT,
+                              data.get('nip_penandatangan') or '', row['id']))
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "UPDATE kasus SET tenant = ?, nip_penandatangan = ? WHERE id = ?", nilai
+                )
+            jumlah += len(rows)
+
+    def cari_kasus_terdampak(self, tenant=TENANT_DEFAULT, nip=None, bukan_nip=None,
+                             sejak=None, sampai=None, kecuali_terkirim=True):
+        """
+        Id kasus tenant (urut id) lewat idx_kasus_penandatangan: NIP penandatangan
+        = nip / != bukan_nip, sejak <= dibuat < sampai ('YYYY-MM-DD'). Kasus yang
+        suratnya sudah terkirim lewat outbox dilewati bila kecuali_terkirim.
+        """
+        syarat, nilai = ["tenant = ?"], [tenant]
+        if nip is not None:
+            syarat.append("nip_penandatangan = ?")
+            nilai.append(nip)
+        if bukan_nip is not None:
+            syarat.append("nip_penandatangan != ?")
+            nilai.append(bukan_nip)
+        if sejak:
+            syarat.append("dibuat >= ?")
+            nilai.append(sejak)
+        if sampai:
+            syarat.append("dibuat < ?")
+            nilai.append(sampai)
+        if kecuali_terkirim:
+            syarat.append("NOT EXISTS (SELECT 1 FROM kiriman WHERE kiriman.kasus_id = kasus.id "
+                          "AND kiriman.status = 'terkirim')")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id FROM kasus WHERE {' AND '.join(syarat)} ORDER BY id", nilai
+            ).fetchall()
+        return [row['id'] for row in rows]
+
+    def perbarui_kasus(self, daftar_hasil, daftar_surat=()):
+        """
+        Tulis ulang isi kasus (hasil berisi kasus_id) dan daftarkan surat barunya
+        dalam satu transaksi. Lampiran kiriman yang masih antri diganti dengan PDF
+        baru (surat dengan kasus_id sama) agar yang terkirim adalah versi terbaru,
+        dan kasusnya diantrikan ulang untuk sinkron (mode lapangan) seperti
+        ganti_nomor_surat, sehingga server provinsi menerima isi terbaru.
+        """
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        nilai = [(*self._nilai_kasus(h), h['kasus_id']) for h in daftar_hasil]
+        lampiran = [(s['sha256'], self._lampiran(s['pdf']), s['kasus_id'])
+                    for s in daftar_surat if s.get('pdf') is not None]
+        with self._lock, self._conn:
+            self._conn.executemany(_UPDATE_KASUS, nilai)
+            self._conn.executemany("DELETE FROM sinkron_keluar WHERE kasus_id = ?",
+                                   [(h['kasus_id'],) for h in daftar_hasil])
+            self._insert_surat(daftar_surat, now)
+            self._conn.executemany(
+                "UPDATE kiriman SET sha256 = ?, lampiran = ? WHERE kasus_id = ? AND status = 'antri'",
+                lampiran
+            )
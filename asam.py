@@ -0,0 +1,327 @@
+"""
+=================================================================================
+PENILAIAN ASAM 6 DIMENSI -> LEVEL LAYANAN (LEVEL OF CARE)
+=================================================================================
+Jawaban ASAM di tab Asesmen Medis (data_lengkap) dipetakan ke skor risiko 0-4
+per indikator; skor dimensi = indikator terberat di dimensi itu. Level layanan:
+
+    3.7  Rawat Inap   - ada dimensi 1-3 (withdrawal, biomedis, psikiatrik)
+                        dengan skor >= ambang_medis
+    3.5  Rawat Inap   - skor gabungan (rata-rata berbobot) >= ambang_skor['3.5'],
+                        atau dimensi 5 & 6 sama-sama >= ambang_medis
+    2.1  Rawat Jalan  - skor gabungan >= ambang_skor['2.1'] (rawat jalan intensif)
+    1    Rawat Jalan  - selain itu
+
+Penempatan (Rawat Inap/Rawat Jalan) dipakai tabel keputusan rekomendasi di
+app.py. Kasus tanpa jawaban ASAM (arsip lama, impor surat) tidak dinilai.
+
+Dua bentuk dengan semantik yang sama:
+- nilai_asam(data)          satu kasus (form UI, analyze_medical_data)
+- nilai_asam_batch(df)      DataFrame banyak kasus sekaligus (numpy)
+
+Skor ulang seluruh arsip setelah bobot/ambang disetel:
+
+    python asam.py skor-ulang --parameter bobot_baru.json [--keluaran beda.csv]
+
+File parameter (JSON, semua key opsional, digabung ke PARAMETER_ASAM):
+{"bobot_dimensi": {"5": 1.5, "6": 1.5}, "ambang_skor": {"3.5": 2.25}, "ambang_medis": 3}
+=================================================================================
+"""
+
+import argparse
+import copy
+import csv
+import json
+import numbers
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+NAMA_DIMENSI = {
+    1: "Intoksikasi & Withdrawal",
+    2: "Kondisi Biomedis",
+    3: "Emosional/Psikiatrik",
+    4: "Kesiapan Berubah",
+    5: "Potensi Relapse",
+    6: "Lingkungan Pemulihan",
+}
+
+# Field penanda kasus sudah dinilai ASAM (wajib di form)
+FIELD_PENANDA = 'motivasi_rehabilitasi'
+
+TIDAK_DINILAI = "Tidak Dinilai"
+RAWAT_INAP = "Rawat Inap"
+RAWAT_JALAN = "Rawat Jalan"
+PENEMPATAN = (TIDAK_DINILAI, RAWAT_JALAN, RAWAT_INAP)
+
+# (level, penempatan, layanan) dari intensitas tertinggi
+LEVEL_ASAM = [
+    ("3.7", RAWAT_INAP, "Rawat inap dengan pemantauan medis intensif"),
+    ("3.5", RAWAT_INAP, "Rawat inap residensial intensitas tinggi"),
+    ("2.1", RAWAT_JALAN, "Rawat jalan intensif"),
+    ("1", RAWAT_JALAN, "Rawat jalan"),
+]
+_LEVEL = {level: (penempatan, layanan) for level, penempatan, layanan in LEVEL_ASAM}
+
+# Indikator per dimensi. Jenis pemetaan:
+#   pilihan  jawaban -> skor (jawaban kosong/tidak dikenal = 0)
+#   ambang   angka: [(nilai_min, skor), ...] dari yang terbesar
+#   bobot    daftar: jumlah bobot item (item lain = bobot_lain), dibatasi maks
+INDIKATOR_ASAM = [
+    {'field': 'tingkat_withdrawal', 'dimensi': 1,
+     'pilihan': {"Ringan": 1, "Sedang": 2, "Berat": 4}},
+    {'field': 'frekuensi_intoksikasi', 'dimensi': 1, 'ambang': [(2, 3), (1, 1)]},
+    {'field': 'jenis_penyakit', 'dimensi': 2, 'maks': 4, 'bobot_lain': 1,
+     'bobot': {"HIV/AIDS": 2, "Hepatitis": 2, "TBC": 2, "Penyakit Jantung": 2}},
+    {'field': 'tingkat_gangguan_jiwa', 'dimensi': 3,
+     'pilihan': {"Ringan": 1, "Sedang": 2, "Berat": 4}},
+    {'field': 'motivasi_rehabilitasi', 'dimensi': 4,
+     'pilihan': {"Sangat Tinggi": 0, "Tinggi": 1, "Sedang": 2, "Rendah": 3, "Sangat Rendah": 4}},
+    {'field': 'insight_masalah', 'dimensi': 4,
+     'pilihan': {"Aktif mencari bantuan": 0,
+                 "Sadar dan siap untuk berubah": 1,
+                 "Mulai menyadari tapi belum siap berubah": 2,
+                 "Tidak sadar ada masalah (denial)": 4}},
+    {'field': 'riwayat_rehabilitasi', 'dimensi': 5, 'ambang': [(3, 3), (2, 2), (1, 1)]},
+    {'field': 'hasil_rehabilitasi', 'dimensi': 5,
+     'pilihan': {"Masih dalam proses": 1,
+                 "Selesai tapi kambuh (relapse)": 3,
+                 "Drop out (tidak selesai)": 3}},
+    {'field': 'trigger_utama', 'dimensi': 5, 'maks': 3, 'bobot_lain': 1, 'bobot': {}},
+    {'field': 'dukungan_keluarga', 'dimensi': 6,
+     'pilihan': {"Sangat Mendukung": 0, "Mendukung": 1, "Netral": 2,
+                 "Tidak Mendukung": 3, "Sangat Tidak Mendukung": 4}},
+    {'field': 'kondisi_rumah', 'dimensi': 6,
+     'pilihan': {"Kondusif untuk pemulihan": 0,
+                 "Cukup kondusif": 1,
+                 "Tidak kondusif (ada pengguna lain)": 3,
+                 "Sangat tidak kondusif (lingkungan peredaran)": 4}},
+    {'field': 'status_pekerjaan', 'dimensi': 6,
+     'pilihan': {"Bekerja/Bersekolah aktif": 0,
+                 "Tidak bekerja/sekolah tapi produktif": 1,
+                 "Tidak bekerja/sekolah tidak produktif": 2,
+                 "Kehilangan pekerjaan/DO karena narkotika": 3}},
+    {'field': 'kemampuan_ekonomi', 'dimensi': 6,
+     'pilihan': {"Mampu mandiri": 0,
+                 "Mampu dengan bantuan keluarga": 1,
+                 "Tidak mampu (butuh bantuan pemerintah)": 2}},
+]
+FIELD_ASAM = tuple(dict.fromkeys(ind['field'] for ind in INDIKATOR_ASAM))
+
+PARAMETER_ASAM = {
+    'bobot_dimensi': {1: 1.0, 2: 1.0, 3: 1.0, 4: 1.0, 5: 1.0, 6: 1.0},
+    'ambang_medis': 3,
+    'ambang_skor': {'3.5': 2.0, '2.1': 1.0},
+}
+
+# Pembulatan skor gabungan sebelum dibandingkan dengan ambang, agar bentuk
+# skalar dan numpy (urutan penjumlahan berbeda) selalu memberi level yang sama
+_DESIMAL = 6
+
+
+def _dinilai(penanda):
+    return isinstance(penanda, str) and penanda != ""
+
+
+def muat_parameter(path=None):
+    """PARAMETER_ASAM digabung dengan isi file JSON (bila ada)"""
+    parameter = copy.deepcopy(PARAMETER_ASAM)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            spesifikasi = json.load(f)
+        for dimensi, bobot in spesifikasi.get('bobot_dimensi', {}).items():
+            if int(dimensi) not in NAMA_DIMENSI:
+                raise ValueError(f"Dimensi ASAM tidak dikenal: {dimensi}")
+            parameter['bobot_dimensi'][int(dimensi)] = float(bobot)
+        for level, ambang in spesifikasi.get('ambang_skor', {}).items():
+            if level not in parameter['ambang_skor']:
+                raise ValueError(f"Ambang skor ASAM tidak dikenal: {level}")
+            parameter['ambang_skor'][level] = float(ambang)
+        if 'ambang_medis' in spesifikasi:
+            parameter['ambang_medis'] = spesifikasi['ambang_medis']
+    if sum(parameter['bobot_dimensi'].values()) <= 0:
+        raise ValueError("Total bobot dimensi ASAM harus > 0")
+    return parameter
+
+
+# =============================================================================
+# SATU KASUS
+# =============================================================================
+def _skor_indikator(ind, nilai):
+    if 'pilihan' in ind:
+        return ind['pilihan'].get(nilai, 0) if isinstance(nilai, str) else 0
+    if 'ambang' in ind:
+        if isinstance(nilai, bool) or not isinstance(nilai, numbers.Real):
+            return 0
+        for batas, skor in ind['ambang']:
+            if nilai >= batas:
+                return skor
+        return 0
+    if not isinstance(nilai, (list, tuple)):
+        return 0
+    return min(ind['maks'], sum(ind['bobot'].get(item, ind['bobot_lain']) for item in nilai))
+
+
+def _level(dimensi, skor, parameter):
+    medis = parameter['ambang_medis']
+    if max(dimensi[0], dimensi[1], dimensi[2]) >= medis:
+        return "3.7"
+    if skor >= parameter['ambang_skor']['3.5'] or (dimensi[4] >= medis and dimensi[5] >= medis):
+        return "3.5"
+    if skor >= parameter['ambang_skor']['2.1']:
+        return "2.1"
+    return "1"
+
+
+def nilai_asam(data, parameter=None):
+    """
+    Penilaian ASAM satu kasus: dict {dimensi: [skor D1..D6], skor, level,
+    penempatan, layanan}, atau None bila kasus tidak memuat jawaban ASAM.
+    """
+    if not _dinilai(data.get(FIELD_PENANDA)):
+        return None
+    parameter = parameter or PARAMETER_ASAM
+    dimensi = [0] * len(NAMA_DIMENSI)
+    for ind in INDIKATOR_ASAM:
+        i = ind['dimensi'] - 1
+        dimensi[i] = max(dimensi[i], _skor_indikator(ind, data.get(ind['field'])))
+    bobot = parameter['bobot_dimensi']
+    skor = round(sum(bobot[d] * dimensi[d - 1] for d in NAMA_DIMENSI) / sum(bobot.values()), _DESIMAL)
+    level = _level(dimensi, skor, parameter)
+    penempatan, layanan = _LEVEL[level]
+    return {'dimensi': dimensi, 'skor': round(skor, 2), 'level': level,
+            'penempatan': penempatan, 'layanan': layanan}
+
+
+def penempatan_asam(asam):
+    """Penempatan untuk tabel keputusan rekomendasi (hasil nilai_asam atau None)"""
+    return asam['penempatan'] if asam else TIDAK_DINILAI
+
+
+# =============================================================================
+# BATCH (NUMPY)
+# =============================================================================
+def _skor_indikator_seri(ind, seri):
+    if 'pilihan' in ind:
+        return seri.map(ind['pilihan']).fillna(0).to_numpy(dtype=np.int64)
+    if 'ambang' in ind:
+        angka = pd.to_numeric(seri.where(~seri.map(lambda v: isinstance(v, bool))), errors="coerce")
+        angka = angka.fillna(-np.inf).to_numpy(dtype=np.float64)
+        return np.select([angka >= batas for batas, _ in ind['ambang']],
+                         [skor for _, skor in ind['ambang']], 0).astype(np.int64)
+    bobot, lain = ind['bobot'], ind['bobot_lain']
+    jumlah = seri.map(lambda v: sum(bobot.get(item, lain) for item in v)
+                      if isinstance(v, (list, tuple)) else 0)
+    return np.minimum(jumlah.to_numpy(dtype=np.int64), ind['maks'])
+
+
+def nilai_asam_batch(df, parameter=None):
+    """
+    Penilaian ASAM semua baris df (kolom field data_lengkap): DataFrame dengan
+    indeks df, kolom d1..d6, skor, level, penempatan. Baris tanpa jawaban ASAM:
+    skor/level kosong, penempatan TIDAK_DINILAI.
+    """
+    parameter = parameter or PARAMETER_ASAM
+    n = len(df)
+    dimensi = np.zeros((n, len(NAMA_DIMENSI)), dtype=np.int64)
+    kosong = pd.Series([None] * n, index=df.index, dtype=object)
+    for ind in INDIKATOR_ASAM:
+        seri = df[ind['field']] if ind['field'] in df else kosong
+        i = ind['dimensi'] - 1
+        np.maximum(dimensi[:, i], _skor_indikator_seri(ind, seri), out=dimensi[:, i])
+
+    bobot = np.array([parameter['bobot_dimensi'][d] for d in NAMA_DIMENSI], dtype=np.float64)
+    skor = np.round(dimensi @ bobot / bobot.sum(), _DESIMAL)
+    medis = parameter['ambang_medis']
+    level = np.select(
+        [dimensi[:, :3].max(axis=1) >= medis,
+         (skor >= parameter['ambang_skor']['3.5']) | ((dimensi[:, 4] >= medis) & (dimensi[:, 5] >= medis)),
+         skor >= parameter['ambang_skor']['2.1']],
+        ["3.7", "3.5", "2.1"], "1"
+    ).astype(object)
+
+    penanda = df[FIELD_PENANDA] if FIELD_PENANDA in df else kosong
+    dinilai = penanda.map(_dinilai).to_numpy(dtype=bool)
+    level[~dinilai] = None
+    hasil = pd.DataFrame(dimensi, index=df.index, columns=[f"d{d}" for d in NAMA_DIMENSI])
+    hasil['skor'] = np.where(dinilai, np.round(skor, 2), np.nan)
+    hasil['level'] = level
+    penempatan = {lvl: p for lvl, (p, _) in _LEVEL.items()}
+    hasil['penempatan'] = [penempatan.get(lvl, TIDAK_DINILAI) for lvl in level]
+    return hasil
+
+
+# =============================================================================
+# SKOR ULANG ARSIP
+# =============================================================================
+def skor_ulang_arsip(parameter, path_arsip=None, batch=20_000, berubah=None):
+    """
+    Nilai ulang semua kasus arsip yang memuat jawaban ASAM dengan `parameter`,
+    batch demi batch (DataFrame per `batch` kasus). berubah: callable(kasus_id,
+    level_lama, level_baru) untuk kasus yang levelnya berubah.
+    Kembalikan Counter {(level_lama, level_baru): jumlah}.
+    """
+    from arsip import Arsip
+
+    perpindahan = Counter()
+    baris, lama = [], []
+
+    def _proses():
+        df = pd.DataFrame(baris, columns=('kasus_id',) + FIELD_ASAM).set_index('kasus_id')
+        for kasus_id, level_lama, level_baru in zip(df.index, lama, nilai_asam_batch(df, parameter)['level']):
+            perpindahan[(level_lama, level_baru)] += 1
+            if berubah and level_lama != level_baru:
+                berubah(kasus_id, level_lama, level_baru)
+        baris.clear()
+        lama.clear()
+
+    arsip = Arsip(path_arsip)
+    try:
+        for hasil in arsip.iter_kasus(batch=1000):
+            data = hasil['data']
+            if not _dinilai(data.get(FIELD_PENANDA)):
+                continue
+            baris.append((hasil['kasus_id'],) + tuple(data.get(f) for f in FIELD_ASAM))
+            lama.append((hasil['medical'].get('asam') or {}).get('level'))
+            if len(baris) >= batch:
+                _proses()
+        if baris:
+            _proses()
+    finally:
+        arsip.close()
+    return perpindahan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Penilaian ASAM 6 dimensi")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    p_ulang = sub.add_parser("skor-ulang", help="nilai ulang arsip dengan bobot/ambang lain")
+    p_ulang.add_argument("--parameter", default=None, help="file JSON bobot/ambang (default: aktif)")
+    p_ulang.add_argument("--arsip", default=None, help="path arsip SQLite")
+    p_ulang.add_argument("--keluaran", default=None, help="CSV kasus yang levelnya berubah")
+    args = parser.parse_args()
+
+    parameter = muat_parameter(args.parameter)
+    mulai = time.perf_counter()
+    if args.keluaran:
+        with open(args.keluaran, "w", newline="", encoding="utf-8") as f:
+            penulis = csv.writer(f)
+            penulis.writerow(['kasus_id', 'level_lama', 'level_baru'])
+            perpindahan = skor_ulang_arsip(parameter, args.arsip,
+                                           berubah=lambda *baris: penulis.writerow(baris))
+    else:
+        perpindahan = skor_ulang_arsip(parameter, args.arsip)
+
+    total = sum(perpindahan.values())
+    berubah = {k: n for k, n in perpindahan.items() if k[0] != k[1]}
+    print(f"{total} kasus dinilai ulang dalam {time.perf_counter() - mulai:.1f} s, "
+          f"{sum(berubah.values())} berubah level", file=sys.stderr)
+    for (lama, baru), n in sorted(berubah.items(), key=lambda x: -x[1]):
+        print(f"  {lama or '-':>4} -> {baru:<4} {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""
+=================================================================================
+LOG AUDIT TAT - APPEND-ONLY, BERANTAI HASH
+=================================================================================
+Mencatat siapa menghasilkan rekomendasi/surat apa dan kapan. Satu entri = satu
+baris JSON di DATA_DIR/audit.log; field pertama "prev" berisi SHA-256 baris
+sebelumnya (baris pertama: 64 x "0"), sehingga mengubah, menyisipkan atau
+menghapus satu baris memutus rantai mulai baris itu.
+
+- Group commit: catat() hanya memasukkan entri ke antrean; satu thread penulis
+  menulis semua entri yang terkumpul dengan satu write + satu fsync. Pemanggil
+  yang menunggu (tunggu=True) berbagi fsync yang sama.
+- Beberapa proses (app + worker antrian) aman menulis ke file yang sama: tiap
+  batch ditulis di bawah flock dan ujung rantai dibaca ulang bila file berubah.
+- File kepala (audit.log.kepala) menyimpan nomor & hash entri terakhir yang
+  ditulis, di-HMAC dengan kunci TTE, untuk mendeteksi pemotongan ekor log.
+- Verifikasi cepat tanpa parse JSON (hanya SHA-256 per baris), paralel per
+  segmen file:
+
+    python audit.py verifikasi [--proses N]
+    python audit.py tampil [--ekor 20]
+
+Entri tidak memuat identitas tersangka (nama/NIK) karena log tidak dapat
+dihapus; cukup kasus_id, nomor surat dan hash dokumen.
+=================================================================================
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: hanya aman untuk satu proses penulis
+    fcntl = None
+
+from arsip import DATA_DIR
+
+AUDIT_PATH = os.environ.get("TAT_AUDIT_FILE", os.path.join(DATA_DIR, "audit.log"))
+
+HASH_AWAL = "0" * 64
+_PREFIX = b'{"prev":"'
+_AWAL_HASH = len(_PREFIX)
+_AKHIR_HASH = _AWAL_HASH + 64
+_FIELD_SISTEM = ("prev", "no")
+_JEDA_ULANG = 1.0  # detik sebelum batch yang gagal ditulis dicoba lagi
+_UKURAN_BLOK_VERIFIKASI = 8 * 1024 * 1024
+
+
+class AuditGagal(RuntimeError):
+    """Entri audit belum tersimpan (mis. disk penuh); pemanggil tidak boleh melanjutkan diam-diam"""
+
+
+def _mac_kepala(kunci, no, hash_hex):
+    return hmac.new(kunci, f"TAT-AUDIT\x00{no}:{hash_hex}".encode(), hashlib.sha256).hexdigest()
+
+
+def _baca_ujung(fd, ukuran):
+    """
+    (hash baris terakhir, nomor entri terakhir, ukuran valid). Ekor tanpa newline
+    adalah sisa write yang gagal dan dipotong (hanya dipanggil di bawah flock).
+    """
+    blok = 4096
+    while ukuran > 0:
+        awal = max(0, ukuran - blok)
+        ekor = os.pread(fd, ukuran - awal, awal)
+        if not ekor.endswith(b"\n"):
+            nl = ekor.rfind(b"\n")
+            if nl < 0 and awal > 0:
+                blok *= 2
+                continue
+            ukuran = awal + nl + 1
+            os.ftruncate(fd, ukuran)
+            continue
+        nl = ekor.rfind(b"\n", 0, len(ekor) - 1)
+        if nl < 0 and awal > 0:
+            blok *= 2
+            continue
+        baris = ekor[nl + 1:-1]
+        return hashlib.sha256(baris).hexdigest(), json.loads(baris)["no"], ukuran
+    return HASH_AWAL, 0, 0
+
+
+# =============================================================================
+# PENULIS (GROUP COMMIT)
+# =============================================================================
+class LogAudit:
+    def __init__(self, path=None, kunci=None):
+        self.path = path or AUDIT_PATH
+        if kunci is None:
+            import tanda_tangan
+            kunci = tanda_tangan.muat_kunci()
+        self._kunci = kunci
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o600)
+        self._hash = HASH_AWAL
+        self._no = 0
+        self._ukuran = -1  # ukuran file setelah batch terakhir kita; -1 = baca ujung dulu
+
+        self._kondisi = threading.Condition()
+        self._antre = []
+        self._tiket = 0        # tiket entri terakhir yang diterima
+        self._tiket_tulis = 0  # tiket entri terakhir yang sudah fsync
+        self._galat = None
+        self._berhenti = False
+        self._thread = threading.Thread(target=self._loop, name="audit-penulis", daemon=True)
+        self._thread.start()
+
+    def catat(self, aksi, pengguna="", tunggu=True, **detail):
+        """
+        Tambahkan entri audit. tunggu=True: kembali setelah entri tersimpan di disk
+        (AuditGagal bila penulisan sedang gagal). Mengembalikan nomor tiket lokal.
+        """
+        for field in _FIELD_SISTEM:
+            if field in detail:
+                raise ValueError(f"field '{field}' dicadangkan untuk rantai audit")
+        entri = {
+            'waktu': datetime.now().astimezone().isoformat(timespec="milliseconds"),
+            'pengguna': pengguna,
+            'aksi': aksi,
+            **detail,
+        }
+        with self._kondisi:
+            if self._berhenti:
+                raise AuditGagal("log audit sudah ditutup")
+            self._antre.append(entri)
+            self._tiket += 1
+            tiket = self._tiket
+            self._kondisi.notify_all()
+            if tunggu:
+                self._tunggu(tiket)
+        return tiket
+
+    def _tunggu(self, tiket):
+        while self._tiket_tulis < tiket:
+            if self._galat is not None:
+                raise AuditGagal(f"entri audit belum tersimpan: {self._galat}")
+            self._kondisi.wait()
+
+    def flush(self):
+        """Tunggu semua entri yang sudah diterima tersimpan"""
+        with self._kondisi:
+            self._tunggu(self._tiket)
+
+    def close(self):
+        with self._kondisi:
+            self._berhenti = True
+            self._kondisi.notify_all()
+        self._thread.join()
+        os.close(self._fd)
+
+    def _loop(self):
+        while True:
+            with self._kondisi:
+                while not self._antre and not self._berhenti:
+                    self._kondisi.wait()
+                if not self._antre:
+                    return
+                # entri yang datang selama fsync berjalan masuk batch berikutnya
+                batch, self._antre = self._antre, []
+            try:
+                self._tulis(batch)
+            except OSError as e:
+                with self._kondisi:
+                    self._antre[:0] = batch
+                    self._galat = e
+                    self._kondisi.notify_all()
+                    berhenti = self._berhenti
+                if berhenti:
+                    return
+                time.sleep(_JEDA_ULANG)
+                continue
+            with self._kondisi:
+                self._tiket_tulis += len(batch)
+                self._galat = None
+                self._kondisi.notify_all()
+
+    def _tulis(self, batch):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            ukuran = os.fstat(self._fd).st_size
+            if ukuran != self._ukuran:  # proses lain menulis, atau batch sebelumnya gagal
+                self._hash, self._no, ukuran = _baca_ujung(self._fd, ukuran)
+
+            hash_akhir, no = self._hash, self._no
+            baris = []
+            for entri in batch:
+                no += 1
+                rekaman = {'prev': hash_akhir, 'no': no}
+                rekaman.update(entri)
+                b = json.dumps(rekaman, ensure_ascii=False, separators=(",", ":"),
+                               default=str).encode("utf-8")
+                hash_akhir = hashlib.sha256(b).hexdigest()
+                baris.append(b)
+            data = b"\n".join(baris) + b"\n"
+
+            self._ukuran = -1  # bila write/fsync gagal, ujung dibaca (dan dirapikan) ulang
+            tertulis = 0
+            while tertulis < len(data):
+                tertulis += os.write(self._fd, data[tertulis:])
+            os.fsync(self._fd)
+            self._hash, self._no, self._ukuran = hash_akhir, no, ukuran + len(data)
+            self._tulis_kepala()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _tulis_kepala(self):
+        # tanpa fsync: kepala boleh tertinggal dari log, yang penting tidak mendahuluinya
+        kepala = {'no': self._no, 'hash': self._hash,
+                  'mac': _mac_kepala(self._kunci, self._no, self._hash)}
+        tmp = f"{self.path}.kepala.tmp"
+        with open(tmp, "w") as f:
+            json.dump(kepala, f)
+        os.replace(tmp, f"{self.path}.kepala")
+
+
+# =============================================================================
+# VERIFIKASI
+# =============================================================================
+def _periksa_segmen(tugas):
+    """
+    Periksa rantai di dalam satu segmen [awal, akhir) file. Mengembalikan
+    (prev baris pertama, hash baris terakhir, jumlah baris, indeks baris yang
+    prev-nya = hash_cari atau None, galat lokal (indeks, alasan) atau None).
+    """
+    path, awal, akhir, hash_cari = tugas
+    hash_cari = hash_cari.encode() if hash_cari else None
+    sha256 = hashlib.sha256
+    prev_pertama = None
+    sebelum = None
+    cocok = None
+    i = 0
+    sisa = b""
+    with open(path, "rb") as f:
+        f.seek(awal)
+        posisi = awal
+        while posisi < akhir:
+            blok = f.read(min(_UKURAN_BLOK_VERIFIKASI, akhir - posisi))
+            if not blok:
+                break
+            posisi += len(blok)
+            daftar_baris = (sisa + blok).split(b"\n")
+            sisa = daftar_baris.pop()
+            for baris in daftar_baris:
+                if baris[:_AWAL_HASH] != _PREFIX:
+                    return prev_pertama, sebelum, i, cocok, (i, "format baris tidak dikenal")
+                prev = baris[_AWAL_HASH:_AKHIR_HASH]
+                if sebelum is None:
+                    prev_pertama = prev
+                elif prev != sebelum:
+                    return prev_pertama, sebelum, i, cocok, (i, "hash sebelumnya tidak cocok")
+                if cocok is None and prev == hash_cari:
+                    cocok = i
+                sebelum = sha256(baris).hexdigest().encode()
+                i += 1
+    if sisa:
+        return prev_pertama, sebelum, i, cocok, (i, "baris terakhir tidak lengkap")
+    return prev_pertama, sebelum, i, cocok, None
+
+
+def _batas_segmen(path, ukuran, jumlah):
+    """Potong file menjadi `jumlah` segmen yang berakhir tepat di newline"""
+    batas = [0]
+    with open(path, "rb") as f:
+        for k in range(1, jumlah):
+            f.seek(max(ukuran * k // jumlah, batas[-1]))
+            f.readline()
+            batas.append(min(f.tell(), ukuran))
+    batas.append(ukuran)
+    return [(a, b) for a, b in zip(batas, batas[1:]) if b > a]
+
+
+def verifikasi(path=None, proses=None, kunci=None):
+    """
+    Verifikasi integritas rantai + kepala. Mengembalikan dict {'utuh', 'jumlah',
+    'hash_akhir', 'galat'}; galat berisi nomor baris (1-based) dan alasan.
+    """
+    path = path or AUDIT_PATH
+    kepala = None
+    if os.path.exists(f"{path}.kepala"):
+        with open(f"{path}.kepala") as f:
+            kepala = json.load(f)
+    if kunci is None and kepala is not None:
+        import tanda_tangan
+        kunci = tanda_tangan.muat_kunci()
+
+    ukuran = os.path.getsize(path) if os.path.exists(path) else 0
+    galat = []
+    if ukuran == 0:
+        segmen_hasil = []
+    else:
+        proses = proses or os.cpu_count() or 1
+        jumlah = max(1, min(proses, ukuran // (4 * 1024 * 1024) + 1))
+        tugas = [(path, a, b, kepala['hash'] if kepala else None)
+                 for a, b in _batas_segmen(path, ukuran, jumlah)]
+        if len(tugas) == 1:
+            segmen_hasil = [_periksa_segmen(tugas[0])]
+        else:
+            with Pool(len(tugas)) as pool:
+                segmen_hasil = pool.map(_periksa_segmen, tugas)
+
+    # sambungkan segmen: prev baris pertama tiap segmen = hash baris terakhir segmen sebelumnya
+    sebelum = HASH_AWAL.encode()
+    total = 0
+    no_cocok = None
+    for prev_pertama, hash_terakhir, n, cocok, galat_lokal in segmen_hasil:
+        if n and prev_pertama != sebelum:
+            galat.append((total + 1, "hash sebelumnya tidak cocok"))
+            break
+        if cocok is not None and no_cocok is None:
+            no_cocok = total + cocok  # entri sebelum baris yang menunjuk hash kepala
+        if galat_lokal is not None:
+            galat.append((total + galat_lokal[0] + 1, galat_lokal[1]))
+            break
+        total += n
+        sebelum = hash_terakhir or sebelum
+    hash_akhir = sebelum.decode()
+
+    if not galat and kepala is not None:
+        if not hmac.compare_digest(kepala['mac'], _mac_kepala(kunci, kepala['no'], kepala['hash'])):
+            galat.append((None, "MAC file kepala tidak valid"))
+        elif kepala['hash'] == hash_akhir:
+            if kepala['no'] != total:
+                galat.append((None, f"kepala mencatat {kepala['no']} entri, log berisi {total}"))
+        elif no_cocok != kepala['no']:
+            galat.append((None, f"entri #{kepala['no']} dari kepala tidak ada di log (log terpotong?)"))
+
+    return {'utuh': not galat, 'jumlah': total, 'hash_akhir': hash_akhir, 'galat': galat}
+
+
+def iter_entri(path=None):
+    """Iterasi entri log (dict), dari yang terlama"""
+    with open(path or AUDIT_PATH, "rb") as f:
+        for baris in f:
+            yield json.loads(baris)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Log audit TAT (rantai hash)")
+    parser.add_argument("--log", default=AUDIT_PATH, help="path file log audit")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    p_ver = sub.add_parser("verifikasi", help="periksa integritas rantai & kepala")
+    p_ver.add_argument("--proses", type=int, default=None, help="jumlah proses paralel")
+    p_tampil = sub.add_parser("tampil", help="tampilkan entri terakhir")
+    p_tampil.add_argument("--ekor", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.perintah == "verifikasi":
+        mulai = time.perf_counter()
+        hasil = verifikasi(args.log, args.proses)
+        durasi = time.perf_counter() - mulai
+        print(f"{hasil['jumlah']} entri diperiksa dalam {durasi:.2f} s, hash akhir {hasil['hash_akhir']}")
+        for no, alasan in hasil['galat']:
+            print(f"RUSAK{f' di baris {no}' if no else ''}: {alasan}", file=sys.stderr)
+        sys.exit(0 if hasil['utuh'] else 1)
+    else:
+        from collections import deque
+        for entri in deque(iter_entri(args.log), maxlen=args.ekor):
+            entri.pop('prev')
+            print(json.dumps(entri, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
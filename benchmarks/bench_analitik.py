@@ -0,0 +1,64 @@
+"""
+Benchmark snapshot analitik: waktu muat satu tahun kasus dari Parquet ke pandas
+(semua kolom vs kolom terpilih) dan ukuran snapshot per kasus.
+
+    python benchmarks/bench_analitik.py [kasus_per_tahun]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from contoh_kasus import buat_hasil
+import ekspor_analitik
+
+
+def _isi_snapshot(direktori, n, tahun):
+    """n kasus tersebar sepanjang `tahun` (+ tahun sebelumnya sebagai partisi yang dipangkas)"""
+    rng = random.Random(tahun)
+    contoh = [ekspor_analitik.baris_analitik({**h, 'kasus_id': 0, 'timestamp': None})
+              for h in buat_hasil(500)]
+    awal = datetime(tahun - 1, 1, 1)
+    baris = []
+    for kasus_id in range(1, 2 * n + 1):
+        b = dict(rng.choice(contoh))
+        b['dibuat'] = awal + timedelta(seconds=rng.randrange(2 * 365 * 86400))
+        b['kasus_id'] = kasus_id
+        b['tahun'], b['bulan'] = b['dibuat'].year, b['dibuat'].month
+        baris.append(b)
+        if len(baris) >= ekspor_analitik.BATCH_EKSPOR:
+            ekspor_analitik._tulis_batch(baris, direktori)
+            baris = []
+    if baris:
+        ekspor_analitik._tulis_batch(baris, direktori)
+
+
+def _ukur(label, fn, ulang=3):
+    terbaik = None
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        df = fn()
+        durasi = time.perf_counter() - mulai
+        terbaik = durasi if terbaik is None else min(terbaik, durasi)
+    print(f"{label:<40} {len(df):>9} baris {terbaik * 1000:>9.0f} ms")
+
+
+def main(n=100_000):
+    tahun = datetime.now().year
+    with tempfile.TemporaryDirectory() as tmp:
+        _isi_snapshot(tmp, n, tahun)
+        _ukur("file bagian, semua kolom", lambda: ekspor_analitik.baca(tahun=tahun, direktori=tmp))
+        ekspor_analitik.padatkan(tmp)
+        ukuran = sum(os.path.getsize(os.path.join(a, f)) for a, _, fs in os.walk(tmp)
+                     for f in fs if f.endswith(".parquet"))
+        print(f"snapshot {2 * n} kasus: {ukuran / 1024 / 1024:.1f} MiB ({ukuran / (2 * n):.0f} B/kasus)")
+        _ukur("padat, semua kolom", lambda: ekspor_analitik.baca(tahun=tahun, direktori=tmp))
+        _ukur("padat, 3 kolom", lambda: ekspor_analitik.baca(
+            ['jenis_narkotika_utama', 'instansi', 'rekomendasi'], tahun=tahun, direktori=tmp))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
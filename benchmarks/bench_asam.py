@@ -0,0 +1,58 @@
+"""
+Benchmark penilaian ASAM: nilai_asam per kasus vs nilai_asam_batch (numpy)
+untuk skor ulang arsip setelah bobot disetel.
+
+    python benchmarks/bench_asam.py [jumlah_kasus]
+"""
+
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asam  # noqa: E402
+
+
+def _jawaban(rng):
+    data = {}
+    for ind in asam.INDIKATOR_ASAM:
+        if 'pilihan' in ind:
+            data[ind['field']] = rng.choice([""] + list(ind['pilihan']))
+        elif 'ambang' in ind:
+            data[ind['field']] = rng.choice([0, 0, 0, 1, 2, 3])
+        else:
+            pilihan = list(ind['bobot']) + ["Lainnya", "Stress/Tekanan", "Teman Pengguna"]
+            data[ind['field']] = rng.sample(pilihan, k=rng.randint(0, 3))
+    if rng.random() < 0.1:
+        data[asam.FIELD_PENANDA] = ""
+    return data
+
+
+def main(n=200_000):
+    rng = random.Random(7)
+    daftar = [_jawaban(rng) for _ in range(n)]
+    parameter = asam.muat_parameter()
+    parameter['bobot_dimensi'][5] = 1.5
+
+    mulai = time.perf_counter()
+    skalar = [asam.nilai_asam(d, parameter) for d in daftar]
+    durasi = time.perf_counter() - mulai
+    print(f"per kasus : {n} kasus {durasi:6.2f} s ({n / durasi:>10.0f} kasus/s)")
+
+    df = pd.DataFrame(daftar)
+    mulai = time.perf_counter()
+    batch = asam.nilai_asam_batch(df, parameter)
+    durasi = time.perf_counter() - mulai
+    print(f"batch     : {n} kasus {durasi:6.2f} s ({n / durasi:>10.0f} kasus/s)")
+
+    level_skalar = [h['level'] if h else None for h in skalar]
+    assert level_skalar == batch['level'].tolist()
+    print(batch['level'].value_counts(dropna=False).to_string())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
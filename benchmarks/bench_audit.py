@@ -0,0 +1,71 @@
+"""
+Benchmark log audit: latensi catat() (tunggu sampai fsync) dengan beberapa
+thread bersamaan, dan kecepatan verifikasi rantai.
+
+    python benchmarks/bench_audit.py [jumlah_entri_verifikasi] [thread]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audit  # noqa: E402
+
+
+def _latensi(path, thread, per_thread=200):
+    log = audit.LogAudit(path, kunci=b"\x00" * 32)
+    latensi = []
+
+    def kerja(n):
+        for i in range(per_thread):
+            mulai = time.perf_counter()
+            log.catat('asesmen', pengguna=f"sesi-{n}", kasus_id=i, nomor_surat=f"B/{i}/X/2025")
+            latensi.append(time.perf_counter() - mulai)
+
+    mulai = time.perf_counter()
+    pekerja = [threading.Thread(target=kerja, args=(n,)) for n in range(thread)]
+    for p in pekerja:
+        p.start()
+    for p in pekerja:
+        p.join()
+    durasi = time.perf_counter() - mulai
+    log.close()
+
+    urut = sorted(latensi)
+    print(f"catat {thread:>2} thread: {len(latensi) / durasi:8.0f} entri/s, "
+          f"p50 {1000 * statistics.median(urut):.2f} ms, p99 {1000 * urut[int(0.99 * (len(urut) - 1))]:.2f} ms")
+
+
+def _verifikasi(path, n):
+    log = audit.LogAudit(path, kunci=b"\x00" * 32)
+    for i in range(n):
+        log.catat('tanda_tangan_surat', tunggu=False, kasus_id=i, sha256="ab" * 32)
+    log.close()
+
+    ukuran = os.path.getsize(path) / 1024 / 1024
+    for proses in sorted({1, os.cpu_count() or 1}):
+        mulai = time.perf_counter()
+        hasil = audit.verifikasi(path, proses=proses, kunci=b"\x00" * 32)
+        durasi = time.perf_counter() - mulai
+        assert hasil['utuh'] and hasil['jumlah'] == n, hasil['galat']
+        print(f"verifikasi {n} entri ({ukuran:.0f} MiB), {proses} proses: {durasi:.2f} s "
+              f"({n / durasi / 1e6:.2f} juta entri/s)")
+
+
+def main(n=1_000_000, thread_maks=16):
+    with tempfile.TemporaryDirectory() as tmp:
+        thread = 1
+        while thread <= thread_maks:
+            _latensi(os.path.join(tmp, f"latensi_{thread}.log"), thread)
+            thread *= 2
+        _verifikasi(os.path.join(tmp, "verifikasi.log"), n)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 16)
@@ -0,0 +1,71 @@
+"""
+Benchmark overhead enkripsi at-rest: throughput stream (MB/s) dan waktu
+simpan/baca arsip dengan vs tanpa enkripsi record.
+
+    python benchmarks/bench_enkripsi.py [jumlah_kasus] [ukuran_stream_mib]
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+from contoh_kasus import buat_hasil
+import enkripsi
+from arsip import Arsip
+
+
+def _stream(ukuran_mib):
+    data = os.urandom(1024 * 1024)
+    n = ukuran_mib
+
+    mulai = time.perf_counter()
+    keluaran = io.BytesIO()
+    with enkripsi.PenulisTerenkripsi(keluaran) as w:
+        for _ in range(n):
+            w.write(data)
+    t_enk = time.perf_counter() - mulai
+
+    keluaran.seek(0)
+    mulai = time.perf_counter()
+    total = sum(len(c) for c in enkripsi.iter_dekripsi(keluaran))
+    t_dek = time.perf_counter() - mulai
+    assert total == n * len(data)
+
+    ekspansi = 100.0 * (len(keluaran.getvalue()) / total - 1)
+    print(f"stream {n} MiB: enkripsi {n / t_enk:8.1f} MiB/s, dekripsi {n / t_dek:8.1f} MiB/s, "
+          f"ekspansi {ekspansi:.3f}%")
+
+
+def _arsip(daftar, aktif):
+    enkripsi.ENKRIPSI_AKTIF = aktif
+    with tempfile.TemporaryDirectory() as tmp:
+        arsip = Arsip(os.path.join(tmp, "arsip.sqlite3"))
+        mulai = time.perf_counter()
+        for hasil in daftar:
+            arsip.simpan_kasus(hasil)
+        t_simpan = time.perf_counter() - mulai
+
+        mulai = time.perf_counter()
+        n = sum(1 for _ in arsip.iter_kasus(batch=1000))
+        t_baca = time.perf_counter() - mulai
+        arsip.close()
+    return t_simpan, t_baca, n
+
+
+def main(n=2000, ukuran_mib=64):
+    _stream(ukuran_mib)
+
+    daftar = buat_hasil(n)
+    enkripsi.muat_cincin()  # muat kunci di luar pengukuran
+    polos = _arsip(daftar, False)
+    sandi = _arsip(daftar, True)
+    for label, p, s in (("simpan", polos[0], sandi[0]), ("baca", polos[1], sandi[1])):
+        print(f"arsip {label:<6} {n} kasus: polos {p * 1e6 / n:7.1f} us/kasus, "
+              f"terenkripsi {s * 1e6 / n:7.1f} us/kasus, overhead {100.0 * (s / p - 1):+.1f}%")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 64)
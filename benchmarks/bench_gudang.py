@@ -0,0 +1,49 @@
+"""
+Benchmark gudang blob: simpan (dengan dedup render ulang identik) dan baca
+kembali lewat mmap (buka) vs salinan bytes (baca), pada blob seukuran surat.
+
+    TAT_DATA_DIR=/tmp/tat_bench python benchmarks/bench_gudang.py [jumlah_surat]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gudang  # noqa: E402
+
+
+def main(n=2000, ukuran=60 * 1024):
+    g = gudang.GudangBlob(tempfile.mkdtemp(prefix="bench_gudang_"))
+    unik = [os.urandom(ukuran) for _ in range(n // 2)]
+
+    mulai = time.perf_counter()
+    daftar_sha = [g.simpan(unik[i % len(unik)], gudang.ref_surat(i, 'pdf')) for i in range(n)]
+    durasi = time.perf_counter() - mulai
+    stat = g.statistik()
+    print(f"simpan    : {n} surat {durasi:6.2f} s ({n / durasi:>8.0f} surat/s), "
+          f"{stat['blob']} blob unik, {stat['bytes_disk'] / 1024 / 1024:.1f} MB di disk")
+
+    mulai = time.perf_counter()
+    total = 0
+    for sha in daftar_sha:
+        with g.buka(sha) as isi:
+            total += len(isi)
+    durasi = time.perf_counter() - mulai
+    print(f"buka      : {n} surat {durasi:6.2f} s ({n / durasi:>8.0f} surat/s)")
+
+    mulai = time.perf_counter()
+    total = sum(len(g.baca(sha)) for sha in daftar_sha)
+    durasi = time.perf_counter() - mulai
+    print(f"baca      : {n} surat {durasi:6.2f} s ({n / durasi:>8.0f} surat/s), {total / 1024 / 1024:.0f} MB")
+
+    for i in range(n):
+        g.lepas(gudang.ref_surat(i, 'pdf'))
+    print(f"gc        : {g.gc()[0]} blob dihapus")
+    g.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,50 @@
+"""
+Benchmark ukuran & waktu render PDF: output standar (dengan stream ASCII85
+seperti default ReportLab, dan tanpa) vs mode arsip (per surat dan bundel
+multi-surat).
+
+    python benchmarks/bench_pdf_arsip.py [jumlah_surat]
+"""
+
+import sys
+import time
+
+from reportlab import rl_config
+
+from contoh_kasus import buat_hasil
+from app import generate_pdf_document, generate_pdf_bundle
+
+
+def _ukur(label, fn, n):
+    mulai = time.perf_counter()
+    total_bytes = fn()
+    durasi = time.perf_counter() - mulai
+    print(f"{label:<32} {total_bytes / 1024:>10.1f} KiB {total_bytes / 1024 / n:>10.1f} KiB/surat "
+          f"{durasi * 1000 / n:>10.1f} ms/surat")
+    return total_bytes
+
+
+def main(n=50):
+    daftar = buat_hasil(n)
+
+    def _per_surat(mode_arsip):
+        return sum(
+            len(generate_pdf_document(h['data'], h['medical'], h['legal'], h['recommendation'],
+                                      mode_arsip=mode_arsip).getvalue())
+            for h in daftar
+        )
+
+    print(f"{n} surat sintetis")
+    print(f"{'mode':<32} {'total':>14} {'per surat':>19} {'render':>16}")
+    rl_config.useA85 = 1
+    a85 = _ukur("standar ASCII85 (per surat)", lambda: _per_surat(False), n)
+    rl_config.useA85 = 0
+    standar = _ukur("standar (per surat)", lambda: _per_surat(False), n)
+    arsip = _ukur("arsip (per surat)", lambda: _per_surat(True), n)
+    bundel = _ukur("arsip (bundel)", lambda: len(generate_pdf_bundle(daftar).getvalue()), n)
+    print(f"rasio terhadap standar ASCII85: standar {standar / a85:.2f}, arsip {arsip / a85:.2f}, "
+          f"bundel {bundel / a85:.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,53 @@
+"""
+Benchmark waktu-ke-surat-pertama: worker dingin (spawn, impor + template dari
+nol) vs worker hangat (fork dari induk yang sudah menjalankan panaskan()).
+Diukur dari start proses sampai PDF surat pertama selesai dirender.
+
+    python benchmarks/bench_pool_hangat.py [jumlah_ulangan]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import multiprocessing  # noqa: E402
+
+import pool_hangat  # noqa: E402
+
+
+def _surat_pertama(antrian_hasil, mulai):
+    import app
+    from regresi import data_dasar
+
+    data = data_dasar()
+    medical = app.analyze_medical_data(data)
+    legal = app.analyze_legal_data(data)
+    rec = app.generate_recommendation(medical, legal, data)
+    app.generate_pdf_document(data, medical, legal, rec, kode_verifikasi="BENCH")
+    antrian_hasil.put(time.perf_counter() - mulai)
+
+
+def _ukur(ctx, ulangan):
+    hasil = ctx.Queue()
+    durasi = []
+    for _ in range(ulangan):
+        p = ctx.Process(target=_surat_pertama, args=(hasil, time.perf_counter()))
+        p.start()
+        durasi.append(hasil.get())
+        p.join()
+    return sorted(durasi)[len(durasi) // 2]
+
+
+def main(ulangan=5):
+    dingin = _ukur(multiprocessing.get_context("spawn"), ulangan)
+    print(f"dingin (spawn)  : {dingin * 1000:8.1f} ms ke surat pertama")
+
+    print(f"pemanasan induk : {pool_hangat.panaskan() * 1000:8.1f} ms (sekali)")
+    hangat = _ukur(pool_hangat.konteks(), ulangan)
+    print(f"hangat (fork)   : {hangat * 1000:8.1f} ms ke surat pertama")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,45 @@
+"""
+Benchmark memori: dict hasil asesmen (bentuk arsip/JSON) vs RekamanKasus.
+
+    python benchmarks/bench_rekaman.py [jumlah_kasus]
+
+Kasus diserialisasi ke JSON lebih dulu lalu dimuat ulang, sama seperti saat
+memindai arsip, sehingga string kategorikal tidak berbagi objek secara
+kebetulan di sisi dict.
+"""
+
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from contoh_kasus import buat_hasil
+from rekaman import dari_hasil
+
+
+def _ukur(label, muat, baris):
+    gc.collect()
+    tracemalloc.start()
+    mulai = time.perf_counter()
+    objek = [muat(s) for s in baris]
+    durasi = time.perf_counter() - mulai
+    saat_ini, puncak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n = len(baris)
+    print(f"{label:<20} {saat_ini / n:>10.0f} B/kasus {puncak / n:>12.0f} B/kasus puncak "
+          f"{durasi * 1e6 / n:>8.1f} us/kasus")
+    del objek
+    return saat_ini
+
+
+def main(n=10000):
+    baris = [json.dumps(h, ensure_ascii=False) for h in buat_hasil(n)]
+    print(f"{n} kasus sintetis")
+    ukuran_dict = _ukur("dict", json.loads, baris)
+    ukuran_rekaman = _ukur("RekamanKasus", lambda s: dari_hasil(json.loads(s)), baris)
+    print(f"penghematan: {ukuran_dict / ukuran_rekaman:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
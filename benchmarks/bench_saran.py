@@ -0,0 +1,76 @@
+"""
+Benchmark indeks saran: bangun dari riwayat kasus sintetis (dengan variasi
+ejaan/salah ketik), lalu latensi saran() per ketikan untuk awalan dan teks
+salah ketik.
+
+    python benchmarks/bench_saran.py [jumlah_kasus] [jumlah_instansi]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saran import IndeksSaran  # noqa: E402
+
+WILAYAH = ["Tarakan", "Bulungan", "Nunukan", "Malinau", "Tana Tidung", "Samarinda", "Balikpapan",
+           "Berau", "Kutai Kartanegara", "Bontang", "Paser", "Penajam Paser Utara"]
+SATUAN = ["Satresnarkoba Polres", "Kejaksaan Negeri", "Lapas Kelas IIA", "Rutan Kelas IIB",
+          "Pengadilan Negeri", "Satresnarkoba Polresta"]
+
+
+def _salah_ketik(teks, rng):
+    i = rng.randrange(len(teks))
+    return teks[:i] + teks[i + 1:]
+
+
+def _riwayat(n, n_instansi, rng):
+    instansi = [f"{rng.choice(SATUAN)} {rng.choice(WILAYAH)} {i}" for i in range(n_instansi)]
+    for i in range(n):
+        nilai = rng.choice(instansi)
+        if rng.random() < 0.05:
+            nilai = _salah_ketik(nilai, rng)
+        elif rng.random() < 0.05:
+            nilai = nilai.upper()
+        yield {
+            'instansi_pemohon': nilai,
+            'penerima_surat': f"Kepala {nilai}",
+            'jabatan_penandatangan': "Kepala Seksi Rehabilitasi BNN Provinsi Kalimantan Utara",
+            'nama_penandatangan': f"dr. PENANDATANGAN {i % 7}",
+            'nip_penandatangan': f"19800101 200501 1 00{i % 7}",
+        }
+
+
+def _ukur(indeks, kueri):
+    durasi = []
+    for q in kueri:
+        mulai = time.perf_counter()
+        indeks.saran('instansi_pemohon', q)
+        durasi.append(time.perf_counter() - mulai)
+    durasi.sort()
+    return durasi[len(durasi) // 2] * 1000, durasi[int(len(durasi) * 0.99)] * 1000
+
+
+def main(n=50_000, n_instansi=500):
+    rng = random.Random(11)
+    indeks = IndeksSaran()
+    mulai = time.perf_counter()
+    for data in _riwayat(n, n_instansi, rng):
+        indeks.tambah(data)
+    print(f"bangun      : {n} kasus {time.perf_counter() - mulai:6.2f} s, nilai unik {indeks.statistik()}")
+
+    contoh = [s for s in indeks.saran('instansi_pemohon', "", limit=200)]
+    awalan = [" ".join(s.split()[rng.randrange(len(s.split())):])[:rng.randint(3, 12)] for s in contoh]
+    salah = [_salah_ketik(q, rng) for q in awalan if len(q) >= 6]
+    p50, p99 = _ukur(indeks, awalan)
+    print(f"awalan      : p50 {p50:6.2f} ms, p99 {p99:6.2f} ms")
+    p50, p99 = _ukur(indeks, salah)
+    print(f"salah ketik : p50 {p50:6.2f} ms, p99 {p99:6.2f} ms")
+    print(f"contoh      : {salah[0]!r} -> {indeks.saran('instansi_pemohon', salah[0], limit=3)}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 500)
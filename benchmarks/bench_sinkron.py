@@ -0,0 +1,41 @@
+"""
+Benchmark sinkron mode lapangan: kasus satu hari dari arsip laptop ke server
+pengganti lokal yang disimulasikan lewat link lambat.
+
+    python benchmarks/bench_sinkron.py [jumlah_kasus] [kbit_per_detik]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+from contoh_kasus import buat_hasil
+from arsip import Arsip
+import sinkron
+
+
+def main(n=30, kbps=64):
+    folder = tempfile.mkdtemp(prefix="bench_sinkron_")
+    lokal = Arsip(os.path.join(folder, "lokal.sqlite3"))
+    pusat = Arsip(os.path.join(folder, "pusat.sqlite3"))
+    for hasil in buat_hasil(n):
+        lokal.simpan_kasus(hasil)
+
+    server = sinkron.ServerSinkron(("127.0.0.1", 0), pusat, "bench", lambat=kbps * 1000 / 8)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    mentah = sum(len(t) for t in (sinkron._kemas("bench", [h])[0] for h in lokal.ambil_belum_sinkron(0, n)))
+    r = sinkron.sinkronkan(lokal, url, "bench", "bench")
+    print(f"{r['kasus']} kasus @ {kbps} kbit/s: {r['bytes'] / 1024:.1f} KB terkirim "
+          f"(per kasus terpisah {mentah / 1024:.1f} KB), {r['durasi_detik']} s, {dict(r['status'])}")
+
+    r = sinkron.sinkronkan(lokal, url, "bench", "bench")
+    print(f"sinkron ulang tanpa perubahan: {r['kasus']} kasus, {r['durasi_detik']} s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 64)
@@ -0,0 +1,51 @@
+"""
+Benchmark terbit ulang setelah ganti penandatangan: cari kasus terdampak lewat
+indeks, lalu terbitkan ulang dengan tambal blok TTD .docx vs render penuh
+(--kop), pada arsip sintetis yang suratnya sudah ada di gudang blob.
+
+    TAT_DATA_DIR=/tmp/tat_bench python benchmarks/bench_terbit_ulang.py [jumlah_kasus] [proses]
+"""
+
+import sys
+import time
+
+from contoh_kasus import buat_hasil
+from app import generate_word_document
+from arsip import Arsip
+from gudang import GudangBlob, ref_surat
+import terbit_ulang
+
+TTD_LAMA = {'jabatan_penandatangan': "Kepala Seksi Rehabilitasi BNN Provinsi Kalimantan Utara",
+            'nama_penandatangan': "dr. PENANDATANGAN LAMA", 'nip_penandatangan': "19800101 200501 1 001"}
+TTD_BARU = {'jabatan_penandatangan': "Kepala BNN Provinsi Kalimantan Utara",
+            'nama_penandatangan': "Drs. PENANDATANGAN BARU", 'nip_penandatangan': "19700101 199003 1 002"}
+
+
+def main(n=200, proses=None):
+    arsip = Arsip()
+    gudang = GudangBlob()
+    for hasil in buat_hasil(n):
+        hasil['data'].update(TTD_LAMA)
+        kasus_id = arsip.simpan_kasus(hasil)
+        gudang.simpan(generate_word_document(hasil['data'], hasil['medical'], hasil['legal'],
+                                             hasil['recommendation']).getvalue(),
+                      ref_surat(kasus_id, 'docx'))
+    gudang.close()
+
+    mulai = time.perf_counter()
+    kasus_ids = terbit_ulang.pilih_kasus(arsip, nip_lama=TTD_LAMA['nip_penandatangan'])
+    print(f"cari        : {len(kasus_ids)} kasus terdampak {(time.perf_counter() - mulai) * 1000:6.1f} ms")
+
+    for nama, ttd, kop in (("tambal TTD", TTD_BARU, False), ("render penuh", TTD_LAMA, True)):
+        r = terbit_ulang.terbitkan_ulang(kasus_ids, ttd, kop, proses=proses)
+        print(f"{nama:<12}: {r['jumlah']} surat {r['durasi_detik']:6.2f} s "
+              f"({r['tambal']} tambal, {r['render']} render)")
+
+    sisa = terbit_ulang.pilih_kasus(arsip, nip_lama=TTD_BARU['nip_penandatangan'])
+    print(f"lanjutan    : {len(sisa)} kasus masih ber-NIP baru setelah dikembalikan ke NIP lama")
+    arsip.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+         int(sys.argv[2]) if len(sys.argv) > 2 else None)
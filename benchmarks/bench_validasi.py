@@ -0,0 +1,58 @@
+"""
+Benchmark validasi skema: satu kasus per panggilan (jalur form UI) vs satu
+DataFrame sekaligus (jalur impor massal), pada kasus sintetis dengan sebagian
+NIK/tanggal sengaja dirusak.
+
+    python benchmarks/bench_validasi.py [jumlah_kasus]
+"""
+
+import random
+import sys
+import time
+
+import pandas as pd
+
+from contoh_kasus import buat_data
+import validasi
+
+
+def _kasus(n):
+    rng = random.Random(42)
+    contoh = [buat_data(i, rng) for i in range(1000)]
+    hasil = []
+    for i in range(n):
+        data = dict(contoh[i % len(contoh)])
+        r = rng.random()
+        if r < 0.05:
+            data['nik'] = data['nik'][:15]
+        elif r < 0.10:
+            data['nik'] = "99" + data['nik'][2:]
+        elif r < 0.15:
+            data['tanggal_lahir'] = "31-02-1990"
+        hasil.append(data)
+    return hasil
+
+
+def main(n=100_000):
+    daftar = _kasus(n)
+
+    sampel = daftar[:min(n, 10_000)]
+    mulai = time.perf_counter()
+    salah_skalar = sum(len(validasi.VALIDATOR.kasus(d)) for d in sampel)
+    durasi = time.perf_counter() - mulai
+    print(f"per kasus : {len(sampel):>8} kasus {durasi:6.2f} s ({len(sampel) / durasi:>9.0f} kasus/s), "
+          f"{salah_skalar} kesalahan")
+
+    df = pd.DataFrame(daftar)
+    mulai = time.perf_counter()
+    kesalahan = validasi.VALIDATOR.dataframe(df)
+    durasi = time.perf_counter() - mulai
+    print(f"DataFrame : {n:>8} kasus {durasi:6.2f} s ({n / durasi:>9.0f} kasus/s), "
+          f"{len(kesalahan)} kesalahan")
+
+    salah_vektor = (kesalahan['baris'] < len(sampel)).sum()
+    assert salah_vektor == salah_skalar, (salah_vektor, salah_skalar)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
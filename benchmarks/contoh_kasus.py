@@ -0,0 +1,102 @@
+"""
+Kasus sintetis untuk benchmark (data fiktif, bukan data tersangka sebenarnya).
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import (  # noqa: E402
+    JENIS_NARKOTIKA_LIST, POLA_PENGGUNAAN, SEMA_LIMITS,
+    analyze_medical_data, analyze_legal_data, generate_recommendation,
+)
+
+NAMA_DEPAN = ["AHMAD", "BUDI", "CITRA", "DEWI", "EKO", "FITRI", "GUNAWAN", "HENDRA", "INDAH", "JOKO"]
+NAMA_BELAKANG = ["YANI", "SANTOSO", "LESTARI", "PRATAMA", "WIJAYA", "SAPUTRA", "RAHMAN", "HIDAYAT"]
+INSTANSI = [
+    "Direktorat Reserse Narkoba Polda Kalimantan Utara",
+    "Satresnarkoba Polres Tarakan",
+    "Satresnarkoba Polres Bulungan",
+    "Satresnarkoba Polres Nunukan",
+]
+
+
+def buat_data(i, rng):
+    """Satu data_lengkap sintetis"""
+    jenis = rng.sample(JENIS_NARKOTIKA_LIST[:-1], k=rng.randint(1, 2))
+    bb_jenis = [j for j in jenis if j in SEMA_LIMITS]
+    instansi = rng.choice(INSTANSI)
+    nama = f"{rng.choice(NAMA_DEPAN)} {rng.choice(NAMA_BELAKANG)}"
+    urut = rng.randint(1, 9999)
+    hari, bulan, tahun = rng.randint(1, 28), rng.randint(1, 12), rng.randint(1970, 2005)
+    jenis_kelamin = rng.choice(["Laki-laki", "Perempuan"])
+    # NIK konsisten dengan tanggal lahir & jenis kelamin (lolos validasi.py)
+    hari_nik = hari + 40 if jenis_kelamin == "Perempuan" else hari
+    return {
+        'nama': nama,
+        'nik': f"657101{hari_nik:02d}{bulan:02d}{tahun % 100:02d}{urut:04d}",
+        'tempat_lahir': "Tarakan",
+        'tanggal_lahir': f"{hari:02d}-{bulan:02d}-{tahun}",
+        'jenis_kelamin': jenis_kelamin,
+        'kewarganegaraan': "Indonesia",
+        'alamat': f"Jl. Contoh No. {i}, RT 01/RW 02, Kel. Karang Anyar, Kota Tarakan",
+        'no_hp': "",
+        'no_rekening': "",
+        'status_kawin': "Belum Kawin",
+        'pendidikan': "SMA/SMK",
+        'pekerjaan': "Karyawan Swasta",
+        'penghasilan': 3000000,
+        'kronologi': "Kasus sintetis untuk benchmark.",
+        'jenis_narkotika_digunakan': jenis,
+        'hasil_urine': "Positif",
+        'jenis_narkotika_positif': jenis,
+        'riwayat_pidana_narkotika': rng.random() < 0.2,
+        'riwayat_penahanan': rng.randint(0, 2),
+        'barang_bukti_jenis': bb_jenis,
+        'barang_bukti_detail': {
+            j: {"jumlah": round(rng.uniform(0.1, 2.0) * SEMA_LIMITS[j]['limit'], 3),
+                "satuan": SEMA_LIMITS[j]['unit']}
+            for j in bb_jenis
+        },
+        'tujuan_kepemilikan': rng.choice(["Dipakai Sendiri", "Dipakai Bersama-sama", "Akan Dijual"]),
+        'metode_pembelian': rng.choice(["Dari Teman", "Dari Jaringan Tertentu", "Beli Langsung di Tempat"]),
+        'fakta_hukum': "Fakta hukum sintetis.",
+        'kesimpulan_hukum': "Kesimpulan hukum sintetis.",
+        'enable_sema_evaluation': True,
+        'dsm5_count': rng.randint(0, 11),
+        'jenis_narkotika_utama': jenis[0],
+        'diagnosis_code': "F15",
+        'pola_penggunaan': rng.choice(POLA_PENGGUNAAN),
+        'durasi_bulan': rng.randint(1, 120),
+        'kesimpulan_medis': "Kesimpulan medis sintetis.",
+        'nomor_surat': f"B/{i:05d}/X/KA/PB.06/2025/BNN KALTARA",
+        'tanggal_surat': "15 December 2025",
+        'tanggal_pelaksanaan': "15 December 2025",
+        'penerima_surat': "Direktur Reserse Narkoba Polda Kalimantan Utara",
+        'instansi_pemohon': instansi,
+        'nomor_surat_pemohon': f"B/{i}/XII/2025/Ditresnarkoba",
+        'tanggal_surat_pemohon': "10 December 2025",
+        'jabatan_penandatangan': "Kepala Seksi Rehabilitasi BNN Provinsi Kalimantan Utara",
+        'nama_penandatangan': "dr. CONTOH PENANDATANGAN",
+        'nip_penandatangan': "19800101 200501 1 001",
+        'instansi_penyidik': instansi,
+    }
+
+
+def buat_hasil(n, seed=2025):
+    """List n hasil asesmen sintetis lengkap (data + analisis + rekomendasi)"""
+    rng = random.Random(seed)
+    daftar = []
+    for i in range(1, n + 1):
+        data = buat_data(i, rng)
+        medical = analyze_medical_data(data)
+        legal = analyze_legal_data(data)
+        daftar.append({
+            'data': data,
+            'medical': medical,
+            'legal': legal,
+            'recommendation': generate_recommendation(medical, legal, data),
+        })
+    return daftar
@@ -0,0 +1,311 @@
+"""
+Uji beban pengguna bersamaan terhadap satu replika app.py (Streamlit AppTest).
+
+Tiap "asesor" virtual menjalankan sesi realistis: isi Tab I-III field demi field
+(satu rerun per input, seperti browser), centang kriteria DSM-5, tekan tombol
+proses, lalu mengunduh surat Word & PDF (isi berkas diambil dari media file
+manager dan callback on_click tombol unduh dijalankan). Konkurensi dinaikkan bertahap;
+tiap tahap melaporkan throughput, latensi rerun p50/p95/p99, CPU dan memori
+per sesi.
+
+    python benchmarks/uji_beban.py [--tahap 1,2,4,8,16] [--sesi-per-pengguna 2]
+
+Semua sesi berjalan di satu proses (thread per sesi) dan berbagi satu runtime
+(media file manager, cache), sama seperti server Streamlit, jadi angka ini
+adalah kapasitas satu replika. Arsip & kunci TTE
+ditulis ke direktori sementara (TAT_DATA_DIR), bukan data produksi.
+"""
+
+import argparse
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+os.environ.setdefault("TAT_DATA_DIR", tempfile.mkdtemp(prefix="tat_uji_beban_"))
+
+from unittest.mock import MagicMock  # noqa: E402
+
+from streamlit.proto.WidgetStates_pb2 import WidgetStates  # noqa: E402
+from streamlit.runtime import Runtime  # noqa: E402
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager  # noqa: E402
+from streamlit.runtime.media_file_manager import MediaFileManager  # noqa: E402
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage  # noqa: E402
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache  # noqa: E402
+from streamlit.testing.v1 import AppTest, app_test  # noqa: E402
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner  # noqa: E402
+
+from contoh_kasus import buat_data  # noqa: E402
+from ruang_kerja import STATUS_DIUNDUH  # noqa: E402
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+LABEL_PROSES = "🔍 PROSES ASESMEN & GENERATE SURAT"
+# label tombol unduh -> awalan isi berkas yang diharapkan
+UNDUH_SURAT = {"📘 Download Surat (Word)": b"PK", "📕 Download Surat (PDF)": b"%PDF"}
+
+
+class _RuntimeAppTest(Runtime):
+    """Sasaran pasang/lepas Runtime._instance milik AppTest (lihat _pasang_runtime_bersama)"""
+
+
+class _RunnerSesi(LocalScriptRunner):
+    """
+    LocalScriptRunner dengan session id unik dan cache bytecode bersama.
+    Bawaannya semua sesi memakai "test session id" (di media file manager
+    bersama, akhir run satu sesi membuang berkas unduhan sesi lain) dan tiap
+    run meng-compile app.py sendiri; compile paralel di beberapa thread bisa
+    gagal ("AST constructor recursion depth mismatch") dan run itu selesai
+    tanpa satu widget pun. Server sungguhan juga memakai satu ScriptCache.
+    """
+
+    _cache_skrip = ScriptCache()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._session_id = uuid.uuid4().hex
+        self._script_cache = self._cache_skrip
+
+
+def _pasang_runtime_bersama():
+    """
+    AppTest memasang Runtime._instance di awal tiap run dan mengosongkannya di
+    akhir; dengan beberapa sesi paralel, sesi yang selesai duluan membuat run
+    sesi lain gagal ("Runtime hasn't been created!") lalu timeout. Seperti
+    server sungguhan, semua sesi memakai satu runtime: AppTest diarahkan ke
+    subclass sehingga pasang/lepasnya tidak menyentuh Runtime asli, dan tiap
+    sesi mendapat session id sendiri (_RunnerSesi).
+    """
+    penyimpanan = MemoryMediaFileStorage("/mock/media")
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(penyimpanan)
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    app_test.Runtime = _RuntimeAppTest
+    app_test.LocalScriptRunner = _RunnerSesi
+    Runtime._instance = runtime
+    return penyimpanan
+
+
+MEDIA = _pasang_runtime_bersama()
+
+
+class _KlikUnduh:
+    """
+    Klik st.download_button (belum didukung AppTest): kirim trigger_value tombol
+    bersama state widget lain, seperti browser saat mengunduh (callback on_click
+    dijalankan di rerun berikutnya)
+    """
+
+    def __init__(self, at, tombol):
+        self.at = at
+        self.tombol = tombol
+
+    def run(self, timeout=None):
+        states = WidgetStates()
+        states.CopyFrom(self.at._tree.get_widget_states())
+        trigger = states.widgets.add()
+        trigger.id = self.tombol.proto.id
+        trigger.trigger_value = True
+        return self.at._run(states, timeout=timeout)
+
+
+def _widget(at, jenis, label):
+    for w in getattr(at, jenis):
+        if w.label == label:
+            return w
+    raise LookupError(f"{jenis} '{label}' tidak ditemukan")
+
+
+def _pills_kosong(at):
+    """
+    AppTest tidak bisa mengirim state st.pills pilihan tunggal yang belum dipilih
+    (value None -> TypeError); kirim sebagai tanpa pilihan, seperti browser
+    """
+    for w in at.button_group:
+        if w.value is None:
+            w.set_value([])
+
+
+def _rss_kib():
+    """RSS proses saat ini (KiB) dari /proc; fallback ke puncak RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _langkah_sesi(data):
+    """Urutan interaksi satu sesi: list (jenis_widget, label/key, aksi, nilai)"""
+    langkah = [
+        ("text_input", "Nama Lengkap *", "input", data['nama']),
+        ("text_input", "NIK *", "input", data['nik']),
+        ("text_input", "Tempat Lahir *", "input", data['tempat_lahir']),
+        # Harus cocok dengan NIK (validasi nik_cocok_identitas) dan usia USIA_MIN-USIA_MAKS
+        ("date_input", "Tanggal Lahir *", "set_value",
+         datetime.strptime(data['tanggal_lahir'], "%d-%m-%Y").date()),
+        ("selectbox", "Jenis Kelamin *", "select", data['jenis_kelamin']),
+        ("text_area", "Alamat Lengkap *", "input", data['alamat']),
+        ("text_input", "Pekerjaan Saat Ini", "input", data['pekerjaan']),
+        ("text_area", "Uraikan kronologi penangkapan/penyerahan diri *", "input", data['kronologi']),
+        ("multiselect", "Pilih jenis narkotika yang pernah/sedang digunakan *", "set_value",
+         data['jenis_narkotika_digunakan']),
+        ("multiselect", "Jenis Narkotika yang Positif *", "set_value", data['jenis_narkotika_positif']),
+        ("multiselect", "Jenis narkotika yang menjadi barang bukti *", "set_value",
+         data['barang_bukti_jenis']),
+    ]
+    for jenis, detail in data['barang_bukti_detail'].items():
+        langkah.append(("number_input", f"key:bb_{jenis}", "set_value", float(detail['jumlah'])))
+        langkah.append(("selectbox", f"key:satuan_{jenis}", "select", detail['satuan']))
+    langkah += [
+        ("radio", "Narkotika yang dimiliki untuk *", "set_value", data['tujuan_kepemilikan']),
+        ("text_area", "Fakta-Fakta Hukum *", "input", data['fakta_hukum']),
+        ("text_area", "Kesimpulan Asesmen Hukum *", "input", data['kesimpulan_hukum']),
+    ]
+    langkah += [("checkbox", f"key:dsm5_med_{i}", "check", None) for i in range(1, data['dsm5_count'] + 1)]
+    langkah += [
+        ("selectbox", "Jenis Narkotika Utama yang Digunakan *", "select", data['jenis_narkotika_utama']),
+        ("selectbox", "Pola Penggunaan *", "select", data['pola_penggunaan']),
+        ("text_area", "Kesimpulan Asesmen Medis *", "input", data['kesimpulan_medis']),
+        ("text_input", "Nomor Surat Pemohon *", "input", data['nomor_surat_pemohon']),
+        ("text_input", "Nama Penandatangan *", "input", data['nama_penandatangan']),
+        ("text_input", "NIP*", "input", data['nip_penandatangan']),
+    ]
+    return langkah
+
+
+class PenggunaVirtual(threading.Thread):
+    """Satu asesor: menjalankan beberapa sesi berturut-turut, mencatat latensi rerun"""
+
+    def __init__(self, nomor, jumlah_sesi, timeout):
+        super().__init__(name=f"asesor-{nomor}", daemon=True)
+        self.rng = random.Random(nomor)
+        self.nomor = nomor
+        self.jumlah_sesi = jumlah_sesi
+        self.timeout = timeout
+        self.latensi = []
+        self.sesi_selesai = 0
+        self.galat = []
+        self.app_tests = []  # ditahan sampai pengukuran memori tahap selesai
+
+    def _rerun(self, at, aksi=None):
+        _pills_kosong(at)
+        mulai = time.perf_counter()
+        if aksi is None:
+            at.run(timeout=self.timeout)
+        else:
+            aksi.run(timeout=self.timeout)
+        self.latensi.append(time.perf_counter() - mulai)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+    def _sesi(self, i):
+        data = buat_data(self.nomor * 1000 + i, self.rng)
+        at = AppTest.from_file(APP_PATH, default_timeout=self.timeout)
+        self.app_tests.append(at)
+        self._rerun(at)
+
+        for jenis, label, aksi, nilai in _langkah_sesi(data):
+            if label.startswith("key:"):
+                widget = getattr(at, jenis)(key=label[4:])
+            else:
+                widget = _widget(at, jenis, label)
+            fungsi = getattr(widget, aksi)
+            self._rerun(at, fungsi() if nilai is None else fungsi(nilai))
+
+        # Proses asesmen: analisis + simpan arsip + render Word + render & tanda tangan PDF
+        self._rerun(at, _widget(at, "button", LABEL_PROSES).click())
+        if not any("berhasil" in s.value for s in at.success):
+            galat = [e.value for e in at.error]
+            raise RuntimeError(f"Asesmen tidak diproses: {galat}")
+
+        # Unduh Word & PDF: ambil isi berkas yang disajikan tombol, lalu klik
+        # (catat_unduh: status ruang kerja + log audit, rerun dengan dokumen ter-cache)
+        for label, awalan in UNDUH_SURAT.items():
+            tombol = next((t for t in at.get("download_button") if t.proto.label == label), None)
+            if tombol is None:
+                raise RuntimeError(f"Tombol unduh tidak ada: {label}")
+            isi = MEDIA.get_file(tombol.proto.url.rsplit("/", 1)[-1]).content
+            if not isi.startswith(awalan):
+                raise RuntimeError(f"Berkas unduhan tidak valid: {label}")
+            self._rerun(at, _KlikUnduh(at, tombol))
+        if any(r['status'] != STATUS_DIUNDUH for r in at.session_state['ruang_kerja'].daftar()):
+            raise RuntimeError("Unduhan tidak tercatat di ruang kerja")
+
+    def run(self):
+        for i in range(self.jumlah_sesi):
+            try:
+                self._sesi(i)
+                self.sesi_selesai += 1
+            except Exception as e:  # dicatat, tahap tetap dilanjutkan
+                self.galat.append(f"{type(e).__name__}: {e}")
+
+
+def _persentil(nilai, p):
+    if not nilai:
+        return 0.0
+    urut = sorted(nilai)
+    return urut[min(len(urut) - 1, int(round(p / 100.0 * (len(urut) - 1))))]
+
+
+def jalankan_tahap(konkurensi, sesi_per_pengguna, timeout):
+    rss_awal = _rss_kib()
+    cpu_awal = time.process_time()
+    mulai = time.perf_counter()
+
+    pengguna = [PenggunaVirtual(n, sesi_per_pengguna, timeout) for n in range(konkurensi)]
+    for p in pengguna:
+        p.start()
+    for p in pengguna:
+        p.join()
+
+    durasi = time.perf_counter() - mulai
+    cpu = time.process_time() - cpu_awal
+    rss_akhir = _rss_kib()  # semua AppTest tahap ini masih hidup
+
+    latensi = [x for p in pengguna for x in p.latensi]
+    sesi = sum(p.sesi_selesai for p in pengguna)
+    galat = [g for p in pengguna for g in p.galat]
+    hasil = {
+        'konkurensi': konkurensi,
+        'sesi': sesi,
+        'gagal': len(galat),
+        'sesi_per_menit': 60.0 * sesi / durasi if durasi else 0.0,
+        'rerun_per_detik': len(latensi) / durasi if durasi else 0.0,
+        'p50_ms': 1000 * (statistics.median(latensi) if latensi else 0.0),
+        'p95_ms': 1000 * _persentil(latensi, 95),
+        'p99_ms': 1000 * _persentil(latensi, 99),
+        'cpu_ms_per_sesi': 1000 * cpu / max(sesi, 1),
+        'mem_kib_per_sesi': max(rss_akhir - rss_awal, 0) / max(konkurensi * sesi_per_pengguna, 1),
+        'contoh_galat': galat[:3],
+    }
+    del pengguna
+    return hasil
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Uji beban asesor bersamaan terhadap app.py")
+    parser.add_argument("--tahap", default="1,2,4,8,16", help="daftar konkurensi, dipisah koma")
+    parser.add_argument("--sesi-per-pengguna", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=120.0, help="batas detik per rerun")
+    args = parser.parse_args()
+
+    print(f"app: {APP_PATH}\ndata sementara: {os.environ['TAT_DATA_DIR']}")
+    print(f"{'konk':>5} {'sesi':>5} {'gagal':>5} {'sesi/mnt':>9} {'rerun/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'CPU ms/sesi':>12} {'mem KiB/sesi':>13}")
+    for konkurensi in (int(x) for x in args.tahap.split(",")):
+        h = jalankan_tahap(konkurensi, args.sesi_per_pengguna, args.timeout)
+        print(f"{h['konkurensi']:>5} {h['sesi']:>5} {h['gagal']:>5} {h['sesi_per_menit']:>9.1f} "
+              f"{h['rerun_per_detik']:>8.1f} {h['p50_ms']:>8.0f} {h['p95_ms']:>8.0f} "
+              f"{h['p99_ms']:>8.0f} {h['cpu_ms_per_sesi']:>12.0f} {h['mem_kib_per_sesi']:>13.0f}")
+        for g in h['contoh_galat']:
+            print(f"      ! {g}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+=================================================================================
+SNAPSHOT ANALITIK ARSIP TAT (PARQUET, KOLOMNAR)
+=================================================================================
+Analis membaca snapshot ini, bukan arsip SQLite yang sedang ditulis aplikasi.
+
+- Inkremental: hanya kasus dengan id > watermark (_watermark.json) yang
+  diekspor; file bagian diberi nama dari id awal batch sehingga menjalankan
+  ulang ekspor yang terputus menimpa file yang sama (tidak ada duplikat).
+- Kasus lama yang ditulis ulang (terbit ulang, ganti nomor surat) dikenali
+  dari kolom `diubah` arsip (watermark versi_ubah): baris lamanya dihapus dari
+  file bagian mana pun lalu versi barunya ditulis ke file ubah-<versi>.
+- Partisi Hive: tahun=YYYY/bulan=M/instansi=<slug instansi pemohon>/
+- Hanya kolom analitik: tanpa nama, NIK, alamat & narasi (arsip sumber
+  terenkripsi, snapshot tidak).
+- Baca: memory-mapped, hanya kolom yang diminta, partisi dipangkas oleh filter.
+
+    python ekspor_analitik.py ekspor [--interval 3600]   # terjadwal
+    python ekspor_analitik.py padatkan                   # gabung file kecil per partisi
+    python ekspor_analitik.py info
+
+    from ekspor_analitik import baca
+    df = baca(['jenis_narkotika_utama', 'rekomendasi'], tahun=2025)
+=================================================================================
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from arsip import Arsip, DATA_DIR
+from rekaman import usia, waktu_dibuat
+
+SNAPSHOT_DIR = os.environ.get("TAT_SNAPSHOT_DIR", os.path.join(DATA_DIR, "snapshot_analitik"))
+BATCH_EKSPOR = 50_000
+KOLOM_PARTISI = ["tahun", "bulan", "instansi"]
+
+# Kolom string berkardinalitas rendah: disimpan & dibaca sebagai dictionary
+# (pandas Categorical) sehingga group-by/filter tidak membandingkan string.
+KOLOM_KATEGORI = [
+    "tenant", "instansi_pemohon", "jenis_kelamin", "hasil_urine", "jenis_narkotika_utama",
+    "pola_penggunaan", "tujuan_kepemilikan", "severity_level", "diagnosis_code",
+    "keterlibatan_jaringan", "rekomendasi", "rule_id",
+]
+
+SKEMA = pa.schema([
+    ("kasus_id", pa.int64()),
+    ("nomor_surat", pa.string()),
+    ("dibuat", pa.timestamp("s")),
+    ("tenant", pa.string()),
+    ("instansi_pemohon", pa.string()),
+    ("jenis_kelamin", pa.string()),
+    ("usia", pa.int16()),
+    ("hasil_urine", pa.string()),
+    ("jenis_narkotika_utama", pa.string()),
+    ("jenis_narkotika_digunakan", pa.list_(pa.string())),
+    ("barang_bukti_jenis", pa.list_(pa.string())),
+    ("pola_penggunaan", pa.string()),
+    ("durasi_bulan", pa.float32()),
+    ("tujuan_kepemilikan", pa.string()),
+    ("dsm5_count", pa.int8()),
+    ("severity_level", pa.string()),
+    ("diagnosis_code", pa.string()),
+    ("keterlibatan_jaringan", pa.string()),
+    ("riwayat_pidana", pa.bool_()),
+    ("sema_melebihi", pa.bool_()),
+    ("rekomendasi", pa.string()),
+    ("rule_id", pa.string()),
+    ("impor", pa.bool_()),
+    ("tahun", pa.int16()),
+    ("bulan", pa.int8()),
+    ("instansi", pa.string()),
+])
+
+
+def slug(teks):
+    """'Polres Tarakan / Sat Narkoba' -> 'polres-tarakan-sat-narkoba' (aman untuk nama direktori)"""
+    return re.sub(r"[^a-z0-9]+", "-", (teks or "").lower()).strip("-") or "tanpa-instansi"
+
+
+def baris_analitik(hasil):
+    """Satu kasus arsip -> dict kolom SKEMA (tanpa data identitas)"""
+    data, medical = hasil['data'], hasil['medical']
+    legal, rec = hasil['legal'], hasil['recommendation']
+    dibuat = waktu_dibuat(hasil.get('timestamp'))
+    return {
+        'kasus_id': hasil['kasus_id'],
+        'nomor_surat': data.get('nomor_surat'),
+        'dibuat': dibuat,
+        'tenant': data.get('tenant', 'kaltara'),
+        'instansi_pemohon': data.get('instansi_pemohon'),
+        'jenis_kelamin': data.get('jenis_kelamin'),
+        'usia': usia(data.get('tanggal_lahir'), dibuat),
+        'hasil_urine': data.get('hasil_urine'),
+        'jenis_narkotika_utama': data.get('jenis_narkotika_utama'),
+        'jenis_narkotika_digunakan': list(data.get('jenis_narkotika_digunakan') or []),
+        'barang_bukti_jenis': list(data.get('barang_bukti_jenis') or []),
+        'pola_penggunaan': medical.get('pola_penggunaan'),
+        'durasi_bulan': medical.get('durasi_bulan'),
+        'tujuan_kepemilikan': legal.get('tujuan_kepemilikan'),
+        'dsm5_count': medical.get('dsm5_count'),
+        'severity_level': medical.get('severity_level'),
+        'diagnosis_code': medical.get('diagnosis_code'),
+        'keterlibatan_jaringan': legal.get('keterlibatan_jaringan'),
+        'riwayat_pidana': bool(legal.get('riwayat_pidana')),
+        'sema_melebihi': bool((legal.get('sema_result') or {}).get('sema_exceeded')),
+        'rekomendasi': rec.get('rekomendasi'),
+        'rule_id': rec.get('rule_id'),
+        'impor': 'impor' in data,
+        'tahun': dibuat.year if dibuat else 0,
+        'bulan': dibuat.month if dibuat else 0,
+        'instansi': slug(data.get('instansi_pemohon')),
+    }
+
+
+# =============================================================================
+# EKSPOR
+# =============================================================================
+def _baca_watermark(direktori):
+    path = os.path.join(direktori or SNAPSHOT_DIR, "_watermark.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def baca_watermark(direktori=None):
+    return _baca_watermark(direktori).get('kasus_id', 0)
+
+
+def _tulis_watermark(direktori, kasus_id, versi_ubah, jumlah):
+    path = os.path.join(direktori, "_watermark.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump({'kasus_id': kasus_id, 'versi_ubah': versi_ubah, 'jumlah_terakhir': jumlah,
+                   'diperbarui': datetime.now().isoformat(timespec="seconds")}, f)
+    os.replace(path + ".tmp", path)
+
+
+def _tulis_batch(baris, direktori, nama=None):
+    nama = nama or f"bagian-{baris[0]['kasus_id']:09d}"
+    tabel = pa.Table.from_pylist(baris, schema=SKEMA)
+    pq.write_to_dataset(
+        tabel, direktori,
+        partition_cols=KOLOM_PARTISI,
+        basename_template=f"{nama}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        compression="zstd",
+    )
+
+
+def _hapus_baris(kasus_ids, direktori):
+    """Keluarkan baris kasus_ids dari semua file snapshot (hanya kolom kasus_id yang dibaca untuk cek)"""
+    ids = pa.array(sorted(kasus_ids), type=pa.int64())
+    for akar, _, files in os.walk(direktori):
+        for f in files:
+            if not f.endswith(".parquet"):
+                continue
+            path = os.path.join(akar, f)
+            cocok = pc.is_in(pq.read_table(path, columns=["kasus_id"])["kasus_id"], value_set=ids)
+            if not pc.any(cocok).as_py():
+                continue
+            tabel = pq.read_table(path).filter(pc.invert(cocok))
+            if tabel.num_rows:
+                pq.write_table(tabel, path + ".tmp", compression="zstd")
+                os.replace(path + ".tmp", path)
+            else:
+                os.remove(path)
+
+
+class _KunciEkspor:
+    """Satu ekspor/pemadatan pada satu waktu per direktori snapshot"""
+
+    def __init__(self, direktori):
+        os.makedirs(direktori, exist_ok=True)
+        self._f = open(os.path.join(direktori, "_kunci"), "w")
+
+    def __enter__(self):
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._f.close()
+                raise RuntimeError("ekspor lain sedang berjalan pada direktori snapshot ini")
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+
+def ekspor(path_arsip=None, direktori=None, batch=BATCH_EKSPOR):
+    """
+    Ekspor kasus baru (id > watermark) ke snapshot, lalu ekspor ulang kasus lama
+    yang isinya ditulis ulang sejak putaran sebelumnya (versi_ubah). Batas atas
+    diambil di awal sehingga kasus yang masuk/berubah selama ekspor menunggu
+    putaran berikutnya. Mengembalikan jumlah baris yang diekspor.
+    """
+    direktori = direktori or SNAPSHOT_DIR
+    with _KunciEkspor(direktori):
+        watermark = _baca_watermark(direktori)
+        sejak = watermark.get('kasus_id', 0)
+        sejak_versi = watermark.get('versi_ubah', 0)
+        arsip = Arsip(path_arsip)
+        try:
+            _, sampai = arsip.rentang_id()
+            sampai_versi = arsip.versi_ubah()
+            if sampai <= sejak and sampai_versi <= sejak_versi:
+                return 0
+            jumlah = 0
+            baris = []
+            for hasil in arsip.iter_kasus(batch=1000, sejak_id=sejak, sampai_id=sampai):
+                baris.append(baris_analitik(hasil))
+                if len(baris) >= batch:
+                    _tulis_batch(baris, direktori)
+                    jumlah += len(baris)
+                    baris = []
+            if baris:
+                _tulis_batch(baris, direktori)
+                jumlah += len(baris)
+
+            # Kasus baru (id > sejak) sudah terekspor dengan isi terbaru di atas
+            baris = [baris_analitik(hasil) for hasil in
+                     arsip.iter_kasus_diubah(sejak_versi, sampai_versi, sampai_id=sejak)]
+            if baris:
+                # Idempoten bila terputus: ulangan menghapus lagi lalu menulis ulang file ubah- yang sama
+                _hapus_baris({b['kasus_id'] for b in baris}, direktori)
+                _tulis_batch(baris, direktori, nama=f"ubah-{sampai_versi:09d}")
+                jumlah += len(baris)
+        finally:
+            arsip.close()
+        # watermark terakhir: file bagian sudah lengkap sebelum kasus dianggap terekspor
+        _tulis_watermark(direktori, max(sampai, sejak), max(sampai_versi, sejak_versi), jumlah)
+        return jumlah
+
+
+def padatkan(direktori=None, min_file=2):
+    """Gabungkan file bagian tiap partisi menjadi satu file terurut kasus_id"""
+    direktori = direktori or SNAPSHOT_DIR
+    jumlah_partisi = 0
+    with _KunciEkspor(direktori):
+        for akar, _, files in os.walk(direktori):
+            bagian = sorted(f for f in files if f.endswith(".parquet"))
+            if len(bagian) < min_file:
+                continue
+            tabel = pa.concat_tables(
+                pq.read_table(os.path.join(akar, f), memory_map=True) for f in bagian
+            ).sort_by("kasus_id")
+            id_awal = tabel.column("kasus_id")[0].as_py()
+            tmp = os.path.join(akar, "_padat.tmp")
+            pq.write_table(tabel, tmp, compression="zstd")
+            os.replace(tmp, os.path.join(akar, f"padat-{id_awal:09d}.parquet"))
+            for f in bagian:
+                if f != f"padat-{id_awal:09d}.parquet":
+                    os.remove(os.path.join(akar, f))
+            jumlah_partisi += 1
+    return jumlah_partisi
+
+
+# =============================================================================
+# BACA (UNTUK ANALIS)
+# =============================================================================
+def baca(kolom=None, tahun=None, bulan=None, instansi=None, direktori=None):
+    """
+    DataFrame snapshot. kolom: list kolom yang dibaca (None = semua); tahun/bulan/
+    instansi (slug): nilai tunggal atau list, dipakai untuk memangkas partisi.
+    File di-memory-map; kolom kategori dibaca sebagai pandas Categorical.
+    """
+    direktori = direktori or SNAPSHOT_DIR
+    filters = []
+    for nama, nilai in (("tahun", tahun), ("bulan", bulan), ("instansi", instansi)):
+        if nilai is None:
+            continue
+        nilai = list(nilai) if isinstance(nilai, (list, tuple, set)) else [nilai]
+        filters.append((nama, "in", nilai))
+    kategori = [k for k in KOLOM_KATEGORI if kolom is None or k in kolom]
+    tabel = pq.read_table(
+        direktori,
+        columns=kolom,
+        filters=filters or None,
+        memory_map=True,
+        partitioning="hive",
+        read_dictionary=kategori,
+    )
+    return tabel.to_pandas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot analitik Parquet dari arsip TAT")
+    parser.add_argument("--arsip", default=None, help="path arsip SQLite")
+    parser.add_argument("--keluaran", default=SNAPSHOT_DIR, help="direktori snapshot")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    p_ekspor = sub.add_parser("ekspor", help="ekspor kasus baru (inkremental)")
+    p_ekspor.add_argument("--interval", type=float, default=0,
+                          help="ulangi tiap N detik (0 = sekali jalan)")
+    sub.add_parser("padatkan", help="gabung file bagian per partisi")
+    sub.add_parser("info", help="watermark & ukuran snapshot")
+    args = parser.parse_args()
+
+    if args.perintah == "ekspor":
+        while True:
+            mulai = time.perf_counter()
+            n = ekspor(args.arsip, args.keluaran)
+            print(f"{datetime.now():%Y-%m-%d %H:%M:%S} {n} kasus diekspor "
+                  f"({time.perf_counter() - mulai:.1f} s), watermark {baca_watermark(args.keluaran)}",
+                  file=sys.stderr)
+            if not args.interval:
+                break
+            time.sleep(args.interval)
+    elif args.perintah == "padatkan":
+        print(f"{padatkan(args.keluaran)} partisi dipadatkan")
+    else:
+        jumlah_file = ukuran = 0
+        for akar, _, files in os.walk(args.keluaran):
+            for f in files:
+                if f.endswith(".parquet"):
+                    jumlah_file += 1
+                    ukuran += os.path.getsize(os.path.join(akar, f))
+        print(f"watermark kasus_id {baca_watermark(args.keluaran)}, "
+              f"versi_ubah {_baca_watermark(args.keluaran).get('versi_ubah', 0)}, "
+              f"{jumlah_file} file, {ukuran / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+"""
+=================================================================================
+ENKRIPSI AT-REST DATA KASUS RAHASIA (AES-256-GCM, streaming)
+=================================================================================
+- Tiap record/berkas punya kunci data (DEK) acak sendiri; DEK dibungkus
+  (AES-GCM) oleh kunci master (KEK) dari cincin kunci lokal.
+- Isi dienkripsi per chunk (konstruksi STREAM: nonce = prefix acak + nomor
+  chunk + flag chunk terakhir) sehingga berkas besar tidak pernah utuh di
+  memori dalam bentuk terdekripsi, dan pemotongan/penukaran chunk terdeteksi.
+- Cincin kunci: env TAT_KUNCI_ARSIP (hex, dipisah koma) atau file
+  TAT_KUNCI_ARSIP_FILE (satu hex per baris), default dibuat otomatis di
+  DATA_DIR/kunci_arsip.key. Kunci pertama = kunci aktif untuk penulisan;
+  kunci lain hanya untuk membaca data lama sampai rotasi selesai.
+
+Rotasi (setelah menambah kunci baru di baris pertama):
+
+    python enkripsi.py kunci-baru
+    python enkripsi.py rotasi [--penuh] [--proses 4]
+
+Rotasi mencakup record kasus, lampiran outbox (kiriman) dan berkas di
+direktori keluaran/ruang kerja/gudang. Tanpa --penuh hanya DEK yang dibungkus
+ulang (header diganti, isi tidak disentuh); --penuh mengenkripsi ulang seluruh
+isi dengan DEK baru. Record kasus & lampiran ditulis dengan compare-and-set
+pada versi isinya, sehingga yang diubah app/worker selama rotasi tidak
+dikembalikan ke isi lama.
+
+Format berkas:
+  MAGIC(5) | id_kek(8) | nonce_bungkus(12) | DEK terbungkus(48) | prefix_nonce(7)
+  lalu berulang: panjang_ciphertext(4, big-endian) | ciphertext chunk (+tag 16)
+=================================================================================
+"""
+
+import argparse
+import functools
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import secrets
+import struct
+import sys
+import time
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from arsip import Arsip, ARSIP_PATH, DATA_DIR
+
+KUNCI_FILE_DEFAULT = os.path.join(DATA_DIR, "kunci_arsip.key")
+ENKRIPSI_AKTIF = os.environ.get("TAT_ENKRIPSI", "1") != "0"
+
+MAGIC = b"TATE1"
+UKURAN_CHUNK = 64 * 1024
+_HEADER = struct.Struct(">5s8s12s48s7s")
+UKURAN_HEADER = _HEADER.size
+_PANJANG = struct.Struct(">I")
+
+
+class DataRusak(ValueError):
+    """Ciphertext gagal diautentikasi, terpotong, atau kuncinya tidak tersedia"""
+
+
+# =============================================================================
+# CINCIN KUNCI
+# =============================================================================
+def _id_kek(kek):
+    return hashlib.sha256(b"TAT-KEK\x00" + kek).digest()[:8]
+
+
+class CincinKunci:
+    """Kumpulan KEK; kunci pertama dipakai untuk membungkus DEK baru"""
+
+    def __init__(self, daftar_kek):
+        if not daftar_kek:
+            raise ValueError("Cincin kunci kosong")
+        self._kek = {_id_kek(k): AESGCM(k) for k in daftar_kek}
+        self.id_aktif = _id_kek(daftar_kek[0])
+
+    def bungkus(self, dek):
+        nonce = secrets.token_bytes(12)
+        return self.id_aktif, nonce, self._kek[self.id_aktif].encrypt(nonce, dek, MAGIC + self.id_aktif)
+
+    def buka(self, id_kek, nonce, dek_terbungkus):
+        aead = self._kek.get(id_kek)
+        if aead is None:
+            raise DataRusak(f"Kunci master {id_kek.hex()} tidak ada di cincin kunci")
+        try:
+            return aead.decrypt(nonce, dek_terbungkus, MAGIC + id_kek)
+        except InvalidTag:
+            raise DataRusak("DEK gagal diautentikasi") from None
+
+
+def _baca_daftar_kek():
+    kunci_hex = os.environ.get("TAT_KUNCI_ARSIP")
+    if kunci_hex:
+        return [bytes.fromhex(k.strip()) for k in kunci_hex.split(",") if k.strip()]
+
+    path = os.environ.get("TAT_KUNCI_ARSIP_FILE", KUNCI_FILE_DEFAULT)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32) + "\n")
+    with open(path) as f:
+        return [bytes.fromhex(baris.strip()) for baris in f if baris.strip()]
+
+
+@functools.lru_cache(maxsize=None)
+def muat_cincin():
+    """Cincin kunci proses ini (dimuat sekali)"""
+    return CincinKunci(_baca_daftar_kek())
+
+
+# =============================================================================
+# STREAM
+# =============================================================================
+def _nonce(prefix, nomor, terakhir):
+    return prefix + struct.pack(">IB", nomor, 1 if terakhir else 0)
+
+
+def _buat_header(cincin, dek=None):
+    dek = dek or AESGCM.generate_key(bit_length=256)
+    id_kek, nonce_bungkus, terbungkus = cincin.bungkus(dek)
+    prefix = secrets.token_bytes(7)
+    return dek, prefix, _HEADER.pack(MAGIC, id_kek, nonce_bungkus, terbungkus, prefix)
+
+
+def _urai_header(header, cincin):
+    if len(header) != UKURAN_HEADER or not header.startswith(MAGIC):
+        raise DataRusak("Bukan data terenkripsi TAT")
+    _magic, id_kek, nonce_bungkus, terbungkus, prefix = _HEADER.unpack(header)
+    return cincin.buka(id_kek, nonce_bungkus, terbungkus), prefix
+
+
+class PenulisTerenkripsi(io.RawIOBase):
+    """
+    File-like tulis: plaintext yang ditulis dienkripsi per chunk ke `tujuan`.
+    Bisa dipakai langsung oleh zipfile/pickle; wajib close() untuk menulis
+    chunk terakhir.
+    """
+
+    def __init__(self, tujuan, cincin=None, ukuran_chunk=UKURAN_CHUNK):
+        super().__init__()
+        self._tujuan = tujuan
+        self._ukuran_chunk = ukuran_chunk
+        dek, self._prefix, header = _buat_header(cincin or muat_cincin())
+        self._aead = AESGCM(dek)
+        self._aad = MAGIC + self._prefix
+        self._buffer = bytearray()
+        self._nomor = 0
+        self._posisi = 0
+        self._tujuan.write(header)
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._posisi
+
+    def _tulis_chunk(self, data, terakhir):
+        ct = self._aead.encrypt(_nonce(self._prefix, self._nomor, terakhir), bytes(data), self._aad)
+        self._tujuan.write(_PANJANG.pack(len(ct)))
+        self._tujuan.write(ct)
+        self._nomor += 1
+
+    def write(self, data):
+        self._buffer += data
+        self._posisi += len(data)
+        # Sisakan minimal satu chunk penuh: chunk terakhir baru diketahui saat close()
+        while len(self._buffer) > self._ukuran_chunk:
+            self._tulis_chunk(self._buffer[:self._ukuran_chunk], False)
+            del self._buffer[:self._ukuran_chunk]
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._tulis_chunk(self._buffer, True)
+            self._buffer = bytearray()
+        super().close()
+
+
+def iter_dekripsi(sumber, cincin=None):
+    """Generator chunk plaintext dari file-like terenkripsi; raise DataRusak bila tidak utuh"""
+    dek, prefix = _urai_header(sumber.read(UKURAN_HEADER), cincin or muat_cincin())
+    aead = AESGCM(dek)
+    aad = MAGIC + prefix
+    nomor = 0
+    panjang = sumber.read(_PANJANG.size)
+    while True:
+        if len(panjang) < _PANJANG.size:
+            raise DataRusak("Data terpotong (chunk terakhir tidak ditemukan)")
+        n = _PANJANG.unpack(panjang)[0]
+        ct = sumber.read(n)
+        if len(ct) < n:
+            raise DataRusak(f"Chunk {nomor} terpotong")
+        # Baca panjang chunk berikutnya lebih dulu: chunk tanpa penerus harus berflag terakhir
+        panjang = sumber.read(_PANJANG.size)
+        terakhir = not panjang
+        try:
+            plaintext = aead.decrypt(_nonce(prefix, nomor, terakhir), ct, aad)
+        except InvalidTag:
+            raise DataRusak(f"Chunk {nomor} gagal diautentikasi") from None
+        yield plaintext
+        if terakhir:
+            return
+        nomor += 1
+
+
+class PembacaTerenkripsi(io.RawIOBase):
+    """File-like baca (read/readline/readinto) di atas iter_dekripsi, untuk pickle/zipfile-stream"""
+
+    def __init__(self, sumber, cincin=None, tutup_sumber=False):
+        super().__init__()
+        self._sumber = sumber
+        self._tutup_sumber = tutup_sumber
+        self._chunks = iter_dekripsi(sumber, cincin)
+        self._sisa = memoryview(b"")
+
+    def close(self):
+        if not self.closed and self._tutup_sumber:
+            self._sumber.close()
+        super().close()
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._sisa:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._sisa = memoryview(chunk)
+        n = min(len(b), len(self._sisa))
+        b[:n] = self._sisa[:n]
+        self._sisa = self._sisa[n:]
+        return n
+
+
+def buka_baca(path, cincin=None):
+    """
+    Buka berkas sebagai stream plaintext ber-buffer. Berkas tanpa header
+    enkripsi (dibuat sebelum enkripsi aktif) dibuka apa adanya.
+    """
+    sumber = open(path, "rb", buffering=UKURAN_CHUNK)
+    if sumber.peek(len(MAGIC))[:len(MAGIC)] != MAGIC:
+        return sumber
+    return io.BufferedReader(PembacaTerenkripsi(sumber, cincin, tutup_sumber=True), buffer_size=UKURAN_CHUNK)
+
+
+def buka_tulis(path, cincin=None):
+    """
+    Buka berkas untuk ditulis (ke .tmp lalu rename saat close; dibuang bila
+    blok `with` gagal). Terenkripsi kecuali TAT_ENKRIPSI=0.
+    """
+    if ENKRIPSI_AKTIF:
+        return _BerkasTerenkripsi(path, cincin)
+    return _BerkasPolos(path)
+
+
+class _BerkasAtomik:
+    """Mixin: tulis ke path.tmp, rename saat close, buang saat exception"""
+
+    def _selesai(self):
+        self._file.close()
+        os.replace(self._path_tmp, self._path)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self._path_tmp)
+            io.RawIOBase.close(self)
+        return False
+
+
+class _BerkasTerenkripsi(_BerkasAtomik, PenulisTerenkripsi):
+    def __init__(self, path, cincin=None):
+        self._path = path
+        self._path_tmp = path + ".tmp"
+        self._file = open(self._path_tmp, "wb")
+        super().__init__(self._file, cincin)
+
+    def close(self):
+        if not self.closed:
+            super().close()
+            self._selesai()
+
+
+class _BerkasPolos(_BerkasAtomik, io.RawIOBase):
+    def __init__(self, path):
+        super().__init__()
+        self._path = path
+        self._path_tmp = path + ".tmp"
+        self._file = open(self._path_tmp, "wb")
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._file.tell()
+
+    def write(self, data):
+        return self._file.write(data)
+
+    def close(self):
+        if not self.closed:
+            io.RawIOBase.close(self)
+            self._selesai()
+
+
+def enkripsi_bytes(data, cincin=None):
+    keluaran = io.BytesIO()
+    with PenulisTerenkripsi(keluaran, cincin) as w:
+        w.write(data)
+    return keluaran.getvalue()
+
+
+def dekripsi_bytes(blob, cincin=None):
+    return b"".join(iter_dekripsi(io.BytesIO(blob), cincin))
+
+
+def terenkripsi(blob):
+    return isinstance(blob, (bytes, bytearray, memoryview)) and bytes(blob[:len(MAGIC)]) == MAGIC
+
+
+# =============================================================================
+# ROTASI
+# =============================================================================
+def bungkus_ulang_header(header, cincin):
+    """Header baru: DEK sama dibungkus KEK aktif (isi tidak perlu dienkripsi ulang)"""
+    dek, prefix = _urai_header(header, cincin)
+    id_kek, nonce_bungkus, terbungkus = cincin.bungkus(dek)
+    return _HEADER.pack(MAGIC, id_kek, nonce_bungkus, terbungkus, prefix)
+
+
+def rotasi_blob(blob, cincin, penuh=False):
+    """Blob record -> blob dengan kunci aktif; plaintext lama (bukan blob) ikut dienkripsi"""
+    if not terenkripsi(blob):
+        return enkripsi_bytes(blob if isinstance(blob, bytes) else blob.encode("utf-8"), cincin)
+    if penuh:
+        return enkripsi_bytes(dekripsi_bytes(blob, cincin), cincin)
+    return bungkus_ulang_header(bytes(blob[:UKURAN_HEADER]), cincin) + bytes(blob[UKURAN_HEADER:])
+
+
+def rotasi_berkas(path, cincin, penuh=False):
+    """
+    Rotasi satu berkas: header ditimpa di tempat, atau (--penuh / berkas lama
+    yang belum terenkripsi) enkripsi ulang streaming dengan DEK baru
+    """
+    with open(path, "rb") as f:
+        header = f.read(UKURAN_HEADER)
+    if penuh or not terenkripsi(header):
+        with buka_baca(path, cincin) as src, _BerkasTerenkripsi(path, cincin) as dst:
+            while True:
+                data = src.read(UKURAN_CHUNK)
+                if not data:
+                    break
+                dst.write(data)
+        return
+    with open(path, "r+b") as f:
+        f.write(bungkus_ulang_header(header, cincin))
+
+
+_rotasi_path_arsip = None
+_rotasi_penuh = False
+
+
+def _init_rotasi(path_arsip, penuh):
+    global _rotasi_path_arsip, _rotasi_penuh
+    _rotasi_path_arsip = path_arsip
+    _rotasi_penuh = penuh
+
+
+def _rotasi_rentang(tugas):
+    """
+    Worker: hitung blob baru untuk (tabel, awal, akhir) - record kasus atau
+    lampiran outbox kiriman id (awal, akhir]; penulisan di proses utama
+    """
+    tabel, awal, akhir = tugas
+    cincin = muat_cincin()
+    arsip = Arsip(_rotasi_path_arsip)
+    try:
+        baca = arsip.iter_blob_kasus if tabel == "kasus" else arsip.iter_lampiran_kiriman
+        return tabel, [(baris_id, versi, rotasi_blob(blob, cincin, _rotasi_penuh))
+                       for baris_id, versi, blob in baca(awal, akhir)]
+    finally:
+        arsip.close()
+
+
+def _rotasi_berkas_worker(path):
+    rotasi_berkas(path, muat_cincin(), _rotasi_penuh)
+    return path
+
+
+def rotasi_arsip(path_arsip=None, direktori_berkas=(), penuh=False, proses=None, ukuran_rentang=2000):
+    """
+    Rotasi paralel: seluruh record arsip, lampiran outbox kiriman dan berkas di
+    direktori_berkas (termasuk yang masih plaintext) dipindahkan ke kunci aktif,
+    sehingga kiriman yang masih antri tetap terbaca setelah kunci lama dihapus.
+    Aman dijalankan saat app/worker hidup: record/lampiran yang ditulis ulang
+    selagi rotasi berjalan tidak ditimpa (sudah memakai kunci aktif; dihitung
+    'dilewati').
+    """
+    path_arsip = path_arsip or ARSIP_PATH
+    arsip = Arsip(path_arsip)
+    rentang = []
+    for tabel, ukuran in (("kasus", ukuran_rentang), ("kiriman", max(1, ukuran_rentang // 10))):
+        id_min, id_maks = arsip.rentang_id(tabel)
+        if id_maks:
+            rentang += [(tabel, a, min(a + ukuran, id_maks)) for a in range(id_min - 1, id_maks, ukuran)]
+    berkas = [os.path.join(d, n) for d in direktori_berkas if os.path.isdir(d)
+              for n in os.listdir(d) if not n.endswith(".tmp")]
+
+    mulai = time.perf_counter()
+    jumlah = {'kasus': 0, 'kiriman': 0}
+    n_dilewati = 0
+    tulis = {'kasus': arsip.tulis_blob_kasus, 'kiriman': arsip.tulis_lampiran_kiriman}
+    try:
+        with multiprocessing.Pool(proses, initializer=_init_rotasi, initargs=(path_arsip, penuh)) as pool:
+            for tabel, baris in pool.imap_unordered(_rotasi_rentang, rentang):
+                ditulis = tulis[tabel](baris)
+                jumlah[tabel] += ditulis
+                n_dilewati += len(baris) - ditulis
+            n_berkas = sum(1 for _ in pool.imap_unordered(_rotasi_berkas_worker, berkas))
+    finally:
+        arsip.close()
+    return {'record': jumlah['kasus'], 'lampiran_kiriman': jumlah['kiriman'], 'dilewati': n_dilewati,
+            'berkas': n_berkas, 'penuh': penuh,
+            'durasi_detik': round(time.perf_counter() - mulai, 2)}
+
+
+def main():
+    from antrian import KELUARAN_DIR
+    from gudang import GUDANG_DIR
+    from ruang_kerja import RUANG_KERJA_DIR
+
+    parser = argparse.ArgumentParser(description="Kunci & rotasi enkripsi arsip TAT")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    sub.add_parser("kunci-baru", help="tambahkan kunci master baru sebagai kunci aktif")
+    p_rotasi = sub.add_parser("rotasi", help="pindahkan arsip & berkas ke kunci aktif")
+    p_rotasi.add_argument("--penuh", action="store_true", help="enkripsi ulang isi dengan DEK baru")
+    p_rotasi.add_argument("--proses", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.perintah == "kunci-baru":
+        path = os.environ.get("TAT_KUNCI_ARSIP_FILE", KUNCI_FILE_DEFAULT)
+        lama = _baca_daftar_kek()
+        path_tmp = path + ".tmp"
+        fd = os.open(path_tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write("\n".join(k.hex() for k in [secrets.token_bytes(32)] + lama) + "\n")
+        os.replace(path_tmp, path)
+        print(f"Kunci baru aktif; {len(lama)} kunci lama disimpan untuk membaca data lama. "
+              f"Jalankan 'python enkripsi.py rotasi' lalu hapus kunci lama dari {path}.")
+    else:
+        direktori = [KELUARAN_DIR] + [os.path.join(induk, d) for induk in (RUANG_KERJA_DIR, GUDANG_DIR)
+                                      for d in (os.listdir(induk) if os.path.isdir(induk) else [])]
+        print(json.dumps(rotasi_arsip(direktori_berkas=direktori, penuh=args.penuh, proses=args.proses),
+                         indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+=================================================================================
+GUDANG BLOB SURAT TAT (content-addressed, SHA-256)
+=================================================================================
+Surat yang sudah di-render (Word/PDF) disimpan sekali di disk dengan kunci
+SHA-256 isinya, sehingga unduhan dari arsip dan proses massal tidak perlu
+me-render ulang:
+
+    DATA_DIR/blob/ab/abcdef...      isi (terkompresi bila menguntungkan, lalu
+                                    terenkripsi kecuali TAT_ENKRIPSI=0)
+    DATA_DIR/blob/indeks.sqlite3    blob(sha256, ukuran, kompresi, jumlah_ref)
+                                    + referensi(nama -> sha256)
+
+- Deduplikasi: render ulang yang menghasilkan bytes identik hanya menambah
+  referensi, tidak menulis berkas baru.
+- Referensi bernama (mis. "kasus/12.pdf"); menimpa referensi memindahkan
+  hitungannya ke blob baru. Blob tanpa referensi dihapus oleh gc().
+- Kompresi deflate (zlib) hanya dipakai bila menghemat >= 10%; .docx (ZIP)
+  dan PDF terkompresi disimpan apa adanya.
+- Baca zero-copy lewat mmap (memoryview) untuk blob yang tersimpan polos.
+
+    python gudang.py statistik
+    python gudang.py gc
+=================================================================================
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+import enkripsi
+from arsip import DATA_DIR
+
+GUDANG_DIR = os.path.join(DATA_DIR, "blob")
+KOMPRESI_MIN_HEMAT = 0.10
+LEVEL_ZLIB = 6
+
+SKEMA_GUDANG = """
+CREATE TABLE IF NOT EXISTS blob (
+    sha256 TEXT PRIMARY KEY,
+    ukuran INTEGER NOT NULL,          -- bytes asli
+    ukuran_simpan INTEGER NOT NULL,   -- bytes di disk
+    kompresi TEXT,                    -- 'zlib' atau NULL
+    jumlah_ref INTEGER NOT NULL DEFAULT 0,
+    dibuat REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_blob_tanpa_ref ON blob(jumlah_ref) WHERE jumlah_ref = 0;
+
+CREATE TABLE IF NOT EXISTS referensi (
+    nama TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_referensi_sha256 ON referensi(sha256);
+"""
+
+
+def ref_surat(kasus_id, format_surat):
+    """Nama referensi baku untuk surat satu kasus arsip ('docx' / 'pdf')"""
+    return f"kasus/{kasus_id}.{format_surat}"
+
+
+class GudangBlob:
+    """Akses gudang blob; aman dipakai bersama antar thread dan antar proses."""
+
+    def __init__(self, direktori=None):
+        self.direktori = direktori or GUDANG_DIR
+        os.makedirs(self.direktori, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(self.direktori, "indeks.sqlite3"), timeout=30,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SKEMA_GUDANG)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _path(self, sha):
+        return os.path.join(self.direktori, sha[:2], sha)
+
+    @contextmanager
+    def _transaksi(self):
+        # BEGIN IMMEDIATE: simpan & gc antar proses saling menunggu, sehingga
+        # berkas tidak pernah dihapus gc di antara pemeriksaan dan penambahan referensi
+        with self._lock:
+            c = self._conn
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                yield c
+                c.execute("COMMIT")
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+
+    def _tulis_berkas(self, sha, isi):
+        """Tulis isi ke disk (atomik); kembalikan (ukuran_simpan, kompresi)"""
+        kompresi = None
+        padat = zlib.compress(isi, LEVEL_ZLIB)
+        if len(padat) <= len(isi) * (1 - KOMPRESI_MIN_HEMAT):
+            isi, kompresi = padat, 'zlib'
+        path = self._path(sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with enkripsi.buka_tulis(path) as f:
+            f.write(isi)
+        return os.path.getsize(path), kompresi
+
+    @staticmethod
+    def _pindah_ref(c, sha_lama, sha_baru):
+        if sha_lama == sha_baru:
+            return
+        if sha_lama is not None:
+            c.execute("UPDATE blob SET jumlah_ref = jumlah_ref - 1 WHERE sha256 = ?", (sha_lama,))
+        if sha_baru is not None:
+            c.execute("UPDATE blob SET jumlah_ref = jumlah_ref + 1 WHERE sha256 = ?", (sha_baru,))
+
+    # -------------------------------------------------------------------------
+    # TULIS
+    # -------------------------------------------------------------------------
+    def simpan(self, isi, referensi=None):
+        """
+        Simpan isi (bytes/BytesIO) dan kembalikan SHA-256-nya. Bila referensi
+        diberikan, referensi itu diarahkan ke blob ini (blob lamanya dilepas).
+        Blob tanpa referensi ikut terhapus pada gc() berikutnya.
+        """
+        if hasattr(isi, 'getbuffer'):
+            isi = isi.getbuffer()
+        sha = hashlib.sha256(isi).hexdigest()
+        with self._transaksi() as c:
+            ada = c.execute("SELECT 1 FROM blob WHERE sha256 = ?", (sha,)).fetchone()
+            if ada is None or not os.path.exists(self._path(sha)):
+                ukuran_simpan, kompresi = self._tulis_berkas(sha, isi)
+                c.execute(
+                    "INSERT INTO blob (sha256, ukuran, ukuran_simpan, kompresi, dibuat) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT(sha256) DO UPDATE SET "
+                    "ukuran_simpan = excluded.ukuran_simpan, kompresi = excluded.kompresi",
+                    (sha, len(isi), ukuran_simpan, kompresi, time.time())
+                )
+            if referensi is not None:
+                lama = c.execute("SELECT sha256 FROM referensi WHERE nama = ?", (referensi,)).fetchone()
+                c.execute("INSERT OR REPLACE INTO referensi (nama, sha256) VALUES (?, ?)", (referensi, sha))
+                self._pindah_ref(c, lama[0] if lama else None, sha)
+        return sha
+
+    def lepas(self, referensi):
+        """Hapus referensi; blobnya dihapus gc() bila tidak ada referensi lain"""
+        with self._transaksi() as c:
+            lama = c.execute("DELETE FROM referensi WHERE nama = ? RETURNING sha256", (referensi,)).fetchone()
+            if lama is not None:
+                self._pindah_ref(c, lama[0], None)
+
+    def gc(self):
+        """Hapus semua blob tanpa referensi; kembalikan (jumlah, bytes_dibebaskan)"""
+        jumlah = dibebaskan = 0
+        with self._transaksi() as c:
+            for sha, ukuran_simpan in c.execute(
+                    "DELETE FROM blob WHERE jumlah_ref <= 0 RETURNING sha256, ukuran_simpan").fetchall():
+                try:
+                    os.remove(self._path(sha))
+                except FileNotFoundError:
+                    pass
+                jumlah += 1
+                dibebaskan += ukuran_simpan
+        return jumlah, dibebaskan
+
+    # -------------------------------------------------------------------------
+    # BACA
+    # -------------------------------------------------------------------------
+    def cari(self, referensi):
+        """SHA-256 blob yang ditunjuk referensi, atau None"""
+        with self._lock:
+            row = self._conn.execute("SELECT sha256 FROM referensi WHERE nama = ?", (referensi,)).fetchone()
+        return row[0] if row else None
+
+    def _info(self, sha):
+        with self._lock:
+            row = self._conn.execute("SELECT kompresi FROM blob WHERE sha256 = ?", (sha,)).fetchone()
+        if row is None:
+            raise KeyError(sha)
+        return row['kompresi']
+
+    @contextmanager
+    def buka(self, sha):
+        """
+        Isi blob sebagai buffer read-only selama blok `with`. Blob polos tak
+        terkompresi dipetakan langsung (mmap, tanpa salinan); selain itu
+        didekripsi/didekompresi ke memori.
+        """
+        kompresi = self._info(sha)
+        with open(self._path(sha), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield memoryview(b"")
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if kompresi is None and not enkripsi.terenkripsi(mm[:len(enkripsi.MAGIC)]):
+                    view = memoryview(mm)
+                    try:
+                        yield view
+                    finally:
+                        view.release()
+                    return
+        with enkripsi.buka_baca(self._path(sha)) as f:
+            isi = f.read()
+        yield memoryview(zlib.decompress(isi) if kompresi == 'zlib' else isi)
+
+    def baca(self, sha):
+        """Isi blob sebagai bytes (untuk API yang butuh bytes, mis. st.download_button)"""
+        with self.buka(sha) as view:
+            return bytes(view)
+
+    def statistik(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(ukuran), 0), COALESCE(SUM(ukuran_simpan), 0), "
+                "COALESCE(SUM(jumlah_ref <= 0), 0), COALESCE(SUM(jumlah_ref), 0) FROM blob"
+            ).fetchone()
+        return {'blob': row[0], 'bytes_asli': row[1], 'bytes_disk': row[2],
+                'tanpa_ref': row[3], 'referensi': row[4]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gudang blob surat TAT")
+    parser.add_argument("perintah", choices=["statistik", "gc"])
+    parser.add_argument("--direktori", default=None, help=f"default {GUDANG_DIR}")
+    args = parser.parse_args()
+
+    gudang = GudangBlob(args.direktori)
+    try:
+        if args.perintah == "gc":
+            jumlah, dibebaskan = gudang.gc()
+            print(f"{jumlah} blob dihapus, {dibebaskan / 1024 / 1024:.1f} MB dibebaskan")
+        else:
+            for k, v in gudang.statistik().items():
+                print(f"{k:<11}: {v}")
+    finally:
+        gudang.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+=================================================================================
+IMPOR MASSAL SURAT TAT LAMA (.docx) KE ARSIP
+=================================================================================
+Mengurai surat hasil TAT yang dibuat dengan template generate_word_document
+kembali menjadi record berbentuk data_lengkap (tabel identitas, kesimpulan
+poin a/b, rekomendasi) lalu menyimpannya ke arsip.
+
+    python impor_surat.py /path/folder_surat [--proses 8] [--batch 200]
+
+- Parsing paralel (pool proses) langsung dari word/document.xml (zipfile +
+  ElementTree), tanpa memuat python-docx per file.
+- Hanya proses utama yang menulis ke SQLite, per batch dalam satu transaksi
+  bersama checkpoint impor_surat -> aman dihentikan kapan saja; menjalankan
+  ulang perintah yang sama melanjutkan dari file yang belum tercatat.
+- File yang isinya identik (SHA-256 sama) hanya diimpor sekali.
+- Field identitas divalidasi per batch dengan skema yang sama dengan form UI
+  (validasi.py, bentuk kolom pandas); surat yang gagal dicatat 'tidak_valid'.
+
+Record hasil impor ditandai data['impor'] = {'file', 'sha256'}. Field yang tidak
+tertulis di surat (barang bukti, riwayat, jawaban DSM-5, dst.) dibiarkan kosong;
+dsm5_count diisi nilai representatif kategori keparahan yang tertulis.
+=================================================================================
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+import zipfile
+from datetime import datetime
+from io import BytesIO
+from multiprocessing import Pool
+from xml.etree import ElementTree
+
+import pandas as pd
+
+from arsip import Arsip, ARSIP_PATH
+from validasi import VALIDATOR_SURAT_LAMA
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Nilai dsm5_count representatif per kategori (lihat analyze_medical_data)
+DSM5_PER_KEPARAHAN = {"Tidak Ada": 0, "Ringan": 2, "Sedang": 4, "Berat": 6}
+
+BULAN = {
+    "januari": 1, "februari": 2, "maret": 3, "april": 4, "mei": 5, "juni": 6, "juli": 7,
+    "agustus": 8, "september": 9, "oktober": 10, "november": 11, "desember": 12,
+    "january": 1, "february": 2, "march": 3, "may": 5, "june": 6, "july": 7,
+    "august": 8, "october": 10, "december": 12,
+}
+
+RE_NOMOR = re.compile(r"^Nomor\t+: (.+)$", re.M)
+# "<tempat surat tenant>, 12 Maret 2025" (Tarakan untuk tenant bawaan)
+RE_TANGGAL_SURAT = re.compile(r"^[A-Z][\w .'-]*, (\d{1,2} \w+ \d{4})$", re.M)
+RE_PENERIMA = re.compile(r"Kepada\nYth\. (.+?)\ndi\nTempat", re.S)
+RE_RUJUKAN = re.compile(
+    r"^(?:e\. )?Surat (.+?) Nomor: (.+?) tanggal (.+?) perihal Permohonan Asesmen Terpadu\.$", re.M
+)
+RE_KESIMPULAN_A = re.compile(
+    r"^a\. Bahwa tersangka/terdakwa a\.n\. .+? merupakan penyalahguna narkotika golongan I "
+    r"yaitu (.*?) untuk diri sendiri dengan pola pemakaian (.+?) kategori (.+?), "
+    r"didiagnosis (.+) \(([^()]+)\)\.$", re.M
+)
+RE_KESIMPULAN_B = re.compile(
+    r"^b\. Bahwa tersangka/terdakwa a\.n\. .+? (Tidak didapatkan|Didapatkan.*?) "
+    r"indikasi keterlibatan dalam jaringan", re.M
+)
+RE_REKOMENDASI_REHAB = re.compile(
+    r"^a\. Terhadap tersangka/terdakwa a\.n\. .+? agar dilakukan perawatan dan pemulihan dengan "
+    r"(.+?) sebanyak (.+?) di (.+)\.$", re.M
+)
+RE_REKOMENDASI_HUKUM = re.compile(r"^a\. Terhadap tersangka/terdakwa a\.n\. .+? agar (.+)\.$", re.M)
+# Poin b rekomendasi tidak punya kata penanda setelah nama -> pola dibentuk per surat
+POLA_TINDAK_LANJUT = r"^b\. Terhadap perkara tersangka/terdakwa a\.n\. {nama} (.+)\.$"
+RE_TTD = re.compile(r"Ditandatangani Secara Elektronik Oleh:\n+(.+?)\n+(.+?)\nNIP\. (.+)$", re.M)
+
+LABEL_IDENTITAS = {
+    "Nama": "nama",
+    "NIK": "nik",
+    "Jenis Kelamin": "jenis_kelamin",
+    "Kewarganegaraan": "kewarganegaraan",
+    "Alamat": "alamat",
+}
+
+_aturan = None
+
+
+class SuratTidakDikenali(ValueError):
+    """Dokumen bukan surat TAT atau formatnya tidak cocok dengan template"""
+
+
+# =============================================================================
+# PARSING (dijalankan di worker)
+# =============================================================================
+def _teks_paragraf(p):
+    bagian = []
+    for el in p.iter():
+        if el.tag == W + "t":
+            bagian.append(el.text or "")
+        elif el.tag == W + "tab":
+            bagian.append("\t")
+        elif el.tag in (W + "br", W + "cr"):
+            bagian.append("\n")
+    return "".join(bagian)
+
+
+def baca_docx(isi):
+    """(teks paragraf tingkat body digabung newline, list baris tabel [sel, ...])"""
+    with zipfile.ZipFile(BytesIO(isi)) as z:
+        root = ElementTree.fromstring(z.read("word/document.xml"))
+    body = root.find(W + "body")
+    if body is None:
+        raise SuratTidakDikenali("word/document.xml tanpa body")
+
+    paragraf = []
+    baris_tabel = []
+    for el in body:
+        if el.tag == W + "p":
+            paragraf.append(_teks_paragraf(el))
+        elif el.tag == W + "tbl":
+            for tr in el.iter(W + "tr"):
+                baris_tabel.append([
+                    "\n".join(_teks_paragraf(p) for p in tc.iter(W + "p"))
+                    for tc in tr.iter(W + "tc")
+                ])
+    return "\n".join(paragraf), baris_tabel
+
+
+def _cari(pola, teks, nama_field, wajib=True):
+    m = pola.search(teks)
+    if m is None and wajib:
+        raise SuratTidakDikenali(f"{nama_field} tidak ditemukan")
+    return m
+
+
+def _ke_timestamp(tanggal):
+    """'15 Desember 2025' / '15 December 2025' -> '2025-12-15 00:00:00' (None bila gagal)"""
+    bagian = tanggal.strip().split()
+    if len(bagian) != 3 or bagian[1].lower() not in BULAN:
+        return None
+    try:
+        return datetime(int(bagian[2]), BULAN[bagian[1].lower()], int(bagian[0])).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def _rule_dari_rekomendasi(rekomendasi):
+    for rule_id, keluaran in _aturan.items():
+        if keluaran['rekomendasi'] == rekomendasi:
+            return rule_id
+    return ""
+
+
+def urai_surat(isi, nama_file=""):
+    """Urai bytes .docx surat TAT menjadi dict hasil {data, medical, legal, recommendation, timestamp}"""
+    teks, baris_tabel = baca_docx(isi)
+
+    identitas = {}
+    for sel in baris_tabel:
+        if len(sel) >= 2:
+            identitas[sel[0].strip()] = sel[1].strip().removeprefix(":").strip()
+    if "Nama" not in identitas:
+        raise SuratTidakDikenali("tabel identitas tidak ditemukan")
+
+    data = {LABEL_IDENTITAS[label]: nilai for label, nilai in identitas.items() if label in LABEL_IDENTITAS}
+    tempat, _, tgl = identitas.get("Tempat/Tgl Lahir", "").rpartition(", ")
+    data['tempat_lahir'] = tempat
+    data['tanggal_lahir'] = tgl
+
+    data['nomor_surat'] = _cari(RE_NOMOR, teks, "Nomor surat").group(1).strip()
+    m = _cari(RE_TANGGAL_SURAT, teks, "Tanggal surat", wajib=False)
+    data['tanggal_surat'] = m.group(1).strip() if m else ""
+    m = _cari(RE_PENERIMA, teks, "Penerima", wajib=False)
+    data['penerima_surat'] = m.group(1).strip() if m else ""
+
+    m = _cari(RE_RUJUKAN, teks, "Rujukan surat pemohon", wajib=False)
+    if m:
+        data['instansi_pemohon'] = m.group(1).strip()
+        data['nomor_surat_pemohon'] = m.group(2).strip()
+        data['tanggal_surat_pemohon'] = m.group(3).strip()
+    else:
+        data['instansi_pemohon'] = data['nomor_surat_pemohon'] = data['tanggal_surat_pemohon'] = ""
+    data['instansi_penyidik'] = data['instansi_pemohon']
+
+    # Kesimpulan a (medis) & b (hukum)
+    m = _cari(RE_KESIMPULAN_A, teks, "Kesimpulan poin a")
+    jenis_positif = [j.strip() for j in m.group(1).split(",") if j.strip()]
+    severity_level = m.group(3).strip()
+    medical = {
+        'dsm5_count': DSM5_PER_KEPARAHAN.get(severity_level, 0),
+        'severity_level': severity_level,
+        'diagnosis_code': m.group(5).strip(),
+        'diagnosis': m.group(4).strip(),
+        'pola_penggunaan': m.group(2).strip(),
+    }
+    keterlibatan = _cari(RE_KESIMPULAN_B, teks, "Kesimpulan poin b").group(1).strip()
+
+    # Rekomendasi
+    re_tindak_lanjut = re.compile(POLA_TINDAK_LANJUT.format(nama=re.escape(data['nama'])), re.M)
+    tindak_lanjut = _cari(re_tindak_lanjut, teks, "Rekomendasi poin b").group(1).strip()
+    m = RE_REKOMENDASI_REHAB.search(teks)
+    if m:
+        rekomendasi = m.group(1).strip()
+        durasi = m.group(2).strip()
+        tempat_wl = m.group(3)
+        # Tempat & wajib lapor dipisah " dan "; pakai tempat aturan yang dikenal bila cocok
+        rule_id = _rule_dari_rekomendasi(rekomendasi)
+        tempat_aturan = _aturan.get(rule_id, {}).get('tempat', '')
+        if tempat_aturan and tempat_wl.startswith(tempat_aturan + " dan "):
+            tempat_rehab, wajib_lapor = tempat_aturan, tempat_wl[len(tempat_aturan) + 5:]
+        else:
+            tempat_rehab, _, wajib_lapor = tempat_wl.partition(" dan ")
+    else:
+        _cari(RE_REKOMENDASI_HUKUM, teks, "Rekomendasi poin a")
+        rekomendasi, durasi, tempat_rehab, wajib_lapor = "Proses Hukum", "-", "-", "-"
+        rule_id = _rule_dari_rekomendasi(rekomendasi)
+
+    m = _cari(RE_TTD, teks, "Penandatangan", wajib=False)
+    data['jabatan_penandatangan'] = m.group(1).strip() if m else ""
+    data['nama_penandatangan'] = m.group(2).strip() if m else ""
+    data['nip_penandatangan'] = m.group(3).strip() if m else ""
+
+    data.update({
+        'jenis_narkotika_digunakan': jenis_positif,
+        'hasil_urine': "Positif" if jenis_positif else "Negatif",
+        'jenis_narkotika_positif': jenis_positif,
+        'jenis_narkotika_utama': jenis_positif[0] if jenis_positif else "",
+        'dsm5_count': medical['dsm5_count'],
+        'diagnosis_code': medical['diagnosis_code'],
+        'pola_penggunaan': medical['pola_penggunaan'],
+        'barang_bukti_jenis': [],
+        'barang_bukti_detail': {},
+        'enable_sema_evaluation': False,
+        'impor': {'file': nama_file, 'sha256': hashlib.sha256(isi).hexdigest()},
+    })
+
+    return {
+        'data': data,
+        'medical': medical,
+        'legal': {
+            'keterlibatan_jaringan': keterlibatan,
+            'barang_bukti': [],
+            'sema_result': {"sema_exceeded": [], "sema_within": [], "unit_issues": [], "non_sema_items": []},
+        },
+        'recommendation': {
+            'rekomendasi': rekomendasi,
+            'durasi': durasi,
+            'tempat': tempat_rehab.strip(),
+            'tindak_lanjut': tindak_lanjut,
+            'wajib_lapor': wajib_lapor.strip(),
+            'rule_id': rule_id,
+        },
+        'timestamp': _ke_timestamp(data['tanggal_surat']),
+    }
+
+
+def _init_worker(aturan):
+    global _aturan
+    _aturan = aturan
+
+
+def _proses_file(entri):
+    """Worker: baca + urai satu file; galat dikembalikan sebagai status, bukan exception"""
+    path, ukuran, mtime = entri
+    item = {'path': path, 'ukuran': ukuran, 'mtime': mtime, 'sha256': None, 'hasil': None}
+    try:
+        with open(path, "rb") as f:
+            isi = f.read()
+        item['hasil'] = urai_surat(isi, os.path.basename(path))
+        item['sha256'] = item['hasil']['data']['impor']['sha256']
+        item['status'], item['pesan'] = 'ok', None
+    except SuratTidakDikenali as e:
+        item['status'], item['pesan'] = 'tidak_dikenali', str(e)
+    except (OSError, zipfile.BadZipFile, ElementTree.ParseError, KeyError) as e:
+        item['status'], item['pesan'] = 'rusak', f"{type(e).__name__}: {e}"
+    return item
+
+
+# =============================================================================
+# PROSES UTAMA
+# =============================================================================
+def cari_file(akar):
+    """Generator (path_absolut, ukuran, mtime) semua .docx di bawah akar (rekursif)"""
+    tumpukan = [akar]
+    while tumpukan:
+        with os.scandir(tumpukan.pop()) as it:
+            for entri in it:
+                if entri.is_dir(follow_symlinks=False):
+                    tumpukan.append(entri.path)
+                elif entri.name.lower().endswith(".docx") and not entri.name.startswith("~$"):
+                    st = entri.stat()
+                    yield os.path.abspath(entri.path), st.st_size, st.st_mtime
+
+
+def impor_folder(akar, path_arsip=None, proses=None, batch=200, laporan=None):
+    """
+    Impor semua .docx di bawah akar. laporan: callable(ringkasan) dipanggil tiap
+    batch tersimpan. Kembalikan ringkasan dict (jumlah per status, durasi).
+    """
+    import app
+
+    arsip = Arsip(path_arsip or ARSIP_PATH)
+    try:
+        sudah = arsip.file_terimpor()
+        antre = [e for e in cari_file(akar) if sudah.get(e[0]) != (e[1], e[2])]
+        ringkasan = {'total': len(antre), 'dilewati': len(sudah), 'diproses': 0,
+                     'ok': 0, 'duplikat': 0, 'tidak_dikenali': 0, 'tidak_valid': 0, 'rusak': 0}
+        mulai = time.perf_counter()
+
+        with Pool(proses, initializer=_init_worker, initargs=(app.ATURAN_REKOMENDASI,)) as pool:
+            tertunda = []
+            for item in pool.imap_unordered(_proses_file, antre, chunksize=16):
+                tertunda.append(item)
+                if len(tertunda) >= batch:
+                    _simpan_batch(arsip, tertunda, ringkasan, mulai, laporan)
+                    tertunda = []
+            if tertunda:
+                _simpan_batch(arsip, tertunda, ringkasan, mulai, laporan)
+
+        ringkasan['durasi_detik'] = round(time.perf_counter() - mulai, 2)
+        return ringkasan
+    finally:
+        arsip.close()
+
+
+def _validasi_batch(tertunda):
+    """Tandai item 'ok' yang datanya melanggar skema sebagai 'tidak_valid' (satu DataFrame per batch)"""
+    ok = [i for i, item in enumerate(tertunda) if item['status'] == 'ok']
+    if not ok:
+        return
+    df = pd.DataFrame([tertunda[i]['hasil']['data'] for i in ok], index=ok)
+    for i, pesan in VALIDATOR_SURAT_LAMA.dataframe(df).groupby('baris', sort=False)['pesan']:
+        tertunda[i].update(status='tidak_valid', pesan="; ".join(pesan), hasil=None)
+
+
+def _simpan_batch(arsip, tertunda, ringkasan, mulai, laporan):
+    _validasi_batch(tertunda)
+    for status, jumlah in arsip.simpan_impor(tertunda).items():
+        ringkasan[status] += jumlah
+    ringkasan['diproses'] += len(tertunda)
+    if laporan:
+        ringkasan['durasi_detik'] = round(time.perf_counter() - mulai, 2)
+        laporan(ringkasan)
+
+
+def _cetak_kemajuan(r):
+    laju = r['diproses'] / r['durasi_detik'] if r['durasi_detik'] else 0.0
+    sisa = (r['total'] - r['diproses']) / laju if laju else 0.0
+    print(f"\r{r['diproses']}/{r['total']} file | ok {r['ok']} | duplikat {r['duplikat']} | "
+          f"tidak dikenali {r['tidak_dikenali']} | tidak valid {r['tidak_valid']} | rusak {r['rusak']} | "
+          f"{laju:.0f} file/s | sisa ~{sisa:.0f} s", end="", file=sys.stderr, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Impor massal surat TAT lama (.docx) ke arsip")
+    parser.add_argument("folder", help="folder berisi surat .docx (dipindai rekursif)")
+    parser.add_argument("--arsip", default=ARSIP_PATH)
+    parser.add_argument("--proses", type=int, default=None, help="jumlah proses parser (default: jumlah CPU)")
+    parser.add_argument("--batch", type=int, default=200, help="file per transaksi arsip")
+    args = parser.parse_args()
+
+    ringkasan = impor_folder(args.folder, args.arsip, args.proses, args.batch, laporan=_cetak_kemajuan)
+    print(file=sys.stderr)
+    print(f"Selesai: {ringkasan['ok']} diimpor, {ringkasan['duplikat']} duplikat, "
+          f"{ringkasan['tidak_dikenali']} tidak dikenali, {ringkasan['tidak_valid']} tidak valid, "
+          f"{ringkasan['rusak']} rusak, "
+          f"{ringkasan['dilewati']} sudah tercatat sebelumnya ({ringkasan['durasi_detik']} s)")
+    print("Daftar file gagal: SELECT path, status, pesan FROM impor_surat WHERE status NOT IN ('ok', 'duplikat')")
+
+
+if __name__ == "__main__":
+    main()
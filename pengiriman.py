@@ -0,0 +1,257 @@
+"""
+=================================================================================
+PENGIRIMAN SURAT TAT KE INSTANSI PEMOHON (OUTBOX + WORKER SMTP)
+=================================================================================
+Saat surat ditandatangani, aplikasi menulis kiriman ke tabel outbox `kiriman`
+di arsip dalam transaksi yang sama dengan register surat; submit asesor tidak
+menunggu I/O email. Worker terpisah mengirim isi outbox:
+
+    python pengiriman.py worker            # kirim terus-menerus
+    python pengiriman.py status            # kiriman terbaru
+    python pengiriman.py smtp-uji          # server SMTP lokal untuk uji coba
+
+- Kiriman jatuh tempo untuk penerima yang sama digabung menjadi satu email
+  (beberapa lampiran), satu koneksi SMTP dipakai ulang antar batch.
+- Gagal sementara (koneksi putus, balasan 4xx seperti greylisting 450/451):
+  dicoba lagi dengan backoff eksponensial; pengirim/penerima/isi ditolak
+  server dengan kode 5xx: gagal permanen, terlihat di status.
+- Pengiriman at-least-once: batch yang sudah terkirim tetapi worker mati
+  sebelum mencatatnya akan terkirim ulang setelah sewa klaim habis.
+
+Konfigurasi SMTP lewat env: TAT_SMTP_HOST, TAT_SMTP_PORT, TAT_SMTP_USER,
+TAT_SMTP_PASS, TAT_SMTP_STARTTLS (1/0), TAT_SMTP_PENGIRIM. Untuk uji coba
+jalankan `smtp-uji` lalu set TAT_SMTP_HOST=localhost TAT_SMTP_PORT=1025;
+email yang diterima disimpan sebagai file .eml.
+=================================================================================
+"""
+
+import argparse
+import os
+import smtplib
+import socketserver
+import sys
+import time
+import traceback
+import uuid
+from datetime import datetime
+from email.message import EmailMessage
+
+from arsip import Arsip, DATA_DIR
+
+SMTP_HOST = os.environ.get("TAT_SMTP_HOST", "localhost")
+SMTP_PORT = int(os.environ.get("TAT_SMTP_PORT", "1025"))
+SMTP_USER = os.environ.get("TAT_SMTP_USER", "")
+SMTP_PASS = os.environ.get("TAT_SMTP_PASS", "")
+SMTP_STARTTLS = os.environ.get("TAT_SMTP_STARTTLS", "0") == "1"
+SMTP_PENGIRIM = os.environ.get("TAT_SMTP_PENGIRIM", "tat@localhost")
+
+MAKS_PERCOBAAN = 8
+BACKOFF_DASAR = 30      # detik; percobaan ke-n menunggu BACKOFF_DASAR * 2**(n-1)
+BACKOFF_MAKS = 3600
+KOTAK_UJI_DIR = os.path.join(DATA_DIR, "kotak_surat_uji")
+
+
+def susun_email(batch):
+    """Satu EmailMessage untuk satu penerima dengan semua surat di batch sebagai lampiran"""
+    pertama = batch[0]
+    msg = EmailMessage()
+    msg['From'] = SMTP_PENGIRIM
+    msg['To'] = pertama['penerima']
+    if len(batch) == 1:
+        msg['Subject'] = pertama['subjek']
+    else:
+        msg['Subject'] = f"Hasil Asesmen Terpadu ({len(batch)} surat)"
+    daftar = "\n".join(f"- {k['subjek']}" for k in batch)
+    msg.set_content(
+        f"Yth. {pertama['nama_penerima'] or pertama['penerima']},\n\n"
+        f"Bersama ini kami sampaikan surat hasil Asesmen Terpadu berikut:\n{daftar}\n\n"
+        "Surat bertanda tangan elektronik; keaslian dapat diverifikasi melalui kode "
+        "verifikasi yang tercetak di setiap halaman, atau dengan file .sig terlampir "
+        "(tanda tangan Ed25519) dan kunci publik BNN Provinsi.\n"
+    )
+    for k in batch:
+        msg.add_attachment(k['lampiran'], maintype="application", subtype="pdf",
+                           filename=k['nama_lampiran'])
+        if k.get('tanda_tangan'):
+            msg.add_attachment(bytes.fromhex(k['tanda_tangan']), maintype="application",
+                               subtype="octet-stream", filename=f"{k['nama_lampiran']}.sig")
+    return msg
+
+
+def _backoff(percobaan):
+    return min(BACKOFF_DASAR * 2 ** (percobaan - 1), BACKOFF_MAKS)
+
+
+class _KoneksiSmtp:
+    """Koneksi SMTP yang dibuka saat dibutuhkan dan dipakai ulang antar batch"""
+
+    def __init__(self):
+        self._smtp = None
+
+    def kirim(self, msg):
+        if self._smtp is None:
+            smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+            if SMTP_STARTTLS:
+                smtp.starttls()
+            if SMTP_USER:
+                smtp.login(SMTP_USER, SMTP_PASS)
+            self._smtp = smtp
+        try:
+            self._smtp.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, OSError):
+            self.tutup()
+            raise
+
+    def tutup(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+def _kode_penolakan(e):
+    """
+    Kode balasan SMTP bila server menolak pengirim/penerima/isi email, selain
+    itu None. Beberapa penerima ditolak: kode terkecil (ada 4xx = sementara).
+    """
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return min((kode for kode, _ in e.recipients.values()), default=None)
+    if isinstance(e, (smtplib.SMTPSenderRefused, smtplib.SMTPDataError)):
+        return e.smtp_code
+    return None
+
+
+def kirim_batch(arsip, batch, koneksi):
+    """Kirim satu batch; catat hasilnya di outbox. True bila terkirim."""
+    ids = [k['id'] for k in batch]
+    # Lampiran .sig hanya untuk tanda tangan Ed25519 (128 hex); HMAC lama tak bisa diverifikasi penerima
+    for k in batch:
+        surat = arsip.cari_surat(k['sha256']) if k.get('sha256') else None
+        k['tanda_tangan'] = surat['tanda_tangan'] if surat and len(surat['tanda_tangan']) == 128 else None
+    try:
+        koneksi.kirim(susun_email(batch))
+    except Exception as e:
+        kode = _kode_penolakan(e)
+        if kode is not None and kode >= 500:
+            arsip.kiriman_gagal(ids, f"ditolak server ({kode}): {e}")
+            return False
+        error = f"ditolak sementara ({kode}): {e}" if kode else traceback.format_exc(limit=3)
+        percobaan = max(k['percobaan'] for k in batch)
+        if percobaan >= MAKS_PERCOBAAN:
+            arsip.kiriman_gagal(ids, error)
+        else:
+            arsip.kiriman_gagal(ids, error, time.time() + _backoff(percobaan))
+        return False
+    arsip.kiriman_terkirim(ids)
+    return True
+
+
+def jalankan_worker(path_arsip=None, jeda=5.0, berhenti_jika_kosong=False):
+    """Loop worker: klaim batch per penerima, kirim, ulangi; tidur bila outbox kosong"""
+    arsip = Arsip(path_arsip)
+    koneksi = _KoneksiSmtp()
+    try:
+        while True:
+            batch = arsip.ambil_kiriman()
+            if not batch:
+                koneksi.tutup()
+                if berhenti_jika_kosong:
+                    return
+                time.sleep(jeda)
+                continue
+            ok = kirim_batch(arsip, batch, koneksi)
+            print(f"{datetime.now():%H:%M:%S} {'terkirim' if ok else 'gagal   '} "
+                  f"{batch[0]['penerima']} ({len(batch)} surat)", file=sys.stderr)
+    finally:
+        koneksi.tutup()
+        arsip.close()
+
+
+# =============================================================================
+# SERVER SMTP LOKAL UNTUK UJI COBA
+# =============================================================================
+class _SesiSmtpUji(socketserver.StreamRequestHandler):
+    """SMTP minimal (EHLO/MAIL/RCPT/DATA/RSET/NOOP/QUIT); tiap email disimpan ke file .eml"""
+
+    def _balas(self, teks):
+        self.wfile.write(f"{teks}\r\n".encode())
+
+    def handle(self):
+        self._balas("220 tat-smtp-uji siap")
+        penerima = []
+        while True:
+            baris = self.rfile.readline()
+            if not baris:
+                return
+            perintah = baris.decode("utf-8", "replace").strip()
+            kata = perintah.split(" ", 1)[0].upper()
+            if kata in ("EHLO", "HELO"):
+                self._balas("250 tat-smtp-uji")
+            elif kata == "MAIL":
+                penerima = []
+                self._balas("250 OK")
+            elif kata == "RCPT":
+                penerima.append(perintah.split(":", 1)[-1].strip(" <>"))
+                self._balas("250 OK")
+            elif kata == "DATA":
+                self._balas("354 akhiri dengan <CRLF>.<CRLF>")
+                isi = []
+                for baris in self.rfile:
+                    if baris in (b".\r\n", b".\n"):
+                        break
+                    isi.append(baris[1:] if baris.startswith(b"..") else baris)
+                os.makedirs(self.server.folder, exist_ok=True)
+                nama = f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}.eml"
+                with open(os.path.join(self.server.folder, nama), "wb") as f:
+                    f.writelines(isi)
+                print(f"diterima untuk {', '.join(penerima)} -> {nama}", file=sys.stderr)
+                self._balas("250 OK")
+            elif kata in ("RSET", "NOOP"):
+                self._balas("250 OK")
+            elif kata == "QUIT":
+                self._balas("221 selesai")
+                return
+            else:
+                self._balas("502 perintah tidak didukung")
+
+
+class ServerSmtpUji(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, alamat, folder=KOTAK_UJI_DIR):
+        super().__init__(alamat, _SesiSmtpUji)
+        self.folder = folder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pengiriman surat TAT (outbox)")
+    parser.add_argument("--arsip", default=None, help="path arsip SQLite")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    p_worker = sub.add_parser("worker", help="jalankan worker pengiriman")
+    p_worker.add_argument("--jeda", type=float, default=5.0, help="detik tidur saat outbox kosong")
+    sub.add_parser("status", help="tampilkan kiriman terbaru")
+    p_uji = sub.add_parser("smtp-uji", help="server SMTP lokal, email disimpan sebagai .eml")
+    p_uji.add_argument("--port", type=int, default=1025)
+    p_uji.add_argument("--folder", default=KOTAK_UJI_DIR)
+    args = parser.parse_args()
+
+    if args.perintah == "worker":
+        jalankan_worker(args.arsip, args.jeda)
+    elif args.perintah == "smtp-uji":
+        with ServerSmtpUji(("127.0.0.1", args.port), args.folder) as server:
+            print(f"SMTP uji di 127.0.0.1:{args.port}, email disimpan di {args.folder}", file=sys.stderr)
+            server.serve_forever()
+    else:
+        arsip = Arsip(args.arsip)
+        for k in arsip.status_kiriman():
+            error = (k['error'] or '').strip().splitlines()
+            print(f"#{k['id']:<6} kasus {k['kasus_id'] or '-':<6} {k['status']:<9} "
+                  f"x{k['percobaan']} {k['penerima']:<32} {error[-1] if error else ''}"[:160])
+        arsip.close()
+
+
+if __name__ == "__main__":
+    main()
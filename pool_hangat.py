@@ -0,0 +1,122 @@
+"""
+=================================================================================
+POOL WORKER HANGAT (PRE-FORK) - RENDER & ANALISIS TAT
+=================================================================================
+Proses induk memanaskan semua yang mahal SEKALI (impor ReportLab,
+python-docx, pandas; template kop Word & PDF per tenant; style paragraf;
+regulasi SEMA per tenant; tabel rekomendasi), lalu mem-fork
+worker dari keadaan hangat itu. Worker baru langsung siap merender surat:
+tidak ada impor ulang maupun penyusunan template.
+
+    python antrian.py worker --jumlah 4 --maks-tugas 200
+    python pool_hangat.py            # ukur waktu pemanasan
+
+- Worker didaur ulang setelah TAT_WORKER_MAKS_TUGAS pekerjaan (default 200)
+  untuk membatasi pertumbuhan memori; penggantinya di-fork lagi dari induk
+  yang masih hangat.
+- Butuh start method 'fork' (Linux). Di platform tanpa fork dipakai 'spawn'
+  dan pemanasan terjadi di tiap worker (tetap benar, hanya lebih lambat).
+=================================================================================
+"""
+
+import gc
+import multiprocessing
+import multiprocessing.connection
+import os
+import time
+
+MAKS_TUGAS = int(os.environ.get("TAT_WORKER_MAKS_TUGAS", "200"))
+JEDA_GAGAL = 1.0
+
+
+def konteks():
+    """Context multiprocessing: fork bila tersedia, selain itu spawn"""
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("spawn")
+
+
+def panaskan():
+    """
+    Impor pustaka dokumen dan bangun seluruh cache per proses, lalu render satu
+    surat contoh (Word + PDF) agar cache font/parser ikut terisi.
+    Mengembalikan durasi pemanasan (detik).
+    """
+    mulai = time.perf_counter()
+    import app
+    import tanda_tangan  # noqa: F401
+    from regresi import data_dasar
+
+    for tenant in app.REGISTRI.values():
+        app._word_kop_template(tenant)
+        app._pdf_kop(tenant)
+        app.regulasi_tenant(tenant)
+    app._pdf_styles()
+
+    data = data_dasar()
+    medical = app.analyze_medical_data(data)
+    legal = app.analyze_legal_data(data)
+    rec = app.generate_recommendation(medical, legal, data)
+    app.generate_word_document(data, medical, legal, rec)
+    app.generate_pdf_document(data, medical, legal, rec, kode_verifikasi="PEMANASAN", mode_arsip=True)
+
+    # Objek hasil pemanasan dipindah ke generasi permanen: GC di worker tidak
+    # menyentuhnya, sehingga halaman memori tetap dibagi (copy-on-write) dengan induk
+    gc.collect()
+    gc.freeze()
+    return time.perf_counter() - mulai
+
+
+class Pengawas:
+    """
+    Menjaga `jumlah` worker hasil fork tetap hidup. Worker yang keluar (daur
+    ulang setelah maks_tugas, atau mati karena galat) langsung diganti.
+    target(nama_worker, **kwargs) dijalankan di tiap worker.
+    """
+
+    def __init__(self, target, jumlah, awalan, **kwargs):
+        self.target = target
+        self.jumlah = jumlah
+        self.awalan = awalan
+        self.kwargs = kwargs
+        self.ctx = konteks()
+        self.proses = {}  # sentinel -> Process
+        self._urut = 0
+
+    def _fork(self):
+        self._urut += 1
+        p = self.ctx.Process(target=self.target,
+                             args=(f"{self.awalan}:{self._urut}",), kwargs=self.kwargs)
+        p.start()
+        self.proses[p.sentinel] = p
+
+    def jalankan(self):
+        for _ in range(self.jumlah):
+            self._fork()
+        try:
+            while True:
+                for sentinel in multiprocessing.connection.wait(list(self.proses)):
+                    p = self.proses.pop(sentinel)
+                    p.join()
+                    if p.exitcode != 0:
+                        # Cegah fork beruntun bila worker langsung mati saat start
+                        time.sleep(JEDA_GAGAL)
+                    self._fork()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for p in self.proses.values():
+                p.terminate()
+            for p in self.proses.values():
+                p.join()
+
+
+def pool(proses=None, maks_tugas=MAKS_TUGAS, initializer=None, initargs=()):
+    """multiprocessing.Pool yang worker-nya di-fork dari proses induk yang sudah hangat"""
+    panaskan()
+    return konteks().Pool(proses, initializer=initializer, initargs=initargs,
+                          maxtasksperchild=maks_tugas)
+
+
+if __name__ == "__main__":
+    print(f"pemanasan: {panaskan() * 1000:.0f} ms")
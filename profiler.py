@@ -0,0 +1,152 @@
+"""
+=================================================================================
+PROFILER PER-RERUN (khusus admin)
+=================================================================================
+Membungkus satu rerun main() dengan:
+- sampling profiler (thread terpisah membaca stack thread skrip tiap N ms)
+  -> file collapsed-stack (format flamegraph.pl / speedscope / inferno)
+- opsional profiler deterministik (cProfile) -> file .prof (snakeviz/pstats)
+Keduanya menghasilkan tabel top-N fungsi.
+=================================================================================
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from arsip import DATA_DIR
+
+PROFIL_DIR = os.path.join(DATA_DIR, "profil")
+
+
+def _label_frame(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Sampler(threading.Thread):
+    """Thread pembaca stack thread target secara periodik"""
+
+    def __init__(self, target_ident, interval):
+        super().__init__(name="tat-profiler", daemon=True)
+        self.target_ident = target_ident
+        self.interval = interval
+        self.stacks = Counter()
+        self._berhenti = threading.Event()
+
+    def run(self):
+        while not self._berhenti.wait(self.interval):
+            frame = sys._current_frames().get(self.target_ident)
+            stack = []
+            while frame is not None:
+                stack.append(_label_frame(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._berhenti.set()
+        self.join()
+
+
+class ProfilRerun:
+    """
+    Context manager profiling satu rerun.
+
+        with ProfilRerun(deterministik=True) as profil:
+            main()
+        profil.ringkasan  # dict: file, durasi, top_n
+    """
+
+    def __init__(self, deterministik=False, interval_ms=5, top_n=25, direktori=None):
+        self.deterministik = deterministik
+        self.interval = interval_ms / 1000.0
+        self.top_n = top_n
+        self.direktori = direktori or PROFIL_DIR
+        self.ringkasan = None
+
+    def __enter__(self):
+        self._sampler = _Sampler(threading.get_ident(), self.interval)
+        self._profile = cProfile.Profile() if self.deterministik else None
+        self._mulai = time.perf_counter()
+        self._sampler.start()
+        if self._profile:
+            self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Tetap simpan hasil walau rerun berakhir lewat st.rerun()/st.stop()
+        if self._profile:
+            self._profile.disable()
+        self._sampler.stop()
+        durasi = time.perf_counter() - self._mulai
+        self.ringkasan = self._simpan(durasi)
+        return False
+
+    def _simpan(self, durasi):
+        os.makedirs(self.direktori, exist_ok=True)
+        dasar = os.path.join(self.direktori, datetime.now().strftime("rerun_%Y%m%d_%H%M%S_%f"))
+
+        path_collapsed = dasar + ".collapsed"
+        with open(path_collapsed, "w", encoding="utf-8") as f:
+            for stack, jumlah in self._sampler.stacks.most_common():
+                f.write(f"{stack} {jumlah}\n")
+
+        ringkasan = {
+            'durasi_ms': round(durasi * 1000, 1),
+            'sampel': sum(self._sampler.stacks.values()),
+            'file_collapsed': path_collapsed,
+            'file_prof': None,
+        }
+
+        if self._profile:
+            path_prof = dasar + ".prof"
+            self._profile.dump_stats(path_prof)
+            ringkasan['file_prof'] = path_prof
+            ringkasan['top_n'] = self._top_n_deterministik()
+        else:
+            ringkasan['top_n'] = self._top_n_sampling(durasi)
+        return ringkasan
+
+    def _top_n_sampling(self, durasi):
+        """
+        Top-N dari sampel: self = fungsi di puncak stack, total = muncul di stack.
+        Waktu diestimasi dari proporsi sampel terhadap durasi rerun (interval
+        sampling efektif bisa lebih panjang dari interval_ms karena GIL).
+        """
+        self_count = Counter()
+        total_count = Counter()
+        for stack, jumlah in self._sampler.stacks.items():
+            frames = stack.split(";")
+            self_count[frames[-1]] += jumlah
+            for fungsi in set(frames):
+                total_count[fungsi] += jumlah
+        n_sampel = max(sum(self._sampler.stacks.values()), 1)
+        ms_per_sampel = durasi * 1000 / n_sampel
+        return [
+            {
+                'fungsi': fungsi,
+                'total_ms': round(jumlah * ms_per_sampel, 1),
+                'self_ms': round(self_count[fungsi] * ms_per_sampel, 1),
+                'persen_total': round(100.0 * jumlah / n_sampel, 1),
+            }
+            for fungsi, jumlah in total_count.most_common(self.top_n)
+        ]
+
+    def _top_n_deterministik(self):
+        stats = pstats.Stats(self._profile)
+        baris = []
+        for (filename, lineno, nama), (cc, nc, tt, ct, _callers) in stats.stats.items():
+            baris.append({
+                'fungsi': f"{nama} ({os.path.basename(filename)}:{lineno})",
+                'panggilan': nc,
+                'total_ms': round(ct * 1000, 1),
+                'self_ms': round(tt * 1000, 1),
+            })
+        baris.sort(key=lambda b: b['total_ms'], reverse=True)
+        return baris[:self.top_n]
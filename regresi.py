@@ -0,0 +1,471 @@
+"""
+=================================================================================
+KORPUS REGRESI GOLDEN + ANGGARAN WAKTU
+=================================================================================
+Korpus kasus sintetis yang mencakup semua cabang analyze_medical_data,
+evaluate_barang_bukti_sema, analyze_legal_data dan generate_recommendation,
+beserta keluaran golden dan isi teks surat (Word & PDF).
+
+    python regresi.py perbarui     # tulis ulang golden/ dari kode saat ini
+    python regresi.py periksa      # bandingkan dengan golden/, exit 1 bila beda
+    python regresi.py periksa --tanpa-waktu
+    python regresi.py anggaran     # catat ulang anggaran waktu saja (mesin ini)
+
+golden/analisis.json dan golden/surat.json ikut di-commit; anggaran waktu
+bergantung mesin sehingga tidak di-commit: jalankan `anggaran` sekali di
+mesin CI/server yang sama sebelum `periksa`. `periksa` juga gagal bila id
+kasus korpus dan golden tidak sama persis (kasus baru tanpa golden, golden
+yang kasusnya sudah dihapus) atau input kasus berubah tanpa `perbarui`.
+
+Anggaran waktu: durasi minimum dari ULANGAN_WAKTU ulangan tiap tahap
+(analisis, render Word, render PDF) - minimum jauh lebih stabil daripada
+median terhadap gangguan proses lain. `periksa` gagal bila tahap lebih lambat
+dari anggaran x TAT_REGRESI_TOLERANSI (default 1.5) DAN melebihi anggaran
++ TAT_REGRESI_LANTAI_MS (default 10 ms), sehingga tahap yang hanya beberapa
+milidetik tidak gagal karena jitter.
+=================================================================================
+"""
+
+import argparse
+import base64
+import copy
+import json
+import os
+import re
+import sys
+import time
+import zlib
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+GOLDEN_ANALISIS = os.path.join(GOLDEN_DIR, "analisis.json")
+GOLDEN_SURAT = os.path.join(GOLDEN_DIR, "surat.json")
+GOLDEN_WAKTU = os.path.join(GOLDEN_DIR, "anggaran_waktu.json")
+
+TOLERANSI_WAKTU = float(os.environ.get("TAT_REGRESI_TOLERANSI", "1.5"))
+LANTAI_WAKTU_MS = float(os.environ.get("TAT_REGRESI_LANTAI_MS", "10"))
+ULANGAN_WAKTU = 7
+
+# Jenis narkotika utama yang mewakili tiap cabang diagnosis ICD-10
+JENIS_UTAMA_CABANG = [
+    "Sabu/Metamfetamin", "Ekstasi/MDMA", "Heroin", "Morfin", "Ganja",
+    "Cannabinoid Sintesis", "Kokain", "Carisoprodol", "",
+]
+
+# Variasi barang bukti yang mewakili tiap cabang evaluate_barang_bukti_sema
+BARANG_BUKTI_CABANG = {
+    "kosong": {},
+    "bb_none": {"Ganja": None},
+    "non_sema": {"Carisoprodol": {"jumlah": 10, "satuan": "butir"}},
+    "tidak_di_sema": {"Kodein Sirup": {"jumlah": 1.0, "satuan": "gram"}},
+    "melebihi": {"Sabu/Metamfetamin": {"jumlah": 1.5, "satuan": "gram"}},
+    "di_bawah": {"Ganja": {"jumlah": 4.0, "satuan": "gram"}},
+    "tepat_ambang": {"Ekstasi/MDMA": {"jumlah": 8.0, "satuan": "butir"}},
+    "jumlah_invalid": {"Heroin": {"jumlah": "dua", "satuan": "gram"}},
+    "satuan_beda": {"Ganja": {"jumlah": 2.0, "satuan": "paket"}},
+    "satuan_kosong": {"Kokain": {"jumlah": 0.5, "satuan": None}},
+    "campuran": {
+        "Sabu/Metamfetamin": {"jumlah": 0.5, "satuan": "gram"},
+        "Ekstasi/MDMA": {"jumlah": 12, "satuan": "butir"},
+        "Tramadol": {"jumlah": 20, "satuan": "butir"},
+    },
+}
+
+# Cabang "limit None" hanya tercapai lewat versi regulasi lain
+SEMA_LIMITS_TANPA_AMBANG = {"Ganja": {"limit": None, "unit": "gram"}}
+
+TUJUAN_METODE_CABANG = [
+    ("Dipakai Sendiri", "Dari Teman"),
+    ("Dipakai Bersama-sama", "Beli Langsung di Tempat"),
+    ("Dipakai Sendiri", "Dari Jaringan Tertentu"),
+    ("Titipan Orang", "Dari Teman"),
+    ("Akan Dijual", "Aplikasi/Sosial Media"),
+]
+
+# Jawaban ASAM yang mewakili tiap level layanan asam.py (None = tidak dinilai)
+ASAM_CABANG = {
+    "level_1": {'motivasi_rehabilitasi': "Sangat Tinggi", 'insight_masalah': "Aktif mencari bantuan",
+                'dukungan_keluarga': "Sangat Mendukung", 'kondisi_rumah': "Kondusif untuk pemulihan"},
+    "level_2.1": {'motivasi_rehabilitasi': "Rendah", 'insight_masalah': "Mulai menyadari tapi belum siap berubah",
+                  'riwayat_rehabilitasi': 1, 'hasil_rehabilitasi': "Masih dalam proses",
+                  'dukungan_keluarga': "Netral", 'kondisi_rumah': "Cukup kondusif"},
+    "level_3.5": {'motivasi_rehabilitasi': "Sedang", 'riwayat_rehabilitasi': 2,
+                  'hasil_rehabilitasi': "Drop out (tidak selesai)", 'trigger_utama': ["Teman Pengguna"],
+                  'kondisi_rumah': "Sangat tidak kondusif (lingkungan peredaran)"},
+    "level_3.7": {'motivasi_rehabilitasi': "Tinggi", 'tingkat_withdrawal': "Berat"},
+}
+
+
+def data_dasar():
+    """data_lengkap sintetis (fiktif) yang menjadi dasar semua variasi korpus"""
+    return {
+        'nama': "CONTOH REGRESI",
+        'nik': "6571010101900001",
+        'tempat_lahir': "Tarakan",
+        'tanggal_lahir': "01-01-1990",
+        'jenis_kelamin': "Laki-laki",
+        'kewarganegaraan': "Indonesia",
+        'alamat': "Jl. Contoh No. 1, Kota Tarakan",
+        'no_hp': "",
+        'no_rekening': "",
+        'status_kawin': "Belum Kawin",
+        'pendidikan': "SMA/SMK",
+        'pekerjaan': "Karyawan Swasta",
+        'penghasilan': 0,
+        'kronologi': "Kronologi sintetis.",
+        'jenis_narkotika_digunakan': ["Sabu/Metamfetamin"],
+        'hasil_urine': "Positif",
+        'jenis_narkotika_positif': ["Sabu/Metamfetamin"],
+        'riwayat_pidana_narkotika': False,
+        'riwayat_penahanan': 0,
+        'barang_bukti_jenis': [],
+        'barang_bukti_detail': {},
+        'tujuan_kepemilikan': "Dipakai Sendiri",
+        'metode_pembelian': "Dari Teman",
+        'fakta_hukum': "Fakta hukum sintetis.",
+        'kesimpulan_hukum': "Kesimpulan hukum sintetis.",
+        'enable_sema_evaluation': True,
+        'dsm5_count': 4,
+        'jenis_narkotika_utama': "Sabu/Metamfetamin",
+        'diagnosis_code': "F15",
+        'pola_penggunaan': "Habitual",
+        'durasi_bulan': 12,
+        'kesimpulan_medis': "Kesimpulan medis sintetis.",
+        'nomor_surat': "B/REGRESI/X/KA/PB.06/2025/BNN KALTARA",
+        'tanggal_surat': "15 December 2025",
+        'tanggal_pelaksanaan': "15 December 2025",
+        'penerima_surat': "Direktur Reserse Narkoba Polda Kalimantan Utara",
+        'instansi_pemohon': "Direktorat Reserse Narkoba Polda Kalimantan Utara",
+        'nomor_surat_pemohon': "B/1/XII/2025/Ditresnarkoba",
+        'tanggal_surat_pemohon': "10 December 2025",
+        'jabatan_penandatangan': "Kepala Seksi Rehabilitasi BNN Provinsi Kalimantan Utara",
+        'nama_penandatangan': "dr. CONTOH",
+        'nip_penandatangan': "19800101 200501 1 001",
+        'instansi_penyidik': "Direktorat Reserse Narkoba Polda Kalimantan Utara",
+    }
+
+
+def buat_korpus():
+    """
+    Korpus kasus: list dict {id, fungsi, input}. fungsi = 'sema' (evaluasi BB saja)
+    atau 'pipeline' (medis + hukum + rekomendasi dari satu data_lengkap).
+    """
+    korpus = []
+
+    # evaluate_barang_bukti_sema langsung, termasuk versi regulasi tanpa ambang
+    for nama, detail in BARANG_BUKTI_CABANG.items():
+        korpus.append({'id': f"sema/{nama}", 'fungsi': 'sema',
+                       'input': {'barang_bukti_detail': detail}})
+    korpus.append({'id': "sema/limit_none", 'fungsi': 'sema',
+                   'input': {'barang_bukti_detail': {"Ganja": {"jumlah": 1.0, "satuan": "gram"}},
+                             'sema_limits': SEMA_LIMITS_TANPA_AMBANG}})
+
+    # Semua tingkat DSM-5 x cabang diagnosis
+    for dsm5 in range(0, 12):
+        for jenis in JENIS_UTAMA_CABANG:
+            data = data_dasar()
+            data['dsm5_count'] = dsm5
+            data['jenis_narkotika_utama'] = jenis
+            korpus.append({'id': f"medis/dsm{dsm5}/{jenis or 'kosong'}", 'fungsi': 'pipeline',
+                           'input': data})
+
+    # Cabang hukum: tujuan x metode x barang bukti x flag SEMA, pada 3 tingkat DSM-5
+    for tujuan, metode in TUJUAN_METODE_CABANG:
+        for nama_bb, detail in BARANG_BUKTI_CABANG.items():
+            for enable_sema in (True, False):
+                for dsm5 in (1, 4, 7):
+                    data = data_dasar()
+                    data.update({
+                        'tujuan_kepemilikan': tujuan,
+                        'metode_pembelian': metode,
+                        'barang_bukti_detail': copy.deepcopy(detail),
+                        'barang_bukti_jenis': list(detail),
+                        'enable_sema_evaluation': enable_sema,
+                        'dsm5_count': dsm5,
+                    })
+                    korpus.append({
+                        'id': f"hukum/{tujuan}/{metode}/{nama_bb}/sema={int(enable_sema)}/dsm{dsm5}",
+                        'fungsi': 'pipeline',
+                        'input': data,
+                    })
+
+    # Penempatan ASAM x tingkat DSM-5 x keterlibatan jaringan
+    for nama_asam, jawaban in ASAM_CABANG.items():
+        for tujuan, metode in TUJUAN_METODE_CABANG[:3]:
+            for dsm5 in (1, 4, 7):
+                data = data_dasar()
+                data.update(copy.deepcopy(jawaban))
+                data.update({'tujuan_kepemilikan': tujuan, 'metode_pembelian': metode, 'dsm5_count': dsm5})
+                korpus.append({'id': f"asam/{nama_asam}/{tujuan}/{metode}/dsm{dsm5}",
+                               'fungsi': 'pipeline', 'input': data})
+
+    # Key opsional yang tidak ada (nilai default di fungsi analisis)
+    data = data_dasar()
+    for key in ('dsm5_count', 'jenis_narkotika_utama', 'pola_penggunaan', 'durasi_bulan',
+                'tujuan_kepemilikan', 'metode_pembelian', 'riwayat_pidana_narkotika',
+                'riwayat_penahanan', 'barang_bukti_detail', 'enable_sema_evaluation',
+                'instansi_penyidik'):
+        data.pop(key)
+    korpus.append({'id': "default/key_kosong", 'fungsi': 'pipeline', 'input': data})
+    return korpus
+
+
+def jalankan_kasus(app, kasus):
+    """Keluaran fungsi analisis untuk satu kasus korpus"""
+    inp = kasus['input']
+    if kasus['fungsi'] == 'sema':
+        return app.evaluate_barang_bukti_sema(inp['barang_bukti_detail'], inp.get('sema_limits'))
+    medical = app.analyze_medical_data(inp)
+    legal = app.analyze_legal_data(inp)
+    rec = app.generate_recommendation(medical, legal, inp)
+    return {'medical': medical, 'legal': legal, 'recommendation': rec}
+
+
+def kasus_surat(korpus):
+    """Subset pipeline untuk golden surat: satu kasus per aturan rekomendasi x variasi SEMA"""
+    import app
+    terpilih = {}
+    for kasus in korpus:
+        if kasus['fungsi'] != 'pipeline':
+            continue
+        keluaran = jalankan_kasus(app, kasus)
+        sema = keluaran['legal']['sema_result']
+        kunci = (keluaran['recommendation']['rule_id'],
+                 bool(sema.get('sema_exceeded')), bool(sema.get('non_sema_items')))
+        terpilih.setdefault(kunci, kasus)
+    return [terpilih[k] for k in sorted(terpilih)]
+
+
+# =============================================================================
+# EKSTRAKSI TEKS SURAT
+# =============================================================================
+def teks_word(buffer):
+    """Teks paragraf + sel tabel dokumen Word, urut sesuai dokumen"""
+    from docx import Document
+    doc = Document(buffer)
+    baris = [p.text for p in doc.paragraphs]
+    for table in doc.tables:
+        for row in table.rows:
+            baris.append(" | ".join(cell.text for cell in row.cells))
+    return baris
+
+
+_STREAM_RE = re.compile(rb"<<(.*?)>>\s*stream\r?\n(.*?)\r?\nendstream", re.S)
+_TEKS_RE = re.compile(rb"\((?:\\.|[^\\)])*\)\s*Tj|\[(?:\\.|[^\]])*\]\s*TJ")
+_STRING_RE = re.compile(rb"\(((?:\\.|[^\\)])*)\)")
+_ESCAPE = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f",
+           b"(": b"(", b")": b")", b"\\": b"\\"}
+
+
+def _unescape_pdf(s):
+    keluar = bytearray()
+    i = 0
+    while i < len(s):
+        c = s[i:i + 1]
+        if c == b"\\" and i + 1 < len(s):
+            nxt = s[i + 1:i + 2]
+            if nxt.isdigit():
+                oktal = re.match(rb"[0-7]{1,3}", s[i + 1:i + 4]).group()
+                keluar.append(int(oktal, 8))
+                i += 1 + len(oktal)
+                continue
+            keluar += _ESCAPE.get(nxt, nxt)
+            i += 2
+            continue
+        keluar += c
+        i += 1
+    return keluar.decode("latin-1")
+
+
+def teks_pdf(isi):
+    """
+    Ekstraksi teks sederhana dari PDF ReportLab (font standar): operator Tj/TJ
+    pada content stream, didekode bila ASCII85/FlateDecode. Satu baris per operator.
+    """
+    baris = []
+    for kamus, stream in _STREAM_RE.findall(isi):
+        if b"/ASCII85Decode" in kamus:
+            stream = stream.strip()
+            if stream.endswith(b"~>"):
+                stream = stream[:-2]
+            stream = base64.a85decode(stream)
+        if b"/FlateDecode" in kamus:
+            try:
+                stream = zlib.decompress(stream)
+            except zlib.error:
+                continue
+        if b"BT" not in stream:
+            continue
+        for op in _TEKS_RE.findall(stream):
+            teks = "".join(_unescape_pdf(s) for s in _STRING_RE.findall(op))
+            if teks.strip():
+                baris.append(teks)
+    return baris
+
+
+def teks_surat(app, hasil):
+    args = (hasil['data'], hasil['medical'], hasil['legal'], hasil['recommendation'])
+    return {
+        'word': teks_word(app.generate_word_document(*args)),
+        'pdf': teks_pdf(app.generate_pdf_document(*args).getvalue()),
+    }
+
+
+# =============================================================================
+# ANGGARAN WAKTU
+# =============================================================================
+def ukur_waktu(app, korpus, surat):
+    """Durasi minimum (ms) dari ULANGAN_WAKTU ulangan tiap tahap atas korpus"""
+    pipeline = [k for k in korpus if k['fungsi'] == 'pipeline']
+    hasil_surat = [dict({'data': k['input']}, **jalankan_kasus(app, k)) for k in surat]
+
+    def _minimum(fn):
+        durasi = []
+        for _ in range(ULANGAN_WAKTU):
+            mulai = time.perf_counter()
+            fn()
+            durasi.append((time.perf_counter() - mulai) * 1000)
+        return round(min(durasi), 3)
+
+    def _render(generate):
+        for h in hasil_surat:
+            generate(h['data'], h['medical'], h['legal'], h['recommendation'])
+
+    return {
+        'analisis_korpus_ms': _minimum(lambda: [jalankan_kasus(app, k) for k in korpus]),
+        'analisis_per_kasus_ms': round(_minimum(lambda: [jalankan_kasus(app, k) for k in pipeline])
+                                       / max(len(pipeline), 1), 4),
+        'render_word_ms': _minimum(lambda: _render(app.generate_word_document)),
+        'render_pdf_ms': _minimum(lambda: _render(app.generate_pdf_document)),
+    }
+
+
+# =============================================================================
+# PERBARUI / PERIKSA
+# =============================================================================
+def _hasil_golden(app, korpus):
+    analisis = [dict(kasus, output=jalankan_kasus(app, kasus)) for kasus in korpus]
+    surat = []
+    for kasus in kasus_surat(korpus):
+        hasil = dict({'data': kasus['input']}, **jalankan_kasus(app, kasus))
+        surat.append({'id': kasus['id'], 'input': kasus['input'], 'teks': teks_surat(app, hasil)})
+    return analisis, surat
+
+
+def _tulis_json(path, obj):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+def perbarui():
+    import app
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    korpus = buat_korpus()
+    analisis, surat = _hasil_golden(app, korpus)
+    _tulis_json(GOLDEN_ANALISIS, analisis)
+    _tulis_json(GOLDEN_SURAT, surat)
+    print(f"Golden diperbarui: {len(analisis)} kasus analisis, {len(surat)} surat")
+    perbarui_anggaran()
+
+
+def _korpus_golden():
+    """(korpus, surat) dari golden/ yang tersimpan, agar waktu diukur atas input yang sama"""
+    with open(GOLDEN_ANALISIS, encoding="utf-8") as f:
+        korpus = [{'id': k['id'], 'fungsi': k['fungsi'], 'input': k['input']} for k in json.load(f)]
+    with open(GOLDEN_SURAT, encoding="utf-8") as f:
+        surat = [{'id': g['id'], 'fungsi': 'pipeline', 'input': g['input']} for g in json.load(f)]
+    return korpus, surat
+
+
+def perbarui_anggaran():
+    import app
+    waktu = ukur_waktu(app, *_korpus_golden())
+    _tulis_json(GOLDEN_WAKTU, waktu)
+    print(f"Anggaran waktu diperbarui ({GOLDEN_WAKTU}):")
+    print(json.dumps(waktu, indent=1))
+
+
+def _beda_id(jenis, id_korpus, id_golden):
+    """Pesan kegagalan untuk id korpus tanpa golden dan id golden di luar korpus"""
+    id_korpus, id_golden = set(id_korpus), set(id_golden)
+    return ([f"[{jenis}] {i}: tidak ada di golden - jalankan `python regresi.py perbarui`"
+             for i in sorted(id_korpus - id_golden)]
+            + [f"[{jenis}] {i}: ada di golden tetapi tidak lagi di korpus"
+               for i in sorted(id_golden - id_korpus)])
+
+
+def periksa(cek_waktu=True):
+    """Bandingkan kode saat ini dengan golden; kembalikan list pesan kegagalan"""
+    import app
+    for path in (GOLDEN_ANALISIS, GOLDEN_SURAT):
+        if not os.path.exists(path):
+            return [f"{path} belum ada - jalankan `python regresi.py perbarui` lebih dulu"]
+
+    with open(GOLDEN_ANALISIS, encoding="utf-8") as f:
+        golden_analisis = json.load(f)
+    with open(GOLDEN_SURAT, encoding="utf-8") as f:
+        golden_surat = json.load(f)
+
+    gagal = []
+    # Korpus dan golden harus memuat kasus yang sama: kasus baru tanpa golden atau
+    # golden yang kasusnya sudah hilang dari korpus tidak boleh lolos diam-diam
+    korpus = buat_korpus()
+    gagal += _beda_id("analisis", [k['id'] for k in korpus], [k['id'] for k in golden_analisis])
+    input_golden = {k['id']: k['input'] for k in golden_analisis}
+    for kasus in korpus:
+        if kasus['id'] in input_golden and json.loads(json.dumps(kasus['input'])) != input_golden[kasus['id']]:
+            gagal.append(f"[analisis] {kasus['id']}: input korpus berbeda dengan golden")
+    gagal += _beda_id("surat", [k['id'] for k in kasus_surat(korpus)], [g['id'] for g in golden_surat])
+
+    for kasus in golden_analisis:
+        # Bandingkan lewat JSON agar tuple/list & key order tidak berpengaruh
+        keluaran = json.loads(json.dumps(jalankan_kasus(app, kasus)))
+        if keluaran != kasus['output']:
+            gagal.append(f"[analisis] {kasus['id']}: keluaran berbeda")
+
+    for golden in golden_surat:
+        kasus = {'fungsi': 'pipeline', 'input': golden['input']}
+        hasil = dict({'data': golden['input']}, **jalankan_kasus(app, kasus))
+        teks = teks_surat(app, hasil)
+        for fmt in ('word', 'pdf'):
+            if teks[fmt] != golden['teks'][fmt]:
+                beda = next((i for i, (a, b) in enumerate(zip(teks[fmt], golden['teks'][fmt])) if a != b),
+                            min(len(teks[fmt]), len(golden['teks'][fmt])))
+                gagal.append(f"[surat {fmt}] {golden['id']}: berbeda mulai baris {beda}")
+
+    if cek_waktu and os.path.exists(GOLDEN_WAKTU):
+        with open(GOLDEN_WAKTU, encoding="utf-8") as f:
+            anggaran = json.load(f)
+        waktu = ukur_waktu(app, *_korpus_golden())
+        for tahap, batas in anggaran.items():
+            if tahap in waktu and waktu[tahap] > max(batas * TOLERANSI_WAKTU, batas + LANTAI_WAKTU_MS):
+                gagal.append(f"[waktu] {tahap}: {waktu[tahap]} ms > anggaran {batas} ms "
+                             f"x {TOLERANSI_WAKTU} (lantai +{LANTAI_WAKTU_MS:g} ms)")
+    return gagal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Korpus regresi golden TAT")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    sub.add_parser("perbarui", help="tulis ulang golden dari kode saat ini")
+    sub.add_parser("anggaran", help="catat ulang anggaran waktu saja")
+    p_periksa = sub.add_parser("periksa", help="bandingkan dengan golden")
+    p_periksa.add_argument("--tanpa-waktu", action="store_true", help="lewati anggaran waktu")
+    args = parser.parse_args()
+
+    if args.perintah == "perbarui":
+        perbarui()
+        return 0
+    if args.perintah == "anggaran":
+        perbarui_anggaran()
+        return 0
+
+    gagal = periksa(cek_waktu=not args.tanpa_waktu)
+    for pesan in gagal:
+        print(pesan)
+    print("OK" if not gagal else f"{len(gagal)} kegagalan")
+    return 1 if gagal else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
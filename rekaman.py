@@ -0,0 +1,419 @@
+"""
+=================================================================================
+REKAMAN KASUS RINGKAS (untuk batch besar & pemindaian arsip)
+=================================================================================
+Representasi hasil asesmen dalam dataclass ber-__slots__:
+- nilai kategorikal (jenis_kelamin, pola_penggunaan, tingkat keparahan, dst.)
+  di-intern sehingga ribuan kasus berbagi satu objek string yang sama;
+- rekomendasi disimpan sebagai kode enum (KodeRekomendasi);
+- list disimpan sebagai tuple (penanda _Kemasan, sehingga tuple asli tetap
+  tuple saat dibuka), barang_bukti_detail sebagai tuple triplet.
+
+Konversi dua arah dengan bentuk dict lama bersifat lossless:
+    dari_hasil(hasil).ke_hasil() == hasil
+Key yang tidak dikenal disimpan apa adanya di field `ekstra`, dan key yang
+tidak ada di dict asal tetap tidak ada setelah konversi balik.
+
+Dipakai pemindaian arsip rekap.py dan replay.py lewat iter_rekaman; field
+dibaca dengan .get() ala dict tanpa konversi balik penuh. waktu_dibuat/usia
+dipakai bersama rekap.py dan ekspor_analitik.py agar tanggal & usia satu kasus
+sama di rekap Excel dan snapshot Parquet.
+=================================================================================
+"""
+
+import sys
+from dataclasses import dataclass, fields
+from datetime import datetime
+from enum import IntEnum
+from typing import ClassVar
+
+
+class _Absen:
+    """Penanda key yang tidak ada pada dict asal (berbeda dari nilai None)"""
+    __slots__ = ()
+
+    def __repr__(self):
+        return "ABSEN"
+
+    def __reduce__(self):
+        # Tetap singleton setelah pickle (pool multiprocessing), karena dicek dengan `is`
+        return "ABSEN"
+
+
+ABSEN = _Absen()
+
+
+class _Kemasan(tuple):
+    """Tuple hasil pengemasan list/struktur standar; tuple asli dibiarkan tuple saat dibuka"""
+    __slots__ = ()
+
+
+class KodeRekomendasi(IntEnum):
+    RAWAT_INAP = 1
+    RAWAT_JALAN = 2
+    PROSES_HUKUM_REHABILITASI = 3
+    PROSES_HUKUM = 4
+
+
+LABEL_REKOMENDASI = {
+    KodeRekomendasi.RAWAT_INAP: "Rehabilitasi Rawat Inap",
+    KodeRekomendasi.RAWAT_JALAN: "Rehabilitasi Rawat Jalan",
+    KodeRekomendasi.PROSES_HUKUM_REHABILITASI: "Proses Hukum dengan Rehabilitasi",
+    KodeRekomendasi.PROSES_HUKUM: "Proses Hukum",
+}
+KODE_REKOMENDASI = {label: kode for kode, label in LABEL_REKOMENDASI.items()}
+
+KEY_SEMA = ("sema_exceeded", "sema_within", "unit_issues", "non_sema_items")
+
+
+# =============================================================================
+# KONVERSI GENERIK
+# =============================================================================
+def _kemas(nilai, kategorikal):
+    """Nilai dict -> nilai rekaman (str di-intern bila kategorikal, list -> tuple)"""
+    if isinstance(nilai, str):
+        return sys.intern(nilai) if kategorikal else nilai
+    if isinstance(nilai, list):
+        return _Kemasan(sys.intern(v) if kategorikal and isinstance(v, str) else v for v in nilai)
+    return nilai
+
+
+def _buka(nilai):
+    """Nilai rekaman -> nilai dict"""
+    if type(nilai) is _Kemasan:
+        return list(nilai)
+    return nilai
+
+
+def _dari_dict(cls, d, khusus=None):
+    """Bangun rekaman dari dict; `khusus` = {nama_field: fungsi_kemas} untuk field bertipe khusus"""
+    khusus = khusus or {}
+    kwargs = {}
+    for f in fields(cls):
+        if f.name == 'ekstra' or f.name not in d:
+            continue
+        nilai = d[f.name]
+        if f.name in khusus:
+            kwargs[f.name] = khusus[f.name](nilai)
+        else:
+            kwargs[f.name] = _kemas(nilai, f.name in cls._KATEGORIKAL)
+    nama_field = cls._NAMA_FIELD
+    ekstra = {k: v for k, v in d.items() if k not in nama_field}
+    return cls(**kwargs, ekstra=ekstra or None)
+
+
+def _ke_dict(obj, khusus=None):
+    khusus = khusus or {}
+    d = {}
+    for f in fields(obj):
+        if f.name == 'ekstra':
+            continue
+        nilai = getattr(obj, f.name)
+        if nilai is ABSEN:
+            continue
+        d[f.name] = khusus[f.name](nilai) if f.name in khusus else _buka(nilai)
+    if obj.ekstra:
+        d.update(obj.ekstra)
+    return d
+
+
+def _kemas_barang_bukti(detail):
+    """{jenis: {'jumlah', 'satuan'}} -> ((jenis, jumlah, satuan), ...) bila bentuknya standar"""
+    if isinstance(detail, dict) and all(
+        isinstance(det, dict) and det.keys() == {'jumlah', 'satuan'} for det in detail.values()
+    ):
+        return _Kemasan(
+            (sys.intern(jenis), det['jumlah'], _kemas(det['satuan'], True))
+            for jenis, det in detail.items()
+        )
+    return detail
+
+
+def _buka_barang_bukti(detail):
+    if type(detail) is _Kemasan:
+        return {jenis: {'jumlah': jumlah, 'satuan': satuan} for jenis, jumlah, satuan in detail}
+    return detail
+
+
+def _kemas_sema(sema):
+    """sema_result standar (4 list) -> tuple 4 tuple; bentuk lain disimpan apa adanya"""
+    if isinstance(sema, dict) and tuple(sema.keys()) == KEY_SEMA and all(
+        isinstance(sema[k], list) for k in KEY_SEMA
+    ):
+        return _Kemasan(tuple(sema[k]) for k in KEY_SEMA)
+    return sema
+
+
+def _buka_sema(sema):
+    if type(sema) is _Kemasan:
+        return {k: list(v) for k, v in zip(KEY_SEMA, sema)}
+    return sema
+
+
+# =============================================================================
+# REKAMAN
+# =============================================================================
+class _AksesDict:
+    """Akses baca ala dict untuk pemindaian (rekap, replay) tanpa konversi penuh"""
+    __slots__ = ()
+
+    def get(self, nama, default=None):
+        """
+        Seperti dict.get pada bentuk dict; field bertipe khusus dibuka
+        (rekomendasi -> label, barang_bukti_detail/sema_result -> dict), list
+        lain tetap tuple (baca-saja)
+        """
+        if nama in self._NAMA_FIELD:
+            nilai = getattr(self, nama)
+            if nilai is ABSEN:
+                return default
+            buka = self._KHUSUS_BUKA.get(nama)
+            return buka(nilai) if buka else nilai
+        return (self.ekstra or {}).get(nama, default)
+
+    def __contains__(self, nama):
+        if nama in self._NAMA_FIELD:
+            return getattr(self, nama) is not ABSEN
+        return nama in (self.ekstra or {})
+
+    def ke_dict(self):
+        return _ke_dict(self, self._KHUSUS_BUKA)
+
+
+@dataclass(slots=True)
+class RekamanData(_AksesDict):
+    """Padanan ringkas `data_lengkap`"""
+    # Identitas
+    nama: object = ABSEN
+    nik: object = ABSEN
+    tempat_lahir: object = ABSEN
+    tanggal_lahir: object = ABSEN
+    jenis_kelamin: object = ABSEN
+    kewarganegaraan: object = ABSEN
+    alamat: object = ABSEN
+    no_hp: object = ABSEN
+    no_rekening: object = ABSEN
+    status_kawin: object = ABSEN
+    pendidikan: object = ABSEN
+    pekerjaan: object = ABSEN
+    penghasilan: object = ABSEN
+    # Hukum
+    kronologi: object = ABSEN
+    jenis_narkotika_digunakan: object = ABSEN
+    hasil_urine: object = ABSEN
+    jenis_narkotika_positif: object = ABSEN
+    riwayat_pidana_narkotika: object = ABSEN
+    riwayat_penahanan: object = ABSEN
+    barang_bukti_jenis: object = ABSEN
+    barang_bukti_detail: object = ABSEN
+    tujuan_kepemilikan: object = ABSEN
+    metode_pembelian: object = ABSEN
+    fakta_hukum: object = ABSEN
+    kesimpulan_hukum: object = ABSEN
+    enable_sema_evaluation: object = ABSEN
+    # Medis
+    dsm5_count: object = ABSEN
+    jenis_narkotika_utama: object = ABSEN
+    diagnosis_code: object = ABSEN
+    pola_penggunaan: object = ABSEN
+    durasi_bulan: object = ABSEN
+    kesimpulan_medis: object = ABSEN
+    # ASAM 6 dimensi
+    tingkat_withdrawal: object = ABSEN
+    frekuensi_intoksikasi: object = ABSEN
+    jenis_penyakit: object = ABSEN
+    tingkat_gangguan_jiwa: object = ABSEN
+    motivasi_rehabilitasi: object = ABSEN
+    insight_masalah: object = ABSEN
+    riwayat_rehabilitasi: object = ABSEN
+    hasil_rehabilitasi: object = ABSEN
+    trigger_utama: object = ABSEN
+    dukungan_keluarga: object = ABSEN
+    kondisi_rumah: object = ABSEN
+    status_pekerjaan: object = ABSEN
+    kemampuan_ekonomi: object = ABSEN
+    # Surat
+    nomor_surat: object = ABSEN
+    tanggal_surat: object = ABSEN
+    tanggal_pelaksanaan: object = ABSEN
+    penerima_surat: object = ABSEN
+    instansi_pemohon: object = ABSEN
+    nomor_surat_pemohon: object = ABSEN
+    tanggal_surat_pemohon: object = ABSEN
+    jabatan_penandatangan: object = ABSEN
+    nama_penandatangan: object = ABSEN
+    nip_penandatangan: object = ABSEN
+    instansi_penyidik: object = ABSEN
+    ekstra: object = None
+
+    _KATEGORIKAL: ClassVar[frozenset] = frozenset({
+        'tempat_lahir', 'jenis_kelamin', 'kewarganegaraan', 'status_kawin', 'pendidikan',
+        'pekerjaan', 'jenis_narkotika_digunakan', 'hasil_urine', 'jenis_narkotika_positif',
+        'barang_bukti_jenis', 'tujuan_kepemilikan', 'metode_pembelian', 'jenis_narkotika_utama',
+        'diagnosis_code', 'pola_penggunaan', 'tanggal_surat', 'tanggal_pelaksanaan',
+        'penerima_surat', 'instansi_pemohon', 'tanggal_surat_pemohon', 'jabatan_penandatangan',
+        'nama_penandatangan', 'nip_penandatangan', 'instansi_penyidik',
+        'tingkat_withdrawal', 'jenis_penyakit', 'tingkat_gangguan_jiwa', 'motivasi_rehabilitasi',
+        'insight_masalah', 'hasil_rehabilitasi', 'trigger_utama', 'dukungan_keluarga',
+        'kondisi_rumah', 'status_pekerjaan', 'kemampuan_ekonomi',
+    })
+    _KHUSUS: ClassVar[dict] = {'barang_bukti_detail': _kemas_barang_bukti}
+    _KHUSUS_BUKA: ClassVar[dict] = {'barang_bukti_detail': _buka_barang_bukti}
+
+
+@dataclass(slots=True)
+class RekamanMedis(_AksesDict):
+    """Padanan ringkas hasil analyze_medical_data"""
+    dsm5_count: object = ABSEN
+    severity: object = ABSEN
+    severity_level: object = ABSEN
+    diagnosis_code: object = ABSEN
+    diagnosis: object = ABSEN
+    pola_penggunaan: object = ABSEN
+    durasi_bulan: object = ABSEN
+    asam: object = ABSEN
+    ekstra: object = None
+
+    _KATEGORIKAL: ClassVar[frozenset] = frozenset({
+        'severity', 'severity_level', 'diagnosis_code', 'diagnosis', 'pola_penggunaan',
+    })
+    _KHUSUS: ClassVar[dict] = {}
+    _KHUSUS_BUKA: ClassVar[dict] = {}
+
+
+@dataclass(slots=True)
+class RekamanHukum(_AksesDict):
+    """Padanan ringkas hasil analyze_legal_data"""
+    keterlibatan_jaringan: object = ABSEN
+    riwayat_pidana: object = ABSEN
+    riwayat_penahanan: object = ABSEN
+    barang_bukti: object = ABSEN
+    tujuan_kepemilikan: object = ABSEN
+    sema_result: object = ABSEN
+    ekstra: object = None
+
+    _KATEGORIKAL: ClassVar[frozenset] = frozenset({
+        'keterlibatan_jaringan', 'barang_bukti', 'tujuan_kepemilikan',
+    })
+    _KHUSUS: ClassVar[dict] = {'sema_result': _kemas_sema}
+    _KHUSUS_BUKA: ClassVar[dict] = {'sema_result': _buka_sema}
+
+
+@dataclass(slots=True)
+class RekamanRekomendasi(_AksesDict):
+    """Padanan ringkas hasil generate_recommendation (rekomendasi sebagai kode enum)"""
+    rekomendasi: object = ABSEN
+    durasi: object = ABSEN
+    tempat: object = ABSEN
+    tindak_lanjut: object = ABSEN
+    wajib_lapor: object = ABSEN
+    rule_id: object = ABSEN
+    ekstra: object = None
+
+    _KATEGORIKAL: ClassVar[frozenset] = frozenset({
+        'durasi', 'tempat', 'tindak_lanjut', 'wajib_lapor', 'rule_id',
+    })
+    _KHUSUS: ClassVar[dict] = {
+        'rekomendasi': lambda r: KODE_REKOMENDASI.get(r, r) if isinstance(r, str) else r,
+    }
+    _KHUSUS_BUKA: ClassVar[dict] = {
+        'rekomendasi': lambda r: LABEL_REKOMENDASI[r] if isinstance(r, KodeRekomendasi) else r,
+    }
+
+    @property
+    def kode(self):
+        """KodeRekomendasi, atau None bila teks rekomendasi tidak standar"""
+        return self.rekomendasi if isinstance(self.rekomendasi, KodeRekomendasi) else None
+
+
+for _cls in (RekamanData, RekamanMedis, RekamanHukum, RekamanRekomendasi):
+    _cls._NAMA_FIELD = frozenset(f.name for f in fields(_cls) if f.name != 'ekstra')
+
+
+def _rekaman_dari(cls, d):
+    return _dari_dict(cls, d, cls._KHUSUS)
+
+
+@dataclass(slots=True)
+class RekamanKasus:
+    """Satu hasil asesmen lengkap ({'data', 'medical', 'legal', 'recommendation', ...})"""
+    data: RekamanData
+    medical: RekamanMedis
+    legal: RekamanHukum
+    recommendation: RekamanRekomendasi
+    ekstra: object = None  # kasus_id, timestamp, dst.
+
+    def ke_hasil(self):
+        """Kembali ke bentuk dict hasil asesmen semula"""
+        hasil = {
+            'data': self.data.ke_dict(),
+            'medical': self.medical.ke_dict(),
+            'legal': self.legal.ke_dict(),
+            'recommendation': self.recommendation.ke_dict(),
+        }
+        if self.ekstra:
+            hasil.update(self.ekstra)
+        return hasil
+
+    def get(self, nama, default=None):
+        """Key tingkat atas selain data/medical/legal/recommendation (kasus_id, timestamp, ...)"""
+        return (self.ekstra or {}).get(nama, default)
+
+    @property
+    def kasus_id(self):
+        return self.get('kasus_id')
+
+
+def dari_hasil(hasil):
+    """Dict hasil asesmen -> RekamanKasus"""
+    ekstra = {k: v for k, v in hasil.items()
+              if k not in ('data', 'medical', 'legal', 'recommendation')}
+    return RekamanKasus(
+        data=_rekaman_dari(RekamanData, hasil['data']),
+        medical=_rekaman_dari(RekamanMedis, hasil['medical']),
+        legal=_rekaman_dari(RekamanHukum, hasil['legal']),
+        recommendation=_rekaman_dari(RekamanRekomendasi, hasil['recommendation']),
+        ekstra=ekstra or None,
+    )
+
+
+def iter_rekaman(arsip, batch=1000, sejak_id=0, sampai_id=None, periode=None):
+    """
+    Pindai arsip sebagai stream RekamanKasus: per rentang id (sejak_id, sampai_id],
+    atau per periode (awal, akhir) kolom dibuat bila `periode` diisi
+    """
+    if periode is not None:
+        kasus = arsip.iter_kasus_periode(*periode, batch=batch)
+    else:
+        kasus = arsip.iter_kasus(batch=batch, sejak_id=sejak_id, sampai_id=sampai_id)
+    for hasil in kasus:
+        yield dari_hasil(hasil)
+
+
+# =============================================================================
+# WAKTU & USIA (rekap dan ekspor analitik)
+# =============================================================================
+_FORMAT_WAKTU = (("%Y-%m-%d %H:%M:%S", 19), ("%Y-%m-%dT%H:%M:%S", 19), ("%Y-%m-%d", 10))
+
+
+def waktu_dibuat(teks):
+    """Timestamp kasus ('YYYY-MM-DD HH:MM:SS', ISO ber-'T', atau tanggal saja) -> datetime, None bila tak terbaca"""
+    if not isinstance(teks, str):
+        return None
+    for fmt, panjang in _FORMAT_WAKTU:
+        try:
+            return datetime.strptime(teks[:panjang], fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def usia(tanggal_lahir, pada):
+    """Usia (tahun penuh) pada tanggal `pada` dari tanggal lahir 'DD-MM-YYYY'; None bila salah satunya tak ada"""
+    if pada is None or not isinstance(tanggal_lahir, str):
+        return None
+    try:
+        lahir = datetime.strptime(tanggal_lahir, "%d-%m-%Y")
+    except ValueError:
+        return None
+    return pada.year - lahir.year - ((pada.month, pada.day) < (lahir.month, lahir.day))
@@ -0,0 +1,292 @@
+"""
+=================================================================================
+REKAP BULANAN KASUS TAT (XLSX / CSV, STREAMING)
+=================================================================================
+Rekap untuk BNN Pusat: satu baris per kasus (identitas, narkotika, hasil SEMA,
+rekomendasi) dan lembar Ringkasan per bulan/rekomendasi, narkotika, hasil
+SEMA dan instansi pemohon.
+
+    python rekap.py 2025                       # rekap setahun, data/keluaran/rekap_2025.xlsx
+    python rekap.py 2025 --bulan 3 --format csv --keluaran rekap_maret.csv
+
+Dari UI rekap dikirim ke antrian dokumen (jenis 'rekap') sehingga dikerjakan
+worker, bukan sesi asesor; hasilnya terenkripsi seperti keluaran antrian lain.
+
+- Kasus dibaca dari arsip per batch (keyset di atas indeks `dibuat`) sebagai
+  RekamanKasus (nilai kategorikal di-intern) dan langsung ditulis: XlsxWriter mode constant_memory menulis baris ke file
+  sementara, sehingga memori tidak bertambah dengan jumlah kasus.
+- Ringkasan berisi rumus COUNTIFS atas lembar Data (ikut berubah bila data
+  difilter/dikoreksi di Excel) beserta nilai hasil hitungan saat ekspor,
+  agar angka langsung tampil di penampil yang tidak menghitung ulang rumus.
+- Format CSV hanya berisi baris data (tanpa ringkasan).
+=================================================================================
+"""
+
+import argparse
+import csv
+import io
+import os
+import sys
+from collections import Counter
+from datetime import datetime
+
+import enkripsi
+from arsip import Arsip, DATA_DIR
+from rekaman import iter_rekaman, usia, waktu_dibuat
+
+KELUARAN_DIR = os.path.join(DATA_DIR, "keluaran")
+NAMA_BULAN = ["Januari", "Februari", "Maret", "April", "Mei", "Juni", "Juli",
+              "Agustus", "September", "Oktober", "November", "Desember"]
+
+# (judul kolom, lebar) lembar Data; urutan = urutan kolom A, B, C, ...
+KOLOM = [
+    ("No", 6), ("ID Kasus", 9), ("Tanggal", 11), ("Bulan", 7), ("Nomor Surat", 38),
+    ("Nama", 26), ("NIK", 18), ("Jenis Kelamin", 12), ("Usia", 6), ("Instansi Pemohon", 40),
+    ("Hasil Urine", 10), ("Narkotika Positif", 26), ("Narkotika Utama", 18),
+    ("Barang Bukti", 36), ("Hasil SEMA", 16), ("Tingkat Keparahan", 14), ("Diagnosis", 10),
+    ("Keterlibatan Jaringan", 20), ("Rekomendasi", 30), ("Durasi", 12), ("Tempat Rehabilitasi", 30),
+]
+_INDEKS = {judul: i for i, (judul, _) in enumerate(KOLOM)}
+
+LAPOR_SETIAP = 1000
+
+
+def _kolom_data(judul):
+    """Referensi seluruh kolom lembar Data untuk rumus, mis. Data!$S:$S"""
+    huruf = chr(ord("A") + _INDEKS[judul])
+    return f"Data!${huruf}:${huruf}"
+
+
+def _periode(tahun, bulan=None):
+    """(awal, akhir) teks 'YYYY-MM-DD' untuk filter kolom dibuat arsip"""
+    if bulan:
+        akhir = f"{tahun + 1}-01-01" if bulan == 12 else f"{tahun}-{bulan + 1:02d}-01"
+        return f"{tahun}-{bulan:02d}-01", akhir
+    return f"{tahun}-01-01", f"{tahun + 1}-01-01"
+
+
+def hasil_sema(legal):
+    """Ringkasan satu kata hasil evaluasi SEMA 4/2010 untuk rekap"""
+    sema = legal.get('sema_result') or {}
+    if sema.get('sema_exceeded'):
+        return "Melebihi"
+    if sema.get('unit_issues'):
+        return "Perlu Verifikasi"
+    if sema.get('sema_within'):
+        return "Dalam Batas"
+    return "Tidak Dievaluasi"
+
+
+def baris_rekap(no, rekaman):
+    """Satu RekamanKasus -> list nilai sesuai KOLOM (kategori kosong ditulis '-' agar terhitung COUNTIFS)"""
+    data, medical = rekaman.data, rekaman.medical
+    legal, rec = rekaman.legal, rekaman.recommendation
+    dibuat = waktu_dibuat(rekaman.get('timestamp'))
+    detail = data.get('barang_bukti_detail') or {}
+    barang_bukti = ", ".join(
+        f"{jenis} {detail[jenis].get('jumlah', '')} {detail[jenis].get('satuan', '')}".strip()
+        if isinstance(detail.get(jenis), dict) else jenis
+        for jenis in data.get('barang_bukti_jenis') or []
+    )
+    return [
+        no, rekaman.kasus_id, dibuat, dibuat.month if dibuat else None,
+        data.get('nomor_surat', ''), data.get('nama', ''), data.get('nik', ''),
+        data.get('jenis_kelamin', ''), usia(data.get('tanggal_lahir'), dibuat),
+        data.get('instansi_pemohon') or "-", data.get('hasil_urine', ''),
+        ", ".join(data.get('jenis_narkotika_positif') or []), data.get('jenis_narkotika_utama') or "-",
+        barang_bukti, hasil_sema(legal), medical.get('severity_level', ''),
+        medical.get('diagnosis_code', ''), legal.get('keterlibatan_jaringan', ''),
+        rec.get('rekomendasi') or "-", rec.get('durasi', ''), rec.get('tempat', ''),
+    ]
+
+
+# =============================================================================
+# PENULIS
+# =============================================================================
+class _PenulisCsv:
+    def __init__(self, berkas):
+        # utf-8-sig: Excel mengenali encoding saat CSV dibuka langsung
+        self._teks = io.TextIOWrapper(berkas, encoding="utf-8-sig", newline="", write_through=True)
+        self._csv = csv.writer(self._teks)
+        self._csv.writerow([judul for judul, _ in KOLOM])
+
+    def tulis(self, baris):
+        if baris[2] is not None:
+            baris = baris[:2] + [baris[2].strftime("%Y-%m-%d")] + baris[3:]
+        self._csv.writerow(baris)
+
+    def selesai(self, statistik, judul):
+        self._teks.flush()
+        self._teks.detach()
+
+
+class _PenulisXlsx:
+    def __init__(self, berkas):
+        import xlsxwriter
+
+        self._wb = xlsxwriter.Workbook(berkas, {
+            'constant_memory': True,
+            # isian bebas (nama, kronologi) yang diawali '=' atau berisi URL tetap teks biasa
+            'strings_to_formulas': False,
+            'strings_to_urls': False,
+        })
+        self._tebal = self._wb.add_format({'bold': True})
+        self._judul = self._wb.add_format({'bold': True, 'font_size': 14})
+        self._kepala = self._wb.add_format({'bold': True, 'bg_color': '#1f4e79', 'font_color': 'white',
+                                            'border': 1, 'text_wrap': True, 'valign': 'top'})
+        self._tanggal = self._wb.add_format({'num_format': 'dd-mm-yyyy'})
+        # Ringkasan ditambahkan lebih dulu agar menjadi lembar pertama, diisi setelah Data selesai
+        self._ringkasan = self._wb.add_worksheet("Ringkasan")
+        self._data = self._wb.add_worksheet("Data")
+        for i, (judul, lebar) in enumerate(KOLOM):
+            self._data.set_column(i, i, lebar)
+            self._data.write(0, i, judul, self._kepala)
+        self._data.freeze_panes(1, 0)
+        self._baris = 0
+
+    def tulis(self, baris):
+        self._baris += 1
+        self._data.write_row(self._baris, 0, baris[:2])
+        if baris[2] is not None:
+            self._data.write_datetime(self._baris, 2, baris[2], self._tanggal)
+        self._data.write_row(self._baris, 3, baris[3:])
+
+    def _tabel(self, baris, judul, kategori, hitungan, kriteria):
+        """Satu tabel ringkasan 'kategori | jumlah' dengan rumus COUNTIFS + total"""
+        ws = self._ringkasan
+        ws.write(baris, 0, judul, self._kepala)
+        ws.write(baris, 1, "Jumlah", self._kepala)
+        awal = baris + 1
+        for nama in kategori:
+            baris += 1
+            ws.write_string(baris, 0, nama)
+            ws.write_formula(baris, 1, f'=COUNTIFS({kriteria},$A{baris + 1})', None, hitungan[nama])
+        baris += 1
+        ws.write(baris, 0, "Total", self._tebal)
+        ws.write_formula(baris, 1, f"=SUM(B{awal + 1}:B{baris})", self._tebal, sum(hitungan.values()))
+        return baris + 2
+
+    def selesai(self, statistik, judul):
+        if self._baris:
+            self._data.autofilter(0, 0, self._baris, len(KOLOM) - 1)
+        ws = self._ringkasan
+        ws.set_column(0, 0, 42)
+        ws.set_column(1, 8, 14)
+        ws.write(0, 0, judul, self._judul)
+        ws.write(1, 0, f"Dibuat {datetime.now():%d-%m-%Y %H:%M}")
+
+        # Per bulan x rekomendasi
+        rekomendasi = sorted(statistik['rekomendasi'])
+        baris = 3
+        ws.write(baris, 0, "Bulan", self._kepala)
+        for j, nama in enumerate(rekomendasi, 1):
+            ws.write(baris, j, nama, self._kepala)
+        ws.write(baris, len(rekomendasi) + 1, "Total", self._kepala)
+        awal = baris + 1
+        for bulan in sorted(b for b in statistik['bulan'] if b):
+            baris += 1
+            ws.write_string(baris, 0, NAMA_BULAN[bulan - 1])
+            for j, nama in enumerate(rekomendasi, 1):
+                huruf = chr(ord("A") + j)
+                ws.write_formula(
+                    baris, j,
+                    f'=COUNTIFS({_kolom_data("Bulan")},{bulan},{_kolom_data("Rekomendasi")},{huruf}${awal})',
+                    None, statistik['bulan_rekomendasi'][(bulan, nama)]
+                )
+            akhir_kolom = chr(ord("A") + len(rekomendasi))
+            ws.write_formula(baris, len(rekomendasi) + 1, f"=SUM(B{baris + 1}:{akhir_kolom}{baris + 1})",
+                             self._tebal, statistik['bulan'][bulan])
+        baris += 1
+        ws.write(baris, 0, "Total", self._tebal)
+        for j in range(1, len(rekomendasi) + 2):
+            huruf = chr(ord("A") + j)
+            nilai = (statistik['rekomendasi'][rekomendasi[j - 1]] if j <= len(rekomendasi)
+                     else statistik['total'])
+            ws.write_formula(baris, j, f"=SUM({huruf}{awal + 1}:{huruf}{baris})", self._tebal, nilai)
+        baris += 2
+
+        for judul_tabel, kunci, kolom in (
+            ("Narkotika Utama", 'narkotika', "Narkotika Utama"),
+            ("Hasil SEMA", 'sema', "Hasil SEMA"),
+            ("Instansi Pemohon", 'instansi', "Instansi Pemohon"),
+        ):
+            hitungan = statistik[kunci]
+            kategori = sorted(hitungan, key=lambda k: (-hitungan[k], k))
+            baris = self._tabel(baris, judul_tabel, kategori, hitungan, _kolom_data(kolom))
+        self._wb.close()
+
+
+PENULIS = {'xlsx': _PenulisXlsx, 'csv': _PenulisCsv}
+
+
+# =============================================================================
+# PROSES UTAMA
+# =============================================================================
+def tulis_rekap(berkas, tahun, bulan=None, format_rekap="xlsx", path_arsip=None, laporan=None):
+    """
+    Tulis rekap periode ke file-like biner `berkas`. laporan: callable(jumlah)
+    dipanggil tiap LAPOR_SETIAP kasus. Kembalikan jumlah kasus.
+    """
+    penulis = PENULIS[format_rekap](berkas)
+    statistik = {'total': 0, 'bulan': Counter(), 'rekomendasi': Counter(), 'bulan_rekomendasi': Counter(),
+                 'narkotika': Counter(), 'sema': Counter(), 'instansi': Counter()}
+    arsip = Arsip(path_arsip)
+    try:
+        for rekaman in iter_rekaman(arsip, batch=500, periode=_periode(tahun, bulan)):
+            statistik['total'] += 1
+            baris = baris_rekap(statistik['total'], rekaman)
+            penulis.tulis(baris)
+            bln, rek = baris[_INDEKS["Bulan"]], baris[_INDEKS["Rekomendasi"]]
+            statistik['bulan'][bln] += 1
+            statistik['rekomendasi'][rek] += 1
+            statistik['bulan_rekomendasi'][(bln, rek)] += 1
+            statistik['narkotika'][baris[_INDEKS["Narkotika Utama"]]] += 1
+            statistik['sema'][baris[_INDEKS["Hasil SEMA"]]] += 1
+            statistik['instansi'][baris[_INDEKS["Instansi Pemohon"]]] += 1
+            if laporan and statistik['total'] % LAPOR_SETIAP == 0:
+                laporan(statistik['total'])
+    finally:
+        arsip.close()
+    periode = f"{NAMA_BULAN[bulan - 1]} {tahun}" if bulan else f"Tahun {tahun}"
+    penulis.selesai(statistik, f"Rekap Asesmen Terpadu - {periode}")
+    return statistik['total']
+
+
+def nama_rekap(tahun, bulan=None, format_rekap="xlsx"):
+    return f"rekap_{tahun}" + (f"_{bulan:02d}" if bulan else "") + f".{format_rekap}"
+
+
+def buat_rekap(tahun, bulan=None, format_rekap="xlsx", path=None, path_arsip=None, laporan=None):
+    """Rekap ke berkas terenkripsi (enkripsi.buka_tulis) di KELUARAN_DIR; kembalikan (path, jumlah)"""
+    os.makedirs(KELUARAN_DIR, exist_ok=True)
+    path = path or os.path.join(KELUARAN_DIR, nama_rekap(tahun, bulan, format_rekap))
+    with enkripsi.buka_tulis(path) as berkas:
+        jumlah = tulis_rekap(berkas, tahun, bulan, format_rekap, path_arsip, laporan)
+    return path, jumlah
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rekap kasus TAT per bulan/tahun (XLSX/CSV)")
+    parser.add_argument("tahun", type=int)
+    parser.add_argument("--bulan", type=int, choices=range(1, 13), default=None)
+    parser.add_argument("--format", dest="format_rekap", choices=sorted(PENULIS), default="xlsx")
+    parser.add_argument("--arsip", default=None, help="path arsip SQLite")
+    parser.add_argument("--keluaran", default=None,
+                        help="path file tanpa enkripsi (default: terenkripsi di data/keluaran)")
+    args = parser.parse_args()
+
+    def lapor(jumlah):
+        print(f"\r{jumlah} kasus", end="", file=sys.stderr, flush=True)
+
+    if args.keluaran:
+        with open(args.keluaran, "wb") as berkas:
+            jumlah = tulis_rekap(berkas, args.tahun, args.bulan, args.format_rekap, args.arsip, lapor)
+        path = args.keluaran
+    else:
+        path, jumlah = buat_rekap(args.tahun, args.bulan, args.format_rekap,
+                                  path_arsip=args.arsip, laporan=lapor)
+    print(f"\r{jumlah} kasus -> {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
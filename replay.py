@@ -0,0 +1,251 @@
+"""
+=================================================================================
+REPLAY ARSIP "WHAT-IF" TERHADAP VERSI REGULASI BARU
+=================================================================================
+Menjalankan ulang seluruh kasus arsip melalui evaluate_barang_bukti_sema /
+analyze_legal_data / generate_recommendation dengan versi regulasi lain, lalu
+melaporkan kasus yang hasilnya berubah.
+
+    python replay.py regulasi_baru.json [--basis regulasi_lama.json]
+                     [--proses 4] [--keluaran diff.csv]
+
+Tanpa --basis, pembanding adalah hasil yang tersimpan di arsip (yang benar-benar
+diterbitkan). Kasus tidak dimuat sekaligus: tiap worker membaca rentang id
+sendiri langsung dari arsip, hanya baris yang berubah dikirim balik.
+
+Format file regulasi (JSON, semua key opsional):
+{
+  "versi": "SEMA-2026-draft",
+  "sema_limits": {"Ganja": {"limit": 10.0, "unit": "gram"}, "LSD": null},
+  "non_sema_list": ["Carisoprodol", "Tramadol"],
+  "tabel_rekomendasi": {"TIDAK|2-5|Bukan Berat": "R1-RAWAT-INAP",
+                        "TIDAK|2-5|Bukan Berat|Rawat Jalan": "R2-RAWAT-JALAN"},
+  "aturan_rekomendasi": {"R1-RAWAT-INAP": {"durasi": "3 (tiga) bulan"}}
+}
+sema_limits digabung ke batas SEMA efektif tenant kasus (SEMA_LIMITS aktif +
+override tenant di TAT_TENANT_FILE; null = hapus kategori); non_sema_list
+mengganti seluruh daftar (tanpa key ini: daftar tenant/aktif); tabel/aturan rekomendasi menimpa entri tabel aktif
+(kunci tanpa bagian penempatan ASAM berlaku untuk semua penempatan, kunci
+yang lebih spesifik menang).
+=================================================================================
+"""
+
+import argparse
+import copy
+import csv
+import json
+import multiprocessing
+import sys
+import time
+from collections import Counter
+
+from arsip import Arsip, ARSIP_PATH
+from tenant import REGISTRI, get_tenant
+from rekaman import iter_rekaman
+
+KOLOM_DIFF = [
+    'kasus_id', 'nomor_surat',
+    'rekomendasi_lama', 'rekomendasi_baru', 'rule_lama', 'rule_baru',
+    'keterlibatan_lama', 'keterlibatan_baru', 'sema_melebihi_lama', 'sema_melebihi_baru',
+]
+
+_app = None
+_regulasi_baru = None
+_regulasi_basis = None
+_path_arsip = None
+
+
+def muat_regulasi(path=None):
+    """
+    Bangun versi regulasi dari file JSON di atas regulasi aktif di app.py.
+    path None = regulasi aktif. Tabel rekomendasi diverifikasi lengkap & konsisten.
+    """
+    import app
+
+    spesifikasi = {}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            spesifikasi = json.load(f)
+
+    def _gabung(dasar):
+        sema_limits = dasar.get('sema_limits')
+        sema_limits = copy.deepcopy(app.SEMA_LIMITS if sema_limits is None else sema_limits)
+        for jenis, info in spesifikasi.get('sema_limits', {}).items():
+            if info is None:
+                sema_limits.pop(jenis, None)
+            else:
+                sema_limits[jenis] = info
+        non_sema_list = spesifikasi.get('non_sema_list', dasar.get('non_sema_list'))
+        if non_sema_list is None:
+            non_sema_list = list(app.NON_SEMA_LIST)
+        return {'sema_limits': sema_limits, 'non_sema_list': non_sema_list}
+
+    aturan = copy.deepcopy(app.ATURAN_REKOMENDASI)
+    for rule_id, keluaran in spesifikasi.get('aturan_rekomendasi', {}).items():
+        aturan.setdefault(rule_id, {}).update(keluaran)
+
+    tabel = dict(app.TABEL_REKOMENDASI)
+    entri = [(tuple(kunci_teks.split("|")), rule_id)
+             for kunci_teks, rule_id in spesifikasi.get('tabel_rekomendasi', {}).items()]
+    for kunci, rule_id in sorted(entri, key=lambda e: len(e[0])):
+        daftar_kunci = [kunci + (a,) for a in app.DOMAIN_ASAM] if len(kunci) == 3 else [kunci]
+        for k in daftar_kunci:
+            if k not in tabel:
+                raise ValueError(f"Kunci tabel rekomendasi tidak dikenal: {'|'.join(kunci)}")
+            tabel[k] = rule_id
+
+    tidak_terdefinisi = set(tabel.values()) - set(aturan)
+    if tidak_terdefinisi:
+        raise ValueError(f"Aturan tanpa keluaran: {sorted(tidak_terdefinisi)}")
+    for rule_id in set(tabel.values()):
+        kurang = set(app.ATURAN_REKOMENDASI[app.ATURAN_DEFAULT]) - set(aturan[rule_id])
+        if kurang:
+            raise ValueError(f"Aturan {rule_id} tidak lengkap: {sorted(kurang)}")
+
+    return {
+        'versi': spesifikasi.get('versi', path or 'aktif'),
+        **_gabung({}),
+        # Batas SEMA per tenant kasus (override tenant, lalu file di atasnya)
+        'per_tenant': {kode: _gabung(app.regulasi_tenant(t)) for kode, t in REGISTRI.items()},
+        'tabel': tabel,
+        'aturan': aturan,
+    }
+
+
+def _modul_app():
+    global _app
+    if _app is None:
+        import app
+        _app = app
+    return _app
+
+
+def evaluasi_kasus(data, regulasi):
+    """Jalankan analisis hukum + rekomendasi satu kasus di bawah versi regulasi (tenant kasus)"""
+    app = _modul_app()
+    medical = app.analyze_medical_data(data)
+    legal = app.analyze_legal_data(data, regulasi['per_tenant'][get_tenant(data.get('tenant')).kode])
+    rec = app.generate_recommendation(medical, legal, data, regulasi['tabel'], regulasi['aturan'])
+    return legal, rec
+
+
+def _init_worker(path_arsip, regulasi_baru, regulasi_basis):
+    global _regulasi_baru, _regulasi_basis, _path_arsip
+    _modul_app()
+    _path_arsip = path_arsip
+    _regulasi_baru = regulasi_baru
+    _regulasi_basis = regulasi_basis
+
+
+def _replay_rentang(rentang):
+    """Replay kasus id (awal, akhir]; kembalikan (jumlah_kasus, jumlah_dilewati, transisi, baris_diff)"""
+    awal, akhir = rentang
+    arsip = Arsip(_path_arsip)
+    n = 0
+    dilewati = 0
+    transisi = Counter()
+    diff = []
+    try:
+        for rekaman in iter_rekaman(arsip, batch=1000, sejak_id=awal, sampai_id=akhir):
+            if 'impor' in rekaman.data:
+                # Surat lama hasil impor tidak memuat input lengkap (barang bukti, DSM-5, ...)
+                dilewati += 1
+                continue
+            n += 1
+            data = rekaman.data.ke_dict()
+            legal_baru, rec_baru = evaluasi_kasus(data, _regulasi_baru)
+            if _regulasi_basis is None:
+                # Hasil terbit dibaca langsung dari rekaman (akses ala dict) tanpa konversi
+                legal_lama, rec_lama = rekaman.legal, rekaman.recommendation
+            else:
+                legal_lama, rec_lama = evaluasi_kasus(data, _regulasi_basis)
+
+            transisi[(rec_lama.get('rekomendasi'), rec_baru['rekomendasi'])] += 1
+            if (rec_lama.get('rekomendasi') != rec_baru['rekomendasi']
+                    or legal_lama.get('keterlibatan_jaringan') != legal_baru['keterlibatan_jaringan']):
+                diff.append({
+                    'kasus_id': rekaman.kasus_id,
+                    'nomor_surat': data.get('nomor_surat', ''),
+                    'rekomendasi_lama': rec_lama.get('rekomendasi'),
+                    'rekomendasi_baru': rec_baru['rekomendasi'],
+                    'rule_lama': rec_lama.get('rule_id', ''),
+                    'rule_baru': rec_baru.get('rule_id', ''),
+                    'keterlibatan_lama': legal_lama.get('keterlibatan_jaringan'),
+                    'keterlibatan_baru': legal_baru['keterlibatan_jaringan'],
+                    'sema_melebihi_lama': len(legal_lama.get('sema_result', {}).get('sema_exceeded', [])),
+                    'sema_melebihi_baru': len(legal_baru['sema_result']['sema_exceeded']),
+                })
+    finally:
+        arsip.close()
+    return n, dilewati, transisi, diff
+
+
+def replay_arsip(regulasi_baru, regulasi_basis=None, path_arsip=None, proses=None,
+                 ukuran_rentang=5000, tulis_diff=None):
+    """
+    Replay seluruh arsip paralel. tulis_diff: callable(baris) untuk tiap baris diff
+    (dipanggil di proses utama secara streaming). Kembalikan ringkasan dict.
+    """
+    path_arsip = path_arsip or ARSIP_PATH
+    arsip = Arsip(path_arsip)
+    id_min, id_maks = arsip.rentang_id()
+    arsip.close()
+
+    rentang = [(a, min(a + ukuran_rentang, id_maks))
+               for a in range(id_min - 1, id_maks, ukuran_rentang)] if id_maks else []
+
+    mulai = time.perf_counter()
+    total = 0
+    dilewati = 0
+    berubah = 0
+    transisi = Counter()
+    with multiprocessing.Pool(proses, initializer=_init_worker,
+                              initargs=(path_arsip, regulasi_baru, regulasi_basis)) as pool:
+        for n, lewat, trans, diff in pool.imap_unordered(_replay_rentang, rentang):
+            total += n
+            dilewati += lewat
+            berubah += len(diff)
+            transisi.update(trans)
+            if tulis_diff:
+                for baris in diff:
+                    tulis_diff(baris)
+
+    return {
+        'versi_baru': regulasi_baru['versi'],
+        'versi_basis': regulasi_basis['versi'] if regulasi_basis else 'arsip (hasil diterbitkan)',
+        'jumlah_kasus': total,
+        'jumlah_dilewati_impor': dilewati,
+        'jumlah_berubah': berubah,
+        'transisi': {f"{lama} -> {baru}": jumlah
+                     for (lama, baru), jumlah in transisi.most_common() if lama != baru},
+        'durasi_detik': round(time.perf_counter() - mulai, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay arsip TAT terhadap versi regulasi baru")
+    parser.add_argument("regulasi", help="file JSON versi regulasi baru")
+    parser.add_argument("--basis", help="file JSON versi regulasi pembanding (default: hasil arsip)")
+    parser.add_argument("--arsip", default=ARSIP_PATH)
+    parser.add_argument("--proses", type=int, default=None)
+    parser.add_argument("--keluaran", default="-", help="file CSV diff (default: stdout)")
+    args = parser.parse_args()
+
+    regulasi_baru = muat_regulasi(args.regulasi)
+    regulasi_basis = muat_regulasi(args.basis) if args.basis else None
+
+    out = sys.stdout if args.keluaran == "-" else open(args.keluaran, "w", newline="", encoding="utf-8")
+    try:
+        writer = csv.DictWriter(out, fieldnames=KOLOM_DIFF)
+        writer.writeheader()
+        ringkasan = replay_arsip(regulasi_baru, regulasi_basis, args.arsip, args.proses,
+                                 tulis_diff=writer.writerow)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(json.dumps(ringkasan, ensure_ascii=False, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
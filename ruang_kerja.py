@@ -0,0 +1,198 @@
+"""
+=================================================================================
+RUANG KERJA KASUS PER SESI ASESOR
+=================================================================================
+Satu sesi dapat memegang beberapa kasus sekaligus (mis. lima tersangka dari satu
+operasi). Hanya beberapa kasus terakhir yang dipakai disimpan di memori; kasus
+lain di-spill ke disk (pickle terenkripsi) sehingga pemakaian memori per sesi
+terbatas.
+Hasil analisis dan dokumen yang sudah di-render ikut tersimpan, jadi berpindah
+kasus tidak menghitung ulang apa pun.
+
+Direktori spill disentuh (mtime) tiap kali ruang kerja diakses sehingga
+bersihkan_usang hanya menghapus direktori sesi yang benar-benar ditinggalkan,
+dan dihapus saat sesi berakhir (objek RuangKerja dibuang dari session_state)
+atau saat proses berhenti. Bila berkas spill tetap hilang, kasus dimuat ulang
+dari arsip lewat `pemuat`.
+=================================================================================
+"""
+
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+
+import enkripsi
+from arsip import DATA_DIR
+
+RUANG_KERJA_DIR = os.path.join(DATA_DIR, "ruang_kerja")
+KASUS_DI_MEMORI = int(os.environ.get("TAT_KASUS_DI_MEMORI", "3"))
+UMUR_MAKS_DETIK = 24 * 3600  # direktori sesi yang tidak tersentuh selama ini dihapus
+
+STATUS_DIPROSES = "Diproses"
+STATUS_DIUNDUH = "Surat diunduh"
+
+
+def bersihkan_usang(direktori=None, umur_maks=UMUR_MAKS_DETIK):
+    """Hapus direktori spill milik sesi yang sudah lama berakhir"""
+    direktori = direktori or RUANG_KERJA_DIR
+    if not os.path.isdir(direktori):
+        return
+    batas = time.time() - umur_maks
+    for nama in os.listdir(direktori):
+        path = os.path.join(direktori, nama)
+        try:
+            if os.path.isdir(path) and os.path.getmtime(path) < batas:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+class RuangKerja:
+    """
+    Kumpulan kasus milik satu sesi, dikunci dengan kasus_id arsip.
+
+        rk = RuangKerja()
+        rk.tambah(hasil)          # jadi kasus aktif
+        rk.pilih(kasus_id)        # pindah kasus (muat dari disk bila perlu)
+        rk.hasil_aktif()          # dict hasil kasus aktif atau None
+
+    pemuat: callable(kasus_id) -> hasil atau None, dipakai bila berkas spill hilang
+    (mis. get_arsip().ambil_kasus).
+    """
+
+    def __init__(self, maks_di_memori=None, direktori=None, pemuat=None):
+        self.maks_di_memori = max(1, maks_di_memori or KASUS_DI_MEMORI)
+        self.id_sesi = uuid.uuid4().hex
+        self.direktori = os.path.join(direktori or RUANG_KERJA_DIR, self.id_sesi)
+        self.aktif = None
+        self.pemuat = pemuat
+        self._lock = threading.RLock()
+        self._memori = OrderedDict()  # kasus_id -> hasil (urutan LRU)
+        self._indeks = OrderedDict()  # kasus_id -> ringkasan kecil, urutan dibuat
+        # Streamlit tidak punya hook akhir sesi: direktori dihapus saat objek ini
+        # dibuang bersama session_state, atau saat proses berhenti
+        self._hapus_direktori = weakref.finalize(self, shutil.rmtree, self.direktori, True)
+        bersihkan_usang(os.path.dirname(self.direktori))
+
+    # -------------------------------------------------------------------------
+    def _path(self, kasus_id):
+        return os.path.join(self.direktori, f"kasus_{kasus_id}.pkl")
+
+    def _sentuh(self):
+        """Perbarui mtime direktori spill agar tidak dianggap usang oleh bersihkan_usang"""
+        try:
+            os.utime(self.direktori)
+        except FileNotFoundError:
+            pass
+
+    def _spill(self):
+        """Pindahkan kasus paling lama tidak dipakai ke disk sampai batas terpenuhi"""
+        while len(self._memori) > self.maks_di_memori:
+            kasus_id, hasil = self._memori.popitem(last=False)
+            os.makedirs(self.direktori, exist_ok=True)
+            with enkripsi.buka_tulis(self._path(kasus_id)) as f:
+                pickle.dump(hasil, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _muat(self, kasus_id):
+        hasil = self._memori.get(kasus_id)
+        if hasil is not None:
+            self._memori.move_to_end(kasus_id)
+            return hasil
+        path = self._path(kasus_id)
+        try:
+            with enkripsi.buka_baca(path) as f:
+                hasil = pickle.load(f)
+        except FileNotFoundError:
+            hasil = self.pemuat(kasus_id) if self.pemuat and kasus_id in self._indeks else None
+            if hasil is None:
+                # Tidak bisa dipulihkan: keluarkan dari ruang kerja
+                self._indeks.pop(kasus_id, None)
+                if self.aktif == kasus_id:
+                    self.aktif = None
+                return None
+        else:
+            os.remove(path)
+        self._memori[kasus_id] = hasil
+        self._spill()
+        return hasil
+
+    @staticmethod
+    def _ringkas(hasil, status):
+        return {
+            'kasus_id': hasil['kasus_id'],
+            'nama': hasil['data'].get('nama', ''),
+            'nomor_surat': hasil['data'].get('nomor_surat', ''),
+            'rekomendasi': hasil['recommendation']['rekomendasi'],
+            'status': status,
+            'dibuat': hasil.get('timestamp', ''),
+        }
+
+    # -------------------------------------------------------------------------
+    def tambah(self, hasil):
+        """Masukkan hasil asesmen baru (wajib punya kasus_id) dan jadikan aktif"""
+        kasus_id = hasil['kasus_id']
+        with self._lock:
+            self._sentuh()
+            self._indeks[kasus_id] = self._ringkas(hasil, STATUS_DIPROSES)
+            self._memori[kasus_id] = hasil
+            self._memori.move_to_end(kasus_id)
+            self.aktif = kasus_id
+            self._spill()
+        return kasus_id
+
+    def pilih(self, kasus_id):
+        """Jadikan kasus aktif; None = mulai kasus baru (tanpa hasil aktif)"""
+        with self._lock:
+            self._sentuh()
+            if kasus_id is not None and self._muat(kasus_id) is None:
+                kasus_id = None
+            self.aktif = kasus_id
+
+    def hasil_aktif(self):
+        with self._lock:
+            self._sentuh()
+            if self.aktif is None:
+                return None
+            return self._muat(self.aktif)
+
+    def tandai(self, kasus_id, status):
+        with self._lock:
+            if kasus_id in self._indeks:
+                self._indeks[kasus_id]['status'] = status
+
+    def hapus(self, kasus_id):
+        """Keluarkan kasus dari ruang kerja (arsip tidak tersentuh)"""
+        with self._lock:
+            self._indeks.pop(kasus_id, None)
+            self._memori.pop(kasus_id, None)
+            try:
+                os.remove(self._path(kasus_id))
+            except FileNotFoundError:
+                pass
+            if self.aktif == kasus_id:
+                self.aktif = None
+
+    def daftar(self):
+        """Ringkasan semua kasus, urutan dibuat, plus lokasi (memori/disk)"""
+        with self._lock:
+            self._sentuh()
+            return [dict(r, di_memori=k in self._memori) for k, r in self._indeks.items()]
+
+    def __len__(self):
+        return len(self._indeks)
+
+    def __contains__(self, kasus_id):
+        return kasus_id in self._indeks
+
+    def tutup(self):
+        """Hapus semua berkas spill sesi ini"""
+        with self._lock:
+            self._memori.clear()
+            self._indeks.clear()
+            self.aktif = None
+            shutil.rmtree(self.direktori, ignore_errors=True)
@@ -0,0 +1,238 @@
+"""
+=================================================================================
+INDEKS SARAN (AUTOCOMPLETE) INSTANSI, PENERIMA & PENANDATANGAN DARI ARSIP
+=================================================================================
+Isian berulang (instansi pemohon, penerima surat, jabatan/nama/NIP
+penandatangan) disarankan dari riwayat arsip agar ejaan seragam dan analitik
+tidak terpecah karena salah ketik.
+
+- Indeks di memori, satu per proses (st.cache_resource): list terurut potongan
+  teks per awal kata -> pencarian awalan dengan bisect; bila hasil kurang,
+  dilengkapi pencarian mirip untuk salah ketik (kandidat dari indeks trigram,
+  dinilai dengan difflib).
+- Dibangun sekali dari arsip lalu diperbarui inkremental (hanya kasus dengan
+  id > watermark) saat kasus baru disimpan; saran() tidak pernah menyentuh
+  database, sehingga rerun per ketikan tetap dalam hitungan milidetik.
+- Arsip dibaca & didekripsi di luar kunci indeks: pembangunan penuh mengisi
+  indeks baru lalu menukarnya, jadi saran() sesi lain tidak ikut menunggu.
+  Bila isi kasus lama ditulis ulang (terbit ulang ganti penandatangan, ganti
+  nomor surat; terlihat dari Arsip.versi_ubah()), perbarui() membangun ulang
+  indeks sehingga penandatangan lama tidak lagi disarankan.
+- Ejaan yang ditampilkan = ejaan paling sering untuk teks yang sama setelah
+  normalisasi (huruf kecil, spasi dirapikan); urutan saran = frekuensi.
+
+    python saran.py instansi_pemohon "polres tar"
+=================================================================================
+"""
+
+import argparse
+import bisect
+import difflib
+import threading
+from collections import Counter, defaultdict
+
+from tenant import TENANT_DEFAULT
+
+FIELD_SARAN = (
+    'instansi_pemohon',
+    'penerima_surat',
+    'jabatan_penandatangan',
+    'nama_penandatangan',
+    'nip_penandatangan',
+)
+MAKS_PINDAI = 200       # entri awalan yang diperiksa per pencarian
+MAKS_KANDIDAT = 50      # kandidat trigram yang dinilai difflib
+AMBANG_MIRIP = 0.75
+
+
+def _normal(teks):
+    return " ".join(str(teks or "").split()).casefold()
+
+
+def _trigram(teks):
+    teks = f"  {teks} "
+    return {teks[i:i + 3] for i in range(len(teks) - 2)}
+
+
+class IndeksSaran:
+    """
+    Indeks saran per field; aman dipakai bersama oleh banyak sesi. Bila tenant
+    diisi, hanya kasus tenant itu yang diindeks (riwayat provinsi lain tidak
+    ikut disarankan).
+
+        indeks = IndeksSaran()
+        indeks.perbarui(arsip)                     # awal/setelah terbit ulang: seluruh arsip, lalu hanya kasus baru
+        indeks.saran('instansi_pemohon', "polres") # -> ["Satresnarkoba Polres Tarakan", ...]
+        indeks.penandatangan("dr. budi")           # -> {'jabatan_penandatangan': ..., 'nip_penandatangan': ...}
+    """
+
+    def __init__(self, field=FIELD_SARAN, tenant=None):
+        self.field = tuple(field)
+        self.tenant = tenant
+        self.watermark = 0
+        self.versi_ubah = None                                         # Arsip.versi_ubah() saat dibangun
+        self._lock = threading.RLock()
+        self._kunci_bangun = threading.Lock()                          # satu pembaruan sekaligus
+        self._frekuensi = {f: Counter() for f in self.field}          # kunci -> jumlah kasus
+        self._ejaan = {f: defaultdict(Counter) for f in self.field}   # kunci -> Counter ejaan asli
+        self._awalan = {f: [] for f in self.field}                    # [(potongan, kunci)] terurut
+        self._trigram = {f: defaultdict(set) for f in self.field}     # trigram -> {kunci}
+        self._ttd = defaultdict(lambda: defaultdict(Counter))         # kunci nama -> field -> Counter
+
+    # -------------------------------------------------------------------------
+    def tambah(self, data):
+        """Masukkan isian satu kasus (dict data_lengkap) ke indeks"""
+        if self.tenant is not None and (data.get('tenant') or TENANT_DEFAULT) != self.tenant:
+            return
+        with self._lock:
+            for f in self.field:
+                asli = " ".join(str(data.get(f) or "").split())
+                kunci = _normal(asli)
+                if not kunci:
+                    continue
+                if kunci not in self._frekuensi[f]:
+                    kata = kunci.split(" ")
+                    for i in range(len(kata)):
+                        bisect.insort(self._awalan[f], (" ".join(kata[i:]), kunci))
+                    for g in _trigram(kunci):
+                        self._trigram[f][g].add(kunci)
+                self._frekuensi[f][kunci] += 1
+                self._ejaan[f][kunci][asli] += 1
+            nama = _normal(data.get('nama_penandatangan'))
+            if nama:
+                for f in ('jabatan_penandatangan', 'nip_penandatangan'):
+                    if data.get(f):
+                        self._ttd[nama][f][data[f]] += 1
+
+    def perbarui(self, arsip, batch=500):
+        """
+        Tambahkan kasus arsip dengan id > watermark; bangun ulang seluruhnya bila
+        belum pernah dibangun atau ada kasus lama yang ditulis ulang sejak itu.
+        Kembalikan jumlah kasus yang dibaca (0 bila pembaruan lain sedang jalan:
+        kasus barunya ikut terbaca di sana atau di pembaruan berikutnya).
+        """
+        if not self._kunci_bangun.acquire(blocking=False):
+            return 0
+        try:
+            versi = arsip.versi_ubah()
+            if versi != self.versi_ubah:
+                return self._bangun(arsip, batch, versi)
+            baru = list(arsip.iter_kasus(batch=batch, sejak_id=self.watermark))
+            with self._lock:
+                for hasil in baru:
+                    self.tambah(hasil['data'])
+                    self.watermark = max(self.watermark, hasil['kasus_id'])
+            return len(baru)
+        finally:
+            self._kunci_bangun.release()
+
+    def perbarui_latar(self, arsip, batch=500):
+        """perbarui() di thread latar: pembangunan penuh tidak menahan rerun pemanggil"""
+        thread = threading.Thread(target=self.perbarui, args=(arsip, batch), daemon=True,
+                                  name="indeks-saran")
+        thread.start()
+        return thread
+
+    def bangun_ulang(self, arsip, batch=500):
+        """Bangun ulang indeks dari seluruh arsip (mis. setelah terbit ulang); kembalikan jumlah kasus"""
+        with self._kunci_bangun:
+            return self._bangun(arsip, batch, arsip.versi_ubah())
+
+    def _bangun(self, arsip, batch, versi):
+        """Isi indeks baru dari arsip tanpa memegang kunci indeks ini, lalu tukar isinya"""
+        baru = IndeksSaran(self.field, self.tenant)
+        jumlah = 0
+        for hasil in arsip.iter_kasus(batch=batch):
+            baru.tambah(hasil['data'])
+            baru.watermark = max(baru.watermark, hasil['kasus_id'])
+            jumlah += 1
+        with self._lock:
+            self.watermark, self.versi_ubah = baru.watermark, versi
+            self._frekuensi, self._ejaan = baru._frekuensi, baru._ejaan
+            self._awalan, self._trigram, self._ttd = baru._awalan, baru._trigram, baru._ttd
+        return jumlah
+
+    # -------------------------------------------------------------------------
+    def _tampil(self, f, kunci):
+        return self._ejaan[f][kunci].most_common(1)[0][0]
+
+    def saran(self, field, teks, limit=5):
+        """
+        Hingga `limit` isian riwayat untuk teks yang sedang diketik: cocok awalan
+        kata lebih dulu, lalu mirip (salah ketik); teks kosong -> paling sering.
+        """
+        q = _normal(teks)
+        with self._lock:
+            frekuensi = self._frekuensi[field]
+            if not q:
+                return [self._tampil(field, k) for k, _ in frekuensi.most_common(limit)]
+
+            awalan = self._awalan[field]
+            cocok = set()
+            i = bisect.bisect_left(awalan, (q,))
+            for potongan, kunci in awalan[i:i + MAKS_PINDAI]:
+                if not potongan.startswith(q):
+                    break
+                cocok.add(kunci)
+            hasil = sorted(cocok, key=lambda k: (-frekuensi[k], k))[:limit]
+
+            if len(hasil) < limit:
+                hasil += self._mirip(field, q, limit - len(hasil), set(hasil))
+            return [self._tampil(field, k) for k in hasil]
+
+    def _mirip(self, field, q, limit, kecuali):
+        """Salah ketik: kandidat berbagi trigram terbanyak, dinilai per potongan awal kata"""
+        indeks = self._trigram[field]
+        berbagi = Counter()
+        for g in _trigram(q):
+            berbagi.update(indeks.get(g, ()))
+        pembanding = difflib.SequenceMatcher(b=q, autojunk=False)
+        nilai = []
+        for kunci, _ in berbagi.most_common(MAKS_KANDIDAT):
+            if kunci in kecuali:
+                continue
+            kata = kunci.split(" ")
+            terbaik = 0.0
+            for i in range(len(kata)):
+                pembanding.set_seq1(" ".join(kata[i:])[:len(q)])
+                if pembanding.real_quick_ratio() >= AMBANG_MIRIP and pembanding.quick_ratio() >= AMBANG_MIRIP:
+                    terbaik = max(terbaik, pembanding.ratio())
+            if terbaik >= AMBANG_MIRIP:
+                nilai.append((-terbaik, -self._frekuensi[field][kunci], kunci))
+        return [kunci for *_, kunci in sorted(nilai)[:limit]]
+
+    def penandatangan(self, nama):
+        """Jabatan & NIP yang paling sering dipakai bersama nama penandatangan ini"""
+        with self._lock:
+            riwayat = self._ttd.get(_normal(nama))
+            if not riwayat:
+                return {}
+            return {f: c.most_common(1)[0][0] for f, c in riwayat.items()}
+
+    def statistik(self):
+        with self._lock:
+            return {f: len(self._frekuensi[f]) for f in self.field}
+
+
+def main():
+    from arsip import Arsip
+
+    parser = argparse.ArgumentParser(description="Uji indeks saran isian dari arsip")
+    parser.add_argument("field", choices=FIELD_SARAN)
+    parser.add_argument("teks", nargs="?", default="")
+    parser.add_argument("--tenant", default=None, help="hanya kasus tenant ini")
+    parser.add_argument("--arsip", default=None, help="path arsip SQLite")
+    args = parser.parse_args()
+
+    arsip = Arsip(args.arsip)
+    indeks = IndeksSaran(tenant=args.tenant)
+    try:
+        print(f"{indeks.perbarui(arsip)} kasus diindeks: {indeks.statistik()}")
+    finally:
+        arsip.close()
+    for s in indeks.saran(args.field, args.teks, limit=10):
+        print(f"  {s}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+=================================================================================
+SINKRON MODE LAPANGAN (LAPTOP POLRES/LAPAS -> SERVER BNN PROVINSI)
+=================================================================================
+Di lokasi dengan koneksi buruk aplikasi berjalan di laptop dengan arsip
+SQLite lokal seperti biasa. Setiap kasus yang selesai otomatis masuk antrian
+sinkron (kasus tanpa baris di tabel sinkron_keluar) dan dikirim ke server
+provinsi saat koneksi tersedia:
+
+    python sinkron.py kirim [--terus --interval 300]     # di laptop lapangan
+    python sinkron.py status                             # antrian & konflik
+    python sinkron.py ganti-nomor 12 "B/..../2025/BNN KALTARA"
+    python sinkron.py server --port 8765 [--lambat 64]   # penerima di server
+
+- Delta: hanya kasus yang belum diakui server yang dikirim, dalam batch JSON
+  terkompresi deflate (maks. MAKS_BATCH_KASUS kasus / MAKS_BATCH_BYTES).
+- Dapat dilanjutkan: tiap batch dicatat begitu diakui server; batch yang
+  terputus atau balasannya hilang cukup dikirim ulang (server idempoten per
+  perangkat + id kasus lokal), sehingga paling banyak satu batch diulang.
+- Konflik nomor_surat: bila nomor sudah dipakai kasus lain di server, kasus
+  ditolak dan ditandai 'konflik' di laptop; selesaikan dengan ganti-nomor
+  (kasus diantrikan ulang; surat yang sudah terbit ditandatangani ulang dengan
+  nomor baru, termasuk lampiran email yang masih antri, dan .docx lama di
+  gudang dilepas). Isi identik dengan kasus pusat = 'duplikat'.
+- Kasus yang ditulis ulang di laptop setelah tersinkron (terbit ulang, ganti
+  nomor) diantrikan ulang; server menimpa kasus pusatnya ('diperbarui').
+- `server` adalah penerima di sisi provinsi sekaligus server pengganti untuk
+  uji coba lokal; --lambat KBPS mensimulasikan link lambat. Gunakan HTTPS
+  (reverse proxy) di luar jaringan lokal: isi kasus dikirim tanpa enkripsi
+  arsip, lalu dienkripsi ulang dengan kunci server saat disimpan.
+
+Konfigurasi lewat env: TAT_MODE_LAPANGAN=1 (status antrian sinkron tampil di
+sidebar aplikasi), TAT_SINKRON_SERVER (URL), TAT_SINKRON_TOKEN (token bersama
+laptop & server), TAT_ID_PERANGKAT (default dibuat sekali di
+DATA_DIR/id_perangkat).
+=================================================================================
+"""
+
+import argparse
+import hmac
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+import zlib
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from arsip import Arsip, DATA_DIR
+from gudang import GudangBlob, ref_surat
+
+MODE_LAPANGAN = os.environ.get("TAT_MODE_LAPANGAN", "0") == "1"
+SINKRON_SERVER = os.environ.get("TAT_SINKRON_SERVER", "http://127.0.0.1:8765")
+SINKRON_TOKEN = os.environ.get("TAT_SINKRON_TOKEN", "")
+ID_PERANGKAT_FILE = os.path.join(DATA_DIR, "id_perangkat")
+JALUR_BATCH = "/sinkron/batch"
+
+MAKS_BATCH_KASUS = 200
+MAKS_BATCH_BYTES = 1024 * 1024      # JSON sebelum kompresi
+MAKS_BADAN_MASUK = 8 * 1024 * 1024  # batas dekompresi di server (bom zip)
+LEVEL_KOMPRESI = 9
+BATAS_WAKTU = 120                   # detik per permintaan
+MAKS_PERCOBAAN = 5
+BACKOFF_DASAR = 2                   # detik; percobaan ke-n menunggu BACKOFF_DASAR * 2**(n-1)
+
+
+class SinkronGagal(RuntimeError):
+    """Server tidak dapat dihubungi / menolak batch; kasus tetap di antrian lokal"""
+
+
+def id_perangkat():
+    """ID laptop lapangan (env TAT_ID_PERANGKAT atau file yang dibuat sekali)"""
+    nilai = os.environ.get("TAT_ID_PERANGKAT")
+    if nilai:
+        return nilai
+    if not os.path.exists(ID_PERANGKAT_FILE):
+        os.makedirs(os.path.dirname(ID_PERANGKAT_FILE), exist_ok=True)
+        with open(ID_PERANGKAT_FILE, "w") as f:
+            f.write(uuid.uuid4().hex)
+    with open(ID_PERANGKAT_FILE) as f:
+        return f.read().strip()
+
+
+# =============================================================================
+# KLIEN (LAPTOP LAPANGAN)
+# =============================================================================
+def _kemas(perangkat, daftar_hasil):
+    """
+    Bytes batch terkompresi + list kasus_id yang termuat. Kasus ditambahkan
+    sampai MAKS_BATCH_BYTES terlampaui (minimal satu kasus per batch).
+    """
+    item, ids, ukuran = [], [], 0
+    for hasil in daftar_hasil:
+        teks = json.dumps({
+            'kasus_id': hasil['kasus_id'],
+            'hasil': {k: hasil[k] for k in ('data', 'medical', 'legal', 'recommendation', 'timestamp')},
+        }, ensure_ascii=False, separators=(",", ":"))
+        if item and ukuran + len(teks) > MAKS_BATCH_BYTES:
+            break
+        item.append(teks)
+        ids.append(hasil['kasus_id'])
+        ukuran += len(teks)
+    badan = '{"perangkat":%s,"kasus":[%s]}' % (json.dumps(perangkat), ",".join(item))
+    return zlib.compress(badan.encode("utf-8"), LEVEL_KOMPRESI), ids
+
+
+def _kirim_batch(server, token, badan):
+    """POST satu batch, kembalikan list balasan per kasus; ulangi bila koneksi gagal"""
+    permintaan = urllib.request.Request(
+        server.rstrip("/") + JALUR_BATCH, data=badan, method="POST",
+        headers={'Content-Type': "application/json", 'Content-Encoding': "deflate",
+                 'Authorization': f"Bearer {token}"}
+    )
+    for percobaan in range(1, MAKS_PERCOBAAN + 1):
+        try:
+            with urllib.request.urlopen(permintaan, timeout=BATAS_WAKTU) as respons:
+                return json.loads(respons.read())['hasil']
+        except urllib.error.HTTPError as e:
+            if e.code < 500:
+                raise SinkronGagal(f"server menolak batch: HTTP {e.code} {e.reason}") from e
+            galat = e
+        except (urllib.error.URLError, OSError) as e:
+            galat = e
+        if percobaan < MAKS_PERCOBAAN:
+            time.sleep(BACKOFF_DASAR * 2 ** (percobaan - 1))
+    raise SinkronGagal(f"server tidak dapat dihubungi: {galat}")
+
+
+def sinkronkan(arsip, server=None, token=None, perangkat=None, laporan=None):
+    """
+    Kirim semua kasus yang belum tersinkron, batch demi batch. Kembalikan dict
+    status (Counter diterima/duplikat/diperbarui/konflik), kasus, bytes, durasi_detik.
+    SinkronGagal diteruskan; batch yang sudah diakui tetap tercatat.
+    """
+    server = server or SINKRON_SERVER
+    token = SINKRON_TOKEN if token is None else token
+    perangkat = perangkat or id_perangkat()
+    status, total_bytes, sejak_id = Counter(), 0, 0
+    mulai = time.perf_counter()
+    while True:
+        daftar = arsip.ambil_belum_sinkron(sejak_id, MAKS_BATCH_KASUS)
+        if not daftar:
+            break
+        badan, ids = _kemas(perangkat, daftar)
+        balasan = _kirim_batch(server, token, badan)
+        arsip.catat_sinkron(balasan)
+        status.update(h['status'] for h in balasan)
+        total_bytes += len(badan)
+        sejak_id = ids[-1]
+        if laporan:
+            laporan(status, total_bytes)
+    return {'status': status, 'kasus': sum(status.values()), 'bytes': total_bytes,
+            'durasi_detik': round(time.perf_counter() - mulai, 2)}
+
+
+def ganti_nomor(arsip, kasus_id, nomor_surat, pengguna=""):
+    """
+    Selesaikan konflik dengan nomor surat baru. Surat yang sudah diterbitkan
+    (ref gudang kasus/N.pdf) ditandatangani ulang dengan nomor baru dan
+    menggantikan lampiran kiriman yang masih antri; .docx bernomor lama dilepas
+    dari gudang (di-render ulang saat dibutuhkan). Mengembalikan jumlah kiriman
+    yang diganti/dibatalkan.
+    """
+    import tanda_tangan
+    from audit import LogAudit
+
+    gudang = GudangBlob()
+    try:
+        ref_word, ref_pdf = ref_surat(kasus_id, 'docx'), ref_surat(kasus_id, 'pdf')
+        surat = kunci = None
+        if gudang.cari(ref_pdf):
+            hasil = arsip.ambil_kasus(kasus_id)
+            if hasil is None:
+                raise KeyError(kasus_id)
+            hasil['data']['nomor_surat'] = nomor_surat
+            kunci = tanda_tangan.muat_kunci()
+            surat = tanda_tangan.tandatangani_surat(hasil, kunci)
+        jumlah = arsip.ganti_nomor_surat(kasus_id, nomor_surat, surat)
+        gudang.lepas(ref_word)
+        if surat is None:
+            gudang.lepas(ref_pdf)
+            return jumlah
+        gudang.simpan(surat['pdf'], ref_pdf)
+    finally:
+        gudang.close()
+
+    audit = LogAudit(kunci=kunci)
+    try:
+        audit.catat('tanda_tangan_surat', pengguna=pengguna, kasus_id=kasus_id,
+                    nomor_surat=surat['nomor_surat'], sha256=surat['sha256'],
+                    id_kunci=surat['id_kunci'], alasan='ganti_nomor')
+    finally:
+        audit.close()
+    return jumlah
+
+
+# =============================================================================
+# SERVER (PENERIMA PROVINSI / PENGGANTI UNTUK UJI COBA)
+# =============================================================================
+class _PenerimaSinkron(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        print(f"{datetime.now():%H:%M:%S} {self.address_string()} {fmt % args}", file=sys.stderr)
+
+    def _balas(self, kode, obj):
+        isi = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(kode)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(isi)))
+        self.end_headers()
+        self.wfile.write(isi)
+
+    def _baca_badan(self):
+        sisa = int(self.headers.get("Content-Length", 0))
+        lambat = self.server.lambat
+        if not lambat:
+            return self.rfile.read(sisa)
+        # Simulasi link lambat: baca per potongan, tidur sesuai kecepatan (bytes/detik)
+        potongan = []
+        while sisa:
+            data = self.rfile.read(min(sisa, 1024))
+            if not data:
+                break
+            potongan.append(data)
+            sisa -= len(data)
+            time.sleep(len(data) / lambat)
+        return b"".join(potongan)
+
+    def do_GET(self):
+        self._balas(200, {'status': 'ok'})
+
+    def do_POST(self):
+        if self.path != JALUR_BATCH:
+            self._balas(404, {'error': "jalur tidak dikenal"})
+            return
+        token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(token.encode(), self.server.token.encode()):
+            self._balas(401, {'error': "token tidak valid"})
+            return
+        try:
+            badan = self._baca_badan()
+            if self.headers.get("Content-Encoding") == "deflate":
+                d = zlib.decompressobj()
+                badan = d.decompress(badan, MAKS_BADAN_MASUK)
+                if d.unconsumed_tail:
+                    self._balas(413, {'error': "batch terlalu besar"})
+                    return
+            batch = json.loads(badan)
+            daftar = [{'kasus_id': int(k['kasus_id']), 'hasil': k['hasil']} for k in batch['kasus']]
+            perangkat = str(batch['perangkat'])
+        except (ValueError, KeyError, TypeError, zlib.error) as e:
+            self._balas(400, {'error': f"batch rusak: {e}"})
+            return
+        balasan = self.server.arsip.terima_sinkron(perangkat, daftar)
+        jumlah = Counter(h['status'] for h in balasan)
+        print(f"{datetime.now():%H:%M:%S} {perangkat[:12]}: "
+              + ", ".join(f"{k} {v}" for k, v in sorted(jumlah.items())), file=sys.stderr)
+        self._balas(200, {'hasil': balasan})
+
+
+class ServerSinkron(ThreadingHTTPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, alamat, arsip, token, lambat=None):
+        super().__init__(alamat, _PenerimaSinkron)
+        self.arsip = arsip
+        self.token = token
+        self.lambat = lambat  # bytes/detik, None = tanpa batas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sinkron kasus mode lapangan ke server provinsi")
+    parser.add_argument("--arsip", default=None, help="path arsip SQLite")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    p_kirim = sub.add_parser("kirim", help="kirim kasus yang belum tersinkron")
+    p_kirim.add_argument("--server", default=SINKRON_SERVER)
+    p_kirim.add_argument("--terus", action="store_true", help="ulangi tiap --interval detik")
+    p_kirim.add_argument("--interval", type=float, default=300)
+    sub.add_parser("status", help="jumlah antrian sinkron & daftar konflik")
+    p_ganti = sub.add_parser("ganti-nomor", help="ganti nomor surat kasus konflik lalu antrikan ulang")
+    p_ganti.add_argument("kasus_id", type=int)
+    p_ganti.add_argument("nomor_surat")
+    p_server = sub.add_parser("server", help="penerima sinkron (server provinsi / uji coba)")
+    p_server.add_argument("--host", default="127.0.0.1")
+    p_server.add_argument("--port", type=int, default=8765)
+    p_server.add_argument("--lambat", type=float, default=None, help="simulasi link lambat (kbit/detik)")
+    args = parser.parse_args()
+
+    arsip = Arsip(args.arsip)
+    try:
+        if args.perintah == "kirim":
+            while True:
+                try:
+                    r = sinkronkan(arsip, args.server)
+                    print(f"{datetime.now():%H:%M:%S} {r['kasus']} kasus, {r['bytes'] / 1024:.1f} KB, "
+                          f"{r['durasi_detik']} s: {dict(r['status'])}", file=sys.stderr)
+                except SinkronGagal as e:
+                    print(f"{datetime.now():%H:%M:%S} {e}; {arsip.jumlah_belum_sinkron()} kasus menunggu",
+                          file=sys.stderr)
+                    if not args.terus:
+                        sys.exit(1)
+                if not args.terus:
+                    break
+                time.sleep(args.interval)
+        elif args.perintah == "server":
+            if not SINKRON_TOKEN:
+                parser.error("set TAT_SINKRON_TOKEN terlebih dahulu")
+            lambat = args.lambat * 1000 / 8 if args.lambat else None
+            with ServerSinkron((args.host, args.port), arsip, SINKRON_TOKEN, lambat) as server:
+                print(f"Penerima sinkron di http://{args.host}:{args.port}{JALUR_BATCH}", file=sys.stderr)
+                server.serve_forever()
+        elif args.perintah == "ganti-nomor":
+            jumlah = ganti_nomor(arsip, args.kasus_id, args.nomor_surat)
+            print(f"Kasus #{args.kasus_id} diantrikan ulang dengan nomor {args.nomor_surat}"
+                  + (f"; {jumlah} kiriman antri diperbarui" if jumlah else ""))
+        else:
+            print(f"{arsip.jumlah_belum_sinkron()} kasus menunggu sinkron")
+            for s in arsip.status_sinkron('konflik'):
+                print(f"#{s['kasus_id']:<6} {s['nomor_surat']:<40} {s['pesan'] or ''}"[:160])
+    finally:
+        arsip.close()
+
+
+if __name__ == "__main__":
+    main()
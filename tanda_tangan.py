@@ -0,0 +1,230 @@
+"""
+=================================================================================
+TANDA TANGAN ELEKTRONIK & HASH INTEGRITAS SURAT TAT
+=================================================================================
+- Kunci penandatangan dikonfigurasi lokal (env TAT_KUNCI_TTE berisi hex, atau
+  file TAT_KUNCI_TTE_FILE; default dibuat otomatis di DATA_DIR/kunci_tte.key).
+  32 byte kunci = seed Ed25519.
+- Kode verifikasi = HMAC-SHA256 atas isi asesmen, dicetak di footer PDF.
+- Tanda tangan = Ed25519 atas file PDF final, didaftarkan di arsip sehingga
+  surat unggahan dapat diverifikasi dengan satu lookup hash. Instansi penerima
+  cukup memegang kunci publik (bukan rahasia) untuk memverifikasi sendiri:
+
+    python tanda_tangan.py kunci-publik > kunci_tte.pub.pem
+    python tanda_tangan.py verifikasi surat.pdf surat.pdf.sig --kunci-publik kunci_tte.pub.pem
+    openssl pkeyutl -verify -pubin -inkey kunci_tte.pub.pem -rawin -in surat.pdf -sigfile surat.pdf.sig
+
+- Surat lama bertanda HMAC-SHA256 (sebelum Ed25519) tetap terverifikasi lewat
+  arsip dengan kunci yang sama.
+=================================================================================
+"""
+
+import argparse
+import functools
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+
+from arsip import DATA_DIR
+
+KUNCI_FILE_DEFAULT = os.path.join(DATA_DIR, "kunci_tte.key")
+
+_kunci_worker = None
+
+
+def muat_kunci():
+    """Muat kunci TTE dari env/file; buat file kunci baru jika belum ada"""
+    kunci_hex = os.environ.get("TAT_KUNCI_TTE")
+    if kunci_hex:
+        return bytes.fromhex(kunci_hex.strip())
+
+    path = os.environ.get("TAT_KUNCI_TTE_FILE", KUNCI_FILE_DEFAULT)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+    with open(path) as f:
+        return bytes.fromhex(f.read().strip())
+
+
+@functools.lru_cache(maxsize=4)
+def _kunci_privat(kunci):
+    return Ed25519PrivateKey.from_private_bytes(kunci)
+
+
+def kunci_publik(kunci):
+    """Kunci publik Ed25519 (32 byte) untuk dibagikan ke instansi penerima"""
+    return _kunci_privat(kunci).public_key().public_bytes(
+        serialization.Encoding.Raw, serialization.PublicFormat.Raw
+    )
+
+
+def pem_kunci_publik(kunci):
+    return _kunci_privat(kunci).public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+
+def id_kunci(kunci):
+    """Sidik jari kunci publik (bukan rahasia) untuk mencatat kunci mana yang dipakai"""
+    return hashlib.sha256(b"TAT-KUNCI-ED25519\x00" + kunci_publik(kunci)).hexdigest()[:16]
+
+
+def _id_kunci_hmac(kunci):
+    """Sidik jari kunci pada surat lama bertanda HMAC"""
+    return hashlib.sha256(b"TAT-KUNCI\x00" + kunci).hexdigest()[:16]
+
+
+def kode_verifikasi(hasil, kunci):
+    """HMAC atas isi asesmen (kanonis) - dicetak di surat sebagai kode verifikasi"""
+    payload = json.dumps(
+        [hasil['data'], hasil['medical'], hasil['legal'], hasil['recommendation']],
+        ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")
+    return hmac.new(kunci, payload, hashlib.sha256).hexdigest()
+
+
+def format_kode(kode):
+    """Bentuk ringkas kode verifikasi untuk dicetak, mis. 'A1B2-C3D4-E5F6-A7B8-C9D0'"""
+    k = kode[:20].upper()
+    return "-".join(k[i:i + 4] for i in range(0, len(k), 4))
+
+
+def tandatangani_bytes(isi, kunci):
+    """Kembalikan (sha256_hex, tanda_tangan_hex) untuk isi file final (Ed25519 atas isi)"""
+    return hashlib.sha256(isi).hexdigest(), _kunci_privat(kunci).sign(isi).hex()
+
+
+def verifikasi_bytes(isi, tanda_tangan, publik):
+    """Verifikasi tanda tangan Ed25519 (hex/bytes) atas isi dengan kunci publik (32 byte); tanpa arsip"""
+    if isinstance(tanda_tangan, str):
+        tanda_tangan = bytes.fromhex(tanda_tangan)
+    try:
+        Ed25519PublicKey.from_public_bytes(publik).verify(tanda_tangan, isi)
+    except (InvalidSignature, ValueError):
+        return False
+    return True
+
+
+def tandatangani_surat(hasil, kunci):
+    """Render PDF bertanda (kode verifikasi di footer) lalu tandatangani file final"""
+    from app import generate_pdf_document
+
+    kode = kode_verifikasi(hasil, kunci)
+    pdf_buffer = generate_pdf_document(
+        hasil['data'], hasil['medical'], hasil['legal'], hasil['recommendation'],
+        kode_verifikasi=format_kode(kode), mode_arsip=True
+    )
+    isi = pdf_buffer.getvalue()
+    sha, ttd = tandatangani_bytes(isi, kunci)
+    return {
+        'pdf': isi,
+        'sha256': sha,
+        'kasus_id': hasil.get('kasus_id'),
+        'nomor_surat': hasil['data']['nomor_surat'],
+        'format': 'pdf',
+        'kode_verifikasi': kode,
+        'tanda_tangan': ttd,
+        'id_kunci': id_kunci(kunci),
+    }
+
+
+def _init_worker(kunci):
+    global _kunci_worker
+    _kunci_worker = kunci
+    # Impor pustaka dokumen sekali per worker, bukan per surat
+    import app  # noqa: F401
+
+
+def _tandatangani_worker(hasil):
+    return tandatangani_surat(hasil, _kunci_worker)
+
+
+def tandatangani_batch(daftar_hasil, arsip, kunci=None, max_workers=None, chunksize=4):
+    """
+    Render + tandatangani banyak surat secara paralel (pool proses), lalu
+    daftarkan seluruh hash ke arsip dalam satu transaksi.
+    Mengembalikan list hasil tanda tangan (urutan sama dengan input).
+    """
+    kunci = kunci or muat_kunci()
+    daftar_hasil = list(daftar_hasil)
+    if not daftar_hasil:
+        return []
+
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             initializer=_init_worker, initargs=(kunci,)) as pool:
+        hasil_ttd = list(pool.map(_tandatangani_worker, daftar_hasil, chunksize=chunksize))
+
+    arsip.simpan_surat(hasil_ttd)
+    return hasil_ttd
+
+
+def verifikasi_surat(isi, arsip, kunci=None):
+    """
+    Verifikasi file surat unggahan terhadap arsip; surat yang sudah digantikan
+    (terbit ulang / ganti nomor untuk kasus yang sama) tidak lagi valid.
+    Mengembalikan dict: valid (bool), alasan (str), surat (row arsip atau None).
+    """
+    kunci = kunci or muat_kunci()
+    surat = arsip.cari_surat(hashlib.sha256(isi).hexdigest())
+
+    if surat is None:
+        return {'valid': False, 'alasan': "Surat tidak terdaftar di arsip (file berbeda/diubah)", 'surat': None}
+    if surat['id_kunci'] == id_kunci(kunci):
+        cocok = verifikasi_bytes(isi, surat['tanda_tangan'], kunci_publik(kunci))
+    elif surat['id_kunci'] == _id_kunci_hmac(kunci):
+        digest = hashlib.sha256(isi).digest()
+        ttd = hmac.new(kunci, b"TAT-PDF\x00" + digest, hashlib.sha256).hexdigest()
+        cocok = hmac.compare_digest(surat['tanda_tangan'], ttd)
+    else:
+        return {'valid': False, 'alasan': "Surat ditandatangani dengan kunci lain", 'surat': surat}
+    if not cocok:
+        return {'valid': False, 'alasan': "Tanda tangan tidak cocok", 'surat': surat}
+    if surat.get('digantikan'):
+        # Asli, tetapi kasus yang sama sudah diterbitkan ulang (penandatangan/nomor baru)
+        return {'valid': False, 'alasan': "Surat asli tetapi sudah digantikan terbitan yang lebih baru",
+                'surat': surat}
+    return {'valid': True, 'alasan': "Surat asli dan tidak diubah", 'surat': surat}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kunci publik & verifikasi tanda tangan surat TAT")
+    sub = parser.add_subparsers(dest="perintah", required=True)
+    sub.add_parser("kunci-publik", help="cetak kunci publik (PEM) untuk instansi penerima")
+    p_verif = sub.add_parser("verifikasi", help="verifikasi surat dengan kunci publik (tanpa arsip)")
+    p_verif.add_argument("surat", help="file PDF surat")
+    p_verif.add_argument("tanda_tangan", help="file .sig (64 byte, atau hex)")
+    p_verif.add_argument("--kunci-publik", required=True, help="file PEM kunci publik")
+    args = parser.parse_args()
+
+    if args.perintah == "kunci-publik":
+        sys.stdout.write(pem_kunci_publik(muat_kunci()).decode("ascii"))
+        return
+    with open(args.surat, "rb") as f:
+        isi = f.read()
+    with open(args.tanda_tangan, "rb") as f:
+        ttd = f.read()
+    if len(ttd) != 64:
+        ttd = bytes.fromhex(ttd.decode("ascii").strip())
+    with open(args.kunci_publik, "rb") as f:
+        publik = serialization.load_pem_public_key(f.read()).public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw
+        )
+    if verifikasi_bytes(isi, ttd, publik):
+        print("Tanda tangan valid: surat asli dan tidak diubah")
+    else:
+        print("Tanda tangan TIDAK valid")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+=================================================================================
+REGISTRI TENANT (BNN PROVINSI) - KOP SURAT, PENANDATANGAN, TEMBUSAN, SEMA
+=================================================================================
+Satu deployment dapat melayani beberapa BNN Provinsi. Tenant bawaan adalah
+BNN Provinsi Kalimantan Utara; tenant lain dibaca dari file JSON
+TAT_TENANT_FILE (list objek dengan field yang sama dengan class Tenant):
+
+[
+  {
+    "kode": "kalsel",
+    "nama_instansi": "BNN Provinsi Kalimantan Selatan",
+    "wilayah_inggris": "PROVINCE OF SOUTH KALIMANTAN",
+    "alamat": "Jl. ..., Kota Banjarbaru, Provinsi Kalimantan Selatan",
+    "kontak": "Telepon: ... | Web: kalsel.bnn.go.id",
+    "tempat_surat": "Banjarbaru",
+    "penandatangan": [{"jabatan": "...", "nama": "...", "nip": "..."}],
+    "tembusan": ["Kepala BNN Provinsi Kalimantan Selatan;", "..."],
+    "sema_limits": {"Ganja": {"limit": 5.0, "unit": "gram"}},
+    "non_sema_list": ["Carisoprodol"]
+  }
+]
+
+Tenant dipilih per sesi lewat query param ?tenant=<kode> dan disimpan di
+data_lengkap['tenant'] sehingga surat dapat di-render ulang dengan kop yang sama.
+=================================================================================
+"""
+
+import json
+import os
+from dataclasses import dataclass
+
+TENANT_DEFAULT = "kaltara"
+
+
+@dataclass(frozen=True, eq=False)
+class Tenant:
+    kode: str
+    nama_instansi: str                 # "BNN Provinsi Kalimantan Utara"
+    wilayah_inggris: str               # "PROVINCE OF NORTH KALIMANTAN"
+    alamat: str
+    kontak: str
+    tempat_surat: str                  # tempat penandatanganan surat
+    penandatangan: tuple = ()          # tuple dict {jabatan, nama, nip}
+    tembusan: tuple = ()               # tanpa instansi pemohon (ditambahkan per surat)
+    sema_limits: dict = None           # digabung ke SEMA_LIMITS (null = hapus kategori)
+    non_sema_list: tuple = None        # mengganti NON_SEMA_LIST
+
+    @property
+    def wilayah(self):
+        """'Provinsi Kalimantan Utara'"""
+        return self.nama_instansi.removeprefix("BNN ")
+
+    @property
+    def tim(self):
+        return f"Tim Asesmen Terpadu Tingkat {self.wilayah}"
+
+    @property
+    def kop_inggris(self):
+        return f"(NATIONAL NARCOTICS BOARD {self.wilayah_inggris})"
+
+
+KALTARA = Tenant(
+    kode="kaltara",
+    nama_instansi="BNN Provinsi Kalimantan Utara",
+    wilayah_inggris="PROVINCE OF NORTH KALIMANTAN",
+    alamat="Jl. Teuku Umar No. 31, Kota Tarakan, Provinsi Kalimantan Utara",
+    kontak="Telepon: (+62) 81256023695 | Web: kaltara.bnn.go.id",
+    tempat_surat="Tarakan",
+    penandatangan=(
+        {'jabatan': "Kepala Seksi Rehabilitasi BNN Provinsi Kalimantan Utara", 'nama': "", 'nip': ""},
+    ),
+    tembusan=(
+        "Kepala BNN Provinsi Kalimantan Utara;",
+        "Sekretaris BNN Provinsi Kalimantan Utara;",
+        "Kepala Seksi Rehabilitasi BNN Provinsi Kalimantan Utara;",
+    ),
+)
+
+
+def _dari_dict(d):
+    d = dict(d)
+    d['penandatangan'] = tuple(d.get('penandatangan', ()))
+    d['tembusan'] = tuple(d.get('tembusan', ()))
+    if d.get('non_sema_list') is not None:
+        d['non_sema_list'] = tuple(d['non_sema_list'])
+    return Tenant(**d)
+
+
+def muat_registri(path=None):
+    """{kode: Tenant}: tenant bawaan + tenant dari file JSON (bila ada)"""
+    registri = {KALTARA.kode: KALTARA}
+    path = path or os.environ.get("TAT_TENANT_FILE")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for d in json.load(f):
+                tenant = _dari_dict(d)
+                registri[tenant.kode] = tenant
+    return registri
+
+
+REGISTRI = muat_registri()
+
+
+def get_tenant(kode=None):
+    """Tenant berdasarkan kode; kode kosong/tidak dikenal -> tenant default"""
+    return REGISTRI.get(kode or TENANT_DEFAULT, REGISTRI[TENANT_DEFAULT])
@@ -0,0 +1,190 @@
+"""
+=================================================================================
+TERBIT ULANG SURAT MASSAL (GANTI PENANDATANGAN / KOP SURAT)
+=================================================================================
+Saat pejabat penandatangan berganti (atau kop tenant diubah di TAT_TENANT_FILE),
+surat yang belum terkirim diterbitkan ulang dengan jabatan/nama/NIP baru:
+
+    python terbit_ulang.py --tenant kaltara --nip-lama "19800101 200501 1 001" \\
+        --jabatan "Kepala BNN Provinsi Kalimantan Utara" --nama "..." --nip "..."
+    python terbit_ulang.py --tenant kaltara --kop --sejak 2025-01-01
+    python terbit_ulang.py ... --cek        # hanya hitung kasus terdampak
+
+- Kasus terdampak dicari lewat indeks (tenant, nip_penandatangan, dibuat) di
+  arsip, tanpa membuka isi kasus; kasus yang suratnya sudah terkirim lewat
+  outbox dilewati (kecuali --termasuk-terkirim).
+- Render paralel di pool worker hangat (pool_hangat). Bila hanya penandatangan
+  yang berubah dan .docx lama ada di gudang blob, cukup blok TTD yang ditambal
+  (hasil identik dengan render penuh); selain itu render penuh. PDF selalu
+  di-render & ditandatangani ulang karena kode verifikasi di footer dihitung
+  dari isi kasus.
+- Per batch: isi kasus, register surat, lampiran outbox yang masih antri dan
+  referensi gudang diperbarui bersama. Dapat dilanjutkan: kasus yang sudah
+  diterbitkan ulang tidak lagi cocok dengan NIP lama.
+=================================================================================
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+
+from arsip import Arsip
+from gudang import GudangBlob, ref_surat
+from tenant import TENANT_DEFAULT
+
+FIELD_TTD = ('jabatan_penandatangan', 'nama_penandatangan', 'nip_penandatangan')
+BATCH = 50
+
+_kunci_worker = None
+_ttd_worker = None
+_kop_worker = False
+
+
+def pilih_kasus(arsip, tenant=TENANT_DEFAULT, penandatangan=None, nip_lama=None,
+                sejak=None, sampai=None, termasuk_terkirim=False):
+    """
+    Id kasus yang perlu diterbitkan ulang. Tanpa nip_lama, kasus yang NIP-nya
+    sudah sama dengan NIP baru dilewati; tanpa NIP sama sekali (ganti kop atau
+    jabatan saja) seluruh kasus tenant pada rentang tanggal terpilih.
+    """
+    arsip.isi_indeks_penandatangan()
+    bukan_nip = None
+    if nip_lama is None and penandatangan:
+        bukan_nip = penandatangan.get('nip_penandatangan')
+    return arsip.cari_kasus_terdampak(tenant, nip=nip_lama, bukan_nip=bukan_nip, sejak=sejak,
+                                      sampai=sampai, kecuali_terkirim=not termasuk_terkirim)
+
+
+def _init_worker(kunci, penandatangan, kop_berubah):
+    global _kunci_worker, _ttd_worker, _kop_worker
+    _kunci_worker, _ttd_worker, _kop_worker = kunci, penandatangan, kop_berubah
+
+
+def _terbitkan_worker(tugas):
+    """(hasil, docx_lama) -> (hasil_baru, docx, surat_ttd, cara), atau None bila tidak berubah"""
+    from app import generate_word_document, tambal_ttd_docx
+    import tanda_tangan
+
+    hasil, docx_lama = tugas
+    data = {**hasil['data'], **_ttd_worker}
+    if data == hasil['data'] and not _kop_worker:
+        return None
+    hasil_baru = {**hasil, 'data': data}
+
+    docx, cara = None, 'tambal'
+    if docx_lama is not None and not _kop_worker:
+        docx = tambal_ttd_docx(docx_lama, hasil['data'], data)
+    if docx is None:
+        docx, cara = generate_word_document(data, hasil['medical'], hasil['legal'],
+                                            hasil['recommendation']).getvalue(), 'render'
+    return hasil_baru, docx, tanda_tangan.tandatangani_surat(hasil_baru, _kunci_worker), cara
+
+
+def terbitkan_ulang(kasus_ids, penandatangan=None, kop_berubah=False, path_arsip=None,
+                    proses=None, batch=BATCH, pengguna="", laporan=None):
+    """
+    Terbitkan ulang surat kasus_ids dengan penandatangan baru (dict sebagian/semua
+    FIELD_TTD) dan/atau kop tenant terbaru. laporan(selesai, total) dipanggil per
+    batch. Mengembalikan ringkasan + rincian per kasus.
+    """
+    import pool_hangat
+    import tanda_tangan
+    from audit import LogAudit
+
+    penandatangan = {f: v for f, v in (penandatangan or {}).items() if f in FIELD_TTD and v}
+    if not penandatangan and not kop_berubah:
+        raise ValueError("Isi penandatangan baru atau tandai kop berubah")
+
+    mulai = time.perf_counter()
+    kasus_ids = list(kasus_ids)
+    arsip = Arsip(path_arsip)
+    gudang = GudangBlob()
+    kunci = tanda_tangan.muat_kunci()
+    audit = LogAudit(kunci=kunci)
+    jumlah, rincian = Counter(), []
+    try:
+        with pool_hangat.pool(proses, initializer=_init_worker,
+                              initargs=(kunci, penandatangan, kop_berubah)) as pool:
+            for i in range(0, len(kasus_ids), batch):
+                tugas = []
+                for kasus_id in kasus_ids[i:i + batch]:
+                    hasil = arsip.ambil_kasus(kasus_id)
+                    if hasil is None:
+                        continue
+                    sha_word = None if kop_berubah else gudang.cari(ref_surat(kasus_id, 'docx'))
+                    tugas.append((hasil, gudang.baca(sha_word) if sha_word else None))
+
+                terbit = [t for t in pool.imap(_terbitkan_worker, tugas, chunksize=2) if t is not None]
+                jumlah['lewat'] += len(tugas) - len(terbit)
+                arsip.perbarui_kasus([t[0] for t in terbit], [t[2] for t in terbit])
+                for hasil_baru, docx, surat_ttd, cara in terbit:
+                    kasus_id = hasil_baru['kasus_id']
+                    gudang.simpan(docx, ref_surat(kasus_id, 'docx'))
+                    gudang.simpan(surat_ttd['pdf'], ref_surat(kasus_id, 'pdf'))
+                    audit.catat('tanda_tangan_surat', pengguna=pengguna, tunggu=False,
+                                kasus_id=kasus_id, nomor_surat=surat_ttd['nomor_surat'],
+                                sha256=surat_ttd['sha256'], id_kunci=surat_ttd['id_kunci'],
+                                alasan='terbit_ulang')
+                    jumlah[cara] += 1
+                    rincian.append({'kasus_id': kasus_id, 'nomor_surat': surat_ttd['nomor_surat'],
+                                    'cara': cara, 'sha256': surat_ttd['sha256']})
+                if laporan:
+                    laporan(min(i + batch, len(kasus_ids)), len(kasus_ids))
+        audit.flush()
+    finally:
+        audit.close()
+        gudang.close()
+        arsip.close()
+
+    return {
+        'jumlah': len(rincian),
+        'tambal': jumlah['tambal'],
+        'render': jumlah['render'],
+        'lewat': jumlah['lewat'],
+        'durasi_detik': round(time.perf_counter() - mulai, 2),
+        'rincian': rincian,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Terbit ulang surat TAT setelah ganti penandatangan/kop")
+    parser.add_argument("--arsip", default=None, help="path arsip SQLite")
+    parser.add_argument("--tenant", default=TENANT_DEFAULT)
+    parser.add_argument("--nip-lama", default=None, help="hanya surat penandatangan dengan NIP ini")
+    parser.add_argument("--sejak", default=None, help="dibuat sejak (YYYY-MM-DD)")
+    parser.add_argument("--sampai", default=None, help="dibuat sebelum (YYYY-MM-DD)")
+    parser.add_argument("--termasuk-terkirim", action="store_true",
+                        help="ikut terbitkan ulang surat yang sudah terkirim")
+    parser.add_argument("--jabatan", default=None, help="jabatan penandatangan baru")
+    parser.add_argument("--nama", default=None, help="nama penandatangan baru")
+    parser.add_argument("--nip", default=None, help="NIP penandatangan baru")
+    parser.add_argument("--kop", action="store_true", help="kop tenant berubah (render penuh)")
+    parser.add_argument("--proses", type=int, default=None, help="jumlah worker render")
+    parser.add_argument("--cek", action="store_true", help="hanya tampilkan jumlah kasus terdampak")
+    args = parser.parse_args()
+
+    penandatangan = {'jabatan_penandatangan': args.jabatan, 'nama_penandatangan': args.nama,
+                     'nip_penandatangan': args.nip}
+    penandatangan = {f: v for f, v in penandatangan.items() if v}
+    if not penandatangan and not args.kop:
+        parser.error("isi --jabatan/--nama/--nip baru atau --kop")
+
+    arsip = Arsip(args.arsip)
+    try:
+        kasus_ids = pilih_kasus(arsip, args.tenant, penandatangan, args.nip_lama,
+                                args.sejak, args.sampai, args.termasuk_terkirim)
+    finally:
+        arsip.close()
+    print(f"{len(kasus_ids)} kasus terdampak", file=sys.stderr)
+    if args.cek or not kasus_ids:
+        return
+
+    r = terbitkan_ulang(kasus_ids, penandatangan, args.kop, args.arsip, args.proses,
+                        laporan=lambda n, total: print(f"  {n}/{total}", file=sys.stderr))
+    print(f"{r['jumlah']} surat diterbitkan ulang ({r['tambal']} tambal TTD, {r['render']} render penuh, "
+          f"{r['lewat']} sudah sesuai) dalam {r['durasi_detik']} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""
+=================================================================================
+VALIDASI DATA KASUS TAT (SKEMA DEKLARATIF)
+=================================================================================
+SKEMA_KASUS mendeskripsikan aturan per field; Validator mengompilasinya sekali
+menjadi dua bentuk dengan semantik yang sama:
+
+- Validator.kasus(data)      -> [(field, pesan)]       satu kasus (form UI)
+- Validator.dataframe(df)    -> DataFrame baris/field/pesan, semua kesalahan
+                                semua baris sekaligus (operasi kolom pandas)
+
+Jenis aturan per field:
+    wajib        field harus terisi (teks tidak kosong / daftar tidak kosong)
+    wajib_jika   (field_lain, nilai): wajib hanya bila field_lain == nilai
+    pola         regex yang harus cocok penuh (teks)
+    pilihan      nilai harus salah satu dari daftar
+    min / maks   batas nilai angka
+    format       format tanggal strptime; dengan opsi usia_min/usia_maks,
+                 tidak_di_masa_depan, tidak_setelah (field tanggal acuan)
+    silang       nama aturan lintas field di ATURAN_SILANG
+
+Aturan yang bukan 'wajib' dilewati untuk nilai kosong, dan aturan berikutnya
+pada field yang sudah salah tidak dilaporkan lagi (satu pesan per masalah).
+=================================================================================
+"""
+
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+FORMAT_TANGGAL_LAHIR = "%d-%m-%Y"
+FORMAT_TANGGAL_SURAT = "%d %B %Y"
+USIA_MIN = 10
+USIA_MAKS = 100
+SATUAN_BARANG_BUKTI = ["gram", "butir", "paket", "lembar", "lainnya"]
+
+# Kode wilayah provinsi (2 digit pertama NIK), Kemendagri
+KODE_PROVINSI = frozenset({
+    11, 12, 13, 14, 15, 16, 17, 18, 19, 21, 31, 32, 33, 34, 35, 36, 51, 52, 53,
+    61, 62, 63, 64, 65, 71, 72, 73, 74, 75, 76, 81, 82, 91, 92, 93, 94, 95, 96,
+})
+
+SKEMA_KASUS = [
+    # Identitas
+    {'field': 'nama', 'wajib': True, 'pesan': "Nama lengkap harus diisi"},
+    {'field': 'nik', 'wajib': True, 'pesan': "NIK harus diisi"},
+    {'field': 'nik', 'pola': r"\d{16}", 'pesan': "NIK harus 16 digit angka"},
+    {'field': 'nik', 'silang': 'nik_struktur'},
+    {'field': 'tanggal_lahir', 'wajib': True, 'pesan': "Tanggal lahir harus diisi"},
+    {'field': 'tanggal_lahir', 'format': FORMAT_TANGGAL_LAHIR, 'tidak_di_masa_depan': True,
+     'usia_min': USIA_MIN, 'usia_maks': USIA_MAKS,
+     'pesan': f"Tanggal lahir tidak wajar (usia harus {USIA_MIN}-{USIA_MAKS} tahun)"},
+    {'field': 'jenis_kelamin', 'pilihan': ["Laki-laki", "Perempuan"],
+     'pesan': "Jenis kelamin tidak dikenal"},
+    {'field': 'nik', 'silang': 'nik_cocok_identitas'},
+    {'field': 'alamat', 'wajib': True, 'pesan': "Alamat harus diisi"},
+
+    # Hukum
+    {'field': 'kronologi', 'wajib': True, 'pesan': "Kronologi kejadian harus diisi"},
+    {'field': 'jenis_narkotika_digunakan', 'tipe': 'daftar', 'wajib': True,
+     'pesan': "Jenis narkotika yang digunakan harus dipilih"},
+    {'field': 'hasil_urine', 'pilihan': ["Positif", "Negatif"], 'pesan': "Hasil tes urine tidak dikenal"},
+    {'field': 'jenis_narkotika_positif', 'tipe': 'daftar', 'wajib_jika': ('hasil_urine', "Positif"),
+     'pesan': "Jenis narkotika yang positif harus dipilih"},
+    {'field': 'riwayat_penahanan', 'tipe': 'angka', 'min': 0,
+     'pesan': "Jumlah penahanan tidak boleh negatif"},
+    {'field': 'barang_bukti_detail', 'silang': 'barang_bukti'},
+    {'field': 'fakta_hukum', 'wajib': True, 'pesan': "Fakta-fakta hukum harus diisi"},
+    {'field': 'kesimpulan_hukum', 'wajib': True, 'pesan': "Kesimpulan hukum harus diisi"},
+
+    # Medis
+    {'field': 'dsm5_count', 'tipe': 'angka', 'min': 0, 'maks': 11,
+     'pesan': "Jumlah kriteria DSM-5 harus 0-11"},
+    {'field': 'durasi_bulan', 'tipe': 'angka', 'min': 0, 'maks': 600,
+     'pesan': "Durasi penggunaan harus 0-600 bulan"},
+    {'field': 'kesimpulan_medis', 'wajib': True, 'pesan': "Kesimpulan medis harus diisi"},
+
+    # Surat
+    {'field': 'nomor_surat_pemohon', 'wajib': True, 'pesan': "Nomor surat pemohon harus diisi"},
+    {'field': 'tanggal_pelaksanaan', 'format': FORMAT_TANGGAL_SURAT, 'tidak_setelah': 'tanggal_surat',
+     'pesan': "Tanggal pelaksanaan asesmen tidak boleh setelah tanggal surat"},
+    {'field': 'tanggal_surat_pemohon', 'format': FORMAT_TANGGAL_SURAT, 'tidak_setelah': 'tanggal_surat',
+     'pesan': "Tanggal surat pemohon tidak boleh setelah tanggal surat"},
+    {'field': 'email_penerima', 'pola': r"[^@\s]+@[^@\s]+\.[^@\s]+",
+     'pesan': "Format email instansi pemohon tidak valid"},
+    {'field': 'nama_penandatangan', 'wajib': True, 'pesan': "Nama penandatangan harus diisi"},
+    {'field': 'nip_penandatangan', 'wajib': True, 'pesan': "NIP penandatangan harus diisi"},
+]
+
+# Field yang tertulis di surat lama (.docx) dan dapat divalidasi saat impor massal
+FIELD_SURAT_LAMA = ('nama', 'nik', 'tanggal_lahir', 'jenis_kelamin', 'jenis_narkotika_positif')
+
+
+# =============================================================================
+# NILAI KOSONG & KONVERSI
+# =============================================================================
+def _kosong(nilai):
+    if nilai is None:
+        return True
+    if isinstance(nilai, str):
+        return not nilai.strip()
+    if isinstance(nilai, (list, tuple, dict, set)):
+        return not nilai
+    return isinstance(nilai, float) and nilai != nilai  # NaN
+
+
+def _kolom(df, field):
+    return df[field] if field in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+
+def _teks(df, field):
+    return _kolom(df, field).fillna("").astype(str).str.strip()
+
+
+def _kosong_seri(df, field, tipe):
+    kolom = _kolom(df, field)
+    if tipe == 'daftar':
+        return kolom.map(lambda v: not v if isinstance(v, (list, tuple, dict, set)) else True)
+    if tipe == 'angka':
+        return kolom.isna()
+    return _teks(df, field) == ""
+
+
+def _tanggal(nilai, fmt):
+    if isinstance(nilai, datetime):
+        return nilai
+    try:
+        return datetime.strptime(str(nilai).strip(), fmt)
+    except ValueError:
+        return None
+
+
+def _usia(lahir, pada):
+    return pada.year - lahir.year - ((pada.month, pada.day) < (lahir.month, lahir.day))
+
+
+# =============================================================================
+# ATURAN LINTAS FIELD: (fungsi satu kasus -> pesan|None, fungsi DataFrame -> Series pesan|None)
+# =============================================================================
+def _nik_struktur(data):
+    nik = str(data.get('nik', ''))
+    if int(nik[:2]) not in KODE_PROVINSI:
+        return "NIK tidak valid: kode provinsi tidak dikenal"
+    if nik[2:4] == "00" or nik[4:6] == "00":
+        return "NIK tidak valid: kode kabupaten/kota atau kecamatan 00"
+    hari, bulan = int(nik[6:8]), int(nik[8:10])
+    if not (1 <= hari <= 31 or 41 <= hari <= 71) or not 1 <= bulan <= 12:
+        return "NIK tidak valid: bagian tanggal lahir tidak mungkin"
+    if nik[12:] == "0000":
+        return "NIK tidak valid: nomor urut 0000"
+    return None
+
+
+def _nik_struktur_seri(df):
+    nik = _teks(df, 'nik')
+    prov = pd.to_numeric(nik.str[:2], errors="coerce")
+    hari = pd.to_numeric(nik.str[6:8], errors="coerce")
+    bulan = pd.to_numeric(nik.str[8:10], errors="coerce")
+    kondisi = [
+        ~prov.isin(KODE_PROVINSI),
+        (nik.str[2:4] == "00") | (nik.str[4:6] == "00"),
+        ~(hari.between(1, 31) | hari.between(41, 71)) | ~bulan.between(1, 12),
+        nik.str[12:] == "0000",
+    ]
+    pesan = [
+        "NIK tidak valid: kode provinsi tidak dikenal",
+        "NIK tidak valid: kode kabupaten/kota atau kecamatan 00",
+        "NIK tidak valid: bagian tanggal lahir tidak mungkin",
+        "NIK tidak valid: nomor urut 0000",
+    ]
+    return pd.Series(np.select(kondisi, pesan, default=None), index=df.index, dtype=object)
+
+
+_PESAN_NIK_IDENTITAS = "NIK tidak cocok dengan tanggal lahir/jenis kelamin (digit 7-12 NIK = DDMMYY, DD+40 untuk perempuan)"
+
+
+def _nik_cocok_identitas(data):
+    lahir = _tanggal(data.get('tanggal_lahir'), FORMAT_TANGGAL_LAHIR)
+    if lahir is None:
+        return None
+    nik = str(data['nik'])
+    hari, bulan, tahun = int(nik[6:8]), int(nik[8:10]), int(nik[10:12])
+    perempuan = hari > 40
+    if data.get('jenis_kelamin') in ("Laki-laki", "Perempuan") and \
+            perempuan != (data['jenis_kelamin'] == "Perempuan"):
+        return _PESAN_NIK_IDENTITAS
+    if (hari - 40 if perempuan else hari, bulan, tahun) != (lahir.day, lahir.month, lahir.year % 100):
+        return _PESAN_NIK_IDENTITAS
+    return None
+
+
+def _nik_cocok_identitas_seri(df):
+    nik = _teks(df, 'nik')
+    lahir = pd.to_datetime(_teks(df, 'tanggal_lahir'), format=FORMAT_TANGGAL_LAHIR, errors="coerce")
+    hari = pd.to_numeric(nik.str[6:8], errors="coerce")
+    bulan = pd.to_numeric(nik.str[8:10], errors="coerce")
+    tahun = pd.to_numeric(nik.str[10:12], errors="coerce")
+    perempuan = hari > 40
+    jk = _teks(df, 'jenis_kelamin')
+    salah_jk = jk.isin(["Laki-laki", "Perempuan"]) & (perempuan != (jk == "Perempuan"))
+    salah_tgl = ((hari - 40 * perempuan) != lahir.dt.day) | (bulan != lahir.dt.month) | \
+        (tahun != lahir.dt.year % 100)
+    salah = lahir.notna() & (salah_jk | salah_tgl)
+    return pd.Series(np.where(salah, _PESAN_NIK_IDENTITAS, None), index=df.index, dtype=object)
+
+
+def _barang_bukti(data):
+    jenis = data.get('barang_bukti_jenis')
+    jenis = list(jenis) if isinstance(jenis, (list, tuple)) else []
+    detail = data.get('barang_bukti_detail')
+    detail = detail if isinstance(detail, dict) else {}
+    masalah = []
+    for j in jenis:
+        d = detail.get(j)
+        if d is None:
+            masalah.append(f"jumlah {j} belum diisi")
+            continue
+        try:
+            jumlah = float(d.get('jumlah'))
+        except (TypeError, ValueError):
+            jumlah = 0.0
+        if not jumlah > 0:
+            masalah.append(f"jumlah {j} harus lebih dari 0")
+        if d.get('satuan') not in SATUAN_BARANG_BUKTI:
+            masalah.append(f"satuan {j} tidak dikenal")
+    lebih = [j for j in detail if j not in jenis]
+    if lebih:
+        masalah.append(f"detail tanpa jenis barang bukti: {', '.join(lebih)}")
+    return f"Barang bukti: {'; '.join(masalah)}" if masalah else None
+
+
+def _barang_bukti_seri(df):
+    # field bersarang (dict per baris): diperiksa per baris
+    jenis = _kolom(df, 'barang_bukti_jenis')
+    detail = _kolom(df, 'barang_bukti_detail')
+    return pd.Series(
+        [_barang_bukti({'barang_bukti_jenis': j, 'barang_bukti_detail': d})
+         for j, d in zip(jenis, detail)],
+        index=df.index, dtype=object
+    )
+
+
+ATURAN_SILANG = {
+    'nik_struktur': (_nik_struktur, _nik_struktur_seri, ('nik',)),
+    'nik_cocok_identitas': (_nik_cocok_identitas, _nik_cocok_identitas_seri,
+                            ('nik', 'tanggal_lahir', 'jenis_kelamin')),
+    'barang_bukti': (_barang_bukti, _barang_bukti_seri, ('barang_bukti_detail',)),
+}
+
+
+# =============================================================================
+# KOMPILASI
+# =============================================================================
+class _Aturan:
+    """Satu aturan terkompilasi: cek(data) -> pesan|None, cek_seri(df) -> Series pesan|None"""
+
+    __slots__ = ('field', 'bergantung', 'cek', 'cek_seri')
+
+    def __init__(self, field, bergantung, cek, cek_seri):
+        self.field = field
+        self.bergantung = bergantung
+        self.cek = cek
+        self.cek_seri = cek_seri
+
+
+def _kompilasi_aturan(spek):
+    field = spek['field']
+    tipe = spek.get('tipe', 'teks')
+    pesan = spek.get('pesan')
+
+    if 'silang' in spek:
+        cek, cek_seri, bergantung = ATURAN_SILANG[spek['silang']]
+        return _Aturan(field, bergantung, cek, cek_seri)
+
+    def seri_pesan(mask):
+        return pd.Series(np.where(mask, pesan, None), index=mask.index, dtype=object)
+
+    if spek.get('wajib') or 'wajib_jika' in spek:
+        syarat = spek.get('wajib_jika')
+
+        def cek(data):
+            if syarat and data.get(syarat[0]) != syarat[1]:
+                return None
+            return pesan if _kosong(data.get(field)) else None
+
+        def cek_seri(df):
+            mask = _kosong_seri(df, field, tipe)
+            if syarat:
+                mask &= _kolom(df, syarat[0]) == syarat[1]
+            return seri_pesan(mask)
+
+        return _Aturan(field, (field,), cek, cek_seri)
+
+    # aturan nilai: nilai kosong dilewati
+    if 'pola' in spek:
+        pola = re.compile(spek['pola'])
+        salah = lambda v: pola.fullmatch(str(v).strip()) is None  # noqa: E731
+        salah_seri = lambda df: ~_teks(df, field).str.fullmatch(spek['pola'])  # noqa: E731
+    elif 'pilihan' in spek:
+        pilihan = list(spek['pilihan'])
+        salah = lambda v: v not in pilihan  # noqa: E731
+        salah_seri = lambda df: ~_kolom(df, field).isin(pilihan)  # noqa: E731
+    elif tipe == 'angka':
+        batas_min, batas_maks = spek.get('min', -np.inf), spek.get('maks', np.inf)
+
+        def salah(v):
+            try:
+                return not batas_min <= float(v) <= batas_maks
+            except (TypeError, ValueError):
+                return True
+
+        def salah_seri(df):
+            angka = pd.to_numeric(_kolom(df, field), errors="coerce")
+            return ~angka.between(batas_min, batas_maks)
+    elif 'format' in spek:
+        fmt = spek['format']
+        acuan = spek.get('tidak_setelah')
+        masa_depan = spek.get('tidak_di_masa_depan', False)
+        usia_min, usia_maks = spek.get('usia_min'), spek.get('usia_maks')
+
+        def salah(v, data):
+            tgl = _tanggal(v, fmt)
+            if tgl is None:
+                return True
+            hari_ini = datetime.now()
+            if masa_depan and tgl > hari_ini:
+                return True
+            if usia_min is not None and not usia_min <= _usia(tgl, hari_ini) <= usia_maks:
+                return True
+            if acuan:
+                batas = _tanggal(data.get(acuan), fmt)
+                if batas is not None and tgl > batas:
+                    return True
+            return False
+
+        def salah_seri(df):
+            tgl = pd.to_datetime(_teks(df, field), format=fmt, errors="coerce")
+            mask = tgl.isna()
+            hari_ini = pd.Timestamp.now()
+            if masa_depan:
+                mask |= tgl > hari_ini
+            if usia_min is not None:
+                usia = hari_ini.year - tgl.dt.year - (
+                    (tgl.dt.month > hari_ini.month) |
+                    ((tgl.dt.month == hari_ini.month) & (tgl.dt.day > hari_ini.day))
+                )
+                mask |= ~usia.between(usia_min, usia_maks)
+            if acuan:
+                batas = pd.to_datetime(_teks(df, acuan), format=fmt, errors="coerce")
+                mask |= batas.notna() & (tgl > batas)
+            return mask
+
+        def cek(data):
+            v = data.get(field)
+            return None if _kosong(v) or not salah(v, data) else pesan
+
+        def cek_seri(df):
+            return seri_pesan(~_kosong_seri(df, field, tipe) & salah_seri(df).fillna(True))
+
+        return _Aturan(field, (field,), cek, cek_seri)
+    else:
+        raise ValueError(f"aturan tidak dikenal untuk field {field}: {spek}")
+
+    def cek(data):
+        v = data.get(field)
+        return None if _kosong(v) or not salah(v) else pesan
+
+    def cek_seri(df):
+        return seri_pesan(~_kosong_seri(df, field, tipe) & salah_seri(df).fillna(True).astype(bool))
+
+    return _Aturan(field, (field,), cek, cek_seri)
+
+
+class Validator:
+    """Skema terkompilasi; field: batasi ke subset field (mis. FIELD_SURAT_LAMA)"""
+
+    def __init__(self, skema=SKEMA_KASUS, field=None):
+        self.aturan = [
+            _kompilasi_aturan(spek) for spek in skema
+            if field is None or spek['field'] in field
+        ]
+
+    def kasus(self, data):
+        """Semua kesalahan satu kasus: list (field, pesan), urut sesuai skema"""
+        gagal = set()
+        hasil = []
+        for aturan in self.aturan:
+            if gagal.intersection(aturan.bergantung):
+                continue
+            pesan = aturan.cek(data)
+            if pesan:
+                gagal.add(aturan.field)
+                hasil.append((aturan.field, pesan))
+        return hasil
+
+    def dataframe(self, df):
+        """
+        Semua kesalahan semua baris: DataFrame kolom baris (indeks df), field, pesan;
+        urut per baris lalu urutan skema. DataFrame kosong bila semua valid.
+        """
+        gagal = {}
+        bagian = []
+        for urutan, aturan in enumerate(self.aturan):
+            pesan = aturan.cek_seri(df)
+            lewati = None
+            for f in aturan.bergantung:
+                if f in gagal:
+                    lewati = gagal[f] if lewati is None else (lewati | gagal[f])
+            mask = pesan.notna()
+            if lewati is not None:
+                mask &= ~lewati
+            if not mask.any():
+                continue
+            gagal[aturan.field] = mask if aturan.field not in gagal else (gagal[aturan.field] | mask)
+            bagian.append(pd.DataFrame({
+                'baris': df.index[mask.to_numpy()],
+                'field': aturan.field,
+                'pesan': pesan[mask].to_numpy(),
+                '_urutan': urutan,
+            }))
+        if not bagian:
+            return pd.DataFrame({'baris': pd.Series(dtype=df.index.dtype),
+                                 'field': pd.Series(dtype=object), 'pesan': pd.Series(dtype=object)})
+        hasil = pd.concat(bagian, ignore_index=True)
+        hasil['_posisi'] = df.index.get_indexer(hasil['baris'])
+        return (hasil.sort_values(['_posisi', '_urutan'], kind="stable")
+                .drop(columns=['_posisi', '_urutan']).reset_index(drop=True))
+
+
+VALIDATOR = Validator()
+VALIDATOR_SURAT_LAMA = Validator(field=FIELD_SURAT_LAMA)
+
+
+def validasi_kasus(data):
+    """Pesan kesalahan satu kasus (list string, kosong bila valid)"""
+    return [pesan for _, pesan in VALIDATOR.kasus(data)]